@@ -0,0 +1,38 @@
+"""add adaptive_item_stats
+
+Revision ID: add_adaptive_item_stats
+Revises: add_calendar_entries
+Create Date: 2026-10-20 01:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_adaptive_item_stats'
+down_revision = 'add_calendar_entries'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Compteurs cumulés par question de test adaptatif (alimenter ensuite avec rebuild_adaptive_item_stats.py)
+    op.create_table(
+        'adaptive_item_stats',
+        sa.Column('question_id', sa.Integer(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('correct', sa.Integer(), nullable=False),
+        sa.Column('timed_attempts', sa.Integer(), nullable=False),
+        sa.Column('response_time_sum', sa.Float(), nullable=False),
+        sa.Column('response_time_sq_sum', sa.Float(), nullable=False),
+        sa.Column('total_score_sum', sa.Float(), nullable=False),
+        sa.Column('total_score_sq_sum', sa.Float(), nullable=False),
+        sa.Column('correct_total_score_sum', sa.Float(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('question_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('adaptive_item_stats')
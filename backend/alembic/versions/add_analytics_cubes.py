@@ -0,0 +1,64 @@
+"""add analytics_cubes
+
+Revision ID: add_analytics_cubes
+Revises: add_daily_activity_rollups
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_analytics_cubes'
+down_revision = 'add_daily_activity_rollups'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Cube des résultats pour les tableaux de bord /analytics
+    op.create_table(
+        'analytics_cubes',
+        sa.Column('source', sa.String(length=20), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('hour', sa.Integer(), nullable=False),
+        sa.Column('class_id', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('teacher_id', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('subject', sa.String(length=100), nullable=False, server_default=''),
+        sa.Column('score_bucket', sa.Integer(), nullable=False),
+        sa.Column('result_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('score_sum', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('percentage_sum', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('time_spent_sum', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('time_spent_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('source', 'day', 'hour', 'class_id', 'teacher_id', 'subject', 'score_bucket')
+    )
+    op.create_index('ix_analytics_cubes_source_day', 'analytics_cubes', ['source', 'day'])
+    op.create_index('ix_analytics_cubes_teacher_subject', 'analytics_cubes', ['source', 'teacher_id', 'subject'])
+
+    # Élèves actifs par jour (comptages distincts)
+    op.create_table(
+        'analytics_student_days',
+        sa.Column('source', sa.String(length=20), nullable=False),
+        sa.Column('student_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('class_id', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('result_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.ForeignKeyConstraint(['student_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('source', 'student_id', 'day')
+    )
+    op.create_index('ix_analytics_student_days_source_day', 'analytics_student_days', ['source', 'day'])
+
+    # Remplissage initial depuis quiz_results et test_attempts
+    from services.analytics_cubes import AnalyticsCubeService
+    AnalyticsCubeService(Session(bind=op.get_bind())).rebuild()
+
+
+def downgrade() -> None:
+    op.drop_index('ix_analytics_student_days_source_day', table_name='analytics_student_days')
+    op.drop_table('analytics_student_days')
+    op.drop_index('ix_analytics_cubes_teacher_subject', table_name='analytics_cubes')
+    op.drop_index('ix_analytics_cubes_source_day', table_name='analytics_cubes')
+    op.drop_table('analytics_cubes')
@@ -0,0 +1,47 @@
+"""add assessment_events
+
+Revision ID: add_assessment_events
+Revises: add_learning_path_templates
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_assessment_events'
+down_revision = 'add_learning_path_templates'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Journal unifié des résultats d'évaluation (alimenter ensuite avec backfill_assessment_events.py)
+    op.create_table(
+        'assessment_events',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('source', sa.String(length=30), nullable=False),
+        sa.Column('source_id', sa.Integer(), nullable=False),
+        sa.Column('student_id', sa.Integer(), nullable=False),
+        sa.Column('class_id', sa.Integer(), nullable=True),
+        sa.Column('subject', sa.String(length=255), nullable=False),
+        sa.Column('title', sa.String(length=255), nullable=False),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.Column('max_score', sa.Float(), nullable=False),
+        sa.Column('normalized_score', sa.Float(), nullable=False),
+        sa.Column('occurred_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['student_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('source', 'source_id', name='uq_assessment_events_source')
+    )
+    op.create_index('ix_assessment_events_id', 'assessment_events', ['id'])
+    op.create_index('ix_assessment_events_student_time', 'assessment_events', ['student_id', 'occurred_at'])
+    op.create_index('ix_assessment_events_class_subject_time', 'assessment_events', ['class_id', 'subject', 'occurred_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_assessment_events_class_subject_time', table_name='assessment_events')
+    op.drop_index('ix_assessment_events_student_time', table_name='assessment_events')
+    op.drop_index('ix_assessment_events_id', table_name='assessment_events')
+    op.drop_table('assessment_events')
@@ -0,0 +1,29 @@
+"""add background_tasks.applied_at
+
+Revision ID: add_background_task_applied_at
+Revises: assessment_events_assignment_class
+Create Date: 2026-10-20 04:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_background_task_applied_at'
+down_revision = 'assessment_events_assignment_class'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Marque posée dans la transaction des effets d'un traitement (services/task_queue.claim_effects)
+    with op.batch_alter_table('background_tasks') as batch_op:
+        batch_op.add_column(sa.Column('applied_at', sa.DateTime(), nullable=True))
+    # Tâches déjà conclues: leurs effets sont validés
+    op.execute("UPDATE background_tasks SET applied_at = finished_at WHERE status = 'succeeded'")
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('background_tasks') as batch_op:
+        batch_op.drop_column('applied_at')
@@ -0,0 +1,53 @@
+"""add background_tasks
+
+Revision ID: add_background_tasks
+Revises: add_test_access_indexes
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_background_tasks'
+down_revision = 'add_test_access_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # File de tâches durable des traitements après soumission
+    op.create_table(
+        'background_tasks',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('idempotency_key', sa.String(length=160), nullable=False),
+        sa.Column('kind', sa.String(length=60), nullable=False),
+        sa.Column('subject', sa.String(length=80), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=True),
+        sa.Column('priority', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('max_attempts', sa.Integer(), nullable=False),
+        sa.Column('run_at', sa.DateTime(), nullable=False),
+        sa.Column('locked_at', sa.DateTime(), nullable=True),
+        sa.Column('locked_by', sa.String(length=80), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('result', sa.Text(), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('idempotency_key')
+    )
+    op.create_index('ix_background_tasks_id', 'background_tasks', ['id'])
+    op.create_index('ix_background_tasks_ready', 'background_tasks', ['status', 'run_at', 'priority'])
+    op.create_index('ix_background_tasks_subject', 'background_tasks', ['subject'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_background_tasks_subject', table_name='background_tasks')
+    op.drop_index('ix_background_tasks_ready', table_name='background_tasks')
+    op.drop_index('ix_background_tasks_id', table_name='background_tasks')
+    op.drop_table('background_tasks')
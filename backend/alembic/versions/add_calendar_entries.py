@@ -0,0 +1,61 @@
+"""add calendar_entries
+
+Revision ID: add_calendar_entries
+Revises: add_content_sharing_targets
+Create Date: 2026-10-20 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_calendar_entries'
+down_revision = 'add_content_sharing_targets'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Événements de calendrier matérialisés (alimenter ensuite avec rebuild_calendar_entries.py)
+    op.create_table(
+        'calendar_entries',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('source', sa.String(length=20), nullable=False),
+        sa.Column('source_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('class_id', sa.Integer(), nullable=True),
+        sa.Column('owner_id', sa.Integer(), nullable=True),
+        sa.Column('event_type', sa.String(length=50), nullable=False),
+        sa.Column('title', sa.String(length=255), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('subject', sa.String(length=100), nullable=True),
+        sa.Column('location', sa.String(length=255), nullable=True),
+        sa.Column('color', sa.String(length=7), nullable=True),
+        sa.Column('status', sa.String(length=50), nullable=True),
+        sa.Column('all_day', sa.Boolean(), nullable=False),
+        sa.Column('starts_at', sa.DateTime(), nullable=False),
+        sa.Column('ends_at', sa.DateTime(), nullable=False),
+        sa.Column('rrule', sa.String(length=255), nullable=True),
+        sa.Column('recurrence_until', sa.DateTime(), nullable=True),
+        sa.Column('range_end', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['class_id'], ['class_groups.id']),
+        sa.ForeignKeyConstraint(['owner_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('source', 'source_id', name='ux_calendar_entries_source')
+    )
+    op.create_index(op.f('ix_calendar_entries_id'), 'calendar_entries', ['id'], unique=False)
+    # Recherche par plage: audience, puis fin de l'intervalle couvert, puis début
+    op.create_index('ix_calendar_entries_user_range', 'calendar_entries', ['user_id', 'range_end', 'starts_at'])
+    op.create_index('ix_calendar_entries_class_range', 'calendar_entries', ['class_id', 'range_end', 'starts_at'])
+    op.create_index('ix_calendar_entries_owner_range', 'calendar_entries', ['owner_id', 'range_end', 'starts_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_calendar_entries_owner_range', table_name='calendar_entries')
+    op.drop_index('ix_calendar_entries_class_range', table_name='calendar_entries')
+    op.drop_index('ix_calendar_entries_user_range', table_name='calendar_entries')
+    op.drop_index(op.f('ix_calendar_entries_id'), table_name='calendar_entries')
+    op.drop_table('calendar_entries')
@@ -0,0 +1,68 @@
+"""add content recommender tables
+
+Revision ID: add_content_recommender
+Revises: add_library_catalogue
+Create Date: 2026-10-19 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_content_recommender'
+down_revision = 'add_library_catalogue'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Voisins précalculés et candidats par élève (alimentés par run_recommender.py --full)
+    op.create_table(
+        'content_neighbours',
+        sa.Column('content_id', sa.Integer(), nullable=False),
+        sa.Column('neighbour_id', sa.Integer(), nullable=False),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.Column('rank', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['content_id'], ['contents.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['neighbour_id'], ['contents.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('content_id', 'neighbour_id')
+    )
+    op.create_index('ix_content_neighbours_rank', 'content_neighbours', ['content_id', 'rank'])
+
+    op.create_table(
+        'student_recommendation_candidates',
+        sa.Column('student_id', sa.Integer(), nullable=False),
+        sa.Column('content_id', sa.Integer(), nullable=False),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.Column('rank', sa.Integer(), nullable=False),
+        sa.Column('subject', sa.String(length=100), nullable=True),
+        sa.ForeignKeyConstraint(['student_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['content_id'], ['contents.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('student_id', 'content_id')
+    )
+    op.create_index(
+        'ix_student_recommendation_candidates_rank', 'student_recommendation_candidates', ['student_id', 'rank']
+    )
+
+    op.create_table(
+        'recommender_runs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('mode', sa.String(length=20), nullable=False),
+        sa.Column('watermark', sa.DateTime(), nullable=False),
+        sa.Column('items_updated', sa.Integer(), nullable=False),
+        sa.Column('students_updated', sa.Integer(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=False),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_recommender_runs_id'), 'recommender_runs', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_recommender_runs_id'), table_name='recommender_runs')
+    op.drop_table('recommender_runs')
+    op.drop_index('ix_student_recommendation_candidates_rank', table_name='student_recommendation_candidates')
+    op.drop_table('student_recommendation_candidates')
+    op.drop_index('ix_content_neighbours_rank', table_name='content_neighbours')
+    op.drop_table('content_neighbours')
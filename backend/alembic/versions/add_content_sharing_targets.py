@@ -0,0 +1,67 @@
+"""add content_sharing_targets and unique content access per sharing
+
+Revision ID: add_content_sharing_targets
+Revises: add_content_recommender
+Create Date: 2026-10-19 23:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_content_sharing_targets'
+down_revision = 'add_content_recommender'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'content_sharing_targets',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('sharing_id', sa.Integer(), nullable=False),
+        sa.Column('class_id', sa.Integer(), nullable=True),
+        sa.Column('student_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['sharing_id'], ['content_sharings.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['class_id'], ['class_groups.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['student_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_content_sharing_targets_id'), 'content_sharing_targets', ['id'], unique=False)
+    op.create_index(op.f('ix_content_sharing_targets_sharing_id'), 'content_sharing_targets', ['sharing_id'], unique=False)
+    op.create_index('ix_content_sharing_targets_class', 'content_sharing_targets', ['class_id', 'sharing_id'])
+    op.create_index('ix_content_sharing_targets_student', 'content_sharing_targets', ['student_id', 'sharing_id'])
+
+    # Partages existants: leurs destinataires restent ceux qui ont reçu une ligne d'accès
+    op.execute("""
+        INSERT INTO content_sharing_targets (sharing_id, student_id)
+        SELECT DISTINCT sharing_id, student_id FROM content_accesses
+    """)
+
+    # Un élève présent dans plusieurs classes ciblées avait plusieurs lignes d'accès:
+    # cumuler les compteurs sur la plus ancienne et supprimer les autres
+    op.execute("""
+        UPDATE content_accesses SET access_count = (
+            SELECT SUM(COALESCE(d.access_count, 0)) FROM content_accesses d
+            WHERE d.sharing_id = content_accesses.sharing_id AND d.student_id = content_accesses.student_id
+        )
+        WHERE id IN (
+            SELECT MIN(id) FROM content_accesses GROUP BY sharing_id, student_id HAVING COUNT(*) > 1
+        )
+    """)
+    op.execute("""
+        DELETE FROM content_accesses WHERE id NOT IN (
+            SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM content_accesses GROUP BY sharing_id, student_id) k
+        )
+    """)
+    op.create_index('ux_content_accesses_sharing_student', 'content_accesses', ['sharing_id', 'student_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ux_content_accesses_sharing_student', table_name='content_accesses')
+    op.drop_index('ix_content_sharing_targets_student', table_name='content_sharing_targets')
+    op.drop_index('ix_content_sharing_targets_class', table_name='content_sharing_targets')
+    op.drop_index(op.f('ix_content_sharing_targets_sharing_id'), table_name='content_sharing_targets')
+    op.drop_index(op.f('ix_content_sharing_targets_id'), table_name='content_sharing_targets')
+    op.drop_table('content_sharing_targets')
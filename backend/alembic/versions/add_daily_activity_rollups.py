@@ -0,0 +1,50 @@
+"""add daily_activity_rollups
+
+Revision ID: add_daily_activity_rollups
+Revises: add_hot_table_composite_indexes
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_daily_activity_rollups'
+down_revision = 'add_hot_table_composite_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Agrégat journalier de learning_history, maintenu à l'écriture
+    op.create_table(
+        'daily_activity_rollups',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('activity_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('scored_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('score_sum', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('last_activity_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('user_id', 'day')
+    )
+    op.create_index('ix_daily_activity_rollups_day', 'daily_activity_rollups', ['day'])
+
+    # Remplissage initial depuis l'historique existant (absent sur certains déploiements)
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table("learning_history"):
+        return
+    day_expr = "CAST(timestamp AS DATE)" if bind.dialect.name == "postgresql" else "date(timestamp)"
+    op.execute(f"""
+        INSERT INTO daily_activity_rollups
+            (user_id, day, activity_count, scored_count, score_sum, last_activity_at)
+        SELECT student_id, {day_expr}, COUNT(*), COUNT(score), COALESCE(SUM(score), 0), MAX(timestamp)
+        FROM learning_history
+        GROUP BY student_id, {day_expr}
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_daily_activity_rollups_day', table_name='daily_activity_rollups')
+    op.drop_table('daily_activity_rollups')
@@ -0,0 +1,51 @@
+"""add deadline_events
+
+Revision ID: add_deadline_events
+Revises: add_french_test_session_tables
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_deadline_events'
+down_revision = 'add_french_test_session_tables'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Échéances planifiées des notifications (devoirs, objectifs, rappels)
+    op.create_table(
+        'deadline_events',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('idempotency_key', sa.String(length=160), nullable=False),
+        sa.Column('source', sa.String(length=20), nullable=False),
+        sa.Column('item_id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=30), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('fire_at', sa.DateTime(), nullable=False),
+        sa.Column('fired_at', sa.DateTime(), nullable=True),
+        sa.Column('cancelled_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('idempotency_key')
+    )
+    op.create_index('ix_deadline_events_id', 'deadline_events', ['id'])
+    op.create_index('ix_deadline_events_pending', 'deadline_events', ['fired_at', 'cancelled_at', 'fire_at'])
+    op.create_index('ix_deadline_events_item', 'deadline_events', ['source', 'item_id'])
+
+    # Planification initiale des devoirs, objectifs et rappels ouverts
+    from services.deadline_scheduler import deadline_scheduler
+    deadline_scheduler.rebuild(Session(bind=op.get_bind()))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_deadline_events_item', table_name='deadline_events')
+    op.drop_index('ix_deadline_events_pending', table_name='deadline_events')
+    op.drop_index('ix_deadline_events_id', table_name='deadline_events')
+    op.drop_table('deadline_events')
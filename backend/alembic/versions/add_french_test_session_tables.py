@@ -0,0 +1,88 @@
+"""add french test session tables
+
+Revision ID: add_french_test_session_tables
+Revises: add_analytics_cubes
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_french_test_session_tables'
+down_revision = 'add_analytics_cubes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Tables auparavant créées à l'exécution par FrenchTestSessionManager (CREATE TABLE IF NOT EXISTS)
+    inspector = sa.inspect(op.get_bind())
+    tables = inspector.get_table_names()
+
+    if 'french_adaptive_tests' not in tables:
+        op.create_table(
+            'french_adaptive_tests',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('student_id', sa.Integer(), nullable=False),
+            sa.Column('test_type', sa.String(), nullable=False),
+            sa.Column('current_question_index', sa.Integer(), nullable=True),
+            sa.Column('total_questions', sa.Integer(), nullable=True),
+            sa.Column('current_difficulty', sa.String(), nullable=False),
+            sa.Column('status', sa.String(), nullable=True),
+            sa.Column('started_at', sa.DateTime(), nullable=True),
+            sa.Column('completed_at', sa.DateTime(), nullable=True),
+            sa.Column('final_score', sa.Float(), nullable=True),
+            sa.Column('difficulty_progression', sa.Text(), nullable=True),
+            sa.Column('level_progression', sa.String(), nullable=True),
+            sa.Column('current_level', sa.String(), nullable=True),
+            sa.Column('questions_sequence', sa.Text(), nullable=True),
+            sa.ForeignKeyConstraint(['student_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_french_adaptive_tests_id', 'french_adaptive_tests', ['id'])
+    elif 'questions_sequence' not in [c['name'] for c in inspector.get_columns('french_adaptive_tests')]:
+        op.add_column('french_adaptive_tests', sa.Column('questions_sequence', sa.Text(), nullable=True))
+
+    if 'french_test_answers' not in tables:
+        op.create_table(
+            'french_test_answers',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('test_id', sa.Integer(), nullable=False),
+            sa.Column('student_id', sa.Integer(), nullable=False),
+            sa.Column('question_id', sa.Integer(), nullable=False),
+            sa.Column('answer', sa.Text(), nullable=False),
+            sa.Column('is_correct', sa.Boolean(), nullable=False),
+            sa.Column('score', sa.Integer(), nullable=False),
+            sa.Column('answered_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['test_id'], ['french_adaptive_tests.id']),
+            sa.ForeignKeyConstraint(['student_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_french_test_answers_id', 'french_test_answers', ['id'])
+    op.create_index('ix_french_test_answers_test_id', 'french_test_answers', ['test_id'], if_not_exists=True)
+
+    if 'french_learning_profiles' not in tables:
+        op.create_table(
+            'french_learning_profiles',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('student_id', sa.Integer(), nullable=False),
+            sa.Column('learning_style', sa.String(), nullable=True),
+            sa.Column('french_level', sa.String(), nullable=True),
+            sa.Column('preferred_pace', sa.String(), nullable=True),
+            sa.Column('strengths', sa.Text(), nullable=True),
+            sa.Column('weaknesses', sa.Text(), nullable=True),
+            sa.Column('cognitive_profile', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['student_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('student_id', name='uq_french_learning_profiles_student_id')
+        )
+        op.create_index('ix_french_learning_profiles_id', 'french_learning_profiles', ['id'])
+
+
+def downgrade() -> None:
+    # Les tables préexistaient souvent à cette migration: seul l'index ajouté est retiré
+    op.drop_index('ix_french_test_answers_test_id', table_name='french_test_answers', if_exists=True)
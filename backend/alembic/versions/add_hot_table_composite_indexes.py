@@ -0,0 +1,52 @@
+"""add composite indexes on hot tables
+
+Revision ID: add_hot_table_composite_indexes
+Revises: add_student_badge_counters
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_hot_table_composite_indexes'
+down_revision = 'add_student_badge_counters'
+branch_labels = None
+depends_on = None
+
+
+# (nom de l'index, table, colonnes) - doit rester aligné avec les Index(...) des modèles
+INDEXES = [
+    ('ix_quiz_results_student_quiz', 'quiz_results', ['student_id', 'quiz_id']),
+    ('ix_quiz_results_student_completed', 'quiz_results', ['student_id', 'completed_at']),
+    ('ix_quiz_results_quiz_completed', 'quiz_results', ['quiz_id', 'completed_at']),
+    ('ix_quiz_answers_result_question', 'quiz_answers', ['result_id', 'question_id']),
+    ('ix_quiz_assignments_student_id', 'quiz_assignments', ['student_id']),
+    ('ix_quiz_assignments_class_id', 'quiz_assignments', ['class_id']),
+    ('ix_learning_history_student_timestamp', 'learning_history', ['student_id', 'timestamp']),
+    ('ix_user_activity_user_timestamp', 'user_activity', ['user_id', 'timestamp']),
+    ('ix_user_badge_user_badge', 'user_badge', ['user_id', 'badge_id']),
+    ('ix_class_groups_teacher_id', 'class_groups', ['teacher_id']),
+    ('ix_class_students_class_student', 'class_students', ['class_id', 'student_id']),
+    ('ix_class_students_student_id', 'class_students', ['student_id']),
+    ('ix_remediation_results_student_topic', 'remediation_results', ['student_id', 'topic', 'completed_at']),
+    ('ix_remediation_results_student_completed', 'remediation_results', ['student_id', 'completed_at']),
+    ('ix_remediation_badges_student_id', 'remediation_badges', ['student_id']),
+    ('ix_remediation_progress_student_topic', 'remediation_progress', ['student_id', 'topic']),
+]
+
+
+def upgrade() -> None:
+    # Les tables ont souvent été créées par des scripts: ignorer celles qui manquent
+    existing_tables = set(sa.inspect(op.get_bind()).get_table_names())
+    for name, table, columns in INDEXES:
+        if table in existing_tables:
+            op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    existing_tables = set(sa.inspect(op.get_bind()).get_table_names())
+    for name, table, _ in reversed(INDEXES):
+        if table in existing_tables:
+            op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,51 @@
+"""add learning path templates
+
+Revision ID: add_learning_path_templates
+Revises: add_background_tasks
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_learning_path_templates'
+down_revision = 'add_background_tasks'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Parcours partagés: un parcours par modèle compilé
+    with op.batch_alter_table('learning_paths') as batch_op:
+        batch_op.add_column(sa.Column('template_key', sa.String(length=120), nullable=True))
+    op.create_index('ix_learning_paths_template_key', 'learning_paths', ['template_key'], unique=True)
+
+    # Écarts par élève sur les étapes d'un parcours partagé
+    op.create_table(
+        'student_path_step_overrides',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('student_learning_path_id', sa.Integer(), nullable=False),
+        sa.Column('step_number', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(), nullable=True),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('content_type', sa.String(), nullable=True),
+        sa.Column('content_id', sa.Integer(), nullable=True),
+        sa.Column('estimated_duration', sa.Integer(), nullable=True),
+        sa.Column('is_required', sa.Boolean(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.ForeignKeyConstraint(['student_learning_path_id'], ['student_learning_paths.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('student_learning_path_id', 'step_number', name='uq_student_path_step_override')
+    )
+    op.create_index('ix_student_path_step_overrides_id', 'student_path_step_overrides', ['id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_student_path_step_overrides_id', table_name='student_path_step_overrides')
+    op.drop_table('student_path_step_overrides')
+    op.drop_index('ix_learning_paths_template_key', table_name='learning_paths')
+    with op.batch_alter_table('learning_paths') as batch_op:
+        batch_op.drop_column('template_key')
@@ -0,0 +1,62 @@
+"""add library_catalogue
+
+Revision ID: add_library_catalogue
+Revises: add_assessment_events
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_library_catalogue'
+down_revision = 'add_assessment_events'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Index du catalogue de la bibliothèque (alimenter ensuite avec rebuild_library_catalogue.py)
+    op.create_table(
+        'library_catalogue',
+        sa.Column('content_id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(length=255), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('type', sa.String(length=50), nullable=True),
+        sa.Column('subject', sa.String(length=100), nullable=True),
+        sa.Column('level', sa.String(length=50), nullable=True),
+        sa.Column('tags', sa.Text(), nullable=True),
+        sa.Column('author', sa.String(length=255), nullable=True),
+        sa.Column('file_url', sa.String(length=500), nullable=True),
+        sa.Column('thumbnail_url', sa.String(length=500), nullable=True),
+        sa.Column('search_text', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.ForeignKeyConstraint(['content_id'], ['contents.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('content_id')
+    )
+    op.create_index('ix_library_catalogue_facets', 'library_catalogue', ['subject', 'level', 'type'])
+
+    # Plein texte: FTS5 sous SQLite, index GIN d'expression sous PostgreSQL
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE library_catalogue_fts USING fts5("
+            "search_text, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+    elif dialect == 'postgresql':
+        op.execute(
+            "CREATE INDEX ix_library_catalogue_search ON library_catalogue "
+            "USING GIN (to_tsvector('simple', search_text))"
+        )
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("DROP TABLE IF EXISTS library_catalogue_fts")
+    elif dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_library_catalogue_search")
+    op.drop_index('ix_library_catalogue_facets', table_name='library_catalogue')
+    op.drop_table('library_catalogue')
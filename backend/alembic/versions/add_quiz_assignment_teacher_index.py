@@ -0,0 +1,27 @@
+"""add quiz_assignments.assigned_by index
+
+Revision ID: add_quiz_assignment_teacher_index
+Revises: add_deadline_events
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_quiz_assignment_teacher_index'
+down_revision = 'add_deadline_events'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Notifications de quiz filtrées par enseignant
+    if 'quiz_assignments' in sa.inspect(op.get_bind()).get_table_names():
+        op.create_index('ix_quiz_assignments_assigned_by', 'quiz_assignments', ['assigned_by'], if_not_exists=True)
+
+
+def downgrade() -> None:
+    if 'quiz_assignments' in sa.inspect(op.get_bind()).get_table_names():
+        op.drop_index('ix_quiz_assignments_assigned_by', table_name='quiz_assignments', if_exists=True)
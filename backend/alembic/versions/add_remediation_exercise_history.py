@@ -0,0 +1,34 @@
+"""add remediation_exercise_history
+
+Revision ID: add_remediation_exercise_history
+Revises: add_quiz_assignment_teacher_index
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_remediation_exercise_history'
+down_revision = 'add_quiz_assignment_teacher_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Exercices de la banque déjà proposés à chaque élève (auparavant en mémoire)
+    op.create_table(
+        'remediation_exercise_history',
+        sa.Column('student_id', sa.Integer(), nullable=False),
+        sa.Column('exercise_id', sa.String(length=50), nullable=False),
+        sa.Column('seen_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['student_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('student_id', 'exercise_id')
+    )
+    op.create_index('ix_remediation_exercise_history_student_seen', 'remediation_exercise_history', ['student_id', 'seen_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_remediation_exercise_history_student_seen', table_name='remediation_exercise_history')
+    op.drop_table('remediation_exercise_history')
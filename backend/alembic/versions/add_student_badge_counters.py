@@ -0,0 +1,48 @@
+"""add student_badge_counters
+
+Revision ID: add_student_badge_counters
+Revises: add_correct_answer_simple
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_student_badge_counters'
+down_revision = 'add_correct_answer_simple'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Compteurs incrémentaux utilisés par le moteur de règles de badges
+    op.create_table(
+        'student_badge_counters',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('student_id', sa.Integer(), nullable=False),
+        sa.Column('scope', sa.String(length=255), nullable=False),
+        sa.Column('event_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('perfect_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('fast_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('early_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('percentage_sum', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('first_percentages', sa.Text(), nullable=True),
+        sa.Column('recent_percentages', sa.Text(), nullable=True),
+        sa.Column('current_streak', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('best_streak', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_activity_date', sa.Date(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['student_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('student_id', 'scope', name='uq_student_badge_counters_student_scope')
+    )
+    op.create_index('ix_student_badge_counters_id', 'student_badge_counters', ['id'])
+    op.create_index('ix_student_badge_counters_student_id', 'student_badge_counters', ['student_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_student_badge_counters_student_id', table_name='student_badge_counters')
+    op.drop_index('ix_student_badge_counters_id', table_name='student_badge_counters')
+    op.drop_table('student_badge_counters')
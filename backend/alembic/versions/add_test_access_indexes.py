@@ -0,0 +1,39 @@
+"""add indexes for adaptive test access resolution
+
+Revision ID: add_test_access_indexes
+Revises: add_remediation_exercise_history
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_test_access_indexes'
+down_revision = 'add_remediation_exercise_history'
+branch_labels = None
+depends_on = None
+
+
+# (nom de l'index, table, colonnes) - aligné avec les Index(...) de models/adaptive_evaluation.py
+INDEXES = [
+    ('ix_test_assignments_type_target', 'test_assignments', ['assignment_type', 'target_id', 'status']),
+    ('ix_adaptive_class_students_student_id', 'adaptive_class_students', ['student_id']),
+    ('ix_adaptive_tests_created_by', 'adaptive_tests', ['created_by']),
+]
+
+
+def upgrade() -> None:
+    # Branches de la requête UNION de services/test_access.py
+    existing_tables = set(sa.inspect(op.get_bind()).get_table_names())
+    for name, table, columns in INDEXES:
+        if table in existing_tables:
+            op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    existing_tables = set(sa.inspect(op.get_bind()).get_table_names())
+    for name, table, _ in reversed(INDEXES):
+        if table in existing_tables:
+            op.drop_index(name, table_name=table, if_exists=True)
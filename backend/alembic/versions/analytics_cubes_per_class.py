@@ -0,0 +1,34 @@
+"""analytics cubes per class membership
+
+Revision ID: analytics_cubes_per_class
+Revises: add_adaptive_item_stats
+Create Date: 2026-10-20 02:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+
+# revision identifiers, used by Alembic.
+revision = 'analytics_cubes_per_class'
+down_revision = 'add_adaptive_item_stats'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Le filtre par classe des journées élèves joint class_students à la lecture
+    with op.batch_alter_table('analytics_student_days') as batch_op:
+        batch_op.drop_column('class_id')
+
+    # Cubes ventilés par classe de l'élève + agrégat toutes classes (class_id = 0)
+    from services.analytics_cubes import AnalyticsCubeService
+    AnalyticsCubeService(Session(bind=op.get_bind())).rebuild()
+
+
+def downgrade() -> None:
+    # Sans ventilation: seul l'agrégat toutes classes reste (relancer rebuild_analytics_cubes.py)
+    op.execute("DELETE FROM analytics_cubes WHERE class_id <> 0")
+    with op.batch_alter_table('analytics_student_days') as batch_op:
+        batch_op.add_column(sa.Column('class_id', sa.Integer(), nullable=False, server_default='0'))
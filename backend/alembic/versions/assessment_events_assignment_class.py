@@ -0,0 +1,31 @@
+"""assessment events class from assignments
+
+Revision ID: assessment_events_assignment_class
+Revises: analytics_cubes_per_class
+Create Date: 2026-10-20 03:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+
+# revision identifiers, used by Alembic.
+revision = 'assessment_events_assignment_class'
+down_revision = 'analytics_cubes_per_class'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Classe de l'assignation évaluée au lieu de MIN(class_id) des classes de l'élève
+    from services.assessment_events import AssessmentEventLog
+    AssessmentEventLog(Session(bind=op.get_bind())).reassign_classes()
+
+
+def downgrade() -> None:
+    op.execute("""
+        UPDATE assessment_events SET class_id = (
+            SELECT MIN(cs.class_id) FROM class_students cs WHERE cs.student_id = assessment_events.student_id
+        )
+    """)
@@ -8,6 +8,7 @@ from models.learning_history import LearningHistory
 from models.badge import UserBadge
 from api.v1.auth import require_role
 from api.v1.users import get_current_user
+from services.activity_streaks import ActivityStreakService
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 import json
@@ -181,23 +182,22 @@ def get_user_activity_stats(
             LearningHistory.timestamp >= start_date
         ).first()
         
-        # Activités quotidiennes
+        # Activités quotidiennes: une requête groupée pour les quiz + l'agrégat journalier
+        quiz_day = func.date(QuizResult.created_at)
+        daily_quizzes = {
+            str(day): count for day, count in db.query(quiz_day, func.count(QuizResult.id)).filter(
+                QuizResult.student_id == user_id,
+                QuizResult.created_at >= start_date
+            ).group_by(quiz_day).all()
+        }
+        daily_learning = ActivityStreakService(db).get_daily_counts(user_id=user_id, since=start_date.date())
+        
         daily_activities = []
         current_date = start_date.date()
         while current_date <= now.date():
-            day_quizzes = db.query(QuizResult).filter(
-                QuizResult.student_id == user_id,
-                func.date(QuizResult.created_at) == current_date
-            ).count()
-            
-            day_learning = db.query(LearningHistory).filter(
-                LearningHistory.student_id == user_id,
-                func.date(LearningHistory.timestamp) == current_date
-            ).count()
-            
             daily_activities.append({
                 "date": current_date.isoformat(),
-                "count": day_quizzes + day_learning
+                "count": daily_quizzes.get(current_date.isoformat(), 0) + daily_learning.get(current_date, 0)
             })
             
             current_date += timedelta(days=1)
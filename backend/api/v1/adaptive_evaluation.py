@@ -15,6 +15,10 @@ from models.adaptive_evaluation import (
     TestAttempt, QuestionResponse, CompetencyAnalysis,
     Class, AdaptiveClassStudent
 )
+from services.post_submission_tasks import enqueue_test_attempt_processing, test_attempt_subject
+from services.test_access import TestAccessResolver
+from services.scoring_kernel import adaptive_test_keys, grade
+from services.item_statistics import attempt_score, item_statistics
 
 # Configuration du logging
 logger = logging.getLogger(__name__)
@@ -527,34 +531,28 @@ async def get_student_adaptive_tests(
             detail="Accès non autorisé"
         )
     
-    # Récupérer les assignations directes
-    direct_assignments = db.query(TestAssignment).filter(
-        TestAssignment.assignment_type == "student",
-        TestAssignment.target_id == student_id,
-        TestAssignment.status == "active"
-    ).all()
-    
-    # Récupérer les assignations via les classes
-    class_assignments = db.query(TestAssignment).join(
-        AdaptiveClassStudent, TestAssignment.target_id == AdaptiveClassStudent.class_id
-    ).filter(
-        TestAssignment.assignment_type == "class",
-        AdaptiveClassStudent.student_id == student_id,
-        TestAssignment.status == "active"
-    ).all()
+    # Assignations directes et via les classes (résolveur partagé, en cache)
+    all_assignments = TestAccessResolver(db).assignments(student_id)
+    test_ids = {assignment.test_id for assignment in all_assignments}
     
-    all_assignments = direct_assignments + class_assignments
+    # Détails des tests et dernière tentative par test, en deux requêtes
+    tests_by_id = {
+        test.id: test
+        for test in db.query(AdaptiveTest).filter(AdaptiveTest.id.in_(test_ids))
+    } if test_ids else {}
+    attempts_by_test = {}
+    if test_ids:
+        for attempt in db.query(TestAttempt).filter(
+            TestAttempt.test_id.in_(test_ids),
+            TestAttempt.student_id == student_id
+        ).order_by(TestAttempt.id):
+            attempts_by_test[attempt.test_id] = attempt
     
-    # Récupérer les détails des tests
     tests = []
     for assignment in all_assignments:
-        test = db.query(AdaptiveTest).filter(AdaptiveTest.id == assignment.test_id).first()
+        test = tests_by_id.get(assignment.test_id)
         if test and test.is_active:
-            # Vérifier s'il y a déjà une tentative
-            attempt = db.query(TestAttempt).filter(
-                TestAttempt.test_id == test.id,
-                TestAttempt.student_id == student_id
-            ).first()
+            attempt = attempts_by_test.get(test.id)
             
             tests.append({
                 "id": test.id,
@@ -566,7 +564,7 @@ async def get_student_adaptive_tests(
                 "estimated_duration": test.estimated_duration,
                 "total_questions": test.total_questions,
                 "adaptation_type": test.adaptation_type,
-                "assignment_id": assignment.id,
+                "assignment_id": assignment.assignment_id,
                 "due_date": assignment.due_date,
                 "status": attempt.status if attempt else "not_started",
                 "progress": attempt.current_question_index if attempt else 0
@@ -595,22 +593,8 @@ async def start_test(
             detail="Seuls les étudiants peuvent commencer des tests"
         )
     
-    # Vérifier que le test est assigné à l'étudiant
-    assignment = db.query(TestAssignment).filter(
-        TestAssignment.test_id == test_id,
-        TestAssignment.target_id == current_user.id,
-        TestAssignment.status == "active"
-    ).first()
-    
-    if not assignment:
-        # Vérifier l'assignation via les classes
-        assignment = db.query(TestAssignment).join(
-            AdaptiveClassStudent, TestAssignment.target_id == AdaptiveClassStudent.class_id
-        ).filter(
-            TestAssignment.test_id == test_id,
-            AdaptiveClassStudent.student_id == current_user.id,
-            TestAssignment.status == "active"
-        ).first()
+    # Vérifier que le test est assigné à l'étudiant (directement ou via une classe)
+    assignment = TestAccessResolver(db).resolve(current_user.id, test_id, assignment_only=True)
     
     if not assignment:
         raise HTTPException(
@@ -635,7 +619,7 @@ async def start_test(
     attempt = TestAttempt(
         test_id=test_id,
         student_id=current_user.id,
-        assignment_id=assignment.id,
+        assignment_id=assignment.assignment_id,
         status="in_progress",
         current_question_index=0
     )
@@ -684,31 +668,22 @@ async def submit_test_attempt(
         )
     
     try:
-        total_score = 0
-        max_score = 0
-        
-        # Traiter chaque réponse
-        for response_data in responses:
-            question = db.query(AdaptiveQuestion).filter(
-                AdaptiveQuestion.id == response_data["question_id"]
-            ).first()
-            
-            if question:
-                is_correct = response_data["answer"] == question.correct_answer
-                score = 1.0 if is_correct else 0.0
-                total_score += score
-                max_score += 1.0
-                
-                # Enregistrer la réponse
-                response = QuestionResponse(
-                    attempt_id=attempt_id,
-                    question_id=question.id,
-                    student_answer=response_data["answer"],
-                    is_correct=is_correct,
-                    score=score,
-                    response_time=response_data.get("response_time", 0)
-                )
-                db.add(response)
+        # Noter toutes les réponses en une passe (corrigé compilé du test)
+        report = grade(adaptive_test_keys(db, attempt.test_id), responses)
+        response_times = {str(response_data.get("question_id")): response_data.get("response_time", 0) for response_data in responses}
+        total_score = report.score
+        max_score = report.max_score
+        
+        for item in report.items:
+            # Enregistrer la réponse
+            db.add(QuestionResponse(
+                attempt_id=attempt_id,
+                question_id=item.question_id,
+                student_answer=item.answer,
+                is_correct=item.is_correct,
+                score=item.points_earned,
+                response_time=response_times.get(str(item.question_id), 0)
+            ))
         
         # Mettre à jour la tentative
         attempt.status = "completed"
@@ -716,8 +691,16 @@ async def submit_test_attempt(
         attempt.total_score = total_score
         attempt.max_score = max_score
         
+        # Cubes analytiques des tableaux de bord: mis à jour en tâche de fond
+        enqueue_test_attempt_processing(db, attempt)
         db.commit()
         
+        # Statistiques d'items (écrites par lots), une fois la copie enregistrée
+        item_statistics.record_attempt(
+            ((item.question_id, item.is_correct, response_times.get(str(item.question_id))) for item in report.items),
+            attempt_score(total_score, max_score)
+        )
+        
         # TODO: Analyser les compétences avec l'IA
         # await analyze_competencies(attempt_id, db)
         
@@ -726,7 +709,8 @@ async def submit_test_attempt(
             "message": "Test soumis avec succès",
             "score": total_score,
             "max_score": max_score,
-            "percentage": (total_score / max_score * 100) if max_score > 0 else 0
+            "percentage": (total_score / max_score * 100) if max_score > 0 else 0,
+            "task_subject": test_attempt_subject(attempt.id)
         }
         
     except Exception as e:
@@ -870,26 +854,21 @@ async def get_student_assignments(
     try:
         print(f"🔥 [DEBUG] Récupération des assignations pour l'étudiant {student_id}")
         
-        # Récupérer les assignations directes à l'étudiant
-        student_assignments = db.query(TestAssignment).filter(
-            TestAssignment.target_id == student_id,
-            TestAssignment.assignment_type == 'student',
-            TestAssignment.status == 'active'
-        ).all()
-        
-        print(f"🔥 [DEBUG] Assignations directes trouvées: {len(student_assignments)}")
-        
-        # Récupérer les assignations via les classes (si l'étudiant est dans une classe)
-        # TODO: Implémenter la logique des classes
+        # Assignations directes et via les classes (résolveur partagé, en cache)
+        student_assignments = TestAccessResolver(db).assignments(student_id)
+        test_ids = {assignment.test_id for assignment in student_assignments}
+        tests_by_id = {
+            test.id: test
+            for test in db.query(AdaptiveTest).filter(AdaptiveTest.id.in_(test_ids))
+        } if test_ids else {}
         
         all_assignments = []
         
         for assignment in student_assignments:
-            # Récupérer les détails du test
-            test = db.query(AdaptiveTest).filter(AdaptiveTest.id == assignment.test_id).first()
+            test = tests_by_id.get(assignment.test_id)
             if test and test.is_active:
-                assignment_data = {
-                    "id": assignment.id,
+                all_assignments.append({
+                    "id": assignment.assignment_id,
                     "test_id": test.id,
                     "title": test.title,
                     "subject": test.subject,
@@ -899,9 +878,7 @@ async def get_student_assignments(
                     "status": assignment.status,
                     "assigned_at": assignment.assigned_at.isoformat() if assignment.assigned_at else None,
                     "assigned_by": assignment.assigned_by
-                }
-                all_assignments.append(assignment_data)
-                print(f"🔥 [DEBUG] Test assigné: {test.title} (ID: {test.id})")
+                })
         
         print(f"🔥 [DEBUG] Total des tests assignés: {len(all_assignments)}")
         return all_assignments
@@ -1053,39 +1030,14 @@ async def submit_test_directly(
             detail="Test non trouvé"
         )
     
-    # Vérifier l'assignation ou si l'étudiant a créé le test lui-même
-    assignment = db.query(TestAssignment).filter(
-        TestAssignment.test_id == test_id,
-        TestAssignment.target_id == current_user.id,
-        TestAssignment.status == "active"
-    ).first()
-    
-    if not assignment:
-        # Vérifier l'assignation via les classes
-        assignment = db.query(TestAssignment).join(
-            AdaptiveClassStudent, TestAssignment.target_id == AdaptiveClassStudent.class_id
-        ).filter(
-            TestAssignment.test_id == test_id,
-            AdaptiveClassStudent.student_id == current_user.id,
-            TestAssignment.status == "active"
-        ).first()
-    
-    # Si pas d'assignation, vérifier si l'étudiant a créé le test lui-même
-    if not assignment:
-        # Vérifier si l'étudiant a créé ce test (cas des quiz créés depuis learning-path)
-        test_creator = db.query(AdaptiveTest).filter(
-            AdaptiveTest.id == test_id,
-            AdaptiveTest.created_by == current_user.id
-        ).first()
-        
-        if test_creator:
-            print(f"🔥 [DEBUG] Test créé par l'étudiant {current_user.id}, assignation non requise")
-            assignment = None  # Pas d'assignation nécessaire
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Ce test ne vous est pas assigné et vous ne l'avez pas créé"
-            )
+    # Vérifier l'assignation (directe ou via une classe) ou si l'étudiant a créé le test lui-même
+    # (cas des quiz créés depuis learning-path) - une requête, en cache par élève
+    grant = TestAccessResolver(db).resolve(current_user.id, test_id)
+    if not grant:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Ce test ne vous est pas assigné et vous ne l'avez pas créé"
+        )
     
     try:
         print(f"🔥 [DEBUG] Création de la tentative de test...")
@@ -1094,7 +1046,7 @@ async def submit_test_directly(
         attempt = TestAttempt(
             test_id=test_id,
             student_id=current_user.id,
-            assignment_id=assignment.id if assignment else None,  # Peut être None si créé par l'étudiant
+            assignment_id=grant.assignment_id,  # None si créé par l'étudiant
             status="completed",
             current_question_index=len(submission.answers),
             total_score=0,
@@ -1111,36 +1063,24 @@ async def submit_test_directly(
         db.refresh(attempt)
         print(f"🔥 [DEBUG] Tentative rafraîchie, ID: {attempt.id}")
         
-        total_score = 0
-        
-        # Traiter chaque réponse
-        for i, response_data in enumerate(submission.answers):
-            print(f"🔥 [DEBUG] Traitement de la réponse {i+1}: {response_data}")
-            
-            question = db.query(AdaptiveQuestion).filter(
-                AdaptiveQuestion.id == response_data["question_id"]
-            ).first()
-            
-            if question:
-                is_correct = response_data["answer"] == question.correct_answer
-                score = 1.0 if is_correct else 0.0
-                total_score += score
-                
-                print(f"🔥 [DEBUG] Question {response_data['question_id']}: Correct={is_correct}, Score={score}")
-                
-                # Enregistrer la réponse
-                response = QuestionResponse(
-                    attempt_id=attempt.id,
-                    question_id=response_data["question_id"],
-                    student_answer=response_data["answer"],
-                    is_correct=is_correct,
-                    score=score,
-                    answered_at=func.now()
-                )
-                db.add(response)
-                print(f"🔥 [DEBUG] Réponse ajoutée à la session")
-            else:
-                print(f"❌ [DEBUG] Question {response_data['question_id']} non trouvée !")
+        # Noter toutes les réponses en une passe (corrigé compilé du test)
+        report = grade(adaptive_test_keys(db, test_id), submission.answers)
+        total_score = report.score
+        
+        for item in report.items:
+            # Enregistrer la réponse
+            db.add(QuestionResponse(
+                attempt_id=attempt.id,
+                question_id=item.question_id,
+                student_answer=item.answer,
+                is_correct=item.is_correct,
+                score=item.points_earned,
+                answered_at=func.now()
+            ))
+        
+        if len(report.items) < len(submission.answers):
+            logger.debug("Test %s: %d réponse(s) hors du test ignorée(s)", test_id,
+                         len(submission.answers) - len(report.items))
         
         print(f"🔥 [DEBUG] Score total calculé: {total_score}")
         
@@ -1150,15 +1090,23 @@ async def submit_test_directly(
         
         print(f"🔥 [DEBUG] Tentative mise à jour, score: {attempt.total_score}")
         
+        enqueue_test_attempt_processing(db, attempt)
         db.commit()
         print(f"🔥 [DEBUG] Deuxième transaction commitée avec succès")
         
+        # Statistiques d'items (écrites par lots), une fois la copie enregistrée
+        item_statistics.record_attempt(
+            ((item.question_id, item.is_correct, None) for item in report.items),
+            attempt_score(total_score, len(submission.answers))
+        )
+        
         return {
             "success": True,
             "score": total_score,
             "max_score": len(submission.answers),
             "percentage": round((total_score / len(submission.answers)) * 100, 2),
-            "quiz_type": "adaptive"
+            "quiz_type": "adaptive",
+            "task_subject": test_attempt_subject(attempt.id)
         }
         
     except Exception as e:
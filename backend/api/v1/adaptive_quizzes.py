@@ -9,6 +9,7 @@ from core.database import get_db
 from models.user import User
 from models.quiz import Quiz, QuizResult, Question
 from models.learning_history import LearningHistory
+from services.scoring_kernel import grade, question_keys, quiz_keys
 from api.v1.auth import get_current_user
 from typing import List, Dict, Any
 from datetime import datetime, timedelta
@@ -211,14 +212,9 @@ def submit_quiz_results(
         time_spent = answers.get("time_spent", 0)
         subject = answers.get("subject", "Français")
         
-        # Calculer le score
-        correct_answers = 0
+        # Calculer le score (corrigés compilés des questions, notés en une passe)
         total_questions = len(student_answers)
-        
-        for question_id, student_answer in student_answers.items():
-            question = db.query(Question).filter(Question.id == int(question_id)).first()
-            if question and question.correct_answer == student_answer:
-                correct_answers += 1
+        correct_answers = grade(question_keys(db, student_answers.keys()), student_answers).correct_count
         
         score = (correct_answers / total_questions * 100) if total_questions > 0 else 0
         
@@ -798,21 +794,11 @@ def create_adaptive_quiz(questions: List[Dict], student_id: int, subject: str, d
 
 def calculate_adaptive_score(quiz: Quiz, answers: Dict, db: Session) -> tuple:
     """Calculer le score d'un quiz adaptatif."""
-    questions = db.query(Question).filter(Question.quiz_id == quiz.id).all()
-    
-    correct_count = 0
-    correct_answers = []
-    
-    for question in questions:
-        student_answer = answers.get(str(question.id))
-        if student_answer:
-            # Comparer avec la réponse correcte
-            correct_answer = question.correct_answer
-            if student_answer == correct_answer:
-                correct_count += 1
-                correct_answers.append(question.id)
+    keys = quiz_keys(db, quiz.id)
+    report = grade(keys, answers)
+    correct_answers = [item.question_id for item in report.items if item.is_correct]
     
-    score = (correct_count / len(questions)) * 100 if questions else 0
+    score = (len(correct_answers) / len(keys)) * 100 if keys else 0
     
     return round(score, 2), correct_answers
 
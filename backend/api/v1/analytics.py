@@ -7,20 +7,33 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc, text
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from collections import defaultdict
+from typing import List, Dict, Any, Optional
 import logging
 
 from core.database import get_db
+from core.response_cache import cached_response
 from core.security import get_current_user, require_role
 from models.adaptive_evaluation import AdaptiveTest, TestAttempt
 from models.user import User
 from models.student_analytics import StudentAnalytics
+from models.analytics_cube import SCORE_BUCKETS
+from services.analytics_cubes import AnalyticsCubeService
 
 # Configuration du logger
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+def _group_by_weekday(daily_totals: Dict) -> Dict[int, Dict[str, float]]:
+    """Regrouper les agrégats journaliers du cube par jour de la semaine (0=Dimanche)"""
+    weekdays: Dict[int, Dict[str, float]] = {}
+    for day, totals in daily_totals.items():
+        bucket = weekdays.setdefault((day.weekday() + 1) % 7, dict.fromkeys(totals, 0))
+        for key, value in totals.items():
+            bucket[key] += value
+    return weekdays
+
 @router.get("/test")
 async def test_endpoint():
     """Endpoint de test simple"""
@@ -64,23 +77,19 @@ async def debug_user(
         return {"error": str(e), "user_id": getattr(current_user, 'id', 'N/A')}
 
 @router.get("/class-overview")
+@cached_response(tags=["class:{class_id}"])
 async def get_class_overview(
+    class_id: Optional[int] = None,
     db: Session = Depends(get_db)
 ):
-    """Vue d'ensemble de la classe avec de vraies données depuis quiz_results"""
+    """Vue d'ensemble de la classe depuis le cube analytique des quiz"""
     try:
         logger.info(f"🔍 Récupération de la vue d'ensemble")
+        cubes = AnalyticsCubeService(db)
+        since = datetime.utcnow().date() - timedelta(days=90)
         
-        # Récupérer les étudiants actifs (qui ont des résultats récents)
-        students_result = db.execute(text("""
-            SELECT DISTINCT u.id, u.username, u.email
-            FROM users u
-            JOIN quiz_results qr ON u.id = qr.user_id
-            WHERE u.role = 'student'
-            AND qr.created_at >= datetime('now', '-90 days')
-        """)).fetchall()
-        
-        active_students = len(students_result)
+        # Étudiants actifs (qui ont des résultats récents)
+        active_students = cubes.count_active_students(since=since, class_id=class_id)
         logger.info(f"👥 Étudiants actifs: {active_students}")
         
         if active_students == 0:
@@ -91,43 +100,20 @@ async def get_class_overview(
                 "averageStudyTime": 0
             }
         
-        # Récupérer les scores moyens
-        scores_result = db.execute(text("""
-            SELECT AVG(qr.score) as avg_score
-            FROM quiz_results qr
-            JOIN users u ON qr.user_id = u.id
-            WHERE u.role = 'student'
-            AND qr.created_at >= datetime('now', '-90 days')
-        """)).fetchone()
+        daily = cubes.get_daily_totals(since=since, class_id=class_id).values()
+        total_tests = sum(d["count"] for d in daily)
+        score_sum = sum(d["score_sum"] for d in daily)
+        time_spent_sum = sum(d["time_spent_sum"] for d in daily)
+        time_spent_count = sum(d["time_spent_count"] for d in daily)
         
-        average_score = round(scores_result[0] or 0, 1)
+        average_score = round(score_sum / total_tests, 1) if total_tests else 0
         logger.info(f"📊 Score moyen: {average_score}")
         
-        # Récupérer l'engagement moyen (basé sur le nombre de tests complétés)
-        engagement_result = db.execute(text("""
-            SELECT COUNT(qr.id) as total_tests, COUNT(DISTINCT qr.user_id) as unique_students
-            FROM quiz_results qr
-            JOIN users u ON qr.user_id = u.id
-            WHERE u.role = 'student'
-            AND qr.created_at >= datetime('now', '-90 days')
-        """)).fetchone()
-        
-        total_tests = engagement_result[0] or 0
-        unique_students = engagement_result[1] or 1
-        average_engagement = round((total_tests / unique_students) * 10, 1) if unique_students > 0 else 0
+        # Engagement moyen (basé sur le nombre de tests complétés)
+        average_engagement = round((total_tests / active_students) * 10, 1)
         logger.info(f"📈 Engagement moyen: {average_engagement}")
         
-        # Récupérer le temps d'étude moyen
-        study_time_result = db.execute(text("""
-            SELECT AVG(qr.time_spent) as avg_time
-            FROM quiz_results qr
-            JOIN users u ON qr.user_id = u.id
-            WHERE u.role = 'student'
-            AND qr.created_at >= datetime('now', '-90 days')
-            AND qr.time_spent IS NOT NULL
-        """)).fetchone()
-        
-        average_study_time = round(study_time_result[0] or 0, 1)
+        average_study_time = round(time_spent_sum / time_spent_count, 1) if time_spent_count else 0
         logger.info(f"⏱️ Temps d'étude moyen: {average_study_time}")
         
         result = {
@@ -221,40 +207,33 @@ async def get_student_performances(
         )
 
 @router.get("/weekly-progress")
+@cached_response(tags=["class:{class_id}"])
 async def get_weekly_progress(
+    class_id: Optional[int] = None,
     db: Session = Depends(get_db)
 ):
-    """Progrès hebdomadaire avec vraies données depuis quiz_results"""
+    """Progrès hebdomadaire depuis le cube analytique des quiz"""
     try:
         logger.info(f"🔍 Récupération du progrès hebdomadaire")
         
-        # Récupérer les résultats de quiz par jour de la semaine
-        weekly_result = db.execute(text("""
-            SELECT 
-                strftime('%w', qr.created_at) as day_of_week,
-                AVG(qr.score) as avg_score,
-                COUNT(qr.id) as tests_completed
-            FROM quiz_results qr
-            JOIN users u ON qr.user_id = u.id
-            WHERE u.role = 'student'
-            AND qr.created_at >= datetime('now', '-90 days')
-            GROUP BY strftime('%w', qr.created_at)
-            ORDER BY day_of_week
-        """)).fetchall()
+        # Agrégats journaliers des 90 derniers jours, regroupés par jour de la semaine
+        since = datetime.utcnow().date() - timedelta(days=90)
+        weekly_result = _group_by_weekday(
+            AnalyticsCubeService(db).get_daily_totals(since=since, class_id=class_id)
+        )
         
         # Mapper les jours de la semaine (0=Dimanche, 1=Lundi, etc.)
         days = ["Dim", "Lun", "Mar", "Mer", "Jeu", "Ven", "Sam"]
         weekly_data = []
         
         for i, day in enumerate(days):
-            # Chercher les données pour ce jour
-            day_data = next((row for row in weekly_result if int(row.day_of_week) == i), None)
+            day_data = weekly_result.get(i)
             
             if day_data:
                 weekly_data.append({
                     "week": day,
-                    "averageScore": round(day_data.avg_score or 0, 1),
-                    "testsCompleted": day_data.tests_completed
+                    "averageScore": round(day_data["score_sum"] / day_data["count"], 1),
+                    "testsCompleted": day_data["count"]
                 })
             else:
                 weekly_data.append({
@@ -274,41 +253,31 @@ async def get_weekly_progress(
         )
 
 @router.get("/monthly-stats")
+@cached_response(tags=["class:{class_id}"])
 async def get_monthly_stats(
+    class_id: Optional[int] = None,
     db: Session = Depends(get_db)
 ):
-    """Statistiques mensuelles avec vraies données depuis quiz_results"""
+    """Statistiques mensuelles depuis le cube analytique des quiz"""
     try:
         logger.info(f"🔍 Récupération des statistiques mensuelles")
         
-        # Récupérer les données par mois depuis quiz_results
-        monthly_data_result = db.execute(text("""
-            SELECT 
-                strftime('%Y-%m', qr.created_at) as month,
-                COUNT(qr.id) as tests_completed,
-                AVG(qr.score) as avg_score
-            FROM quiz_results qr
-            JOIN users u ON qr.user_id = u.id
-            WHERE u.role = 'student'
-            AND qr.created_at >= datetime('now', '-6 months')
-            GROUP BY strftime('%Y-%m', qr.created_at)
-            ORDER BY month DESC
-            LIMIT 6
-        """)).fetchall()
+        # Agrégats journaliers des 6 derniers mois, regroupés par mois
+        since = datetime.utcnow().date() - timedelta(days=183)
+        months: Dict[str, int] = {}
+        for day, totals in AnalyticsCubeService(db).get_daily_totals(since=since, class_id=class_id).items():
+            month = day.strftime('%Y-%m')
+            months[month] = months.get(month, 0) + totals["count"]
         
+        month_names = ["Jan", "Fév", "Mar", "Avr", "Mai", "Juin", "Juil", "Août", "Sep", "Oct", "Nov", "Déc"]
         monthly_data = []
-        for row in monthly_data_result:
-            month_name = row.month
-            if month_name:
-                month_obj = datetime.strptime(month_name, '%Y-%m')
-                month_names = ["Jan", "Fév", "Mar", "Avr", "Mai", "Juin", "Juil", "Août", "Sep", "Oct", "Nov", "Déc"]
-                month_label = month_names[month_obj.month - 1]
-                
-                monthly_data.append({
-                    "month": month_label,
-                    "testsCreated": row.tests_completed,
-                    "testsCompleted": row.tests_completed
-                })
+        for month in sorted(months, reverse=True)[:6]:
+            month_obj = datetime.strptime(month, '%Y-%m')
+            monthly_data.append({
+                "month": month_names[month_obj.month - 1],
+                "testsCreated": months[month],
+                "testsCompleted": months[month]
+            })
         
         logger.info(f"✅ Statistiques mensuelles récupérées: {len(monthly_data)} mois")
         return monthly_data
@@ -698,46 +667,43 @@ async def get_difficulty_performance(
         raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération de la performance par difficulté: {str(e)}")
 
 @router.get("/engagement-trends")
+@cached_response(tags=["class:{class_id}"])
 async def get_engagement_trends(
+    class_id: Optional[int] = None,
     db: Session = Depends(get_db)
 ):
-    """Tendances d'engagement sur 7 jours avec vraies données depuis quiz_results + question_responses"""
+    """Tendances d'engagement sur 7 jours depuis le cube analytique des quiz"""
     try:
         logger.info(f"🔍 Récupération des tendances d'engagement")
         
-        # Récupérer les données d'engagement des 7 derniers jours depuis quiz_results
-        engagement_data = db.execute(text("""
-            SELECT 
-                strftime('%w', qr.created_at) as day_of_week,
-                COUNT(qr.id) as activities,
-                AVG(qr.score) as avg_score,
-                AVG(qr.time_spent) as avg_time_spent
-            FROM quiz_results qr
-            JOIN users u ON qr.user_id = u.id
-            WHERE u.role = 'student'
-            AND qr.created_at >= datetime('now', '-7 days')
-            GROUP BY strftime('%w', qr.created_at)
-            ORDER BY day_of_week
-        """)).fetchall()
+        # Agrégats des 7 derniers jours, regroupés par jour de la semaine
+        since = datetime.utcnow().date() - timedelta(days=7)
+        engagement_data = _group_by_weekday(
+            AnalyticsCubeService(db).get_daily_totals(since=since, class_id=class_id)
+        )
         
         # Mapper les jours de la semaine
         days = ["Dim", "Lun", "Mar", "Mer", "Jeu", "Ven", "Sam"]
         trends_data = []
         
         for i, day in enumerate(days):
-            # Chercher les données pour ce jour
-            day_data = next((row for row in engagement_data if int(row.day_of_week) == i), None)
+            day_data = engagement_data.get(i)
             
             if day_data:
                 # Calculer l'engagement basé sur les scores et l'activité
-                base_engagement = min(100, (day_data.avg_score or 0) * 0.8 + (day_data.activities * 5))
-                study_time = (day_data.avg_time_spent or 0) / 60  # Convertir en minutes
+                avg_score = day_data["score_sum"] / day_data["count"]
+                avg_time_spent = (
+                    day_data["time_spent_sum"] / day_data["time_spent_count"]
+                    if day_data["time_spent_count"] else 0
+                )
+                base_engagement = min(100, avg_score * 0.8 + (day_data["count"] * 5))
+                study_time = avg_time_spent / 60  # Convertir en minutes
                 
                 trends_data.append({
                     "day": day,
                     "engagement": round(base_engagement, 1),
                     "studyTime": round(study_time, 1),
-                    "activities": day_data.activities
+                    "activities": day_data["count"]
                 })
             else:
                 # Données par défaut pour les jours sans activité
@@ -759,61 +725,42 @@ async def get_engagement_trends(
         raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération des tendances d'engagement: {str(e)}")
 
 @router.get("/score-distribution")
+@cached_response(tags=["class:{class_id}"])
 async def get_score_distribution(
+    class_id: Optional[int] = None,
     db: Session = Depends(get_db)
 ):
-    """Distribution des scores des étudiants avec vraies données depuis quiz_results"""
+    """Distribution des scores des étudiants depuis le cube analytique des quiz"""
     try:
         logger.info(f"🔍 Récupération de la distribution des scores")
         
-        # Récupérer la distribution des scores depuis quiz_results
-        score_distribution = db.execute(text("""
-            SELECT 
-                CASE 
-                    WHEN qr.score >= 90 THEN '90-100%'
-                    WHEN qr.score >= 80 THEN '80-89%'
-                    WHEN qr.score >= 70 THEN '70-79%'
-                    WHEN qr.score >= 60 THEN '60-69%'
-                    WHEN qr.score >= 50 THEN '50-59%'
-                    ELSE '0-49%'
-                END as score_range,
-                COUNT(*) as count
-            FROM quiz_results qr
-            JOIN users u ON qr.user_id = u.id
-            WHERE u.role = 'student'
-            AND qr.created_at >= datetime('now', '-30 days')
-            GROUP BY score_range
-            ORDER BY 
-                CASE 
-                    WHEN score_range = '90-100%' THEN 1
-                    WHEN score_range = '80-89%' THEN 2
-                    WHEN score_range = '70-79%' THEN 3
-                    WHEN score_range = '60-69%' THEN 4
-                    WHEN score_range = '50-59%' THEN 5
-                    ELSE 6
-                END
-        """)).fetchall()
-        
-        # Couleurs pour chaque range de score
-        colors = {
-            '90-100%': '#10b981',  # Vert
-            '80-89%': '#22c55e',   # Vert clair
-            '70-79%': '#f59e0b',   # Orange
-            '60-69%': '#f97316',   # Orange foncé
-            '50-59%': '#ef4444',   # Rouge
-            '0-49%': '#dc2626'     # Rouge foncé
+        since = datetime.utcnow().date() - timedelta(days=30)
+        bucket_counts = AnalyticsCubeService(db).get_bucket_counts(since=since, class_id=class_id)
+        
+        # Libellés et couleurs pour chaque range de score (du meilleur au moins bon)
+        ranges = {
+            90: ('90-100%', '#10b981'),  # Vert
+            80: ('80-89%', '#22c55e'),   # Vert clair
+            70: ('70-79%', '#f59e0b'),   # Orange
+            60: ('60-69%', '#f97316'),   # Orange foncé
+            50: ('50-59%', '#ef4444'),   # Rouge
+            0: ('0-49%', '#dc2626')      # Rouge foncé
         }
         
-        total_students = sum(row.count for row in score_distribution)
+        total_students = sum(bucket_counts.values())
         
         distribution_data = []
-        for stat in score_distribution:
-            percentage = (stat.count / total_students * 100) if total_students > 0 else 0
+        for bucket in SCORE_BUCKETS:
+            count = bucket_counts.get(bucket, 0)
+            if not count:
+                continue
+            label, color = ranges[bucket]
+            percentage = (count / total_students * 100) if total_students > 0 else 0
             distribution_data.append({
-                "range": stat.score_range,
-                "count": stat.count,
+                "range": label,
+                "count": count,
                 "percentage": round(percentage, 1),
-                "color": colors.get(stat.score_range, '#6b7280')
+                "color": color
             })
         
         logger.info(f"✅ Distribution des scores récupérée: {len(distribution_data)} ranges")
@@ -824,27 +771,25 @@ async def get_score_distribution(
         raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération de la distribution des scores: {str(e)}")
 
 @router.get("/learning-trends")
+@cached_response(tags=["class:{class_id}"])
 async def get_learning_trends(
+    class_id: Optional[int] = None,
     db: Session = Depends(get_db)
 ):
-    """Tendances d'apprentissage sur plusieurs semaines avec vraies données depuis quiz_results + question_responses"""
+    """Tendances d'apprentissage sur plusieurs semaines depuis le cube analytique des quiz"""
     try:
         logger.info(f"🔍 Récupération des tendances d'apprentissage")
         
-        # Récupérer les données des 4 dernières semaines depuis quiz_results
-        learning_trends = db.execute(text("""
-            SELECT 
-                strftime('%W', qr.created_at) as week_number,
-                COUNT(qr.id) as total_tests,
-                AVG(qr.score) as avg_score,
-                COUNT(DISTINCT qr.user_id) as unique_students
-            FROM quiz_results qr
-            JOIN users u ON qr.user_id = u.id
-            WHERE u.role = 'student'
-            AND qr.created_at >= datetime('now', '-28 days')
-            GROUP BY strftime('%W', qr.created_at)
-            ORDER BY week_number
-        """)).fetchall()
+        # Agrégats des 4 dernières semaines, regroupés par numéro de semaine
+        cubes = AnalyticsCubeService(db)
+        since = datetime.utcnow().date() - timedelta(days=28)
+        learning_trends: Dict[int, Dict[str, Any]] = defaultdict(lambda: {"count": 0, "score_sum": 0.0, "students": set()})
+        for day, totals in cubes.get_daily_totals(since=since, class_id=class_id).items():
+            week = learning_trends[int(day.strftime('%W'))]
+            week["count"] += totals["count"]
+            week["score_sum"] += totals["score_sum"]
+        for student_id, day in cubes.get_student_days(since=since, class_id=class_id):
+            learning_trends[int(day.strftime('%W'))]["students"].add(student_id)
         
         # Générer les données pour les 4 dernières semaines
         trends_data = []
@@ -852,13 +797,13 @@ async def get_learning_trends(
         
         for i in range(4):
             week_num = current_week - (3 - i)
-            week_data = next((row for row in learning_trends if int(row.week_number) == week_num), None)
+            week_data = learning_trends.get(week_num)
             
-            if week_data:
+            if week_data and week_data["count"]:
                 # Calculer les métriques basées sur les vraies données
-                performance = week_data.avg_score or 0
-                engagement = min(100, (week_data.total_tests or 0) * 5)  # Basé sur le nombre de tests
-                completion = min(100, (week_data.unique_students or 0) * 10)  # Basé sur le nombre d'étudiants uniques
+                performance = week_data["score_sum"] / week_data["count"]
+                engagement = min(100, week_data["count"] * 5)  # Basé sur le nombre de tests
+                completion = min(100, len(week_data["students"]) * 10)  # Basé sur le nombre d'étudiants uniques
                 
                 trends_data.append({
                     "week": f"Sem {week_num}",
@@ -910,21 +855,11 @@ async def get_skills_by_subject(
             "objectives": []
         }
         
+        # Performances de toutes les matières en une lecture du cube
+        averages = AnalyticsCubeService(db).get_subject_averages(current_user.id)
+        
         for subject in subjects:
-            # Récupérer les performances pour cette matière
-            performance_result = db.execute(
-                text("""
-                    SELECT AVG(ta.total_score * 100.0 / ta.max_score) as avg_score
-                    FROM test_attempts ta
-                    JOIN adaptive_tests at ON ta.test_id = at.id
-                    WHERE at.created_by = :teacher_id 
-                    AND at.subject = :subject
-                    AND ta.completed_at IS NOT NULL
-                """),
-                {"teacher_id": current_user.id, "subject": subject}
-            ).fetchone()
-            
-            current_score = performance_result.avg_score if performance_result and performance_result.avg_score else 0
+            current_score = averages.get(subject, 0)
             objective = min(95, current_score + 15)  # Objectif 15% plus haut que la performance actuelle
             
             skills_data["currentPerformance"].append(round(current_score, 1))
@@ -1,14 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.responses import Response
 from sqlalchemy.orm import Session
 from core.database import SessionLocal
 from models.user import User, UserRole
 from schemas.user import UserCreate, UserLogin
-from core.security import get_password_hash, verify_password, create_access_token, get_current_user
+from core.config import settings
+from core.rate_limit import SlidingWindowRateLimiter
+from core.security import (
+    get_password_hash, create_access_token, get_current_user,
+    password_pool, PasswordPoolSaturated
+)
 from typing import List
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Tentatives de connexion par compte et par adresse IP
+login_rate_limiter = SlidingWindowRateLimiter(
+    limit=settings.LOGIN_RATE_LIMIT,
+    window_seconds=settings.LOGIN_RATE_WINDOW_SECONDS
+)
+login_ip_rate_limiter = SlidingWindowRateLimiter(
+    limit=settings.LOGIN_IP_RATE_LIMIT,
+    window_seconds=settings.LOGIN_RATE_WINDOW_SECONDS
+)
+
 def get_db():
     db = SessionLocal()
     try:
@@ -73,52 +91,61 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
     return {"message": "Inscription réussie"}
 
 @router.post("/login")
-def login(user_login: UserLogin, db: Session = Depends(get_db)):
-    print(f"[DEBUG] /login appelée avec email={user_login.email}")
-    print(f"[DEBUG] Début de la fonction login")
+def login(user_login: UserLogin, request: Request, db: Session = Depends(get_db)):
+    # Limiter les tentatives par compte et par adresse IP
+    email_key = user_login.email.lower()
+    client_ip = request.client.host if request.client else "inconnu"
+    for limiter, key in ((login_rate_limiter, email_key), (login_ip_rate_limiter, client_ip)):
+        if not limiter.hit(key):
+            logger.warning(f"[LOGIN] Trop de tentatives ({key})")
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Trop de tentatives de connexion, réessayez plus tard",
+                headers={"Retry-After": str(limiter.retry_after(key))}
+            )
     
     try:
         user = db.query(User).filter(User.email == user_login.email).first()
-        print(f"[DEBUG] Recherche utilisateur: {user is not None}")
         
         if not user:
-            print("[DEBUG] Aucun utilisateur trouvé pour cet email")
+            logger.debug(f"[LOGIN] Aucun utilisateur pour {user_login.email}")
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Email ou mot de passe incorrect")
         
-        print(f"[DEBUG] Utilisateur trouvé: id={user.id}, email={user.email}")
-        
-        print(f"[DEBUG] Hash en base: {user.hashed_password}")
-        print(f"[DEBUG] Mot de passe fourni: {user_login.password}")
-        
-        is_valid = verify_password(user_login.password, user.hashed_password)
-        print(f"[DEBUG] Résultat vérification: {is_valid}")
+        try:
+            is_valid, new_hash = password_pool.verify_and_update(user_login.password, user.hashed_password)
+        except PasswordPoolSaturated:
+            logger.warning("[LOGIN] Pool bcrypt saturé, connexion refusée")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Service de connexion surchargé, réessayez dans quelques secondes",
+                headers={"Retry-After": "5"}
+            )
         
         if not is_valid:
-            print("[DEBUG] Mot de passe incorrect pour cet utilisateur")
+            logger.debug(f"[LOGIN] Mot de passe incorrect pour id={user.id}")
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Email ou mot de passe incorrect")
         
-        print(f"[DEBUG] Mot de passe vérifié avec succès")
-        print(f"[DEBUG] Login réussi pour id={user.id}, email={user.email}, role={user.role}")
+        # Migration transparente: ancien hachage SHA256 ou coût bcrypt obsolète
+        if new_hash:
+            user.hashed_password = new_hash
+            db.commit()
+            logger.info(f"[LOGIN] Mot de passe re-haché pour id={user.id}")
         
+        login_rate_limiter.reset(email_key)
         access_token = create_access_token({"sub": user.email, "role": user.role.value})
-        print(f"[DEBUG] Token créé: {access_token[:20]}...")
+        logger.info(f"[LOGIN] Connexion réussie pour id={user.id}, role={user.role.value}")
         
-        response_data = {
+        return {
             "access_token": access_token,
             "token_type": "bearer",
             "role": user.role.value,
             "id": user.id,
             "name": user.username
         }
-        print(f"[DEBUG] Réponse préparée: {response_data}")
-        return response_data
         
     except HTTPException:
         # Relancer les HTTPException sans modification
         raise
     except Exception as e:
-        print(f"[ERROR] Exception dans login: {str(e)}")
-        print(f"[ERROR] Type d'exception: {type(e)}")
-        import traceback
-        print(f"[ERROR] Traceback: {traceback.format_exc()}")
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Erreur interne: {str(e)}") 
\ No newline at end of file
+        logger.exception(f"[ERROR] Exception dans login: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Erreur interne: {str(e)}")
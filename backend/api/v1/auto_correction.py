@@ -8,6 +8,7 @@ from api.v1.auth import require_role
 from typing import List, Dict, Any
 from datetime import datetime
 import json
+from services.scoring_kernel import grade, quiz_keys
 
 router = APIRouter()
 
@@ -106,11 +107,13 @@ def get_correction_details(
         # Récupérer les réponses de l'élève
         student_answers = json.loads(result.answers) if result.answers else {}
         
-        # Analyser chaque question
+        # Analyser chaque question (corrigé compilé du quiz)
+        items = grade(quiz_keys(db, result.quiz_id), student_answers).by_question()
         detailed_correction = []
         for question in questions:
+            item = items.get(question.id)
             student_answer = student_answers.get(str(question.id), "")
-            is_correct = question.correct_answer == student_answer
+            is_correct = bool(item and item.is_correct)
             
             detailed_correction.append({
                 "question_id": question.id,
@@ -232,23 +235,18 @@ def auto_correct_quiz(
         # Récupérer les réponses de l'élève
         student_answers = json.loads(result.answers) if result.answers else {}
         
-        # Corriger automatiquement
-        total_points = 0
-        earned_points = 0
+        # Corriger automatiquement en une passe (questions sans réponse comptées fausses)
+        report = grade(quiz_keys(db, result.quiz_id), student_answers, include_unanswered=True)
+        total_points = report.max_score
+        earned_points = report.score
         corrected_answers = {}
+        items = report.by_question()
         
         for question in questions:
-            total_points += question.points
-            student_answer = student_answers.get(str(question.id), "")
-            
-            # Vérifier si la réponse est correcte
-            is_correct = question.correct_answer == student_answer
-            
-            if is_correct:
-                earned_points += question.points
-            
+            item = items.get(question.id)
+            is_correct = bool(item and item.is_correct)
             corrected_answers[str(question.id)] = {
-                "student_answer": student_answer,
+                "student_answer": student_answers.get(str(question.id), ""),
                 "correct_answer": question.correct_answer,
                 "is_correct": is_correct,
                 "points": question.points,
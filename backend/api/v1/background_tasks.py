@@ -0,0 +1,66 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List
+import json
+
+from core.database import get_db
+from core.security import get_current_user
+from models.background_task import BackgroundTask, TASK_SUCCEEDED, TASK_FAILED
+from models.user import User, UserRole
+from services.roster import teacher_has_student
+from services.task_queue import task_queue
+
+router = APIRouter()
+
+def _can_read(db: Session, task: BackgroundTask, user: User) -> bool:
+    """Propriétaire, administrateur ou enseignant d'une classe de l'élève"""
+    if user.role == UserRole.admin or task.user_id == user.id:
+        return True
+    return user.role == UserRole.teacher and task.user_id is not None and teacher_has_student(db, user.id, task.user_id)
+
+def _serialize(task: BackgroundTask) -> dict:
+    return {
+        "id": task.id,
+        "kind": task.kind,
+        "subject": task.subject,
+        "status": task.status,
+        "attempts": task.attempts,
+        "max_attempts": task.max_attempts,
+        "run_at": task.run_at,
+        "finished_at": task.finished_at,
+        "last_error": task.last_error,
+        "result": json.loads(task.result) if task.result else None,
+    }
+
+@router.get("/")
+def get_tasks_for_subject(
+    subject: str = Query(..., description="Sujet des tâches, ex. quiz_result:42"),
+    wait: float = Query(0, ge=0, le=30, description="Attente maximale (s) que les tâches soient terminées"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Suivre les traitements d'une soumission (long polling optionnel avec `wait`)."""
+    tasks = task_queue.wait_for(db, subject, wait) if wait else db.query(BackgroundTask).filter(
+        BackgroundTask.subject == subject
+    ).order_by(BackgroundTask.id).all()
+    tasks = [task for task in tasks if _can_read(db, task, current_user)]
+    if not tasks:
+        raise HTTPException(status_code=404, detail="Aucune tâche pour ce sujet")
+    return {
+        "subject": subject,
+        "ready": all(task.status == TASK_SUCCEEDED for task in tasks),
+        "failed": any(task.status == TASK_FAILED for task in tasks),
+        "tasks": [_serialize(task) for task in tasks],
+    }
+
+@router.get("/{task_id}")
+def get_task(
+    task_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Statut d'une tâche."""
+    task = db.query(BackgroundTask).filter(BackgroundTask.id == task_id).first()
+    if task is None or not _can_read(db, task, current_user):
+        raise HTTPException(status_code=404, detail="Tâche non trouvée")
+    return _serialize(task)
@@ -5,6 +5,7 @@ from core.database import get_db
 from models.class_group import ClassGroup, ClassStudent
 from models.user import User, UserRole
 from api.v1.auth import get_current_user, require_role
+from services.roster import class_student_ids
 from schemas.class_group import ClassGroupCreate, ClassGroupRead, ClassStudentCreate, ClassStudentRead, ClassStudentWithUserRead
 from typing import List
 from datetime import datetime, timedelta
@@ -24,15 +25,11 @@ def list_class_groups(db: Session = Depends(get_db), current_user=Depends(get_cu
         result = []
         
         for class_group in classes:
-            # Compter le nombre d'élèves dans cette classe
-            student_count = db.query(ClassStudent).filter(
-                ClassStudent.class_id == class_group.id
-            ).count()
+            # Élèves de cette classe (annuaire en mémoire)
+            student_ids = list(class_student_ids(db, class_group.id))
+            student_count = len(student_ids)
             
             # Calculer le niveau moyen (basé sur les scores des quiz)
-            student_ids = [cs.student_id for cs in db.query(ClassStudent).filter(
-                ClassStudent.class_id == class_group.id
-            ).all()]
             
             average_score = 0
             if student_ids:
@@ -173,10 +170,7 @@ def get_class_analytics(
             raise HTTPException(status_code=404, detail="Classe non trouvée")
         
         # Obtenir les IDs des étudiants de cette classe
-        class_students = db.query(ClassStudent).filter(
-            ClassStudent.class_id == class_id
-        ).all()
-        student_ids = [cs.student_id for cs in class_students]
+        student_ids = list(class_student_ids(db, class_id))
         
         if not student_ids:
             # Données par défaut si pas d'étudiants
@@ -6,6 +6,7 @@ from models.user import User
 from models.quiz import QuizResult, Quiz
 from models.learning_history import LearningHistory
 from api.v1.auth import require_role, get_current_user
+from services.roster import class_student_ids
 from typing import List, Dict, Any
 from datetime import datetime, timedelta
 import json
@@ -69,9 +70,7 @@ def get_class_cognitive_analysis(
     """Analyser les profils cognitifs d'une classe."""
     try:
         # Récupérer les étudiants de la classe
-        from models.class_group import ClassStudent
-        class_students = db.query(ClassStudent).filter(ClassStudent.class_id == class_id).all()
-        student_ids = [cs.student_id for cs in class_students]
+        student_ids = sorted(class_student_ids(db, class_id))
         
         if not student_ids:
             return {"message": "Aucun étudiant dans cette classe", "analysis": {}}
@@ -5,7 +5,10 @@ from core.database import get_db
 from models.content_sharing import ContentSharing, ContentAccess
 from models.content import Content
 from models.user import User, UserRole
-from models.class_group import ClassGroup, ClassStudent
+from models.class_group import ClassGroup
+from services.counter_buffer import counter_buffer, CONTENT_ACCESS, SHARING_VIEWS, SHARING_DOWNLOADS
+from services.content_grants import SharingGrants
+from services.roster import class_student_ids, teacher_student_ids
 from api.v1.auth import get_current_user, require_role
 from schemas.content_sharing import (
     ContentSharingCreate, ContentSharingUpdate, ContentSharingRead,
@@ -33,76 +36,23 @@ def share_content(
     if content.created_by != current_user.id and current_user.role != UserRole.admin:
         raise HTTPException(status_code=403, detail="Vous ne pouvez partager que vos propres contenus")
     
-    # Calculer le nombre d'étudiants cibles
-    student_count = 0
-    target_ids = sharing_data.target_ids or []
-    
-    if sharing_data.target_type == "class":
-        # Compter les étudiants dans les classes sélectionnées
-        for class_id in target_ids:
-            class_students = db.query(ClassStudent).filter(ClassStudent.class_id == class_id).count()
-            student_count += class_students
-    elif sharing_data.target_type == "student":
-        student_count = len(target_ids)
-    elif sharing_data.target_type == "all_students":
-        # Compter tous les étudiants de l'enseignant
-        student_count = db.query(ClassStudent).join(ClassGroup).filter(
-            ClassGroup.teacher_id == current_user.id
-        ).distinct(ClassStudent.student_id).count()
-    
-    # Créer le partage
+    # Créer le partage et ses cibles (classes ou élèves); les membres des classes
+    # sont résolus à la lecture et l'accès individuel créé à la première consultation
     sharing = ContentSharing(
         content_id=sharing_data.content_id,
         shared_by=current_user.id,
         target_type=sharing_data.target_type,
-        target_ids=target_ids,
+        target_ids=sharing_data.target_ids or [],
         allow_download=sharing_data.allow_download,
         allow_view=sharing_data.allow_view,
         expiration_date=sharing_data.expiration_date,
         notify_students=sharing_data.notify_students,
-        custom_message=sharing_data.custom_message,
-        student_count=student_count
+        custom_message=sharing_data.custom_message
     )
     
     db.add(sharing)
-    db.commit()
-    db.refresh(sharing)
-    
-    # Créer les accès pour chaque étudiant
-    if sharing_data.target_type == "class":
-        for class_id in target_ids:
-            class_students = db.query(ClassStudent).filter(ClassStudent.class_id == class_id).all()
-            for class_student in class_students:
-                access = ContentAccess(
-                    content_id=sharing_data.content_id,
-                    student_id=class_student.student_id,
-                    sharing_id=sharing.id
-                )
-                db.add(access)
-    
-    elif sharing_data.target_type == "student":
-        for student_id in target_ids:
-            access = ContentAccess(
-                content_id=sharing_data.content_id,
-                student_id=student_id,
-                sharing_id=sharing.id
-            )
-            db.add(access)
-    
-    elif sharing_data.target_type == "all_students":
-        # Récupérer tous les étudiants de l'enseignant
-        teacher_students = db.query(ClassStudent.student_id).join(ClassGroup).filter(
-            ClassGroup.teacher_id == current_user.id
-        ).distinct().all()
-        
-        for student in teacher_students:
-            access = ContentAccess(
-                content_id=sharing_data.content_id,
-                student_id=student.student_id,
-                sharing_id=sharing.id
-            )
-            db.add(access)
-    
+    db.flush()
+    sharing.student_count = SharingGrants(db).grant(sharing, current_user.id)
     db.commit()
     
     # Retourner le partage créé avec les informations complètes
@@ -147,7 +97,7 @@ def get_sharing_stats(
         )
     ).count()
     
-    # Statistiques des vues et téléchargements
+    # Statistiques des vues et téléchargements (plus les incréments pas encore écrits)
     total_views = db.query(func.sum(ContentSharing.view_count)).filter(
         ContentSharing.shared_by == current_user.id
     ).scalar() or 0
@@ -156,6 +106,12 @@ def get_sharing_stats(
         ContentSharing.shared_by == current_user.id
     ).scalar() or 0
     
+    sharing_ids = [sharing_id for (sharing_id,) in db.query(ContentSharing.id).filter(
+        ContentSharing.shared_by == current_user.id
+    )]
+    total_views += counter_buffer.pending_total(SHARING_VIEWS, sharing_ids)
+    total_downloads += counter_buffer.pending_total(SHARING_DOWNLOADS, sharing_ids)
+    
     total_students_reached = db.query(func.sum(ContentSharing.student_count)).filter(
         ContentSharing.shared_by == current_user.id
     ).scalar() or 0
@@ -202,24 +158,19 @@ def get_sharing_targets(
     class_targets = []
     
     for class_group in classes:
-        student_count = db.query(ClassStudent).filter(
-            ClassStudent.class_id == class_group.id
-        ).count()
-        
         class_targets.append(SharingTarget(
             id=class_group.id,
             name=class_group.name,
             type="class",
-            student_count=student_count
+            student_count=len(class_student_ids(db, class_group.id))
         ))
     
-    # Étudiants individuels (tous les étudiants de l'enseignant)
-    teacher_students = db.query(User).join(ClassStudent).join(ClassGroup).filter(
-        and_(
-            ClassGroup.teacher_id == current_user.id,
-            User.role == UserRole.student
-        )
-    ).distinct().all()
+    # Étudiants individuels (tous les étudiants de l'enseignant, annuaire en mémoire)
+    student_ids = teacher_student_ids(db, current_user.id)
+    teacher_students = db.query(User).filter(
+        User.id.in_(student_ids),
+        User.role == UserRole.student
+    ).all() if student_ids else []
     
     student_targets = [
         SharingTarget(
@@ -258,25 +209,38 @@ def get_sharing_accesses(
     if not sharing:
         raise HTTPException(status_code=404, detail="Partage non trouvé")
     
-    # Récupérer les accès avec les détails des étudiants
-    accesses = db.query(ContentAccess).filter(ContentAccess.sharing_id == sharing_id).all()
+    # Destinataires actuels du partage et accès déjà consultés (lignes créées à la première vue)
+    accesses = {
+        access.student_id: access
+        for access in db.query(ContentAccess).filter(ContentAccess.sharing_id == sharing_id)
+    }
+    student_ids = list(dict.fromkeys(list(accesses) + SharingGrants(db).recipients(sharing_id)))
+    students = {
+        student.id: student for student in db.query(User).filter(User.id.in_(student_ids))
+    } if student_ids else {}
+    content = db.query(Content).filter(Content.id == sharing.content_id).first()
     
     # Enrichir avec les détails
     enriched_accesses = []
-    for access in accesses:
-        student = db.query(User).filter(User.id == access.student_id).first()
-        content = db.query(Content).filter(Content.id == access.content_id).first()
+    for student_id in student_ids:
+        student = students.get(student_id)
+        access = accesses.get(student_id)
+        if access is not None:
+            pending_first, pending_last = counter_buffer.pending_stamps(CONTENT_ACCESS, access.id)
+            access_count = (access.access_count or 0) + counter_buffer.pending(CONTENT_ACCESS, access.id)
+        else:
+            pending_first, pending_last, access_count = None, None, 0
         
         enriched_accesses.append(ContentAccessRead(
-            id=access.id,
-            content_id=access.content_id,
-            student_id=access.student_id,
-            sharing_id=access.sharing_id,
-            first_accessed=access.first_accessed,
-            last_accessed=access.last_accessed,
-            access_count=access.access_count,
-            can_view=access.can_view,
-            can_download=access.can_download,
+            id=access.id if access else None,
+            content_id=sharing.content_id,
+            student_id=student_id,
+            sharing_id=sharing.id,
+            first_accessed=(access.first_accessed if access else None) or pending_first,
+            last_accessed=pending_last or (access.last_accessed if access else None),
+            access_count=access_count,
+            can_view=access.can_view if access else True,
+            can_download=access.can_download if access else True,
             student_name=f"{student.first_name or ''} {student.last_name or ''}".strip() or student.email if student else "Inconnu",
             student_email=student.email if student else "",
             content_title=content.title if content else "Contenu inconnu"
@@ -350,28 +314,10 @@ def get_student_shared_contents(
     if current_user.id != student_id and current_user.role not in [UserRole.teacher, UserRole.admin]:
         raise HTTPException(status_code=403, detail="Accès non autorisé")
     
-    # Récupérer tous les accès de l'étudiant
-    student_accesses = db.query(ContentAccess).filter(
-        and_(
-            ContentAccess.student_id == student_id,
-            ContentAccess.can_view == True
-        )
-    ).all()
-    
-    # Récupérer les partages correspondants
-    shared_contents = []
-    for access in student_accesses:
-        sharing = db.query(ContentSharing).filter(
-            and_(
-                ContentSharing.id == access.sharing_id,
-                ContentSharing.is_active == True
-            )
-        ).first()
-        
-        if sharing:
-            # Vérifier si le partage n'a pas expiré
-            if sharing.expiration_date is None or sharing.expiration_date > datetime.now():
-                shared_contents.append(get_sharing_with_details(sharing.id, db))
+    # Partages actifs et non expirés dont l'étudiant est destinataire (classe ou individuel)
+    shared_contents = [
+        get_sharing_with_details(sharing.id, db) for sharing in SharingGrants(db).shared_with(student_id)
+    ]
     
     return shared_contents
 
@@ -382,28 +328,10 @@ def get_my_shared_contents(
 ):
     """Récupérer tous les contenus partagés avec l'étudiant connecté"""
     
-    # Récupérer tous les accès de l'étudiant connecté
-    student_accesses = db.query(ContentAccess).filter(
-        and_(
-            ContentAccess.student_id == current_user.id,
-            ContentAccess.can_view == True
-        )
-    ).all()
-    
-    # Récupérer les partages correspondants
-    shared_contents = []
-    for access in student_accesses:
-        sharing = db.query(ContentSharing).filter(
-            and_(
-                ContentSharing.id == access.sharing_id,
-                ContentSharing.is_active == True
-            )
-        ).first()
-        
-        if sharing:
-            # Vérifier si le partage n'a pas expiré
-            if sharing.expiration_date is None or sharing.expiration_date > datetime.now():
-                shared_contents.append(get_sharing_with_details(sharing.id, db))
+    # Partages actifs et non expirés dont l'étudiant est destinataire (classe ou individuel)
+    shared_contents = [
+        get_sharing_with_details(sharing.id, db) for sharing in SharingGrants(db).shared_with(current_user.id)
+    ]
     
     return shared_contents
 
@@ -421,44 +349,25 @@ def update_content_access(
     if not content_id or not action:
         raise HTTPException(status_code=400, detail="Données manquantes")
     
-    # Vérifier que l'étudiant a accès à ce contenu
-    access = db.query(ContentAccess).filter(
-        and_(
-            ContentAccess.content_id == content_id,
-            ContentAccess.student_id == current_user.id
-        )
-    ).first()
+    # Vérifier que l'étudiant a accès à ce contenu (accès créé à la première consultation)
+    access, sharing = SharingGrants(db).access_for(current_user.id, content_id)
     
     if not access:
         raise HTTPException(status_code=403, detail="Accès non autorisé à ce contenu")
+    db.commit()
     
-    # Mettre à jour les statistiques
+    # Mettre à jour les statistiques (incréments cumulés en mémoire, écrits par lots atomiques)
     if action == "view":
-        access.last_accessed = datetime.now()
-        access.access_count += 1
-        if not access.first_accessed:
-            access.first_accessed = datetime.now()
-        
-        # Mettre à jour le compteur de vues du partage
-        sharing = db.query(ContentSharing).filter(ContentSharing.id == access.sharing_id).first()
-        if sharing:
-            sharing.view_count += 1
+        counter_buffer.increment(CONTENT_ACCESS, access.id)
+        counter_buffer.increment(SHARING_VIEWS, access.sharing_id)
     
     elif action == "download":
         # Vérifier que le téléchargement est autorisé
-        sharing = db.query(ContentSharing).filter(ContentSharing.id == access.sharing_id).first()
-        if not sharing or not sharing.allow_download:
+        if not sharing.allow_download or not access.can_download:
             raise HTTPException(status_code=403, detail="Téléchargement non autorisé pour ce contenu")
         
-        access.last_accessed = datetime.now()
-        access.access_count += 1
-        if not access.first_accessed:
-            access.first_accessed = datetime.now()
-        
-        # Mettre à jour le compteur de téléchargements du partage
-        sharing.download_count += 1
-    
-    db.commit()
+        counter_buffer.increment(CONTENT_ACCESS, access.id)
+        counter_buffer.increment(SHARING_DOWNLOADS, sharing.id)
     
     return {"message": f"Accès {action} mis à jour avec succès"}
 
@@ -470,20 +379,15 @@ def download_shared_content(
 ):
     """Télécharger un contenu partagé"""
     
-    # Vérifier que l'étudiant a accès à ce contenu
-    access = db.query(ContentAccess).filter(
-        and_(
-            ContentAccess.content_id == content_id,
-            ContentAccess.student_id == current_user.id
-        )
-    ).first()
+    # Vérifier que l'étudiant a accès à ce contenu (accès créé à la première consultation)
+    access, sharing = SharingGrants(db).access_for(current_user.id, content_id)
     
     if not access:
         raise HTTPException(status_code=403, detail="Accès non autorisé à ce contenu")
+    db.commit()
     
     # Vérifier que le téléchargement est autorisé
-    sharing = db.query(ContentSharing).filter(ContentSharing.id == access.sharing_id).first()
-    if not sharing or not sharing.allow_download:
+    if not sharing.allow_download or not access.can_download:
         raise HTTPException(status_code=403, detail="Téléchargement non autorisé pour ce contenu")
     
     # Récupérer le contenu
@@ -492,13 +396,8 @@ def download_shared_content(
         raise HTTPException(status_code=404, detail="Contenu non trouvé")
     
     # Mettre à jour les statistiques de téléchargement
-    access.last_accessed = datetime.now()
-    access.access_count += 1
-    if not access.first_accessed:
-        access.first_accessed = datetime.now()
-    
-    sharing.download_count += 1
-    db.commit()
+    counter_buffer.increment(CONTENT_ACCESS, access.id)
+    counter_buffer.increment(SHARING_DOWNLOADS, sharing.id)
     
     # Retourner les informations du contenu pour le téléchargement
     return {
@@ -533,8 +432,8 @@ def get_sharing_with_details(sharing_id: int, db: Session) -> ContentSharingRead
         expiration_date=sharing.expiration_date,
         notify_students=sharing.notify_students,
         custom_message=sharing.custom_message,
-        view_count=sharing.view_count,
-        download_count=sharing.download_count,
+        view_count=(sharing.view_count or 0) + counter_buffer.pending(SHARING_VIEWS, sharing.id),
+        download_count=(sharing.download_count or 0) + counter_buffer.pending(SHARING_DOWNLOADS, sharing.id),
         student_count=sharing.student_count,
         content_title=content.title if content else "Contenu inconnu",
         content_subject=content.subject if content else "",
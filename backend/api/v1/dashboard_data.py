@@ -2,15 +2,17 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_, or_, desc, asc
 from core.database import SessionLocal
+from core.response_cache import cached_response, skip_response_cache, teacher_scope
 from models.user import User, UserRole
 from models.class_group import ClassGroup, ClassStudent
 from models.learning_history import LearningHistory
 from models.quiz import QuizResult
 from models.notification import Notification
-from models.schedule import ScheduleEvent
 from models.badge import UserBadge
 from api.v1.auth import require_role
 from api.v1.users import get_current_user
+from services.roster import class_student_ids, teacher_student_ids
+from services.calendar_feed import CalendarFeed
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 import json
@@ -26,6 +28,7 @@ def get_db():
 
 # 1. ENDPOINT POUR LES TENDANCES (Performance, Engagement, Taux de réussite)
 @router.get("/monthly-progress")
+@cached_response(tags=[teacher_scope])
 def get_monthly_progress(
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role(['teacher', 'admin']))
@@ -238,6 +241,7 @@ def get_monthly_progress(
         }
         
     except Exception as e:
+        skip_response_cache()
         print(f"❌ Erreur dans get_monthly_progress: {str(e)}")
         # Retourner des données de démonstration en cas d'erreur
         return {
@@ -256,6 +260,7 @@ def get_monthly_progress(
         }
 
 @router.get("/advanced-metrics")
+@cached_response(tags=[teacher_scope])
 def get_advanced_metrics(
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role(['teacher', 'admin']))
@@ -622,6 +627,7 @@ def get_advanced_metrics(
         }
         
     except Exception as e:
+        skip_response_cache()
         print(f"❌ Erreur dans get_advanced_metrics: {str(e)}")
         # Retourner des données de démonstration en cas d'erreur
         return {
@@ -666,6 +672,7 @@ def get_advanced_metrics(
         }
 
 @router.get("/trends")
+@cached_response(tags=[teacher_scope])
 def get_teacher_trends(
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role(['teacher', 'admin']))
@@ -826,6 +833,7 @@ def get_teacher_trends(
         }
         
     except Exception as e:
+        skip_response_cache()
         print(f"❌ Erreur dans get_teacher_trends: {str(e)}")
         # Retourner des données de démonstration réalistes quand la base est vide
         return {
@@ -836,6 +844,7 @@ def get_teacher_trends(
 
 # 2. ENDPOINT POUR L'ACTIVITÉ HEBDOMADAIRE
 @router.get("/weekly-activity")
+@cached_response(tags=[teacher_scope])
 def get_weekly_activity(
     subject: Optional[str] = Query(None, description="Matière spécifique"),
     db: Session = Depends(get_db),
@@ -884,6 +893,7 @@ def get_weekly_activity(
         }
         
     except Exception as e:
+        skip_response_cache()
         print(f"Erreur dans get_weekly_activity: {str(e)}")
         return {
             "subject": subject or "Toutes",
@@ -995,17 +1005,15 @@ def get_calendar_events(
         now = datetime.utcnow()
         end_date = now + timedelta(days=days)
         
-        # Récupérer les événements du professeur
-        events = db.query(ScheduleEvent).filter(
-            and_(
-                ScheduleEvent.teacher_id == current_user.id,
-                ScheduleEvent.start_time >= now,
-                ScheduleEvent.start_time <= end_date
-            )
-        ).order_by(ScheduleEvent.start_time).all()
+        # Cours et réunions planifiés par le professeur (séries récurrentes développées)
+        events = CalendarFeed(db).occurrences(current_user.id, now, end_date, sources=("schedule",))
         
         calendar_events = []
         for event in events:
+            # Occurrence déjà commencée: hors de la liste à venir
+            if event["start_date"] < now.isoformat():
+                continue
+            
             # Déterminer la couleur selon le type d'événement
             color_map = {
                 'meeting': 'purple',
@@ -1016,16 +1024,16 @@ def get_calendar_events(
             }
             
             calendar_events.append({
-                "id": event.id,
-                "title": event.title,
-                "description": event.description,
-                "event_type": event.event_type,
-                "start_time": event.start_time.isoformat(),
-                "end_time": event.end_time.isoformat(),
-                "location": event.location,
-                "subject": event.subject,
-                "color": color_map.get(event.event_type, 'gray'),
-                "icon": get_event_icon(event.event_type)
+                "id": event["source_id"],
+                "title": event["title"],
+                "description": event["description"],
+                "event_type": event["type"],
+                "start_time": event["start_date"],
+                "end_time": event["end_date"],
+                "location": event["location"],
+                "subject": event["subject"],
+                "color": color_map.get(event["type"], 'gray'),
+                "icon": get_event_icon(event["type"])
             })
         
         return {"events": calendar_events}
@@ -1036,6 +1044,7 @@ def get_calendar_events(
 
 # 5. ENDPOINT POUR LES MÉTRIQUES DE CLASSE
 @router.get("/class-metrics")
+@cached_response(tags=[teacher_scope])
 def get_class_metrics(
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role(['teacher', 'admin']))
@@ -1049,16 +1058,13 @@ def get_class_metrics(
         
         class_metrics = []
         for class_group in classes:
-            # Compter les étudiants
-            student_count = db.query(func.count(ClassStudent.student_id)).filter(
-                ClassStudent.class_id == class_group.id
-            ).scalar() or 0
+            # Étudiants de la classe (annuaire en mémoire)
+            student_ids = class_student_ids(db, class_group.id)
+            student_count = len(student_ids)
             
             # Score moyen de la classe
-            avg_score = db.query(func.avg(QuizResult.score)).join(
-                ClassStudent, QuizResult.user_id == ClassStudent.student_id
-            ).filter(
-                ClassStudent.class_id == class_group.id
+            avg_score = db.query(func.avg(QuizResult.score)).filter(
+                QuizResult.user_id.in_(student_ids)
             ).scalar() or 0
             
             class_metrics.append({
@@ -1073,6 +1079,7 @@ def get_class_metrics(
         return {"classes": class_metrics}
         
     except Exception as e:
+        skip_response_cache()
         print(f"Erreur dans get_class_metrics: {str(e)}")
         return {"classes": []}
 
@@ -1089,6 +1096,7 @@ def get_event_icon(event_type: str) -> str:
 
 # 6. ENDPOINT UNIFIÉ POUR TOUTES LES DONNÉES DU DASHBOARD
 @router.get("/dashboard-data")
+@cached_response(tags=[teacher_scope])
 def get_dashboard_data(
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role(['teacher', 'admin']))
@@ -1101,6 +1109,9 @@ def get_dashboard_data(
             ClassGroup.teacher_id == current_user.id
         ).scalar() or 0
         
+        # Élèves des classes du professeur (annuaire en mémoire), pour les filtres IN ci-dessous
+        teacher_students = teacher_student_ids(db, current_user.id)
+        
         # Nombre total d'élèves dans le système (pour un admin) ou dans les classes du professeur
         if current_user.role == UserRole.admin:
             total_students = db.query(func.count(User.id)).filter(
@@ -1108,41 +1119,25 @@ def get_dashboard_data(
             ).scalar() or 0
         else:
             # Compter les étudiants uniques du professeur avec filtre sur le rôle
-            # Utiliser une requête SQL brute avec la bonne syntaxe
-            from sqlalchemy import text
-            query = text("""
-                SELECT COUNT(DISTINCT cs.student_id)
-                FROM class_students cs
-                JOIN class_groups cg ON cs.class_id = cg.id
-                JOIN users u ON cs.student_id = u.id
-                WHERE cg.teacher_id = :teacher_id AND u.role = 'student'
-            """)
-            
-            result = db.execute(query, {"teacher_id": current_user.id}).scalar()
-            total_students = result or 0
+            total_students = db.query(func.count(User.id)).filter(
+                User.id.in_(teacher_students),
+                User.role == UserRole.student
+            ).scalar() or 0
         
         # Nombre de quiz dans le système (pour un admin) ou dans les classes du professeur
         if current_user.role == UserRole.admin:
             total_quizzes = db.query(func.count(QuizResult.id)).scalar() or 0
         else:
-            total_quizzes = db.query(func.count(QuizResult.id)).join(
-                ClassStudent, QuizResult.user_id == ClassStudent.student_id
-            ).join(
-                ClassGroup, ClassStudent.class_id == ClassGroup.id
-            ).filter(
-                ClassGroup.teacher_id == current_user.id
+            total_quizzes = db.query(func.count(QuizResult.id)).filter(
+                QuizResult.user_id.in_(teacher_students)
             ).scalar() or 0
         
         # Progression moyenne des élèves (pour un admin) ou dans les classes du professeur
         if current_user.role == UserRole.admin:
             avg_progression = db.query(func.avg(QuizResult.score)).scalar() or 0
         else:
-            avg_progression = db.query(func.avg(QuizResult.score)).join(
-                ClassStudent, QuizResult.user_id == ClassStudent.student_id
-            ).join(
-                ClassGroup, ClassStudent.class_id == ClassGroup.id
-            ).filter(
-                ClassGroup.teacher_id == current_user.id
+            avg_progression = db.query(func.avg(QuizResult.score)).filter(
+                QuizResult.user_id.in_(teacher_students)
             ).scalar() or 0
         
         # Nombre de contenus (placeholder - à adapter selon votre modèle)
@@ -1158,15 +1153,9 @@ def get_dashboard_data(
                 QuizResult.created_at >= week_start
             ).scalar() or 0
         else:
-            recent_activity = db.query(func.count(QuizResult.id)).join(
-                ClassStudent, QuizResult.user_id == ClassStudent.student_id
-            ).join(
-                ClassGroup, ClassStudent.class_id == ClassGroup.id
-            ).filter(
-                and_(
-                    ClassGroup.teacher_id == current_user.id,
-                    QuizResult.created_at >= week_start
-                )
+            recent_activity = db.query(func.count(QuizResult.id)).filter(
+                QuizResult.user_id.in_(teacher_students),
+                QuizResult.created_at >= week_start
             ).scalar() or 0
         
         # Tâches en attente (placeholder)
@@ -1204,6 +1193,7 @@ def get_dashboard_data(
         }
         
     except Exception as e:
+        skip_response_cache()
         print(f"Erreur dans get_dashboard_data: {str(e)}")
         return {
             "overview": {
@@ -14,6 +14,7 @@ from core.security import get_current_user
 from models.user import User
 from models.forum import ForumCategory, ForumThread, ForumReply
 from schemas.forum import ForumThreadCreate, ForumThreadResponse
+from services.counter_buffer import counter_buffer, FORUM_THREAD_VIEWS
 
 router = APIRouter(tags=["forum"])
 
@@ -144,7 +145,7 @@ def get_forum_threads(
                 "tags": safe_parse_tags(thread.tags),
                 "is_pinned": thread.is_pinned,
                 "is_locked": thread.is_locked,
-                "view_count": thread.view_count,
+                "view_count": (thread.view_count or 0) + counter_buffer.pending(FORUM_THREAD_VIEWS, thread.id),
                 "reply_count": thread.reply_count,
                 "last_reply_at": thread.last_reply_at,
                 "created_at": thread.created_at,
@@ -203,9 +204,8 @@ def get_forum_thread(
             detail="Thread non trouvé"
         )
     
-    # Incrémenter le compteur de vues
-    thread.view_count += 1
-    db.commit()
+    # Incrémenter le compteur de vues (écrit par lots, sans verrouiller la ligne du thread)
+    counter_buffer.increment(FORUM_THREAD_VIEWS, thread.id)
     
     return {
         "id": thread.id,
@@ -224,7 +224,7 @@ def get_forum_thread(
         "tags": safe_parse_tags(thread.tags),
         "is_pinned": thread.is_pinned,
         "is_locked": thread.is_locked,
-        "view_count": thread.view_count,
+        "view_count": (thread.view_count or 0) + counter_buffer.pending(FORUM_THREAD_VIEWS, thread.id),
         "reply_count": thread.reply_count,
         "last_reply_at": thread.last_reply_at,
         "created_at": thread.created_at,
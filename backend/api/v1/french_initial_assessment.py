@@ -12,12 +12,14 @@ import random
 
 from core.database import get_db
 from core.security import get_current_user, require_role
+from services.scoring_kernel import compile_key
 from models.user import User, UserRole
 from models.french_learning import (
     FrenchLearningProfile, FrenchCompetency, FrenchCompetencyProgress,
     FrenchAdaptiveTest
 )
 from models.question_history import QuestionHistory
+from services.post_submission_tasks import enqueue_french_profile, french_assessment_subject
 
 # Import des services IA
 try:
@@ -456,8 +458,8 @@ async def submit_french_answer(
         question_difficulty = answer_data.get("question_difficulty", "easy")
         correct_answer = answer_data.get("correct_answer", "")
         
-        # Vérifier si la réponse est correcte
-        is_correct = student_answer == correct_answer
+        # Vérifier si la réponse est correcte (casse et espaces ignorés, accents comptés)
+        is_correct = compile_key(0, "text", correct_answer).check(student_answer)
         
         # Calculer le score
         if is_correct:
@@ -644,6 +646,8 @@ async def submit_french_answer(
             except Exception as e:
                 print(f"❌ Erreur critique lors de la génération du profil: {e}")
             
+            # Profil intelligent (analyse complète du test): affiné en tâche de fond
+            enqueue_french_profile(db, test)
             db.commit()
             
             print(f"🎯 Test terminé: {completion_reason}")
@@ -657,7 +661,8 @@ async def submit_french_answer(
                 "total_questions": new_question_index,
                 "correct_answers": test.final_score // 10,
                 "completion_reason": completion_reason,
-                "profile_generated": True
+                "profile_generated": True,
+                "task_subject": french_assessment_subject(test_id)
             }
         
         db.commit()
@@ -1197,33 +1202,7 @@ async def generate_learning_profile(student_id: int, db: Session) -> Dict[str, A
                 print(f"📊 Score de confiance: {profile_data.get('confidence_score', 0):.2f}")
                 
                 # Mettre à jour le profil dans la base de données
-                existing_profile = db.query(FrenchLearningProfile).filter(
-                    FrenchLearningProfile.student_id == student_id
-                ).first()
-                
-                if existing_profile:
-                    # Mettre à jour le profil existant
-                    existing_profile.learning_style = profile_data.get('learning_style', 'visual')
-                    existing_profile.french_level = profile_data.get('real_french_level', 'A1')
-                    existing_profile.preferred_pace = profile_data.get('preferred_pace', 'moyen')
-                    existing_profile.strengths = profile_data.get('strengths', '[]')
-                    existing_profile.weaknesses = profile_data.get('weaknesses', '[]')
-                    existing_profile.cognitive_profile = profile_data.get('cognitive_profile', '{}')
-                    existing_profile.updated_at = datetime.utcnow()
-                else:
-                    # Créer un nouveau profil
-                    new_profile = FrenchLearningProfile(
-                        student_id=student_id,
-                        learning_style=profile_data.get('learning_style', 'visual'),
-                        french_level=profile_data.get('real_french_level', 'A1'),
-                        preferred_pace=profile_data.get('preferred_pace', 'moyen'),
-                        strengths=profile_data.get('strengths', '[]'),
-                        weaknesses=profile_data.get('weaknesses', '[]'),
-                        cognitive_profile=profile_data.get('cognitive_profile', '{}')
-                    )
-                    db.add(new_profile)
-                
-                db.commit()
+                intelligent_profile_service.save_profile(student_id, profile_data)
                 print("✅ Profil intelligent mis à jour dans la base de données")
                 
                 return profile_data
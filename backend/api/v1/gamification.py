@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc
 from core.database import get_db
+from core.response_cache import cached_response, skip_response_cache
 from models.gamification import UserLevel, Challenge, UserChallenge, Leaderboard, LeaderboardEntry, Achievement, UserAchievement
 from models.user import User
 from models.quiz import Quiz, QuizResult
@@ -14,6 +15,8 @@ import json
 from models.learning_history import LearningHistory
 from models.user import UserRole
 from models.badge import UserBadge, Badge
+from services.badge_rule_engine import BadgeRuleEngine
+from services.activity_streaks import ActivityStreakService
 import random
 
 router = APIRouter()
@@ -217,6 +220,7 @@ def get_user_stats_test(db: Session = Depends(get_db)):
     }
 
 @router.get("/user/{user_id}/level")
+@cached_response(tags=["student:{user_id}"])
 def get_user_level(
     user_id: int,
     db: Session = Depends(get_db),
@@ -301,6 +305,7 @@ def calculate_xp_for_level(level: int) -> int:
     return int(1000 * (1.2 ** (level - 1)))
 
 @router.get("/user/{user_id}/points")
+@cached_response(tags=["student:{user_id}"])
 def get_user_points(
     user_id: int,
     db: Session = Depends(get_db),
@@ -330,6 +335,7 @@ def get_user_points(
     }
 
 @router.get("/user/{user_id}/achievements")
+@cached_response(tags=["student:{user_id}"])
 def get_user_achievements(
     user_id: int,
     db: Session = Depends(get_db),
@@ -349,11 +355,12 @@ def get_user_achievements(
     
     achievements_with_progress = []
     
+    # Progression de tous les achievements en une seule lecture des compteurs
+    progress_by_id = calculate_achievements_progress(all_achievements, user_id, db)
+    
     for achievement in all_achievements:
         user_achievement = unlocked_achievements.get(achievement.id)
-        
-        # Calculer la progression basée sur le type d'achievement
-        progress = calculate_achievement_progress(achievement, user_id, db)
+        progress = progress_by_id[achievement.id]
         
         achievements_with_progress.append({
             "id": achievement.id,
@@ -395,11 +402,12 @@ def get_user_challenges(
     
     challenges_with_progress = []
     
+    # Progression de tous les challenges en une seule lecture des compteurs
+    progress_by_id = calculate_challenges_progress(all_challenges, user_id, db)
+    
     for challenge in all_challenges:
         user_challenge = user_challenge_dict.get(challenge.id)
-        
-        # Calculer la progression basée sur le type de challenge
-        progress = calculate_challenge_progress(challenge, user_id, db)
+        progress = progress_by_id[challenge.id]
         
         challenges_with_progress.append({
             "id": challenge.id,
@@ -521,147 +529,30 @@ def complete_challenge(
         "challenge": challenge
     }
 
+# Challenges dont la progression suit une règle de badge du même nom
+RULE_CHALLENGES = ("Quiz Master", "Streak Master")
+
 def calculate_achievement_progress(achievement: Achievement, user_id: int, db: Session) -> Dict[str, Any]:
-    """Calculer la progression d'un achievement."""
-    
-    if achievement.name == "Quiz Master":
-        # Compléter 10 quiz
-        quiz_count = db.query(QuizResult).filter(QuizResult.student_id == user_id).count()
-        return {"current": quiz_count, "target": 10}
-    
-    elif achievement.name == "Perfect Score":
-        # Obtenir un score parfait sur un quiz
-        perfect_quizzes = db.query(QuizResult).filter(
-            QuizResult.student_id == user_id,
-            QuizResult.score == QuizResult.max_score
-        ).count()
-        return {"current": perfect_quizzes, "target": 1}
-    
-    elif achievement.name == "Streak Master":
-        # Compléter des quiz 5 jours de suite
-        # Calculer la plus longue série de jours consécutifs
-        results = db.query(QuizResult).filter(QuizResult.student_id == user_id).order_by(QuizResult.completed_at).all()
-        
-        if not results:
-            return {"current": 0, "target": 5}
-        
-        # Grouper par jour
-        from datetime import datetime, timedelta
-        daily_activity = {}
-        for result in results:
-            day = result.completed_at.date()
-            if day not in daily_activity:
-                daily_activity[day] = 0
-            daily_activity[day] += 1
-        
-        # Calculer la plus longue série
-        dates = sorted(daily_activity.keys())
-        max_streak = 0
-        current_streak = 0
-        
-        for i, date in enumerate(dates):
-            if i == 0:
-                current_streak = 1
-            else:
-                prev_date = dates[i-1]
-                if (date - prev_date).days == 1:
-                    current_streak += 1
-                else:
-                    current_streak = 1
-            
-            max_streak = max(max_streak, current_streak)
-        
-        return {"current": max_streak, "target": 5}
-    
-    elif achievement.name == "Rapide comme l'éclair":
-        # Complétez 5 quiz en moins de 30 minutes
-        fast_quizzes = db.query(QuizResult).filter(
-            QuizResult.student_id == user_id,
-            QuizResult.time_taken <= 1800  # 30 minutes en secondes
-        ).count()
-        return {"current": fast_quizzes, "target": 5}
-    
-    elif achievement.name == "Maître du Sujet":
-        # Obtenez une moyenne de 90%+ sur 10 quiz d'un même sujet
-        # Calculer la moyenne par sujet
-        results = db.query(QuizResult).filter(QuizResult.student_id == user_id).all()
-        
-        if not results:
-            return {"current": 0, "target": 10}
-        
-        # Grouper par sujet
-        subject_scores = {}
-        for result in results:
-            subject = result.quiz.subject if result.quiz else "Général"
-            if subject not in subject_scores:
-                subject_scores[subject] = []
-            subject_scores[subject].append(result.score)
-        
-        # Trouver le sujet avec la meilleure moyenne
-        best_subject_avg = 0
-        for subject, scores in subject_scores.items():
-            if len(scores) >= 10:
-                avg = sum(scores) / len(scores)
-                if avg >= 90:
-                    best_subject_avg = avg
-                    break
-        
-        return {"current": 1 if best_subject_avg >= 90 else 0, "target": 1}
-    
-    elif achievement.name == "Lève-tôt":
-        # Complétez un quiz avant 8h du matin
-        from datetime import datetime
-        early_quizzes = db.query(QuizResult).filter(
-            QuizResult.student_id == user_id,
-            func.extract('hour', QuizResult.completed_at) < 8
-        ).count()
-        return {"current": early_quizzes, "target": 1}
-    
-    return {"current": 0, "target": 1}
+    """Calculer la progression d'un achievement à partir des compteurs incrémentaux."""
+    return calculate_achievements_progress([achievement], user_id, db)[achievement.id]
+
+def calculate_achievements_progress(achievements: List[Achievement], user_id: int, db: Session) -> Dict[int, Dict[str, Any]]:
+    """Progression de plusieurs achievements (par id), compteurs lus une seule fois."""
+    progress = BadgeRuleEngine(db).get_progress_many(user_id, [achievement.name for achievement in achievements])
+    return {achievement.id: progress[achievement.name] for achievement in achievements}
 
 def calculate_challenge_progress(challenge: Challenge, user_id: int, db: Session) -> Dict[str, Any]:
-    """Calculer la progression d'un challenge."""
-    
-    if challenge.name == "Quiz Master":
-        # Compléter 10 quiz
-        quiz_count = db.query(QuizResult).filter(QuizResult.student_id == user_id).count()
-        return {"current": quiz_count, "target": 10}
-    
-    elif challenge.name == "Streak Master":
-        # Compléter des quiz 5 jours de suite
-        # Utiliser la même logique que pour l'achievement
-        results = db.query(QuizResult).filter(QuizResult.student_id == user_id).order_by(QuizResult.completed_at).all()
-        
-        if not results:
-            return {"current": 0, "target": 5}
-        
-        from datetime import datetime, timedelta
-        daily_activity = {}
-        for result in results:
-            day = result.completed_at.date()
-            if day not in daily_activity:
-                daily_activity[day] = 0
-            daily_activity[day] += 1
-        
-        dates = sorted(daily_activity.keys())
-        max_streak = 0
-        current_streak = 0
-        
-        for i, date in enumerate(dates):
-            if i == 0:
-                current_streak = 1
-            else:
-                prev_date = dates[i-1]
-                if (date - prev_date).days == 1:
-                    current_streak += 1
-                else:
-                    current_streak = 1
-            
-            max_streak = max(max_streak, current_streak)
-        
-        return {"current": max_streak, "target": 5}
-    
-    return {"current": 0, "target": 1}
+    """Calculer la progression d'un challenge à partir des compteurs incrémentaux."""
+    return calculate_challenges_progress([challenge], user_id, db)[challenge.id]
+
+def calculate_challenges_progress(challenges: List[Challenge], user_id: int, db: Session) -> Dict[int, Dict[str, Any]]:
+    """Progression de plusieurs challenges (par id), compteurs lus une seule fois."""
+    names = [challenge.name for challenge in challenges if challenge.name in RULE_CHALLENGES]
+    progress = BadgeRuleEngine(db).get_progress_many(user_id, names) if names else {}
+    return {
+        challenge.id: progress.get(challenge.name, {"current": 0, "target": 1})
+        for challenge in challenges
+    }
 
 @router.get("/leaderboards/")
 def get_leaderboards(
@@ -700,6 +591,7 @@ def get_leaderboards(
     return enriched_leaderboards
 
 @router.get("/leaderboard")
+@cached_response(tags=["class:{class_id}"])
 def get_leaderboard(
     leaderboard_type: str = "global",
     class_id: int = None,
@@ -773,52 +665,15 @@ def get_learning_streak(
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role(['teacher', 'admin']))
 ):
-    """Récupérer les données de série d'apprentissage."""
+    """Récupérer les données de série d'apprentissage (plateforme, 30 derniers jours)."""
     try:
-        # Récupérer l'activité des 30 derniers jours
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        activities = db.query(LearningHistory).filter(
-            LearningHistory.timestamp >= thirty_days_ago
-        ).order_by(LearningHistory.timestamp).all()
-        
-        # Créer un historique des 30 derniers jours
-        history = []
-        current_streak = 0
-        best_streak = 0
-        temp_streak = 0
-        
-        # Grouper par jour
-        daily_activity = {}
-        for activity in activities:
-            day = activity.created_at.date()
-            if day not in daily_activity:
-                daily_activity[day] = 0
-            daily_activity[day] += 1
-        
-        # Créer l'historique des 30 derniers jours
-        for i in range(30):
-            check_date = datetime.utcnow().date() - timedelta(days=29-i)
-            if check_date in daily_activity and daily_activity[check_date] > 0:
-                history.append(1)
-                temp_streak += 1
-                if temp_streak > best_streak:
-                    best_streak = temp_streak
-            else:
-                history.append(0)
-                if temp_streak > 0:
-                    temp_streak = 0
-        
-        # Calculer la série actuelle
-        current_streak = 0
-        for i in range(len(history)-1, -1, -1):
-            if history[i] == 1:
-                current_streak += 1
-            else:
-                break
+        service = ActivityStreakService(db)
+        history = service.get_history(days=30)
+        streaks = service.get_streaks(since=datetime.utcnow().date() - timedelta(days=29))
         
         return {
-            "current": current_streak,
-            "best": best_streak,
+            "current": streaks["current"],
+            "best": streaks["best"],
             "history": history
         }
         
@@ -830,6 +685,28 @@ def get_learning_streak(
             "history": [0] * 30
         } 
 
+@router.get("/user/{user_id}/learning-streak")
+@cached_response(tags=["student:{user_id}"])
+def get_user_learning_streak(
+    user_id: int,
+    days: int = 30,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Récupérer la série d'apprentissage d'un utilisateur (série actuelle et record absolu)."""
+    if current_user.id != user_id and current_user.role not in [UserRole.teacher, UserRole.admin]:
+        raise HTTPException(status_code=403, detail="Accès non autorisé")
+    
+    service = ActivityStreakService(db)
+    streaks = service.get_streaks(user_id=user_id)
+    
+    return {
+        "user_id": user_id,
+        "current": streaks["current"],
+        "best": streaks["best"],
+        "history": service.get_history(days=max(1, min(days, 365)), user_id=user_id)
+    }
+
 @router.get("/user-progress")
 def get_user_progress(
     db: Session = Depends(get_db),
@@ -888,6 +765,7 @@ def get_user_progress(
         } 
 
 @router.get("/user/stats")
+@cached_response(tags=["student:{user}"])
 def get_user_gamification_stats(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)  # Accepter tous les utilisateurs connectés
@@ -955,6 +833,7 @@ def get_user_gamification_stats(
         return result
         
     except Exception as e:
+        skip_response_cache()
         print(f"[ERROR] Erreur dans get_user_gamification_stats: {e}")
         import traceback
         traceback.print_exc()
@@ -976,6 +855,7 @@ def get_user_gamification_stats(
         } 
 
 @router.get("/student/{student_id}/stats")
+@cached_response(tags=["student:{student_id}"])
 def get_student_gamification_stats(
     student_id: int,
     db: Session = Depends(get_db),
@@ -1074,6 +954,7 @@ def get_student_gamification_stats(
         return result
         
     except Exception as e:
+        skip_response_cache()
         print(f"[ERROR] Erreur dans get_student_gamification_stats: {e}")
         import traceback
         traceback.print_exc()
@@ -1097,6 +978,7 @@ def get_student_gamification_stats(
         }
 
 @router.get("/student/{student_id}/badges")
+@cached_response(tags=["student:{student_id}"])
 def get_student_badges(
     student_id: int,
     db: Session = Depends(get_db)
@@ -1124,5 +1006,6 @@ def get_student_badges(
         return badges_info
         
     except Exception as e:
+        skip_response_cache()
         print(f"❌ Erreur lors de la récupération des badges: {e}")
         return [] 
\ No newline at end of file
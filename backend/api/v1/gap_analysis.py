@@ -2,11 +2,13 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc, and_
 from core.database import get_db
+from core.response_cache import cached_response
 from models.user import User
 from models.quiz import QuizResult, Quiz, Question
 from models.learning_history import LearningHistory
 from models.content import Content
 from api.v1.auth import get_current_user
+from services.roster import class_student_ids
 from typing import List, Dict, Any
 from datetime import datetime, timedelta
 import json
@@ -160,6 +162,7 @@ def analyze_student_gaps_test(
         raise HTTPException(status_code=500, detail=f"Erreur lors de l'analyse des lacunes: {str(e)}")
 
 @router.get("/student/{student_id}/gaps")
+@cached_response(tags=["student:{student_id}"])
 def identify_student_gaps(
     student_id: int,
     db: Session = Depends(get_db),
@@ -206,6 +209,7 @@ def identify_student_gaps(
         raise HTTPException(status_code=500, detail=f"Erreur analyse lacunes: {str(e)}")
 
 @router.get("/class/{class_id}/gaps")
+@cached_response(tags=["class:{class_id}"])
 def identify_class_gaps(
     class_id: int,
     db: Session = Depends(get_db),
@@ -214,9 +218,7 @@ def identify_class_gaps(
     """Identifier les lacunes communes d'une classe."""
     try:
         # Récupérer les étudiants de la classe
-        from models.class_group import ClassStudent
-        class_students = db.query(ClassStudent).filter(ClassStudent.class_id == class_id).all()
-        student_ids = [cs.student_id for cs in class_students]
+        student_ids = sorted(class_student_ids(db, class_id))
         
         if not student_ids:
             return {"message": "Aucun étudiant dans cette classe", "gaps": []}
@@ -248,6 +250,7 @@ def identify_class_gaps(
         raise HTTPException(status_code=500, detail=f"Erreur analyse lacunes classe: {str(e)}")
 
 @router.get("/subject/{subject}/gaps")
+@cached_response(tags=["class:{class_id}"])
 def identify_subject_gaps(
     subject: str,
     class_id: int = Query(None, description="ID de la classe (optionnel)"),
@@ -261,9 +264,7 @@ def identify_subject_gaps(
         
         # Filtrer par classe si spécifiée
         if class_id:
-            from models.class_group import ClassStudent
-            class_students = db.query(ClassStudent).filter(ClassStudent.class_id == class_id).all()
-            student_ids = [cs.student_id for cs in class_students]
+            student_ids = sorted(class_student_ids(db, class_id))
             query = query.filter(QuizResult.student_id.in_(student_ids))
         
         results = query.all()
@@ -304,9 +305,7 @@ def identify_subject_gaps_test(
         
         # Filtrer par classe si spécifiée
         if class_id:
-            from models.class_group import ClassStudent
-            class_students = db.query(ClassStudent).filter(ClassStudent.class_id == class_id).all()
-            student_ids = [cs.student_id for cs in class_students]
+            student_ids = sorted(class_student_ids(db, class_id))
             query = query.filter(QuizResult.student_id.in_(student_ids))
         
         results = query.all()
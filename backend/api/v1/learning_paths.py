@@ -1,21 +1,30 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc
+from pydantic import BaseModel
 from core.database import get_db
 from models.learning_path import LearningPath
 from models.student_learning_path import StudentLearningPath
-from models.user import User
+from models.user import User, UserRole
 from models.assessment import Assessment, AssessmentResult
 from models.content import Content
 from models.quiz import Quiz
 from api.v1.users import get_current_user
 from api.v1.auth import require_role
+from services.learning_path_generator import LearningPathGenerator
+from services.roster import class_student_ids, class_teacher_id
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 import json
 
 router = APIRouter()
 
+class ClassPathAssignment(BaseModel):
+    subject: str
+    level: str = "Débutant"  # Débutant, Intermédiaire, Avancé
+    # {élève: {numéro d'étape: {colonne: valeur}}}
+    overrides: Optional[Dict[int, Dict[int, Dict[str, Any]]]] = None
+
 @router.post("/generate/{student_id}")
 def generate_adaptive_learning_path(
     student_id: int,
@@ -175,6 +184,42 @@ def list_learning_paths(
         print(f"Erreur dans list_learning_paths: {str(e)}")
         return []
 
+@router.post("/class/{class_id}/assign")
+def assign_learning_path_to_class(
+    class_id: int,
+    assignment: ClassPathAssignment,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(['teacher', 'admin']))
+):
+    """Assigner le parcours partagé (matière, niveau) à tous les élèves d'une classe."""
+    teacher_id = class_teacher_id(db, class_id)
+    if teacher_id is None:
+        raise HTTPException(status_code=404, detail="Classe non trouvée")
+    if teacher_id != current_user.id and current_user.role != UserRole.admin:
+        raise HTTPException(status_code=403, detail="Cette classe n'appartient pas à l'enseignant")
+    
+    student_ids = sorted(class_student_ids(db, class_id))
+    outsiders = set(assignment.overrides or {}) - set(student_ids)
+    if outsiders:
+        raise HTTPException(status_code=400, detail=f"Élèves hors de la classe: {sorted(outsiders)}")
+    
+    try:
+        learning_path, assigned = LearningPathGenerator(db).assign_to_students(
+            assignment.subject, assignment.level, student_ids,
+            assigned_by=current_user.id, overrides=assignment.overrides
+        )
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        "learning_path_id": learning_path.id,
+        "title": learning_path.title,
+        "class_id": class_id,
+        "students": len(student_ids),
+        "newly_assigned": assigned,
+    }
+
 @router.get("/student/{student_id}/current")
 def get_student_current_path(
     student_id: int,
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
@@ -9,6 +9,9 @@ from api.v1.users import get_current_user
 from models.user import User
 from models.library import UserFavorite, Collection, CollectionItem, ContentHistory, ContentRecommendation, Playlist, PlaylistItem
 from models.content import Content
+from models.library_catalogue import LibraryCatalogueEntry
+from services.library_catalogue import LibraryCatalogue
+from services.content_recommender import ContentRecommender
 from models.class_group import ClassGroup
 
 def get_db():
@@ -26,64 +29,46 @@ router = APIRouter(prefix="/library", tags=["Library"])
 
 @router.get("/resources", response_model=List[dict])
 def get_resources(
+    response: Response,
     subject: Optional[str] = None,
     level: Optional[str] = None,
     type: Optional[str] = None,
     search: Optional[str] = None,
     limit: int = 50,
     offset: int = 0,
+    after: Optional[int] = Query(None, description="Curseur (en-tête X-Next-Cursor de la page précédente)"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Récupérer les ressources de la bibliothèque avec filtres"""
-    query = db.query(Content)
-    
-    if subject:
-        query = query.filter(Content.subject == subject)
-    if level:
-        query = query.filter(Content.level == level)
-    if type:
-        query = query.filter(Content.type == type)
-    if search:
-        query = query.filter(
-            (Content.title.contains(search)) | 
-            (Content.description.contains(search))
-        )
-    
-    resources = query.offset(offset).limit(limit).all()
-    
-    # Convertir en format compatible avec le frontend
-    result = []
-    for resource in resources:
-        # Vérifier si l'utilisateur a mis en favori
-        is_favorite = db.query(UserFavorite).filter(
-            UserFavorite.user_id == current_user.id,
-            UserFavorite.content_id == resource.id
-        ).first() is not None
-        
-        resource_data = {
-            "id": resource.id,
-            "title": resource.title,
-            "description": resource.description,
-            "type": resource.type,
-            "subject": resource.subject,
-            "level": resource.level,
-            "tags": json.loads(resource.tags) if resource.tags else [],
-            "author": resource.author,
-            "created_at": resource.created_at.isoformat() if resource.created_at else "",
-            "duration": getattr(resource, 'duration', None),
-            "file_size": getattr(resource, 'file_size', None),
-            "views": getattr(resource, 'views', 0),
-            "rating": getattr(resource, 'rating', 0.0),
-            "is_favorite": is_favorite,
-            "is_in_collection": False,  # À implémenter
-            "collections": [],
-            "url": getattr(resource, 'url', ''),
-            "thumbnail": getattr(resource, 'thumbnail', '')
-        }
-        result.append(resource_data)
-    
-    return result
+    catalogue = LibraryCatalogue(db)
+    entries, next_cursor = catalogue.search(
+        {"subject": subject, "level": level, "type": type}, search, limit=limit, after=after, offset=offset
+    )
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+    return catalogue.serialize_page(current_user.id, entries)
+
+@router.get("/search", response_model=dict)
+def search_catalogue(
+    subject: Optional[str] = None,
+    level: Optional[str] = None,
+    type: Optional[str] = None,
+    search: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    after: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Recherche plein texte avec facettes (matière, niveau, type) et pagination par curseur"""
+    catalogue = LibraryCatalogue(db)
+    filters = {"subject": subject, "level": level, "type": type}
+    entries, next_cursor = catalogue.search(filters, search, limit=limit, after=after)
+    return {
+        "items": catalogue.serialize_page(current_user.id, entries),
+        "facets": catalogue.facets(filters, search),
+        "next_cursor": next_cursor
+    }
 
 @router.get("/resources/{resource_id}", response_model=dict)
 def get_resource_by_id(
@@ -92,34 +77,11 @@ def get_resource_by_id(
     current_user: User = Depends(get_current_user)
 ):
     """Récupérer une ressource spécifique"""
-    resource = db.query(Content).filter(Content.id == resource_id).first()
-    if not resource:
+    entry = db.query(LibraryCatalogueEntry).filter(LibraryCatalogueEntry.content_id == resource_id).first()
+    if not entry:
         raise HTTPException(status_code=404, detail="Ressource non trouvée")
     
-    # Vérifier si l'utilisateur a mis en favori
-    is_favorite = db.query(UserFavorite).filter(
-        UserFavorite.user_id == current_user.id,
-        UserFavorite.content_id == resource.id
-    ).first() is not None
-    
-    return {
-        "id": resource.id,
-        "title": resource.title,
-        "description": resource.description,
-        "type": resource.type,
-        "subject": resource.subject,
-        "level": resource.level,
-        "tags": json.loads(resource.tags) if resource.tags else [],
-        "author": resource.author,
-        "created_at": resource.created_at.isoformat() if resource.created_at else "",
-        "duration": getattr(resource, 'duration', None),
-        "file_size": getattr(resource, 'file_size', None),
-        "views": getattr(resource, 'views', 0),
-        "rating": getattr(resource, 'rating', 0.0),
-        "is_favorite": is_favorite,
-        "url": getattr(resource, 'url', ''),
-        "thumbnail": getattr(resource, 'thumbnail', '')
-    }
+    return LibraryCatalogue(db).serialize_page(current_user.id, [entry])[0]
 
 # =====================================================
 # ENDPOINTS POUR LES FAVORIS
@@ -277,46 +239,30 @@ def create_collection(
 @router.get("/subjects", response_model=List[dict])
 def get_subjects(db: Session = Depends(get_db)):
     """Récupérer toutes les matières disponibles"""
-    # Récupérer les matières uniques depuis les contenus
-    subjects = db.query(Content.subject).distinct().all()
-    
-    result = []
-    for subject in subjects:
-        if subject[0]:  # Vérifier que le sujet n'est pas None
-            # Compter le nombre de ressources pour cette matière
-            resource_count = db.query(Content).filter(Content.subject == subject[0]).count()
-            
-            subject_data = {
-                "id": len(result) + 1,  # ID temporaire
-                "name": subject[0],
-                "color": f"bg-blue-{500 - (len(result) * 100)}",
-                "resource_count": resource_count
-            }
-            result.append(subject_data)
-    
-    return result
+    # Matières et nombre de ressources (une requête groupée sur le catalogue)
+    return [
+        {
+            "id": index + 1,  # ID temporaire
+            "name": facet["value"],
+            "color": f"bg-blue-{500 - (index * 100)}",
+            "resource_count": facet["count"]
+        }
+        for index, facet in enumerate(LibraryCatalogue(db).facet_counts("subject", {}))
+    ]
 
 @router.get("/levels", response_model=List[dict])
 def get_levels(db: Session = Depends(get_db)):
     """Récupérer tous les niveaux disponibles"""
-    # Récupérer les niveaux uniques depuis les contenus
-    levels = db.query(Content.level).distinct().all()
-    
-    result = []
-    for level in levels:
-        if level[0]:  # Vérifier que le niveau n'est pas None
-            # Compter le nombre de ressources pour ce niveau
-            resource_count = db.query(Content).filter(Content.level == level[0]).count()
-            
-            level_data = {
-                "id": len(result) + 1,  # ID temporaire
-                "name": level[0],
-                "color": f"bg-green-{500 - (len(result) * 100)}",
-                "resource_count": resource_count
-            }
-            result.append(level_data)
-    
-    return result
+    # Niveaux et nombre de ressources (une requête groupée sur le catalogue)
+    return [
+        {
+            "id": index + 1,  # ID temporaire
+            "name": facet["value"],
+            "color": f"bg-green-{500 - (index * 100)}",
+            "resource_count": facet["count"]
+        }
+        for index, facet in enumerate(LibraryCatalogue(db).facet_counts("level", {}))
+    ]
 
 # =====================================================
 # ENDPOINTS POUR LES RECOMMANDATIONS
@@ -329,24 +275,31 @@ def get_recommendations(
     current_user: User = Depends(get_current_user)
 ):
     """Récupérer les recommandations de ressources pour l'utilisateur"""
-    # Logique simple de recommandation basée sur l'historique
-    # À améliorer avec un algorithme plus sophistiqué
-    
-    # Récupérer les ressources les plus populaires
-    popular_resources = db.query(Content).order_by(Content.views.desc()).limit(limit).all()
+    # Candidats précalculés (voisins des ressources consultées, run_recommender.py),
+    # re-classés par matières faibles; ressources populaires pour compléter
+    recommendations = ContentRecommender(db).recommend(current_user.id, limit)
+    entries = {
+        entry.content_id: entry for entry in db.query(LibraryCatalogueEntry).filter(
+            LibraryCatalogueEntry.content_id.in_([content_id for content_id, _, _ in recommendations])
+        )
+    } if recommendations else {}
     
     result = []
-    for resource in popular_resources:
-        resource_data = {
-            "id": resource.id,
-            "title": resource.title,
-            "description": resource.description,
-            "type": resource.type,
-            "subject": resource.subject,
-            "level": resource.level,
-            "rating": getattr(resource, 'rating', 0.0),
-            "views": getattr(resource, 'views', 0)
-        }
-        result.append(resource_data)
+    for content_id, score, reason in recommendations:
+        entry = entries.get(content_id)
+        if entry is None or not entry.is_active:
+            continue
+        result.append({
+            "id": entry.content_id,
+            "title": entry.title,
+            "description": entry.description,
+            "type": entry.type,
+            "subject": entry.subject,
+            "level": entry.level,
+            "rating": 0.0,
+            "views": 0,
+            "score": round(score, 4),
+            "reason": reason
+        })
     
-    return result 
\ No newline at end of file
+    return result
@@ -1,9 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from core.database import get_db
-from models.user import User
-from models.quiz import Quiz, QuizAssignment, QuizResult
-from typing import List, Dict, Any
+from services.quiz_notifications import QuizNotificationEngine, NOTIFICATION_KINDS
+from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 import json
 from pydantic import BaseModel
@@ -26,100 +25,33 @@ class NotificationResponse(BaseModel):
     notifications: List[Notification]
     total_count: int
     unread_count: int
+    next_cursor: Optional[int] = None
 
 router = APIRouter()
 
 @router.get("/quiz", response_model=NotificationResponse)
 def get_quiz_notifications(
+    teacher_id: Optional[int] = Query(None, description="Assignations de cet enseignant"),
+    class_id: Optional[int] = Query(None, description="Assignations de cette classe"),
+    type: Optional[str] = Query(None, description="overdue, due_soon, low_score ou completed"),
+    before_id: Optional[int] = Query(None, description="Curseur: next_cursor de la page précédente"),
+    limit: int = Query(50, ge=1, le=200),
     db: Session = Depends(get_db)
 ):
-    """Récupérer toutes les notifications de quiz (version test sans auth)"""
+    """Récupérer les notifications de quiz (version test sans auth), paginées par curseur"""
+    if type is not None and type not in NOTIFICATION_KINDS:
+        raise HTTPException(status_code=400, detail=f"Type de notification inconnu: {type}")
     try:
-        # Simuler des notifications basées sur les données existantes
-        notifications = []
-        
-        # Récupérer les quiz assignés avec échéances
-        assignments = db.query(QuizAssignment).filter(
-            QuizAssignment.is_active == True,
-            QuizAssignment.due_date.isnot(None)
-        ).all()
-        
-        for assignment in assignments:
-            quiz = db.query(Quiz).filter(Quiz.id == assignment.quiz_id).first()
-            student = db.query(User).filter(User.id == assignment.student_id).first()
-            
-            if quiz and student:
-                # Vérifier si l'étudiant a répondu
-                quiz_result = db.query(QuizResult).filter(
-                    QuizResult.quiz_id == assignment.quiz_id,
-                    QuizResult.student_id == assignment.student_id
-                ).first()
-                
-                # Notification pour quiz en retard
-                if not quiz_result and assignment.due_date < datetime.utcnow():
-                    days_overdue = (datetime.utcnow() - assignment.due_date).days
-                    notifications.append(Notification(
-                        id=f"overdue_{assignment.id}",
-                        type="overdue",
-                        title=f"Quiz en retard",
-                        message=f"L'étudiant {student.username} n'a pas encore répondu au quiz '{quiz.title}' ({days_overdue} jour(s) de retard)",
-                        quiz_title=quiz.title,
-                        student_name=student.username,
-                        due_date=assignment.due_date.isoformat(),
-                        created_at=datetime.utcnow().isoformat(),
-                        is_read=False,
-                        priority="high"
-                    ))
-                
-                # Notification pour échéance proche (dans les 2 jours)
-                elif not quiz_result and assignment.due_date > datetime.utcnow():
-                    days_until_due = (assignment.due_date - datetime.utcnow()).days
-                    if days_until_due <= 2:
-                        notifications.append(Notification(
-                            id=f"due_soon_{assignment.id}",
-                            type="due_soon",
-                            title=f"Échéance proche",
-                            message=f"L'étudiant {student.username} doit répondre au quiz '{quiz.title}' dans {days_until_due} jour(s)",
-                            quiz_title=quiz.title,
-                            student_name=student.username,
-                            due_date=assignment.due_date.isoformat(),
-                            created_at=datetime.utcnow().isoformat(),
-                            is_read=False,
-                            priority="medium"
-                        ))
-                
-                # Notification pour quiz terminé avec score faible
-                elif quiz_result and quiz_result.score < 60:
-                    notifications.append(Notification(
-                        id=f"low_score_{assignment.id}",
-                        type="low_score",
-                        title=f"Score faible",
-                        message=f"L'étudiant {student.username} a obtenu un score faible ({quiz_result.score}/100) au quiz '{quiz.title}'",
-                        quiz_title=quiz.title,
-                        student_name=student.username,
-                        score=quiz_result.score,
-                        created_at=datetime.utcnow().isoformat(),
-                        is_read=False,
-                        priority="medium"
-                    ))
-                
-                # Notification pour quiz terminé avec succès
-                elif quiz_result and quiz_result.score >= 80:
-                    notifications.append(Notification(
-                        id=f"completed_{assignment.id}",
-                        type="completed",
-                        title=f"Quiz terminé avec succès",
-                        message=f"L'étudiant {student.username} a brillamment réussi le quiz '{quiz.title}' avec un score de {quiz_result.score}/100",
-                        quiz_title=quiz.title,
-                        student_name=student.username,
-                        score=quiz_result.score,
-                        created_at=datetime.utcnow().isoformat(),
-                        is_read=False,
-                        priority="low"
-                    ))
+        engine = QuizNotificationEngine(db)
+        rows, next_cursor = engine.page(
+            teacher_id=teacher_id, class_id=class_id, kind=type, before_id=before_id, limit=limit
+        )
+        notifications = [Notification(**row) for row in rows]
+        counts = engine.cached_counts(teacher_id, class_id)
+        total_count = counts[type] if type else sum(counts[k] for k in NOTIFICATION_KINDS)
         
         # Si aucune notification réelle, créer des exemples
-        if not notifications:
+        if not notifications and before_id is None and teacher_id is None and class_id is None and type is None:
             notifications = [
                 Notification(
                     id="example_1",
@@ -158,13 +90,13 @@ def get_quiz_notifications(
                     priority="medium"
                 )
             ]
-        
-        unread_count = len([n for n in notifications if not n.is_read])
+            total_count = len(notifications)
         
         return NotificationResponse(
             notifications=notifications,
-            total_count=len(notifications),
-            unread_count=unread_count
+            total_count=total_count,
+            unread_count=total_count,
+            next_cursor=next_cursor
         )
         
     except Exception as e:
@@ -202,44 +134,31 @@ def mark_all_notifications_as_read(
 
 @router.get("/overdue")
 def get_overdue_notifications(
+    teacher_id: Optional[int] = Query(None),
+    class_id: Optional[int] = Query(None),
+    before_id: Optional[int] = Query(None),
+    limit: int = Query(100, ge=1, le=500),
     db: Session = Depends(get_db)
 ):
     """Récupérer les notifications pour quiz en retard"""
     try:
-        overdue_quizzes = []
-        
-        # Récupérer les quiz assignés en retard
-        assignments = db.query(QuizAssignment).filter(
-            QuizAssignment.is_active == True,
-            QuizAssignment.due_date.isnot(None),
-            QuizAssignment.due_date < datetime.utcnow()
-        ).all()
-        
-        for assignment in assignments:
-            quiz = db.query(Quiz).filter(Quiz.id == assignment.quiz_id).first()
-            student = db.query(User).filter(User.id == assignment.student_id).first()
-            
-            if quiz and student:
-                # Vérifier si l'étudiant a répondu
-                quiz_result = db.query(QuizResult).filter(
-                    QuizResult.quiz_id == assignment.quiz_id,
-                    QuizResult.student_id == assignment.student_id
-                ).first()
-                
-                # Seulement si pas encore répondu
-                if not quiz_result:
-                    days_overdue = (datetime.utcnow() - assignment.due_date).days
-                    overdue_quizzes.append({
-                        "id": assignment.id,
-                        "quiz_title": quiz.title,
-                        "student_name": student.username,
-                        "due_date": assignment.due_date.isoformat(),
-                        "days_overdue": days_overdue,
-                        "assignment_id": assignment.id
-                    })
+        rows, next_cursor = QuizNotificationEngine(db).page(
+            teacher_id=teacher_id, class_id=class_id, kind="overdue", before_id=before_id, limit=limit
+        )
+        overdue_quizzes = [
+            {
+                "id": row["assignment_id"],
+                "quiz_title": row["quiz_title"],
+                "student_name": row["student_name"],
+                "due_date": row["due_date"],
+                "days_overdue": row["days_overdue"],
+                "assignment_id": row["assignment_id"]
+            }
+            for row in rows
+        ]
         
         # Si aucun quiz en retard réel, créer des exemples
-        if not overdue_quizzes:
+        if not overdue_quizzes and before_id is None and teacher_id is None and class_id is None:
             overdue_quizzes = [
                 {
                     "id": 1,
@@ -261,7 +180,8 @@ def get_overdue_notifications(
         
         return {
             "overdue_quizzes": overdue_quizzes,
-            "total_overdue": len(overdue_quizzes)
+            "total_overdue": len(overdue_quizzes),
+            "next_cursor": next_cursor
         }
         
     except Exception as e:
@@ -270,50 +190,13 @@ def get_overdue_notifications(
 
 @router.get("/summary")
 def get_notifications_summary(
+    teacher_id: Optional[int] = Query(None),
+    class_id: Optional[int] = Query(None),
     db: Session = Depends(get_db)
 ):
-    """Récupérer un résumé des notifications"""
+    """Récupérer un résumé des notifications (comptages en cache quelques secondes)"""
     try:
-        # Compter les différents types de notifications
-        summary = {
-            "total_notifications": 0,
-            "unread_count": 0,
-            "high_priority": 0,
-            "overdue_quizzes": 0,
-            "due_soon_quizzes": 0,
-            "recent_completions": 0
-        }
-        
-        # Récupérer les quiz assignés
-        assignments = db.query(QuizAssignment).filter(
-            QuizAssignment.is_active == True
-        ).all()
-        
-        for assignment in assignments:
-            if assignment.due_date:
-                # Quiz en retard
-                if assignment.due_date < datetime.utcnow():
-                    summary["overdue_quizzes"] += 1
-                    summary["high_priority"] += 1
-                
-                # Échéance proche
-                elif (assignment.due_date - datetime.utcnow()).days <= 2:
-                    summary["due_soon_quizzes"] += 1
-                    summary["high_priority"] += 1
-        
-        # Quiz récemment complétés
-        recent_results = db.query(QuizResult).filter(
-            QuizResult.created_at >= datetime.utcnow() - timedelta(days=7)
-        ).count()
-        summary["recent_completions"] = recent_results
-        
-        summary["total_notifications"] = (
-            summary["overdue_quizzes"] + 
-            summary["due_soon_quizzes"] + 
-            summary["recent_completions"]
-        )
-        
-        return summary
+        return QuizNotificationEngine(db).summary(teacher_id=teacher_id, class_id=class_id)
         
     except Exception as e:
         print(f"❌ Erreur get_notifications_summary: {e}")
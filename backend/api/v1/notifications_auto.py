@@ -11,6 +11,7 @@ from api.v1.users import get_current_user
 from models.user import User, UserRole
 from models.organization import Homework, StudySession, Reminder, LearningGoal
 from models.notification import Notification
+from services.deadline_scheduler import deadline_scheduler
 
 def get_db():
     db = SessionLocal()
@@ -51,74 +52,18 @@ class NotificationResponse(BaseModel):
 # FONCTIONS DE NOTIFICATION AUTOMATIQUE
 # =====================================================
 
-async def check_homework_deadlines(db: Session):
-    """Vérifier les deadlines des devoirs et envoyer des notifications"""
-    
-    # Devoirs en retard
-    overdue_homework = db.query(Homework).filter(
-        Homework.due_date < datetime.utcnow(),
-        Homework.status.in_(["pending", "in_progress"])
-    ).all()
-    
-    for homework in overdue_homework:
-        # Créer une notification urgente
-        notification = Notification(
-            user_id=homework.assigned_to,
-            title="Devoir en retard !",
-            message=f"Le devoir '{homework.title}' était à rendre le {homework.due_date.strftime('%d/%m/%Y')}",
-            type="homework",
-            priority="urgent",
-            data={"homework_id": homework.id, "due_date": homework.due_date.isoformat()}
-        )
-        db.add(notification)
-    
-    # Devoirs à rendre dans les 24h
-    tomorrow = datetime.utcnow() + timedelta(days=1)
-    urgent_homework = db.query(Homework).filter(
-        Homework.due_date <= tomorrow,
-        Homework.due_date > datetime.utcnow(),
-        Homework.status.in_(["pending", "in_progress"])
-    ).all()
-    
-    for homework in urgent_homework:
-        notification = Notification(
-            user_id=homework.assigned_to,
-            title="Devoir à rendre demain",
-            message=f"Le devoir '{homework.title}' est à rendre le {homework.due_date.strftime('%d/%m/%Y')}",
-            type="homework",
-            priority="high",
-            data={"homework_id": homework.id, "due_date": homework.due_date.isoformat()}
-        )
-        db.add(notification)
-    
-    db.commit()
+def check_deadlines():
+    """Notifier les échéances dues (devoirs, objectifs, rappels).
 
-async def check_goal_deadlines(db: Session):
-    """Vérifier les deadlines des objectifs et envoyer des notifications"""
-    
-    # Objectifs avec peu de temps restant
-    week_from_now = datetime.utcnow() + timedelta(days=7)
-    urgent_goals = db.query(LearningGoal).filter(
-        LearningGoal.target_date <= week_from_now,
-        LearningGoal.target_date > datetime.utcnow(),
-        LearningGoal.status == "active"
-    ).all()
-    
-    for goal in urgent_goals:
-        days_left = (goal.target_date - datetime.utcnow()).days
-        priority = "urgent" if days_left <= 2 else "high"
-        
-        notification = Notification(
-            user_id=goal.user_id,
-            title=f"Objectif à terminer dans {days_left} jours",
-            message=f"L'objectif '{goal.title}' doit être terminé le {goal.target_date.strftime('%d/%m/%Y')}",
-            type="goal",
-            priority=priority,
-            data={"goal_id": goal.id, "target_date": goal.target_date.isoformat(), "progress": goal.progress}
-        )
-        db.add(notification)
-    
-    db.commit()
+    Les échéances sont planifiées à l'écriture (deadline_events) et déclenchées en
+    continu par le planificateur; cet appel force un passage immédiat, limité aux
+    échéances dues et sans doublon (clé d'idempotence par échéance).
+    """
+    db = SessionLocal()
+    try:
+        return deadline_scheduler.fire_due(db)
+    finally:
+        db.close()
 
 async def check_achievements(db: Session):
     """Vérifier les achievements et envoyer des notifications"""
@@ -166,30 +111,6 @@ async def check_achievements(db: Session):
     
     db.commit()
 
-async def check_reminders(db: Session):
-    """Vérifier les rappels et envoyer des notifications"""
-    
-    # Rappels actifs qui arrivent à échéance
-    now = datetime.utcnow()
-    active_reminders = db.query(Reminder).filter(
-        Reminder.is_active == True,
-        Reminder.reminder_time <= now + timedelta(hours=1),
-        Reminder.reminder_time > now - timedelta(hours=1)
-    ).all()
-    
-    for reminder in active_reminders:
-        notification = Notification(
-            user_id=reminder.user_id,
-            title="Rappel",
-            message=reminder.title,
-            type="reminder",
-            priority="normal",
-            data={"reminder_id": reminder.id, "reminder_time": reminder.reminder_time.isoformat()}
-        )
-        db.add(notification)
-    
-    db.commit()
-
 # =====================================================
 # ENDPOINTS POUR LES NOTIFICATIONS
 # =====================================================
@@ -283,10 +204,8 @@ async def trigger_notification_checks(
         )
     
     # Ajouter les tâches en arrière-plan
-    background_tasks.add_task(check_homework_deadlines, db)
-    background_tasks.add_task(check_goal_deadlines, db)
+    background_tasks.add_task(check_deadlines)
     background_tasks.add_task(check_achievements, db)
-    background_tasks.add_task(check_reminders, db)
     
     return {"message": "Vérifications de notifications déclenchées"}
 
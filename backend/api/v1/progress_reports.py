@@ -6,10 +6,12 @@ from pydantic import BaseModel
 import json
 
 from core.database import SessionLocal
+from core.response_cache import cached_response
 from api.v1.users import get_current_user
 from models.user import User, UserRole
 from models.organization import Homework, StudySession, Reminder, LearningGoal
-from models.class_group import ClassGroup, ClassStudent
+from models.class_group import ClassGroup
+from services.roster import class_student_ids
 
 def get_db():
     db = SessionLocal()
@@ -221,6 +223,7 @@ def calculate_student_progress(
 # =====================================================
 
 @router.get("/student/{student_id}/progress")
+@cached_response(tags=["student:{student_id}"])
 def get_student_progress_report(
     student_id: int,
     period: str = "monthly",  # weekly, monthly, semester
@@ -261,6 +264,7 @@ def get_student_progress_report(
     return progress_data
 
 @router.get("/class/{class_id}/progress")
+@cached_response(tags=["class:{class_id}"])
 def get_class_progress_report(
     class_id: int,
     period: str = "monthly",
@@ -287,10 +291,8 @@ def get_class_progress_report(
             detail="Classe non trouvée ou accès non autorisé"
         )
     
-    # Récupérer les étudiants de la classe
-    students = db.query(ClassStudent).filter(
-        ClassStudent.class_id == class_id
-    ).all()
+    # Récupérer les étudiants de la classe (annuaire en mémoire)
+    student_ids = sorted(class_student_ids(db, class_id))
     
     # Calculer la période
     end_date = datetime.utcnow()
@@ -309,7 +311,7 @@ def get_class_progress_report(
     # Générer les rapports pour chaque étudiant
     class_progress = []
     class_summary = {
-        "total_students": len(students),
+        "total_students": len(student_ids),
         "avg_homework_completion": 0,
         "avg_study_time": 0,
         "avg_goal_achievement": 0,
@@ -321,8 +323,8 @@ def get_class_progress_report(
     total_goal_achievement = 0
     total_performance_score = 0
     
-    for student in students:
-        progress_data = calculate_student_progress(db, student.student_id, start_date, end_date)
+    for student_id in student_ids:
+        progress_data = calculate_student_progress(db, student_id, start_date, end_date)
         if progress_data:
             class_progress.append(progress_data)
             
@@ -350,6 +352,7 @@ def get_class_progress_report(
     }
 
 @router.get("/weekly-progress")
+@cached_response(tags=["student:{user}"])
 def get_weekly_progress(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -387,6 +390,7 @@ def get_weekly_progress(
     }
 
 @router.get("/subject-progress")
+@cached_response(tags=["student:{user}"])
 def get_subject_progress(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
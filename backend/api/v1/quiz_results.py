@@ -8,6 +8,9 @@ from api.v1.users import get_current_user
 from api.v1.notifications_ws import send_notification
 from api.v1.ai import recommend
 import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -64,8 +67,7 @@ async def create_quiz_result(result: QuizResultCreate, db: Session = Depends(get
 @router.get("/", response_model=List[QuizResultRead])
 def list_all_quiz_results(db: Session = Depends(get_db), current_user=Depends(get_current_user)):
     """Récupérer tous les résultats de quiz (pour les professeurs)"""
-    print(f"[API] /quiz_results/ - Token user: {current_user.id if current_user else 'None'}")
-    print(f"[API] User role: {current_user.role}")
+    logger.debug("/quiz_results/ - utilisateur %s (%s)", current_user.id, current_user.role)
     
     # Si c'est un professeur, ne montrer que les résultats des quiz qu'il a créés
     if current_user.role == "teacher":
@@ -73,21 +75,19 @@ def list_all_quiz_results(db: Session = Depends(get_db), current_user=Depends(ge
         from models.quiz import Quiz
         teacher_quizzes = db.query(Quiz.id).filter(Quiz.created_by == current_user.id).all()
         quiz_ids = [q.id for q in teacher_quizzes]
-        print(f"[API] Teacher quiz IDs: {quiz_ids}")
+        logger.debug("Quiz du professeur: %s", quiz_ids)
         
         if quiz_ids:
             results = db.query(QuizResult).filter(QuizResult.quiz_id.in_(quiz_ids)).order_by(QuizResult.created_at.desc()).all()
-            print(f"[API] Found {len(results)} results for teacher")
-            for result in results:
-                print(f"[API] Result: quiz_id={result.quiz_id}, student_id={result.student_id}, is_completed={result.is_completed}")
+            logger.debug("%d résultats pour le professeur %s", len(results), current_user.id)
             return results
         else:
-            print(f"[API] No quizzes found for teacher")
+            logger.debug("Aucun quiz pour le professeur %s", current_user.id)
             return []
     
     # Pour les admins, montrer tous les résultats
     results = db.query(QuizResult).order_by(QuizResult.created_at.desc()).all()
-    print(f"[API] Admin - Found {len(results)} total results")
+    logger.debug("Admin - %d résultats au total", len(results))
     return results
 
 @router.get("/enriched/", response_model=List[dict])
@@ -153,8 +153,7 @@ def get_student_quiz_results(
     current_user=Depends(get_current_user)
 ):
     """Obtenir tous les résultats de quiz d'un étudiant spécifique"""
-    print(f"[API] /quiz-results/student/{student_id} - Token user: {current_user.id if current_user else 'None'}")
-    print(f"[API] User role: {current_user.role}")
+    logger.debug("/quiz_results/student/%s - utilisateur %s (%s)", student_id, current_user.id, current_user.role)
     
     # Vérifier que l'utilisateur a accès à ces données
     if current_user.role == "student" and current_user.id != student_id:
@@ -165,7 +164,7 @@ def get_student_quiz_results(
     
     # Récupérer les résultats de l'étudiant
     results = db.query(QuizResult).filter(QuizResult.student_id == student_id).order_by(QuizResult.created_at.desc()).all()
-    print(f"[API] Found {len(results)} results for student {student_id}")
+    logger.debug("%d résultats pour l'élève %s", len(results), student_id)
     
     return results
 
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 from core.database import SessionLocal
 from models.quiz import Quiz, Question, QuizResult, QuizAnswer, QuizAssignment
@@ -20,6 +20,11 @@ from fpdf import FPDF
 from api.v1.notifications_ws import send_notification
 from models.class_group import ClassStudent
 from schemas.quiz import QuizAnswerRead, QuizResultWithAnswers
+from services.post_submission_tasks import enqueue_quiz_result_processing, quiz_result_subject
+from services.scoring_kernel import extract_correct_answer_from_text, grade, quiz_keys
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -80,26 +85,6 @@ def extract_options_from_text(question_text: str) -> list:
     
     return options
 
-def extract_correct_answer_from_text(question_text: str) -> str:
-    """Extrait la réponse correcte depuis le texte de la question."""
-    if not question_text:
-        return ""
-    
-    # Chercher "Réponse correcte:"
-    correct_start = question_text.find("Réponse correcte:")
-    if correct_start != -1:
-        # Chercher la fin (explication ou fin du texte)
-        explanation_start = question_text.find("Explication:", correct_start)
-        if explanation_start != -1:
-            correct_answer = question_text[correct_start:explanation_start].strip()
-        else:
-            correct_answer = question_text[correct_start:].strip()
-        
-        # Nettoyer
-        return correct_answer.replace("Réponse correcte:", "").strip()
-    
-    return ""
-
 # Quiz CRUD
 @router.get("/", response_model=List[QuizRead])
 def list_quizzes(db: Session = Depends(get_db), current_user=Depends(get_current_user)):
@@ -626,9 +611,13 @@ def get_quiz_result_detail(result_id: int, db: Session = Depends(get_db), curren
 
 # Submit Quiz (pour les élèves)
 @router.post("/{quiz_id}/submit", response_model=QuizResultRead)
-def submit_quiz(quiz_id: int, submission: QuizSubmission, db: Session = Depends(get_db), current_user=Depends(require_role(['student']))):
-    """Soumettre un quiz (pour les élèves)."""
-    print(f"[DEBUG] submit_quiz appelée pour quiz_id={quiz_id}, user_id={current_user.id}")
+def submit_quiz(quiz_id: int, submission: QuizSubmission, response: Response, db: Session = Depends(get_db), current_user=Depends(require_role(['student']))):
+    """Soumettre un quiz (pour les élèves).
+
+    Badges et cubes analytiques sont mis à jour en tâche de fond: leur avancement
+    se suit via /api/v1/background-tasks?subject=quiz_result:<id> (en-tête X-Task-Subject).
+    """
+    logger.debug("submit_quiz appelée pour quiz_id=%s, user_id=%s", quiz_id, current_user.id)
     
     quiz = db.query(Quiz).filter(Quiz.id == quiz_id, Quiz.is_active == True).first()
     if not quiz:
@@ -640,12 +629,11 @@ def submit_quiz(quiz_id: int, submission: QuizSubmission, db: Session = Depends(
         QuizResult.student_id == current_user.id
     ).first()
     
-    print(f"[DEBUG] Existing result found: {existing_result is not None}")
+    logger.debug("Résultat existant: %s", existing_result is not None)
     if existing_result and existing_result.is_completed:
-        print(f"[DEBUG] Quiz already completed, raising 400 error")
+        logger.debug("Quiz %s déjà terminé par l'élève %s", quiz_id, current_user.id)
         raise HTTPException(status_code=400, detail="Quiz already completed")
     
-    print(f"[DEBUG] Proceeding with quiz submission")
     
     # Créer ou récupérer le résultat
     if not existing_result:
@@ -666,80 +654,19 @@ def submit_quiz(quiz_id: int, submission: QuizSubmission, db: Session = Depends(
     else:
         result = existing_result
     
-    # Traiter les réponses
-    score = 0
-    for answer_data in submission.answers:
-        question = db.query(Question).filter(Question.id == answer_data["question_id"]).first()
-        if not question:
-            continue
-        
-        # Créer la réponse
-        quiz_answer = QuizAnswer(
+    # Noter la copie en une passe avec le corrigé compilé du quiz
+    report = grade(quiz_keys(db, quiz_id), submission.answers)
+    for item in report.items:
+        logger.debug("Question %s: réponse '%s', attendue '%s', correcte: %s",
+                     item.question_id, item.answer, item.correct_answer, item.is_correct)
+        db.add(QuizAnswer(
             result_id=result.id,
-            question_id=question.id,
-            answer_text=str(answer_data["answer"])
-        )
-        
-        # Évaluer la réponse
-        is_correct = False
-        points_earned = 0
-        
-        if question.question_type == "mcq":
-            # Récupérer les options et la réponse correcte
-            options = question.options or []
-            correct_answer = question.correct_answer
-            
-            # Déterminer la réponse correcte textuelle
-            correct_text = ""
-            if isinstance(correct_answer, int) and 0 <= correct_answer < len(options):
-                correct_text = options[correct_answer]
-            elif isinstance(correct_answer, str):
-                correct_text = correct_answer
-            else:
-                # Essayer d'extraire depuis le texte de la question
-                correct_text = extract_correct_answer_from_text(question.question_text) or ""
-            
-            # Comparer avec la réponse de l'étudiant
-            student_answer = str(answer_data["answer"])
-            is_correct = student_answer.strip().lower() == correct_text.strip().lower()
-            
-            print(f"[DEBUG] QCM Scoring - Question {question.id}:")
-            print(f"  Student answer: '{student_answer}'")
-            print(f"  Correct text: '{correct_text}'")
-            print(f"  Is correct: {is_correct}")
-            
-        elif question.question_type == "true_false":
-            is_correct = str(answer_data["answer"]).lower() == str(question.correct_answer).lower()
-        elif question.question_type == "text":
-            # Pour les questions texte, on peut faire une comparaison simple
-            is_correct = str(answer_data["answer"]).strip().lower() == str(question.correct_answer).strip().lower()
-        
-        if is_correct:
-            points_earned = question.points
-            score += question.points
-        
-        quiz_answer.is_correct = is_correct
-        quiz_answer.points_earned = points_earned
-        
-        # Ajouter la réponse correcte pour l'affichage
-        if question.question_type == "mcq":
-            options = question.options or []
-            correct_answer = question.correct_answer
-            if isinstance(correct_answer, int) and 0 <= correct_answer < len(options):
-                quiz_answer.correct_answer = options[correct_answer]
-            elif isinstance(correct_answer, str):
-                quiz_answer.correct_answer = correct_answer
-            else:
-                quiz_answer.correct_answer = extract_correct_answer_from_text(question.question_text) or "Réponse correcte non disponible"
-        elif question.question_type == "true_false":
-            if isinstance(question.correct_answer, bool):
-                quiz_answer.correct_answer = "Vrai" if question.correct_answer else "Faux"
-            else:
-                quiz_answer.correct_answer = str(question.correct_answer)
-        else:
-            quiz_answer.correct_answer = str(question.correct_answer)
-        
-        db.add(quiz_answer)
+            question_id=item.question_id,
+            answer_text=str(item.answer),
+            is_correct=item.is_correct,
+            points_earned=item.points_earned
+        ))
+    score = report.score
     
     # Mettre à jour le résultat
     result.score = score
@@ -747,10 +674,13 @@ def submit_quiz(quiz_id: int, submission: QuizSubmission, db: Session = Depends(
     result.is_completed = True
     result.completed_at = datetime.utcnow()
     
+    # Compteurs de badges et cubes analytiques: planifiés avec la soumission, exécutés en fond
+    enqueue_quiz_result_processing(db, result)
     db.commit()
     db.refresh(result)
+    response.headers["X-Task-Subject"] = quiz_result_subject(result.id)
     
-    print(f"[DEBUG] Quiz submitted successfully, score: {score}")
+    logger.debug("Quiz %s soumis, score: %s", quiz_id, score)
     return result
 
 @router.post("/assign/", response_model=QuizAssignmentRead)
@@ -963,41 +893,32 @@ def submit_quiz_simple(quiz_id: int, answers: List[dict], db: Session = Depends(
     if not quiz:
         raise HTTPException(status_code=404, detail="Quiz not found")
     questions = {q.id: q for q in quiz.questions}
-    score = 0
-    max_score = 0
-    corrections = []
-    for ans in answers:
-        qid = ans.get("question_id")
-        student_answer = ans.get("answer")
-        q = questions.get(qid)
-        if not q:
-            continue
-        correct = False
-        if q.question_type == 'mcq':
-            correct = (student_answer == q.correct_answer)
-        elif q.question_type == 'text':
-            correct = (student_answer.strip().lower() == str(q.correct_answer).strip().lower())
-        pts = q.points if correct else 0
-        score += pts
-        max_score += q.points
-        corrections.append({
-            "question": q.question_text,
-            "student_answer": student_answer,
-            "correct_answer": q.correct_answer,
-            "is_correct": correct,
-            "points": pts
-        })
+    report = grade(quiz_keys(db, quiz_id), answers)
+    score = report.score
+    max_score = report.max_score
+    corrections = [
+        {
+            "question": questions[item.question_id].question_text,
+            "student_answer": item.answer,
+            "correct_answer": questions[item.question_id].correct_answer,
+            "is_correct": item.is_correct,
+            "points": item.points_earned
+        }
+        for item in report.items
+    ]
     percent = (score / max_score * 100) if max_score else 0
     # Enregistrer le résultat (optionnel)
     result = QuizResult(student_id=current_user.id, quiz_id=quiz.id, score=score, max_score=max_score, percentage=percent, is_completed=True, sujet=quiz.subject)
     db.add(result)
+    db.flush()
+    enqueue_quiz_result_processing(db, result)
     db.commit()
-    db.refresh(result)
     return {
         "score": score,
         "max_score": max_score,
         "percentage": percent,
-        "corrections": corrections
+        "corrections": corrections,
+        "task_subject": quiz_result_subject(result.id)
     }
 
 @router.get("/{quiz_id}/results")
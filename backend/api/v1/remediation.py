@@ -15,6 +15,7 @@ from models.user import User
 
 # Import de la nouvelle banque d'exercices diversifiée
 from data.remediation_exercises import exercise_bank, get_exercises_for_remediation_plan
+from services.post_submission_tasks import enqueue_remediation_badges, remediation_subject
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
@@ -74,21 +75,22 @@ async def save_remediation_result(
         )
         
         db.add(remediation_result)
+        db.flush()
+        # Compteurs de badges: planifiés avec le résultat, attribués en tâche de fond
+        enqueue_remediation_badges(db, remediation_result)
         db.commit()
         db.refresh(remediation_result)
         
         # Mettre à jour le progrès
         await update_remediation_progress(db, result["student_id"], result["topic"])
         
-        # Vérifier et attribuer des badges
-        await check_and_award_badges(db, result["student_id"], result["topic"])
-        
         logger.info(f"✅ Résultat sauvegardé avec succès: ID {remediation_result.id}")
         
         return {
             "success": True,
             "message": "Résultat de remédiation sauvegardé",
             "result_id": remediation_result.id,
+            "task_subject": remediation_subject(remediation_result.id),
             "timestamp": datetime.utcnow().isoformat()
         }
         
@@ -575,85 +577,6 @@ async def update_remediation_progress(
         logger.error(f"❌ Erreur mise à jour progrès: {str(e)}")
         db.rollback()
 
-async def check_and_award_badges(
-    db: Session, 
-    student_id: int, 
-    topic: str
-):
-    """Vérifier et attribuer des badges basés sur les performances"""
-    try:
-        # Récupérer les statistiques du sujet
-        topic_results = db.query(RemediationResult).filter(
-            RemediationResult.student_id == student_id,
-            RemediationResult.topic == topic
-        ).all()
-        
-        if not topic_results:
-            return
-        
-        total_exercises = len(topic_results)
-        avg_percentage = sum(r.percentage for r in topic_results) / len(topic_results)
-        
-        # Badge "Débutant" - Premier exercice
-        if total_exercises == 1:
-            await award_badge_internal(db, student_id, "achievement", "Débutant", 
-                                    "Premier exercice de remédiation complété", 10)
-        
-        # Badge "Persévérant" - 5 exercices
-        if total_exercises == 5:
-            await award_badge_internal(db, student_id, "achievement", "Persévérant", 
-                                    "5 exercices de remédiation complétés", 25)
-        
-        # Badge "Expert" - 10 exercices avec >80% de réussite
-        if total_exercises >= 10 and avg_percentage >= 80:
-            await award_badge_internal(db, student_id, "expertise", "Expert", 
-                                    f"Expert en {topic} avec {round(avg_percentage, 1)}% de réussite", 50)
-        
-        # Badge "Amélioration" - Progrès significatif
-        if len(topic_results) >= 3:
-            recent_avg = sum(r.percentage for r in topic_results[-3:]) / 3
-            first_avg = sum(r.percentage for r in topic_results[:3]) / 3
-            if recent_avg > first_avg + 20:
-                await award_badge_internal(db, student_id, "improvement", "Amélioration", 
-                                        f"Amélioration significative en {topic}", 30)
-        
-    except Exception as e:
-        logger.error(f"❌ Erreur vérification badges: {str(e)}")
-
-async def award_badge_internal(
-    db: Session, 
-    student_id: int, 
-    badge_type: str, 
-    badge_name: str, 
-    description: str, 
-    points: int
-):
-    """Attribuer un badge en interne (sans endpoint public)"""
-    try:
-        # Vérifier si le badge existe déjà
-        existing = db.query(RemediationBadge).filter(
-            RemediationBadge.student_id == student_id,
-            RemediationBadge.badge_type == badge_type,
-            RemediationBadge.badge_name == badge_name
-        ).first()
-        
-        if not existing:
-            badge = RemediationBadge(
-                student_id=student_id,
-                badge_type=badge_type,
-                badge_name=badge_name,
-                description=description,
-                points=points,
-                earned_at=datetime.utcnow()
-            )
-            db.add(badge)
-            db.commit()
-            logger.info(f"🏆 Badge '{badge_name}' attribué à l'étudiant {student_id}")
-            
-    except Exception as e:
-        logger.error(f"❌ Erreur attribution badge interne: {str(e)}")
-        db.rollback()
-
 # ============================================================================
 # ENDPOINTS DE TEST ET DÉVELOPPEMENT
 # ============================================================================
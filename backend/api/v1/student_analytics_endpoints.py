@@ -6,6 +6,7 @@ from models.user import User
 from models.quiz import QuizResult, Quiz
 from models.learning_history import LearningHistory
 from models.badge import Badge, UserBadge
+from services.assessment_events import AssessmentEventLog
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 import json
@@ -47,96 +48,8 @@ async def get_student_performance_analytics(
             start_date = now - timedelta(days=180)
             months = 6
         
-        # Récupérer TOUS les types de résultats d'évaluation de la période
-        # 1. Résultats de quiz classiques
-        quiz_results = db.query(QuizResult).filter(
-            QuizResult.student_id == student_id,
-            QuizResult.created_at >= start_date,
-            QuizResult.is_completed == True
-        ).all()
-        
-        # 2. Tests adaptatifs (depuis TestAttempt)
-        from models.adaptive_evaluation import TestAttempt, QuestionResponse
-        adaptive_results = db.query(TestAttempt).filter(
-            TestAttempt.student_id == student_id,
-            TestAttempt.started_at >= start_date
-        ).all()
-        
-        # 3. Résultats de remédiation
-        from models.remediation import RemediationResult
-        remediation_results = db.query(RemediationResult).filter(
-            RemediationResult.student_id == student_id,
-            RemediationResult.completed_at >= start_date
-        ).all()
-        
-        # 4. Évaluations initiales
-        from models.assessment import Assessment, AssessmentResult
-        initial_assessments = db.query(AssessmentResult).join(Assessment).filter(
-            Assessment.student_id == student_id,
-            AssessmentResult.completed_at >= start_date
-        ).all()
-        
-        # Combiner tous les résultats
-        all_results = []
-        
-        # Ajouter les quiz classiques
-        for result in quiz_results:
-            all_results.append({
-                'type': 'quiz',
-                'score': result.score,
-                'max_score': result.max_score,
-                'date': result.created_at,
-                'subject': result.sujet or 'Général',
-                'title': f"Quiz {result.id}"
-            })
-        
-        # Ajouter les tests adaptatifs
-        for attempt in adaptive_results:
-            if attempt.completed_at:  # Seulement les tests terminés
-                # Calculer le score du test adaptatif
-                responses = db.query(QuestionResponse).filter(
-                    QuestionResponse.attempt_id == attempt.id
-                ).all()
-                
-                if responses:
-                    correct_answers = sum(1 for r in responses if r.is_correct)
-                    total_questions = len(responses)
-                    score_percentage = (correct_answers / total_questions * 100) if total_questions > 0 else 0
-                    
-                    all_results.append({
-                        'type': 'adaptive',
-                        'score': score_percentage,
-                        'max_score': 100,
-                        'date': attempt.completed_at,
-                        'subject': 'Test Adaptatif',
-                        'title': f"Test {attempt.id}"
-                    })
-        
-        # Ajouter les résultats de remédiation
-        for result in remediation_results:
-            all_results.append({
-                'type': 'remediation',
-                'score': result.score,
-                'max_score': result.max_score,
-                'date': result.completed_at,
-                'subject': result.topic or 'Remédiation',
-                'title': f"Remédiation {result.exercise_type}"
-            })
-        
-        # Ajouter les évaluations initiales
-        for result in initial_assessments:
-            if result.percentage is not None:
-                all_results.append({
-                    'type': 'initial_assessment',
-                    'score': result.percentage,
-                    'max_score': 100,
-                    'date': result.completed_at,
-                    'subject': 'Évaluation Initiale',
-                    'title': 'Évaluation Initiale'
-                })
-        
-        # Trier par date
-        all_results.sort(key=lambda x: x['date'])
+        # Tous les résultats d'évaluation de la période (journal unifié, trié par date)
+        all_results = AssessmentEventLog(db).student_events(student_id, since=start_date)
         
         if not all_results:
             # Retourner des données vides si aucun résultat
@@ -148,10 +61,10 @@ async def get_student_performance_analytics(
         # Grouper les résultats par mois
         monthly_data = {}
         for result in all_results:
-            month_key = result['date'].strftime("%Y-%m")
+            month_key = result.occurred_at.strftime("%Y-%m")
             if month_key not in monthly_data:
                 monthly_data[month_key] = []
-            monthly_data[month_key].append(result['score'])
+            monthly_data[month_key].append(result.score)
         
         # Créer les labels et données pour le graphique
         labels = []
@@ -199,87 +112,8 @@ async def get_student_progress_analytics(
         if not student:
             raise HTTPException(status_code=404, detail="Étudiant non trouvé")
         
-        # Récupérer TOUS les types de résultats d'évaluation
-        all_results = []
-        
-        # 1. Résultats de quiz classiques
-        quiz_results = db.query(QuizResult).filter(
-            QuizResult.student_id == student_id,
-            QuizResult.is_completed == True
-        ).all()
-        
-        for result in quiz_results:
-            all_results.append({
-                'type': 'quiz',
-                'score': result.score,
-                'max_score': result.max_score,
-                'date': result.created_at,
-                'subject': result.sujet or 'Général',
-                'title': f"Quiz {result.id}"
-            })
-        
-        # 2. Tests adaptatifs
-        from models.adaptive_evaluation import TestAttempt, QuestionResponse
-        adaptive_results = db.query(TestAttempt).filter(
-            TestAttempt.student_id == student_id
-        ).all()
-        
-        for attempt in adaptive_results:
-            if attempt.completed_at:
-                responses = db.query(QuestionResponse).filter(
-                    QuestionResponse.attempt_id == attempt.id
-                ).all()
-                
-                if responses:
-                    correct_answers = sum(1 for r in responses if r.is_correct)
-                    total_questions = len(responses)
-                    score_percentage = (correct_answers / total_questions * 100) if total_questions > 0 else 0
-                    
-                    all_results.append({
-                        'type': 'adaptive',
-                        'score': score_percentage,
-                        'max_score': 100,
-                        'date': attempt.completed_at,
-                        'subject': 'Test Adaptatif',
-                        'title': f"Test {attempt.id}"
-                    })
-        
-        # 3. Résultats de remédiation
-        from models.remediation import RemediationResult
-        remediation_results = db.query(RemediationResult).filter(
-            RemediationResult.student_id == student_id
-        ).all()
-        
-        for result in remediation_results:
-            all_results.append({
-                'type': 'remediation',
-                'score': result.score,
-                'max_score': result.max_score,
-                'date': result.completed_at,
-                'subject': result.topic or 'Remédiation',
-                'title': f"Remédiation {result.exercise_type}"
-            })
-        
-        # 4. Évaluations initiales
-        from models.assessment import Assessment, AssessmentResult
-        initial_assessments = db.query(AssessmentResult).join(Assessment).filter(
-            Assessment.student_id == student_id
-        ).all()
-        
-        for result in initial_assessments:
-            if result.percentage is not None:
-                all_results.append({
-                    'type': 'initial_assessment',
-                    'score': result.percentage,
-                    'max_score': 100,
-                    'title': 'Évaluation Initiale',
-                    'date': result.completed_at
-                })
-        
-        # Trier par date et limiter (gérer les dates None)
-        all_results = [r for r in all_results if r['date'] is not None]  # Filtrer les résultats sans date
-        all_results.sort(key=lambda x: x['date'], reverse=True)
-        all_results = all_results[:limit]
+        # Derniers résultats d'évaluation (journal unifié)
+        all_results = AssessmentEventLog(db).student_events(student_id, limit=limit, newest_first=True)
         
         if not all_results:
             return {
@@ -294,7 +128,7 @@ async def get_student_progress_analytics(
         # Inverser l'ordre pour avoir la progression chronologique
         for result in reversed(all_results):
             # Label court avec type d'évaluation
-            title = result['title']
+            title = result.title
             if len(title) > 15:
                 title = title[:15] + "..."
             
@@ -304,13 +138,12 @@ async def get_student_progress_analytics(
                 'adaptive': '🧠',
                 'remediation': '🔧',
                 'initial_assessment': '🎯'
-            }.get(result['type'], '📊')
+            }.get(result.source, '📊')
             
             labels.append(f"{type_icon} {title}")
             
             # Score en pourcentage
-            score_percentage = (result['score'] / result['max_score'] * 100) if result['max_score'] > 0 else 0
-            data.append(round(score_percentage, 1))
+            data.append(round(result.normalized_score, 1))
         
         return {
             "labels": labels,
@@ -337,97 +170,15 @@ async def get_student_subjects_analytics(
         if not student:
             raise HTTPException(status_code=404, detail="Étudiant non trouvé")
         
-        # Récupérer TOUS les types de résultats d'évaluation
-        all_results = []
-        
-        # 1. Résultats de quiz classiques
-        quiz_results = db.query(QuizResult).filter(
-            QuizResult.student_id == student_id,
-            QuizResult.is_completed == True
-        ).all()
-        
-        for result in quiz_results:
-            all_results.append({
-                'type': 'quiz',
-                'score': result.score,
-                'max_score': result.max_score,
-                'subject': result.sujet or 'Général'
-            })
-        
-        # 2. Tests adaptatifs
-        from models.adaptive_evaluation import TestAttempt, QuestionResponse
-        adaptive_results = db.query(TestAttempt).filter(
-            TestAttempt.student_id == student_id
-        ).all()
-        
-        for attempt in adaptive_results:
-            if attempt.completed_at:
-                responses = db.query(QuestionResponse).filter(
-                    QuestionResponse.attempt_id == attempt.id
-                ).all()
-                
-                if responses:
-                    correct_answers = sum(1 for r in responses if r.is_correct)
-                    total_questions = len(responses)
-                    score_percentage = (correct_answers / total_questions * 100) if total_questions > 0 else 0
-                    
-                    all_results.append({
-                        'type': 'adaptive',
-                        'score': score_percentage,
-                        'max_score': 100,
-                        'subject': 'Test Adaptatif'
-                    })
-        
-        # 3. Résultats de remédiation
-        from models.remediation import RemediationResult
-        remediation_results = db.query(RemediationResult).filter(
-            RemediationResult.student_id == student_id
-        ).all()
-        
-        for result in remediation_results:
-            all_results.append({
-                'type': 'remediation',
-                'score': result.score,
-                'max_score': result.max_score,
-                'subject': result.topic or 'Remédiation'
-            })
-        
-        # 4. Évaluations initiales
-        from models.assessment import Assessment, AssessmentResult
-        initial_assessments = db.query(AssessmentResult).join(Assessment).filter(
-            Assessment.student_id == student_id
-        ).all()
-        
-        for result in initial_assessments:
-            if result.percentage is not None:
-                all_results.append({
-                    'type': 'initial_assessment',
-                    'score': result.percentage,
-                    'max_score': 100,
-                    'subject': 'Évaluation Initiale'
-                })
-        
-        if not all_results:
+        # Totaux par matière (journal unifié, agrégés en base)
+        subject_totals = AssessmentEventLog(db).subject_totals(student_id)
+        if not subject_totals:
             return []
         
-        # Grouper par matière et calculer les statistiques
-        subject_stats = {}
-        for result in all_results:
-            subject = result['subject']
-            if subject not in subject_stats:
-                subject_stats[subject] = {
-                    "total_score": 0,
-                    "max_score": 0,
-                    "count": 0
-                }
-            
-            subject_stats[subject]["total_score"] += result['score']
-            subject_stats[subject]["max_score"] += result['max_score']
-            subject_stats[subject]["count"] += 1
-        
         # Calculer la progression par matière
         subjects_data = []
-        for subject, stats in subject_stats.items():
+        for stats in subject_totals:
+            subject = stats["subject"]
             if stats["max_score"] > 0:
                 progress_percentage = (stats["total_score"] / stats["max_score"]) * 100
                 subjects_data.append({
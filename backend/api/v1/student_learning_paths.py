@@ -14,6 +14,7 @@ from models.user import User
 from models.learning_path import LearningPath
 from models.learning_path_step import LearningPathStep
 from models.student_learning_path import StudentLearningPath
+from services.path_templates import PathMaterializer
 from schemas.learning_path import (
     LearningPathStart, LearningPathStepComplete, LearningPathProgress
 )
@@ -148,10 +149,8 @@ def get_learning_path_steps(
             detail="Parcours non trouvé ou non suivi"
         )
     
-    # Récupérer les étapes
-    steps = db.query(LearningPathStep).filter(
-        LearningPathStep.learning_path_id == learning_path_id
-    ).order_by(LearningPathStep.step_number).all()
+    # Étapes du parcours partagé, avec les écarts propres à l'élève
+    steps = PathMaterializer(db).student_steps(student_path)
     
     return {
         "learning_path": {
@@ -162,14 +161,14 @@ def get_learning_path_steps(
         },
         "steps": [
             {
-                "id": step.id,
-                "step_number": step.step_number,
-                "title": step.title,
-                "description": step.description,
-                "content_type": step.content_type,
-                "estimated_duration": step.estimated_duration,
-                "is_required": step.is_required,
-                "is_active": step.is_active
+                "id": step["id"],
+                "step_number": step["step_number"],
+                "title": step["title"],
+                "description": step["description"],
+                "content_type": step["content_type"],
+                "estimated_duration": step["estimated_duration"],
+                "is_required": step["is_required"],
+                "is_active": step["is_active"]
             }
             for step in steps
         ]
@@ -1,8 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, and_
-from core.database import get_db
-from models.user import User
+from sqlalchemy import func, desc, and_, select
+from core.config import settings
+from core.database import get_db, SessionLocal
+from core.security import decode_access_token
+from models.user import User, UserRole
 from models.advanced_learning import (
     LearningPathStep, StudentProgress, ClassAnalytics, 
     StudentAnalytics, RealTimeActivity
@@ -10,6 +14,7 @@ from models.advanced_learning import (
 from models.learning_path import LearningPath
 from models.class_group import ClassGroup
 from models.class_group import ClassStudent
+from services.roster import class_student_ids, class_teacher_id, student_class_ids
 from models.quiz import QuizResult, Quiz
 from schemas.advanced_learning import (
     LearningPathStepCreate, LearningPathStepRead,
@@ -49,15 +54,11 @@ def get_teacher_classes(
     
     result = []
     for class_group in classes:
-        # Compter les étudiants
-        student_count = db.query(ClassStudent).filter(
-            ClassStudent.class_id == class_group.id
-        ).count()
+        # Étudiants de la classe (annuaire en mémoire)
+        student_ids = list(class_student_ids(db, class_group.id))
+        student_count = len(student_ids)
         
         # Calculer la progression moyenne
-        student_ids = [cs.student_id for cs in db.query(ClassStudent).filter(
-            ClassStudent.class_id == class_group.id
-        ).all()]
         
         if student_ids:
             avg_progress = db.query(func.avg(StudentProgress.progress_percentage)).filter(
@@ -127,9 +128,7 @@ def update_advanced_class(
     db.refresh(class_group)
     
     # Compter les étudiants
-    student_count = db.query(ClassStudent).filter(
-        ClassStudent.class_id == class_group.id
-    ).count()
+    student_count = len(class_student_ids(db, class_group.id))
     
     return ClassGroupReadAdvanced(
         **class_group.__dict__,
@@ -309,15 +308,11 @@ def get_class_analytics(
     if not class_group:
         raise HTTPException(status_code=404, detail="Classe non trouvée")
     
-    # Récupérer les étudiants de la classe
-    students = db.query(ClassStudent).filter(
-        ClassStudent.class_id == class_id
-    ).all()
-    
-    student_ids = [s.student_id for s in students]
+    # Récupérer les étudiants de la classe (annuaire en mémoire)
+    student_ids = sorted(class_student_ids(db, class_id))
     
     # Calculer les analytics
-    total_students = len(students)
+    total_students = len(student_ids)
     active_students = db.query(StudentProgress).filter(
         StudentProgress.student_id.in_(student_ids),
         StudentProgress.is_active == True,
@@ -650,16 +645,12 @@ def get_learning_path_steps(
 # SUIVI TEMPS RÉEL
 # ============================================================================
 
-@router.get("/realtime/dashboard", response_model=RealTimeDashboard)
-def get_realtime_dashboard(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(['teacher', 'admin']))
-):
-    """Obtenir le dashboard temps réel pour l'enseignant"""
-    # Récupérer les classes de l'enseignant
-    class_ids = [c.id for c in db.query(ClassGroup).filter(
-        ClassGroup.teacher_id == current_user.id
-    ).all()]
+# Seuil de progression (%) sous lequel un étudiant déclenche une alerte
+STRUGGLING_PROGRESS_THRESHOLD = 30
+
+def _realtime_snapshot(db: Session, teacher_id: int) -> Dict[str, Any]:
+    """Données du dashboard temps réel en un nombre fixe de requêtes (quelle que soit la taille des classes)"""
+    teacher_class_ids = select(ClassGroup.id).where(ClassGroup.teacher_id == teacher_id)
     
     # Étudiants actifs (activité dans les dernières 24h)
     active_students = db.query(StudentProgress).filter(
@@ -672,42 +663,55 @@ def get_realtime_dashboard(
         RealTimeActivity.timestamp >= datetime.utcnow() - timedelta(hours=2)
     ).order_by(RealTimeActivity.timestamp.desc()).limit(20).all()
     
-    # Performances des classes
-    class_performances = []
-    for class_id in class_ids:
-        analytics = db.query(ClassAnalytics).filter(
-            ClassAnalytics.class_id == class_id
-        ).order_by(ClassAnalytics.date.desc()).first()
-        
-        if analytics:
-            class_performances.append(analytics)
+    # Performances des classes: dernière ligne d'analytics par classe (fonction de fenêtre)
+    ranked_analytics = db.query(
+        ClassAnalytics.id.label("id"),
+        func.row_number().over(
+            partition_by=ClassAnalytics.class_id,
+            order_by=ClassAnalytics.date.desc()
+        ).label("rank")
+    ).filter(ClassAnalytics.class_id.in_(teacher_class_ids)).subquery()
+    class_performances = db.query(ClassAnalytics).join(
+        ranked_analytics, ranked_analytics.c.id == ClassAnalytics.id
+    ).filter(ranked_analytics.c.rank == 1).order_by(ClassAnalytics.class_id).all()
+    
+    # Alertes: étudiants des classes sous le seuil (première progression de chaque étudiant)
+    first_progress = db.query(
+        StudentProgress.student_id.label("student_id"),
+        func.min(StudentProgress.id).label("progress_id")
+    ).group_by(StudentProgress.student_id).subquery()
+    struggling = db.query(ClassStudent.class_id, ClassStudent.student_id).join(
+        first_progress, first_progress.c.student_id == ClassStudent.student_id
+    ).join(
+        StudentProgress, StudentProgress.id == first_progress.c.progress_id
+    ).filter(
+        ClassStudent.class_id.in_(teacher_class_ids),
+        StudentProgress.progress_percentage < STRUGGLING_PROGRESS_THRESHOLD
+    ).order_by(ClassStudent.class_id, ClassStudent.id).all()
+    alerts = [
+        {
+            "type": "warning",
+            "message": f"Étudiant en difficulté dans la classe {class_id}",
+            "student_id": student_id
+        }
+        for class_id, student_id in struggling
+    ]
     
-    # Alertes (étudiants en difficulté)
-    alerts = []
-    for class_id in class_ids:
-        students = db.query(ClassStudent).filter(
-            ClassStudent.class_id == class_id
-        ).all()
-        
-        for student in students:
-            progress = db.query(StudentProgress).filter(
-                StudentProgress.student_id == student.student_id
-            ).first()
-            
-            if progress and progress.progress_percentage < 30:
-                alerts.append({
-                    "type": "warning",
-                    "message": f"Étudiant en difficulté dans la classe {class_id}",
-                    "student_id": student.student_id
-                })
-    
-    return RealTimeDashboard(
-        active_students=active_students,
-        current_activities=recent_activities,
-        class_performances=class_performances,
-        alerts=alerts,
-        notifications=[]
-    )
+    return {
+        "active_students": active_students,
+        "current_activities": recent_activities,
+        "class_performances": class_performances,
+        "alerts": alerts,
+        "notifications": []
+    }
+
+@router.get("/realtime/dashboard", response_model=RealTimeDashboard)
+def get_realtime_dashboard(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(['teacher', 'admin']))
+):
+    """Obtenir le dashboard temps réel pour l'enseignant"""
+    return RealTimeDashboard(**_realtime_snapshot(db, current_user.id))
 
 # ============================================================================
 # RAPPORTS AVANCÉS
@@ -721,13 +725,13 @@ def get_student_report(
 ):
     """Générer un rapport détaillé pour un étudiant"""
     # Vérifier que l'étudiant appartient à une classe de l'enseignant
-    student_class = db.query(ClassStudent).join(ClassGroup).filter(
-        ClassStudent.student_id == student_id,
-        ClassGroup.teacher_id == current_user.id
-    ).first()
-    
-    if not student_class:
+    class_id = next((
+        class_id for class_id in student_class_ids(db, student_id)
+        if class_teacher_id(db, class_id) == current_user.id
+    ), None)
+    if class_id is None:
         raise HTTPException(status_code=404, detail="Étudiant non trouvé")
+    student_class = db.query(ClassGroup).filter(ClassGroup.id == class_id).first()
     
     # Récupérer les données de l'étudiant
     student = db.query(User).filter(User.id == student_id).first()
@@ -765,7 +769,7 @@ def get_student_report(
     return StudentReport(
         student_id=student_id,
         student_name=student.username,
-        class_name=student_class.class_group.name,
+        class_name=student_class.name,
         progress_percentage=progress.progress_percentage if progress else 0,
         average_score=avg_score,
         total_quizzes=total_quizzes,
@@ -792,13 +796,9 @@ def get_class_report(
         raise HTTPException(status_code=404, detail="Classe non trouvée")
     
     # Récupérer les étudiants
-    students = db.query(ClassStudent).filter(
-        ClassStudent.class_id == class_id
-    ).all()
-    
     student_reports = []
-    for student in students:
-        report = get_student_report(student.student_id, db, current_user)
+    for student_id in sorted(class_student_ids(db, class_id)):
+        report = get_student_report(student_id, db, current_user)
         student_reports.append(report)
     
     # Calculer les moyennes
@@ -824,7 +824,7 @@ def get_class_report(
         class_id=class_id,
         class_name=class_group.name,
         teacher_name=current_user.username,
-        total_students=len(students),
+        total_students=len(student_reports),
         average_progress=avg_progress,
         average_score=avg_score,
         top_performers=top_performers,
@@ -928,12 +928,8 @@ def get_performance_overview(
     
     for class_group in classes:
         # Compter les étudiants
-        students = db.query(ClassStudent).filter(
-            ClassStudent.class_id == class_group.id
-        ).all()
-        
-        student_ids = [s.student_id for s in students]
-        class_student_count = len(students)
+        student_ids = sorted(class_student_ids(db, class_group.id))
+        class_student_count = len(student_ids)
         total_students += class_student_count
         
         if student_ids:
@@ -1007,12 +1003,8 @@ def get_class_performance_trends(
     if not class_group:
         raise HTTPException(status_code=404, detail="Classe non trouvée")
     
-    # Récupérer les étudiants de la classe
-    students = db.query(ClassStudent).filter(
-        ClassStudent.class_id == class_id
-    ).all()
-    
-    student_ids = [s.student_id for s in students]
+    # Récupérer les étudiants de la classe (annuaire en mémoire)
+    student_ids = sorted(class_student_ids(db, class_id))
     
     # Générer les dates pour la période
     end_date = datetime.utcnow()
@@ -1143,16 +1135,74 @@ class ConnectionManager:
 
 manager = ConnectionManager()
 
+def _dashboard_state(db: Session, teacher_id: int) -> Dict[str, Any]:
+    """Dashboard sérialisé (JSON) et indexé par élément pour calculer les deltas"""
+    dashboard = jsonable_encoder(RealTimeDashboard(**_realtime_snapshot(db, teacher_id)))
+    return {
+        "dashboard": dashboard,
+        "active_students": dashboard["active_students"],
+        "current_activities": {activity["id"]: activity for activity in dashboard["current_activities"]},
+        "class_performances": {perf["class_id"]: perf for perf in dashboard["class_performances"]},
+        "alerts": {f"{alert['message']}:{alert['student_id']}": alert for alert in dashboard["alerts"]},
+    }
+
+def _dashboard_delta(previous: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """Changements entre deux états: éléments ajoutés/modifiés et clés retirées"""
+    delta = {}
+    if current["active_students"] != previous["active_students"]:
+        delta["active_students"] = current["active_students"]
+    for section in ("current_activities", "class_performances", "alerts"):
+        upserted = [item for key, item in current[section].items() if previous[section].get(key) != item]
+        removed = [key for key in previous[section] if key not in current[section]]
+        if upserted or removed:
+            delta[section] = {"upserted": upserted, "removed": removed}
+    return delta
+
+def _load_dashboard_state(teacher_id: int) -> Dict[str, Any]:
+    db = SessionLocal()
+    try:
+        return _dashboard_state(db, teacher_id)
+    finally:
+        db.close()
+
+def _authorized_teacher(token: str, teacher_id: int) -> bool:
+    payload = decode_access_token(token) if token else None
+    if not payload or not payload.get("sub"):
+        return False
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.email == payload["sub"]).first()
+        if user is None:
+            return False
+        return user.role == UserRole.admin or (user.role == UserRole.teacher and user.id == teacher_id)
+    finally:
+        db.close()
+
 @router.websocket("/ws/teacher/{teacher_id}")
 async def websocket_endpoint(websocket: WebSocket, teacher_id: int):
+    """Flux du dashboard temps réel: instantané complet à la connexion, puis uniquement
+    les changements (une passe de requêtes groupées par intervalle, pas de re-polling client)"""
+    if not await run_in_threadpool(_authorized_teacher, websocket.query_params.get("token"), teacher_id):
+        await websocket.close(code=1008)
+        return
+    
     await manager.connect(websocket)
+    previous = None
     try:
         while True:
-            # Envoyer les mises à jour temps réel
-            await asyncio.sleep(5)  # Mise à jour toutes les 5 secondes
-            
-            # Ici on pourrait envoyer des données temps réel
-            # comme les activités des étudiants, les alertes, etc.
+            state = await run_in_threadpool(_load_dashboard_state, teacher_id)
+            if previous is None:
+                await websocket.send_json({"type": "snapshot", "data": state["dashboard"]})
+            else:
+                delta = _dashboard_delta(previous, state)
+                if delta:
+                    await websocket.send_json({"type": "delta", "data": delta})
+            previous = state
             
+            # Attendre l'intervalle suivant (un message du client force un rafraîchissement)
+            try:
+                await asyncio.wait_for(websocket.receive_text(), timeout=settings.TEACHER_REALTIME_PUSH_SECONDS)
+            except asyncio.TimeoutError:
+                pass
     except WebSocketDisconnect:
-        manager.disconnect(websocket) 
\ No newline at end of file
+        manager.disconnect(websocket)
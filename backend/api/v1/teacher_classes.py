@@ -5,6 +5,7 @@ from core.database import get_db
 from models.class_group import ClassGroup, ClassStudent
 from models.user import User, UserRole
 from api.v1.auth import get_current_user, require_role
+from services.roster import class_student_ids, teacher_class_ids
 from schemas.class_group import ClassGroupCreate, ClassGroupRead
 from typing import List, Dict, Any
 from datetime import datetime
@@ -24,15 +25,9 @@ def get_teacher_classes(
         
         result = []
         for class_group in classes:
-            # Compter les étudiants
-            student_count = db.query(ClassStudent).filter(
-                ClassStudent.class_id == class_group.id
-            ).count()
-            
-            # Calculer la progression moyenne
-            student_ids = [cs.student_id for cs in db.query(ClassStudent).filter(
-                ClassStudent.class_id == class_group.id
-            ).all()]
+            # Étudiants de la classe (annuaire en mémoire)
+            student_ids = list(class_student_ids(db, class_group.id))
+            student_count = len(student_ids)
             
             # Récupérer la dernière activité
             last_activity = None
@@ -136,9 +131,7 @@ def update_teacher_class(
         db.refresh(db_class)
         
         # Compter les étudiants
-        student_count = db.query(ClassStudent).filter(
-            ClassStudent.class_id == class_id
-        ).count()
+        student_count = len(class_student_ids(db, class_id))
         
         return {
             "id": db_class.id,
@@ -363,37 +356,29 @@ def get_all_teacher_students(
 ):
     """Récupérer tous les étudiants de toutes les classes d'un professeur"""
     try:
-        # Récupérer toutes les classes du professeur
-        teacher_classes = db.query(ClassGroup).filter(
-            ClassGroup.teacher_id == current_user.id
-        ).all()
-        
-        if not teacher_classes:
+        # Étudiants de toutes les classes du professeur (annuaire en mémoire), sans doublons
+        student_ids = list(dict.fromkeys(
+            student_id
+            for class_id in teacher_class_ids(db, current_user.id)
+            for student_id in sorted(class_student_ids(db, class_id))
+        ))
+        if not student_ids:
             return []
         
-        # Récupérer tous les étudiants de toutes ces classes
-        all_students = set()  # Pour éviter les doublons
-        result = []
-        
-        for class_group in teacher_classes:
-            students_data = db.query(ClassStudent, User).join(User).filter(
-                ClassStudent.class_id == class_group.id
-            ).all()
-            
-            for assignment, student in students_data:
-                if student.id not in all_students:
-                    all_students.add(student.id)
-                    
-                    result.append({
-                        "id": student.id,
-                        "first_name": student.first_name or "",
-                        "last_name": student.last_name or "",
-                        "email": student.email,
-                        "username": student.username,
-                        "role": "student",
-                        "progress": 0,  # Valeur par défaut
-                        "last_activity": "Aucune activité"  # Valeur par défaut
-                    })
+        students = {student.id: student for student in db.query(User).filter(User.id.in_(student_ids))}
+        result = [
+            {
+                "id": student.id,
+                "first_name": student.first_name or "",
+                "last_name": student.last_name or "",
+                "email": student.email,
+                "username": student.username,
+                "role": "student",
+                "progress": 0,  # Valeur par défaut
+                "last_activity": "Aucune activité"  # Valeur par défaut
+            }
+            for student in (students.get(student_id) for student_id in student_ids) if student
+        ]
         
         return result
         
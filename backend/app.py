@@ -56,6 +56,7 @@ from api.v1 import homework, collaboration
 from api.v1 import activity
 from api.v1 import students
 from api.v1 import files
+from api.v1 import background_tasks
 
 # Nouveaux routers français
 from api.v1 import french_initial_assessment, french_learning_paths, french_recommendations
@@ -198,6 +199,7 @@ fastapi_app.include_router(organization_advanced.router, prefix="/api/v1/organiz
 fastapi_app.include_router(homework.router, prefix="/api/v1/homework", tags=["homework"])
 fastapi_app.include_router(collaboration.router, prefix="/api/v1/collaboration", tags=["collaboration"])
 fastapi_app.include_router(activity.router, prefix="/api/v1/activity", tags=["activity"])
+fastapi_app.include_router(background_tasks.router, prefix="/api/v1/background-tasks", tags=["background_tasks"])
 
 # Nouveaux routers pour les services de test (sans authentification)
 from api.v1 import quiz_assignments as quiz_assignments_test
@@ -249,6 +251,60 @@ def read_root():
 def health_check():
     return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
 
+@fastapi_app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Mesures du processus au format texte Prometheus"""
+    from core.config import settings as app_settings
+    from core.metrics import metrics_registry
+    if not app_settings.METRICS_ENABLED:
+        return Response(content=json.dumps({"detail": "Endpoint non trouvé"}), status_code=404, media_type="application/json")
+    return Response(content=metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+@fastapi_app.get("/metrics/profiles/{profile_id}", include_in_schema=False)
+def request_profile(profile_id: str):
+    """Profil échantillonné d'une requête (piles repliées, format flamegraph)"""
+    from core.metrics import get_profile
+    profile = get_profile(profile_id)
+    if profile is None:
+        return Response(content=json.dumps({"detail": "Profil introuvable"}), status_code=404, media_type="application/json")
+    return Response(content=profile, media_type="text/plain")
+
+@fastapi_app.on_event("startup")
+def start_deadline_scheduler():
+    """Charger les échéances en attente et démarrer leur déclenchement"""
+    from core.config import settings as app_settings
+    if not app_settings.DEADLINE_SCHEDULER_ENABLED:
+        return
+    from services.deadline_scheduler import deadline_scheduler
+    try:
+        deadline_scheduler.start()
+    except Exception as e:
+        print(f"❌ Planificateur d'échéances non démarré: {e}")
+
+@fastapi_app.on_event("startup")
+def start_task_workers():
+    """Démarrer les workers de la file de tâches (traitements après soumission)"""
+    from core.config import settings as app_settings
+    from services.task_queue import task_queue
+    try:
+        task_queue.start(app_settings.TASK_QUEUE_WORKERS)
+    except Exception as e:
+        print(f"❌ File de tâches non démarrée: {e}")
+
+@fastapi_app.on_event("shutdown")
+def flush_write_behind_queues():
+    """Persister les écritures différées encore en mémoire avant l'arrêt"""
+    from services.french_test_session_store import french_answer_queue
+    from services.deadline_scheduler import deadline_scheduler
+    from services.task_queue import task_queue
+    from services.counter_buffer import counter_buffer
+    from services.item_statistics import item_statistics
+    french_answer_queue.flush()
+    counter_buffer.flush()
+    item_statistics.flush()
+    deadline_scheduler.stop()
+    task_queue.stop()
+
 # --- GESTION DES ERREURS ---
 
 @fastapi_app.exception_handler(404)
@@ -271,12 +327,9 @@ async def internal_error_handler(request, exc):
 
 @fastapi_app.middleware("http")
 async def add_process_time_header(request, call_next):
-    import time
-    start_time = time.time()
-    response = await call_next(request)
-    process_time = time.time() - start_time
-    response.headers["X-Process-Time"] = str(process_time)
-    return response
+    """Latence, requêtes SQL et profil échantillonné de chaque requête (voir core/metrics.py)"""
+    from core.metrics import instrument_request
+    return await instrument_request(request, call_next)
 
 # Variable pour uvicorn
 app = fastapi_app 
\ No newline at end of file
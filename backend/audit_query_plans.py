@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Audit des plans d'exécution des requêtes chaudes (SQLite)
+Exécute EXPLAIN QUERY PLAN sur les requêtes des endpoints les plus sollicités
+et échoue (code de sortie 1) dès qu'une table est parcourue intégralement.
+
+Usage:
+    python audit_query_plans.py                      # schéma des modèles, base en mémoire
+    python audit_query_plans.py --database sqlite:///./najah_ai.db
+"""
+
+import argparse
+import sys
+from datetime import datetime
+
+from sqlalchemy import create_engine, desc
+from sqlalchemy.orm import sessionmaker
+
+import models  # noqa: F401  (enregistre les mappers)
+from models.quiz import QuizResult, QuizAnswer, QuizAssignment
+from models.learning_history import LearningHistory
+from models.user_activity import UserActivity
+from models.badge import UserBadge
+from models.class_group import ClassGroup, ClassStudent
+from models.remediation import RemediationResult, RemediationBadge, RemediationProgress
+from models.gamification import StudentBadgeCounter
+from models.analytics_cube import AnalyticsCube, AnalyticsStudentDay
+from models.adaptive_evaluation import AdaptiveTest, TestAssignment
+
+SINCE = datetime(2025, 1, 1)
+
+AUDITED_MODELS = [
+    QuizResult, QuizAnswer, QuizAssignment, LearningHistory, UserActivity, UserBadge,
+    ClassGroup, ClassStudent, RemediationResult, RemediationBadge, RemediationProgress,
+    StudentBadgeCounter, AnalyticsCube, AnalyticsStudentDay,
+    AdaptiveTest, TestAssignment,
+]
+
+# (endpoint, description, fabrique de requête) - une entrée par requête chaude
+HOT_QUERIES = [
+    ("quizzes.submit_quiz", "résultat existant (élève, quiz)",
+     lambda db: db.query(QuizResult).filter(QuizResult.quiz_id == 1, QuizResult.student_id == 1)),
+    ("quizzes.get_quiz_results", "résultats d'un quiz",
+     lambda db: db.query(QuizResult).filter(QuizResult.quiz_id == 1)),
+    ("analytics.student", "historique des résultats d'un élève",
+     lambda db: db.query(QuizResult).filter(
+         QuizResult.student_id == 1, QuizResult.completed_at >= SINCE
+     ).order_by(desc(QuizResult.completed_at))),
+    ("quizzes.get_quiz_result_detail", "réponses d'un résultat",
+     lambda db: db.query(QuizAnswer).filter(QuizAnswer.result_id == 1)),
+    ("quizzes.get_assigned_quizzes", "assignations d'un élève",
+     lambda db: db.query(QuizAssignment).filter(QuizAssignment.student_id == 1)),
+    ("quizzes.get_assigned_quizzes", "assignations d'une classe",
+     lambda db: db.query(QuizAssignment).filter(QuizAssignment.class_id == 1)),
+    ("notifications.get_quiz_notifications", "assignations d'un enseignant",
+     lambda db: db.query(QuizAssignment).filter(QuizAssignment.assigned_by == 1)),
+    ("activity.get_recent_activity", "historique d'apprentissage récent",
+     lambda db: db.query(LearningHistory).filter(
+         LearningHistory.student_id == 1, LearningHistory.timestamp >= SINCE
+     ).order_by(desc(LearningHistory.timestamp)).limit(10)),
+    ("activity.user_activity", "activité d'un utilisateur",
+     lambda db: db.query(UserActivity).filter(
+         UserActivity.user_id == 1, UserActivity.timestamp >= SINCE
+     )),
+    ("badges.get_user_badges", "badges d'un utilisateur",
+     lambda db: db.query(UserBadge).filter(UserBadge.user_id == 1)),
+    ("teacher_classes.list", "classes d'un enseignant",
+     lambda db: db.query(ClassGroup).filter(ClassGroup.teacher_id == 1)),
+    ("class_groups.students", "élèves d'une classe",
+     lambda db: db.query(ClassStudent).filter(ClassStudent.class_id == 1)),
+    ("class_groups.membership", "appartenance élève/classe",
+     lambda db: db.query(ClassStudent).filter(ClassStudent.class_id == 1, ClassStudent.student_id == 1)),
+    ("students.classes", "classes d'un élève",
+     lambda db: db.query(ClassStudent).filter(ClassStudent.student_id == 1)),
+    ("remediation.update_remediation_progress", "derniers résultats par sujet",
+     lambda db: db.query(RemediationResult).filter(
+         RemediationResult.student_id == 1, RemediationResult.topic == "fractions"
+     ).order_by(RemediationResult.completed_at.desc()).limit(10)),
+    ("remediation.get_remediation_results", "résultats de remédiation d'un élève",
+     lambda db: db.query(RemediationResult).filter(
+         RemediationResult.student_id == 1
+     ).order_by(RemediationResult.completed_at.desc())),
+    ("remediation.get_student_badges", "badges de remédiation",
+     lambda db: db.query(RemediationBadge).filter(RemediationBadge.student_id == 1)),
+    ("remediation.update_remediation_progress", "progrès par sujet",
+     lambda db: db.query(RemediationProgress).filter(
+         RemediationProgress.student_id == 1, RemediationProgress.topic == "fractions"
+     )),
+    ("gamification.achievements", "compteurs de badges",
+     lambda db: db.query(StudentBadgeCounter).filter(StudentBadgeCounter.student_id == 1)),
+    ("analytics.class_overview", "cube des quiz sur une période",
+     lambda db: db.query(AnalyticsCube).filter(
+         AnalyticsCube.source == "quiz", AnalyticsCube.day >= SINCE.date()
+     )),
+    ("analytics.skills_by_subject", "cube par enseignant et matière",
+     lambda db: db.query(AnalyticsCube).filter(
+         AnalyticsCube.source == "adaptive", AnalyticsCube.teacher_id == 1
+     )),
+    ("analytics.class_overview", "élèves actifs sur une période",
+     lambda db: db.query(AnalyticsStudentDay).filter(
+         AnalyticsStudentDay.source == "quiz", AnalyticsStudentDay.day >= SINCE.date()
+     )),
+    ("adaptive_evaluation.test_access", "assignations directes d'un élève",
+     lambda db: db.query(TestAssignment).filter(
+         TestAssignment.assignment_type == "student", TestAssignment.target_id == 1,
+         TestAssignment.status == "active"
+     )),
+    ("adaptive_evaluation.test_access", "tests créés par un élève",
+     lambda db: db.query(AdaptiveTest).filter(AdaptiveTest.created_by == 1)),
+]
+
+
+def explain(db, query):
+    """Retourner les lignes 'detail' de EXPLAIN QUERY PLAN pour une requête ORM"""
+    connection = db.connection()
+    compiled = query.statement.compile(dialect=connection.dialect)
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    rows = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + compiled.string, params).fetchall()
+    return [row[-1] for row in rows]
+
+
+def is_full_scan(detail: str) -> bool:
+    """'SCAN <table>' sans index = parcours complet ('SEARCH' ou 'USING ... INDEX' sont acceptés)"""
+    return detail.startswith("SCAN") and "INDEX" not in detail.upper()
+
+
+def audit_query_plans(database_url=None, verbose=False):
+    if database_url is None:
+        # Schéma déclaré par les modèles (tables auditées uniquement, sans contraintes FK)
+        engine = create_engine("sqlite://")
+        for model in AUDITED_MODELS:
+            model.__table__.create(bind=engine)
+    else:
+        engine = create_engine(database_url)
+    if engine.dialect.name != "sqlite":
+        print(f"⚠️ Audit disponible uniquement pour SQLite (dialecte: {engine.dialect.name})")
+        return True
+
+    db = sessionmaker(bind=engine)()
+    failures = []
+    try:
+        for endpoint, description, build in HOT_QUERIES:
+            try:
+                details = explain(db, build(db))
+            except Exception as e:
+                failures.append((endpoint, description, f"erreur: {e}"))
+                print(f"  ❌ {endpoint} - {description}: {e}")
+                continue
+
+            scans = [d for d in details if is_full_scan(d)]
+            if scans:
+                failures.append((endpoint, description, "; ".join(scans)))
+                print(f"  ❌ {endpoint} - {description}: {'; '.join(scans)}")
+            else:
+                print(f"  ✅ {endpoint} - {description}")
+            if verbose or scans:
+                for detail in details:
+                    print(f"       {detail}")
+    finally:
+        db.close()
+
+    print()
+    if failures:
+        print(f"❌ {len(failures)}/{len(HOT_QUERIES)} requêtes font un parcours complet")
+        return False
+    print(f"✅ {len(HOT_QUERIES)} requêtes utilisent un index")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Audit EXPLAIN QUERY PLAN des requêtes chaudes")
+    parser.add_argument("--database", help="URL SQLAlchemy (par défaut: schéma des modèles en mémoire)")
+    parser.add_argument("--verbose", action="store_true", help="Afficher tous les plans")
+    args = parser.parse_args()
+
+    print("🔍 Audit des plans d'exécution")
+    print("=" * 50)
+    sys.exit(0 if audit_query_plans(args.database, args.verbose) else 1)
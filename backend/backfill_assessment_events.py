@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Script pour alimenter le journal unifié des évaluations (assessment_events)
+depuis l'historique: quiz_results, test_attempts, remediation_results, assessment_results
+
+Les résultats déjà journalisés sont ignorés: le script peut être relancé.
+
+Usage:
+    python backfill_assessment_events.py
+"""
+
+import sys
+
+from core.database import SessionLocal
+import models  # noqa: F401  (enregistre tous les mappers)
+from models.category import Category  # noqa: F401  (référencée par contents)
+from services.assessment_events import AssessmentEventLog
+
+def backfill_assessment_events():
+    db = SessionLocal()
+    try:
+        print("🔁 Alimentation du journal des évaluations...")
+        inserted = AssessmentEventLog(db).backfill()
+        print(f"✅ {inserted} événements ajoutés")
+        return True
+    except Exception as e:
+        print(f"❌ Erreur lors de l'alimentation: {e}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    sys.exit(0 if backfill_assessment_events() else 1)
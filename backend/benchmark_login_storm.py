@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Benchmark "pic de connexions du matin"
+Des élèves se connectent simultanément puis enchaînent des appels authentifiés.
+Mesure la latence du login (bcrypt borné), des appels authentifiés (cache des
+utilisateurs) et le nombre de lectures de la table users.
+
+L'application tourne en processus sur une base SQLite temporaire; une partie
+des comptes utilise l'ancien hachage SHA256 pour exercer le re-hachage au login.
+
+Usage:
+    python benchmark_login_storm.py --users 200 --concurrency 50 --calls 10
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def report(label, latencies, elapsed):
+    print(f"  {label}: {len(latencies)} requêtes en {elapsed:.2f}s "
+          f"({len(latencies) / elapsed if elapsed else 0:.1f} req/s) - "
+          f"p50 {percentile(latencies, 50) * 1000:.0f} ms, "
+          f"p95 {percentile(latencies, 95) * 1000:.0f} ms, "
+          f"max {max(latencies, default=0) * 1000:.0f} ms")
+
+def run_benchmark(users, concurrency, calls, legacy_ratio, bcrypt_rounds):
+    # Base temporaire et configuration avant l'import de l'application
+    db_file = os.path.join(tempfile.mkdtemp(), "login_storm.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+    os.environ["BCRYPT_ROUNDS"] = str(bcrypt_rounds)
+    os.environ.setdefault("LOGIN_IP_RATE_LIMIT", str(users * 2))
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+    from app import app
+    from core.database import Base, SessionLocal, engine
+    from core.security import get_password_hash, password_pool
+    from models.user import User, UserRole
+
+    Base.metadata.create_all(bind=engine)
+
+    password = "matin123"
+    bcrypt_hash = get_password_hash(password)
+    legacy_hash = hashlib.sha256(password.encode()).hexdigest()
+    legacy_count = int(users * legacy_ratio)
+
+    db = SessionLocal()
+    db.add_all([
+        User(
+            username=f"eleve{i}",
+            email=f"eleve{i}@storm.najah.ma",
+            hashed_password=legacy_hash if i < legacy_count else bcrypt_hash,
+            role=UserRole.student
+        )
+        for i in range(users)
+    ])
+    db.commit()
+    db.close()
+
+    user_reads = Counter()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_user_reads(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM users" in statement:
+            user_reads["select"] += 1
+
+    client = TestClient(app)
+    statuses = Counter()
+
+    def login(i):
+        start = time.perf_counter()
+        response = client.post("/api/v1/auth/login", json={"email": f"eleve{i}@storm.najah.ma", "password": password})
+        statuses[f"login {response.status_code}"] += 1
+        token = response.json().get("access_token") if response.status_code == 200 else None
+        return time.perf_counter() - start, token
+
+    def browse(token):
+        latencies = []
+        for _ in range(calls):
+            start = time.perf_counter()
+            response = client.get("/api/v1/auth/me", headers={"Authorization": f"Bearer {token}"})
+            statuses[f"me {response.status_code}"] += 1
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    print(f"🌅 {users} élèves ({legacy_count} hachages SHA256), {concurrency} connexions simultanées, "
+          f"{calls} appels chacun, bcrypt {bcrypt_rounds} rounds, pool de {password_pool.max_workers} threads")
+    print("=" * 50)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        logins = list(executor.map(login, range(users)))
+    report("login", [latency for latency, _ in logins], time.perf_counter() - start)
+
+    reads_before = user_reads["select"]
+    tokens = [token for _, token in logins if token]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        browsing = [latency for latencies in executor.map(browse, tokens) for latency in latencies]
+    report("appels authentifiés", browsing, time.perf_counter() - start)
+
+    db = SessionLocal()
+    remaining_legacy = db.query(User).filter(User.hashed_password == legacy_hash).count()
+    db.close()
+
+    print()
+    print(f"  statuts: {dict(statuses)}")
+    print(f"  lectures users pendant les appels authentifiés: {user_reads['select'] - reads_before} "
+          f"pour {len(browsing)} appels")
+    print(f"  hachages SHA256 restants: {remaining_legacy}/{legacy_count}")
+    return statuses["login 200"] == users and remaining_legacy == 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark du pic de connexions")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--calls", type=int, default=10, help="Appels authentifiés par élève après connexion")
+    parser.add_argument("--legacy-ratio", type=float, default=0.25, help="Part des comptes en SHA256")
+    parser.add_argument("--bcrypt-rounds", type=int, default=12)
+    args = parser.parse_args()
+
+    ok = run_benchmark(args.users, args.concurrency, args.calls, args.legacy_ratio, args.bcrypt_rounds)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks du noyau de notation (services/scoring_kernel.py)
+Mesure la compilation des corrigés, la notation en mémoire (réponses/s) et une
+soumission complète: ancienne boucle (une requête et des comparaisons de chaînes
+par réponse) contre corrigé compilé en cache + notation en une passe.
+
+Les réponses simulées mélangent bonnes réponses exactes, variantes de casse,
+d'espaces ou de format numérique, et mauvaises réponses; toute réponse
+acceptée par l'ancienne boucle doit l'être aussi par le noyau.
+
+Usage:
+    python benchmark_scoring_kernel.py --questions 40 --submissions 500
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+def report(label, count, elapsed, unit="opérations"):
+    print(f"  {label}: {count} {unit} en {elapsed * 1000:.1f} ms "
+          f"({count / elapsed if elapsed else 0:,.0f}/s, {elapsed / count * 1e6 if count else 0:.1f} µs chacune)")
+
+def legacy_is_correct(question, answer):
+    """Comparaison de l'ancienne boucle de quizzes.submit_quiz"""
+    if question.question_type == "mcq":
+        correct_text = question.correct_answer if isinstance(question.correct_answer, str) else ""
+        return str(answer).strip().lower() == correct_text.strip().lower()
+    if question.question_type == "true_false":
+        return str(answer).lower() == str(question.correct_answer).lower()
+    if question.question_type == "text":
+        return str(answer).strip().lower() == str(question.correct_answer).strip().lower()
+    return False
+
+def variant(question, rng):
+    """Réponse simulée: exacte, variante équivalente ou fausse"""
+    correct = question.correct_answer
+    roll = rng.random()
+    if roll < 0.4:
+        return correct
+    if roll < 0.7:
+        if question.question_type == "true_false":
+            return {"true": "Vrai", "false": "faux"}[correct]
+        if question.question_type == "numeric":
+            return correct.replace(".", ",") + "0"
+        return f"  {correct.upper()} "
+    if question.question_type == "mcq":
+        return rng.choice([option for option in question.options if option != correct])
+    return "réponse fausse"
+
+def run_benchmark(question_count, submissions, seed):
+    # Base temporaire avant l'import de l'application
+    db_file = os.path.join(tempfile.mkdtemp(), "scoring.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+
+    from sqlalchemy import event
+    from app import app  # noqa: F401  (enregistre tous les modèles)
+    from core.database import Base, SessionLocal, engine
+    from models.quiz import Quiz, Question
+    from models.user import User, UserRole
+    from services.scoring_kernel import compile_key, grade, invalidate_answer_keys, quiz_keys
+
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(seed)
+
+    db = SessionLocal()
+    teacher = User(username="prof", email="prof@bench.najah.ma", hashed_password="x", role=UserRole.teacher)
+    db.add(teacher)
+    db.flush()
+    quiz = Quiz(title="Benchmark", subject="Français", created_by=teacher.id, max_score=question_count)
+    db.add(quiz)
+    db.flush()
+    words = ["été", "Château", "forêt", "élève", "Noël", "garçon", "hôpital", "Où"]
+    for i in range(question_count):
+        kind = ["mcq", "true_false", "text", "numeric"][i % 4]
+        if kind == "mcq":
+            options = rng.sample(words, 4)
+            question = Question(quiz_id=quiz.id, question_text=f"Q{i}", question_type="mcq",
+                                options=options, correct_answer=options[0], points=1)
+        elif kind == "true_false":
+            question = Question(quiz_id=quiz.id, question_text=f"Q{i}", question_type="true_false",
+                                correct_answer=rng.choice(["true", "false"]), points=1)
+        elif kind == "text":
+            question = Question(quiz_id=quiz.id, question_text=f"Q{i}", question_type="text",
+                                correct_answer=rng.choice(words), points=1)
+        else:
+            question = Question(quiz_id=quiz.id, question_text=f"Q{i}", question_type="numeric",
+                                correct_answer=f"{rng.uniform(1, 100):.2f}", points=1)
+        db.add(question)
+    db.commit()
+
+    questions = db.query(Question).filter(Question.quiz_id == quiz.id).all()
+    copies = [[{"question_id": q.id, "answer": variant(q, rng)} for q in questions] for _ in range(submissions)]
+    answer_count = submissions * question_count
+
+    queries = {"count": 0}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_queries(conn, cursor, statement, parameters, context, executemany):
+        queries["count"] += 1
+
+    print(f"🧮 {question_count} questions (QCM, vrai/faux, texte, numérique), {submissions} copies")
+    print("=" * 50)
+
+    # 1. Compilation des corrigés
+    start = time.perf_counter()
+    for _ in range(100):
+        for q in questions:
+            compile_key(q.id, q.question_type, q.correct_answer, q.options, q.points)
+    report("compilation", 100 * question_count, time.perf_counter() - start, "corrigés")
+
+    # 2. Notation en mémoire
+    keys = quiz_keys(db, quiz.id)
+    start = time.perf_counter()
+    for copy in copies:
+        grade(keys, copy)
+    report("notation en mémoire", answer_count, time.perf_counter() - start, "réponses")
+
+    # 3. Soumission complète: ancienne boucle
+    by_id = {q.id: q for q in questions}
+    db.expire_all()
+    queries["count"] = 0
+    legacy_correct = 0
+    start = time.perf_counter()
+    for copy in copies:
+        for answer in copy:
+            question = db.query(Question).filter(Question.id == answer["question_id"]).first()
+            legacy_correct += legacy_is_correct(question, answer["answer"])
+    legacy_elapsed = time.perf_counter() - start
+    legacy_queries = queries["count"]
+    report("ancienne boucle", submissions, legacy_elapsed, "copies")
+
+    # 4. Soumission complète: corrigé en cache + notation en une passe
+    invalidate_answer_keys()
+    queries["count"] = 0
+    kernel_correct = 0
+    regressions = 0
+    start = time.perf_counter()
+    for copy in copies:
+        result = grade(quiz_keys(db, quiz.id), copy)
+        kernel_correct += result.correct_count
+    kernel_elapsed = time.perf_counter() - start
+    kernel_queries = queries["count"]
+    report("noyau de notation", submissions, kernel_elapsed, "copies")
+
+    for copy in copies:
+        items = grade(keys, copy).by_question()
+        regressions += sum(
+            1 for answer in copy
+            if legacy_is_correct(by_id[answer["question_id"]], answer["answer"]) and not items[answer["question_id"]].is_correct
+        )
+    db.close()
+
+    print()
+    print(f"  requêtes SQL: {legacy_queries} (ancienne boucle) contre {kernel_queries} (noyau)")
+    print(f"  accélération: x{legacy_elapsed / kernel_elapsed if kernel_elapsed else 0:.0f}")
+    print(f"  réponses acceptées: {legacy_correct} (ancienne boucle) / {kernel_correct} (noyau) sur {answer_count}")
+    print(f"  réponses acceptées avant et refusées par le noyau: {regressions}")
+    return regressions == 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmarks du noyau de notation")
+    parser.add_argument("--questions", type=int, default=40)
+    parser.add_argument("--submissions", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    ok = run_benchmark(args.questions, args.submissions, args.seed)
+    sys.exit(0 if ok else 1)
@@ -11,6 +11,69 @@ class Settings:
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 60))
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     
+    # Authentification: coût bcrypt, pool de vérification et cache des utilisateurs
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", 12))
+    BCRYPT_MAX_WORKERS: int = int(os.getenv("BCRYPT_MAX_WORKERS", max(1, (os.cpu_count() or 2) - 1)))
+    BCRYPT_MAX_PENDING: int = int(os.getenv("BCRYPT_MAX_PENDING", 64))
+    BCRYPT_WAIT_SECONDS: float = float(os.getenv("BCRYPT_WAIT_SECONDS", 5))
+    USER_CACHE_TTL_SECONDS: int = int(os.getenv("USER_CACHE_TTL_SECONDS", 60))
+    LOGIN_RATE_LIMIT: int = int(os.getenv("LOGIN_RATE_LIMIT", 10))  # par compte
+    LOGIN_IP_RATE_LIMIT: int = int(os.getenv("LOGIN_IP_RATE_LIMIT", 300))  # par IP (établissements derrière un NAT)
+    LOGIN_RATE_WINDOW_SECONDS: int = int(os.getenv("LOGIN_RATE_WINDOW_SECONDS", 60))
+    
+    # Tests adaptatifs accessibles par élève (cache local, invalidé sur assignation/classe)
+    TEST_ACCESS_CACHE_TTL_SECONDS: int = int(os.getenv("TEST_ACCESS_CACHE_TTL_SECONDS", 60))
+    # Annuaire enseignant -> classes -> élèves en mémoire (invalidé à chaque changement local)
+    ROSTER_CACHE_TTL_SECONDS: int = int(os.getenv("ROSTER_CACHE_TTL_SECONDS", 60))
+    
+    # Planificateur des notifications d'échéances (devoirs, objectifs, rappels)
+    DEADLINE_SCHEDULER_ENABLED: bool = os.getenv("DEADLINE_SCHEDULER_ENABLED", "true").lower() in ("1", "true", "yes")
+    
+    # Instrumentation des requêtes (/metrics): seuil N+1 et profils échantillonnés via l'en-tête X-Profile
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+    N_PLUS_ONE_THRESHOLD: int = int(os.getenv("N_PLUS_ONE_THRESHOLD", 10))
+    PROFILING_ENABLED: bool = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+    PROFILE_SAMPLE_INTERVAL_MS: float = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", 5))
+    
+    # Cache des réponses des routes de lecture (ETag, invalidation par étiquettes); Redis optionnel
+    RESPONSE_CACHE_ENABLED: bool = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+    RESPONSE_CACHE_TTL_SECONDS: int = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", 60))
+    RESPONSE_CACHE_MAX_ENTRIES: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 5000))
+    RESPONSE_CACHE_REDIS_URL: str = os.getenv("RESPONSE_CACHE_REDIS_URL", "")
+    
+    # File de tâches après soumission (badges, cubes, profils): threads dans l'application,
+    # 0 pour les confier uniquement à des workers séparés (run_task_worker.py)
+    TASK_QUEUE_WORKERS: int = int(os.getenv("TASK_QUEUE_WORKERS", 2))
+    TASK_QUEUE_POLL_SECONDS: float = float(os.getenv("TASK_QUEUE_POLL_SECONDS", 5))
+    TASK_QUEUE_LEASE_SECONDS: float = float(os.getenv("TASK_QUEUE_LEASE_SECONDS", 300))
+    
+    # Dashboard enseignant temps réel: intervalle de calcul des deltas poussés par WebSocket
+    TEACHER_REALTIME_PUSH_SECONDS: float = float(os.getenv("TEACHER_REALTIME_PUSH_SECONDS", 5))
+    
+    # Recommandation de ressources: voisins par ressource et candidats par élève (run_recommender.py),
+    # durée du cache des candidats et bonus des matières faibles
+    RECOMMENDER_NEIGHBOURS: int = int(os.getenv("RECOMMENDER_NEIGHBOURS", 20))
+    RECOMMENDER_CANDIDATES: int = int(os.getenv("RECOMMENDER_CANDIDATES", 50))
+    RECOMMENDER_CACHE_TTL_SECONDS: int = int(os.getenv("RECOMMENDER_CACHE_TTL_SECONDS", 300))
+    RECOMMENDER_WEAK_SUBJECT_BOOST: float = float(os.getenv("RECOMMENDER_WEAK_SUBJECT_BOOST", 0.5))
+    
+    # Compteurs différés (vues, téléchargements, accès): intervalle de vidage (0 = écriture immédiate)
+    # et nombre de lignes en attente déclenchant un vidage anticipé
+    COUNTER_FLUSH_SECONDS: float = float(os.getenv("COUNTER_FLUSH_SECONDS", 2))
+    COUNTER_BATCH_SIZE: int = int(os.getenv("COUNTER_BATCH_SIZE", 1000))
+    
+    # Calendrier: nombre maximal d'occurrences développées par série récurrente et par requête
+    CALENDAR_MAX_OCCURRENCES: int = int(os.getenv("CALENDAR_MAX_OCCURRENCES", 500))
+    
+    # Notation: durée du cache des corrigés compilés (par quiz / test adaptatif / évaluation)
+    SCORING_KEY_CACHE_TTL_SECONDS: int = int(os.getenv("SCORING_KEY_CACHE_TTL_SECONDS", 300))
+
+    # Statistiques d'items des tests adaptatifs: intervalle de vidage des compteurs (0 = écriture immédiate),
+    # durée de l'instantané en mémoire et tentatives minimales avant d'utiliser la discrimination mesurée
+    ITEM_STATS_FLUSH_SECONDS: float = float(os.getenv("ITEM_STATS_FLUSH_SECONDS", 5))
+    ITEM_STATS_CACHE_TTL_SECONDS: int = int(os.getenv("ITEM_STATS_CACHE_TTL_SECONDS", 300))
+    ITEM_STATS_MIN_ATTEMPTS: int = int(os.getenv("ITEM_STATS_MIN_ATTEMPTS", 20))
+    
     # Configuration de base de données dynamique
     SQLALCHEMY_DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./najah_ai.db")
     
@@ -0,0 +1,343 @@
+"""Instrumentation des requêtes: histogrammes de latence par route, requêtes SQL
+par requête HTTP (nombre, durée, détection N+1) et profils échantillonnés à la demande.
+
+Les mesures sont propres au processus et exposées au format texte Prometheus
+(`/metrics`); avec plusieurs workers, chaque worker expose ses propres compteurs.
+"""
+
+import contextvars
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict, defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# Route des requêtes sans endpoint (404): une seule série, quelle que soit l'URL
+UNMATCHED_ROUTE = "__unmatched__"
+
+PROFILE_HEADER = "X-Profile"
+MAX_STORED_PROFILES = 20
+
+
+@dataclass
+class RequestStats:
+    """Mesures SQL d'une requête HTTP (partagées entre la boucle et le thread de l'endpoint)"""
+    queries: int = 0
+    sql_seconds: float = 0.0
+    statements: Counter = field(default_factory=Counter)
+
+
+_current_request: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar(
+    "current_request_stats", default=None
+)
+
+
+class Histogram:
+    """Histogramme cumulatif à bornes fixes (format Prometheus)"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += value
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        running, series = 0, []
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            series.append((_format_number(bound), running))
+        series.append(("+Inf", running + self.counts[-1]))
+        return series
+
+
+class MetricsRegistry:
+    """Compteurs et histogrammes par (méthode, route)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.query_counts: Dict[Tuple[str, str], Histogram] = {}
+        self.requests: Counter = Counter()          # (méthode, route, statut)
+        self.sql_seconds: Dict[Tuple[str, str], float] = defaultdict(float)
+        self.n_plus_one: Counter = Counter()        # (méthode, route)
+        self._n_plus_one_reported = set()
+
+    def record(self, method: str, route: str, status: int, duration: float, stats: RequestStats) -> None:
+        key = (method, route)
+        with self._lock:
+            if key not in self.latency:
+                self.latency[key] = Histogram(LATENCY_BUCKETS)
+                self.query_counts[key] = Histogram(QUERY_COUNT_BUCKETS)
+            self.latency[key].observe(duration)
+            self.query_counts[key].observe(stats.queries)
+            self.requests[(method, route, str(status))] += 1
+            self.sql_seconds[key] += stats.sql_seconds
+        self._detect_n_plus_one(key, stats)
+
+    def _detect_n_plus_one(self, key: Tuple[str, str], stats: RequestStats) -> None:
+        """Même SELECT répété au moins N_PLUS_ONE_THRESHOLD fois dans une requête"""
+        threshold = settings.N_PLUS_ONE_THRESHOLD
+        if threshold <= 0 or stats.queries < threshold:
+            return
+        repeated = [
+            (statement, count) for statement, count in stats.statements.items()
+            if count >= threshold and statement.lstrip().upper().startswith("SELECT")
+        ]
+        if not repeated:
+            return
+        with self._lock:
+            self.n_plus_one[key] += 1
+            new_reports = [(s, c) for s, c in repeated if (key, s) not in self._n_plus_one_reported]
+            self._n_plus_one_reported.update((key, s) for s, _ in new_reports)
+        # Un avertissement par (route, requête SQL) et par processus; le compteur suit la suite
+        for statement, count in new_reports:
+            logger.warning(
+                "⚠️ N+1 probable sur %s %s: %d exécutions de « %s »",
+                key[0], key[1], count, " ".join(statement.split())[:200]
+            )
+
+    def render(self) -> str:
+        """Exposition au format texte Prometheus 0.0.4"""
+        lines = []
+        with self._lock:
+            lines += [
+                "# HELP http_requests_total Requêtes HTTP traitées",
+                "# TYPE http_requests_total counter",
+            ]
+            for (method, route, status), count in sorted(self.requests.items()):
+                lines.append(f"http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+
+            lines += [
+                "# HELP http_request_duration_seconds Durée des requêtes HTTP",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            lines += _render_histograms("http_request_duration_seconds", self.latency)
+
+            lines += [
+                "# HELP http_request_sql_queries Requêtes SQL exécutées par requête HTTP",
+                "# TYPE http_request_sql_queries histogram",
+            ]
+            lines += _render_histograms("http_request_sql_queries", self.query_counts)
+
+            lines += [
+                "# HELP http_request_sql_seconds_total Temps SQL cumulé par route",
+                "# TYPE http_request_sql_seconds_total counter",
+            ]
+            for (method, route), seconds in sorted(self.sql_seconds.items()):
+                lines.append(f"http_request_sql_seconds_total{_labels(method=method, route=route)} {seconds:.6f}")
+
+            lines += [
+                "# HELP http_request_n_plus_one_total Requêtes HTTP avec un SELECT répété (N+1 probable)",
+                "# TYPE http_request_n_plus_one_total counter",
+            ]
+            for (method, route), count in sorted(self.n_plus_one.items()):
+                lines.append(f"http_request_n_plus_one_total{_labels(method=method, route=route)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self.latency.clear()
+            self.query_counts.clear()
+            self.requests.clear()
+            self.sql_seconds.clear()
+            self.n_plus_one.clear()
+            self._n_plus_one_reported.clear()
+
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+def _labels(**labels: str) -> str:
+    escaped = (
+        f'{name}="' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for name, value in labels.items()
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _render_histograms(name: str, histograms: Dict[Tuple[str, str], Histogram]) -> List[str]:
+    lines = []
+    for (method, route), histogram in sorted(histograms.items()):
+        for bound, count in histogram.cumulative():
+            lines.append(f"{name}_bucket{_labels(method=method, route=route, le=bound)} {count}")
+        lines.append(f"{name}_sum{_labels(method=method, route=route)} {histogram.total:.6f}")
+        lines.append(f"{name}_count{_labels(method=method, route=route)} {histogram.cumulative()[-1][1]}")
+    return lines
+
+
+metrics_registry = MetricsRegistry()
+
+
+# ----------------------------------------------------------------------
+# Requêtes SQL (tous les moteurs SQLAlchemy du processus)
+# ----------------------------------------------------------------------
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    if _current_request.get() is not None:
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_request.get()
+    starts = conn.info.get("metrics_query_start")
+    if stats is None or not starts:
+        return
+    stats.sql_seconds += time.perf_counter() - starts.pop()
+    stats.queries += 1
+    stats.statements[statement] += 1
+
+
+# ----------------------------------------------------------------------
+# Profils échantillonnés (en-tête X-Profile, si PROFILING_ENABLED)
+# ----------------------------------------------------------------------
+
+_APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class SamplingProfiler:
+    """Échantillonne les piles des threads pendant une requête (toutes les
+    PROFILE_SAMPLE_INTERVAL_MS ms) et agrège les piles du code de l'application.
+
+    Les threads ne sont pas rattachés à une requête: des requêtes concurrentes
+    apparaissent dans le même profil. À réserver à un diagnostic ciblé.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.samples += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = self._app_stack(frame)
+                if stack:
+                    self.stacks[stack] += 1
+
+    @staticmethod
+    def _app_stack(frame) -> str:
+        """Pile repliée (format flamegraph) limitée aux fichiers de l'application"""
+        parts = []
+        while frame is not None:
+            filename = frame.f_code.co_filename
+            if filename.startswith(_APP_ROOT) and "site-packages" not in filename and filename != __file__:
+                parts.append(f"{os.path.relpath(filename, _APP_ROOT)}:{frame.f_code.co_name}:{frame.f_lineno}")
+            frame = frame.f_back
+        return ";".join(reversed(parts))
+
+    def render(self, route: str, duration: float) -> str:
+        lines = [f"# {route} - {duration * 1000:.1f} ms, {self.samples} échantillons"]
+        lines += [f"{stack} {count}" for stack, count in self.stacks.most_common()]
+        return "\n".join(lines) + "\n"
+
+
+_profiles: "OrderedDict[str, str]" = OrderedDict()
+_profiles_lock = threading.Lock()
+
+
+def store_profile(text: str) -> str:
+    profile_id = uuid.uuid4().hex[:12]
+    with _profiles_lock:
+        _profiles[profile_id] = text
+        while len(_profiles) > MAX_STORED_PROFILES:
+            _profiles.popitem(last=False)
+    return profile_id
+
+
+def get_profile(profile_id: str) -> Optional[str]:
+    with _profiles_lock:
+        return _profiles.get(profile_id)
+
+
+# ----------------------------------------------------------------------
+# Middleware
+# ----------------------------------------------------------------------
+
+def route_template(request) -> str:
+    """Chemin déclaré de la route (/api/v1/quizzes/{quiz_id}), pas l'URL réelle:
+    le nombre de séries reste borné par le nombre de routes"""
+    endpoint = request.scope.get("endpoint")
+    if endpoint is None:
+        return UNMATCHED_ROUTE
+    candidates = [route for route in request.app.routes if getattr(route, "endpoint", None) is endpoint]
+    if len(candidates) == 1:
+        return candidates[0].path
+    from starlette.routing import Match
+    for route in candidates:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+    return UNMATCHED_ROUTE
+
+
+async def instrument_request(request, call_next):
+    """Mesurer une requête: latence, requêtes SQL, profil si demandé"""
+    if not settings.METRICS_ENABLED:
+        start = time.perf_counter()
+        response = await call_next(request)
+        response.headers["X-Process-Time"] = str(time.perf_counter() - start)
+        return response
+
+    stats = RequestStats()
+    token = _current_request.set(stats)
+    profiler = None
+    if settings.PROFILING_ENABLED and request.headers.get(PROFILE_HEADER):
+        profiler = SamplingProfiler(settings.PROFILE_SAMPLE_INTERVAL_MS / 1000)
+        profiler.__enter__()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        duration = time.perf_counter() - start
+        if profiler is not None:
+            profiler.__exit__(None, None, None)
+        _current_request.reset(token)
+        route = route_template(request)
+        metrics_registry.record(request.method, route, status, duration, stats)
+
+    response.headers["X-Process-Time"] = str(duration)
+    response.headers["X-SQL-Queries"] = str(stats.queries)
+    if profiler is not None:
+        response.headers["X-Profile-Id"] = store_profile(profiler.render(route, duration))
+    return response
@@ -0,0 +1,53 @@
+"""Limitation de débit en mémoire (fenêtre glissante) par clé"""
+
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Deque, Dict
+
+
+class SlidingWindowRateLimiter:
+    """Au plus `limit` événements par `window_seconds` pour une même clé.
+
+    État propre au processus: avec plusieurs workers, la limite effective
+    est multipliée par le nombre de workers.
+    """
+
+    def __init__(self, limit: int, window_seconds: float, max_keys: int = 10000):
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self._events: Dict[str, Deque[float]] = defaultdict(deque)
+        self._lock = threading.Lock()
+
+    def hit(self, key: str) -> bool:
+        """Enregistrer un événement; False si la clé a dépassé sa limite"""
+        now = time.monotonic()
+        with self._lock:
+            if len(self._events) > self.max_keys:
+                self._sweep(now)
+            events = self._events[key]
+            while events and events[0] <= now - self.window_seconds:
+                events.popleft()
+            if len(events) >= self.limit:
+                return False
+            events.append(now)
+            return True
+
+    def retry_after(self, key: str) -> int:
+        """Secondes avant qu'un nouvel événement soit accepté pour la clé"""
+        with self._lock:
+            events = self._events.get(key)
+            if not events:
+                return 0
+            return max(0, int(events[0] + self.window_seconds - time.monotonic()) + 1)
+
+    def _sweep(self, now: float) -> None:
+        """Oublier les clés sans événement dans la fenêtre courante"""
+        expired = [k for k, events in self._events.items() if not events or events[-1] <= now - self.window_seconds]
+        for k in expired:
+            del self._events[k]
+
+    def reset(self, key: str) -> None:
+        with self._lock:
+            self._events.pop(key, None)
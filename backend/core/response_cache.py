@@ -0,0 +1,528 @@
+"""Cache des réponses JSON des routes de lecture (tableaux de bord, analytics),
+avec ETag et GET conditionnel.
+
+Une réponse est mise en cache par (chemin, paramètres de requête, utilisateur)
+et étiquetée par les données dont elle dépend (`class:42`, `student:7`,
+`teacher:3`). Les écritures (résultat de quiz, assignation, badge, activité...)
+invalident les étiquettes concernées après le commit; une étiquette dont le
+paramètre est absent (`class:*`) dépend de toutes les valeurs et est invalidée
+par chacune d'elles.
+
+Le stockage par défaut est un LRU propre au processus: avec plusieurs workers,
+une invalidation n'atteint que le worker qui a écrit, les autres servent au plus
+RESPONSE_CACHE_TTL_SECONDS de données périmées. Avec RESPONSE_CACHE_REDIS_URL,
+le cache et les invalidations sont partagés entre workers.
+
+Seules les réponses réussies sont mises en cache: une exception traverse le
+décorateur, et une route qui intercepte une erreur pour retourner des valeurs de
+repli appelle skip_response_cache().
+"""
+
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy import event, inspect as sa_inspect, select, text
+from sqlalchemy.orm import Session, object_session
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+CACHE_CONTROL = "private, no-cache"
+
+# Positionné par la route pendant son exécution (même contexte que le décorateur)
+_skip_store: ContextVar[bool] = ContextVar("response_cache_skip_store", default=False)
+
+
+# ----------------------------------------------------------------------
+# Stockage
+# ----------------------------------------------------------------------
+
+class MemoryBackend:
+    """LRU borné en mémoire, avec index étiquette -> clés"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, str, bytes, Tuple[str, ...]]]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[str, bytes]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1], entry[2]
+
+    def set(self, key: str, etag: str, body: bytes, tags: Tuple[str, ...], ttl: float) -> None:
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, etag, body, tags)
+            for tag in tags:
+                self._tags[tag].add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, tags: Iterable[str]) -> int:
+        removed = 0
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.pop(tag, ())):
+                    removed += self._remove(key)
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def _remove(self, key: str) -> int:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return 0
+        for tag in entry[3]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+        return 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisBackend:
+    """Cache partagé entre workers; en cas d'indisponibilité, tout est un échec de cache"""
+
+    PREFIX = "response_cache:"
+
+    def __init__(self, url: str):
+        import redis
+        self.client = redis.Redis.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2)
+
+    def get(self, key: str) -> Optional[Tuple[str, bytes]]:
+        try:
+            raw = self.client.get(self.PREFIX + key)
+        except Exception as e:
+            logger.warning(f"⚠️ Cache de réponses Redis indisponible: {e}")
+            return None
+        if raw is None:
+            return None
+        entry = json.loads(raw)
+        return entry["etag"], entry["body"].encode("utf-8")
+
+    def set(self, key: str, etag: str, body: bytes, tags: Tuple[str, ...], ttl: float) -> None:
+        ttl = max(1, int(ttl))
+        try:
+            pipe = self.client.pipeline()
+            pipe.set(self.PREFIX + key, json.dumps({"etag": etag, "body": body.decode("utf-8")}), ex=ttl)
+            for tag in tags:
+                pipe.sadd(self.PREFIX + "tag:" + tag, key)
+                pipe.expire(self.PREFIX + "tag:" + tag, ttl)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"⚠️ Réponse non mise en cache (Redis): {e}")
+
+    def invalidate(self, tags: Iterable[str]) -> int:
+        removed = 0
+        try:
+            for tag in tags:
+                tag_key = self.PREFIX + "tag:" + tag
+                keys = [self.PREFIX + member.decode() for member in self.client.smembers(tag_key)]
+                self.client.delete(*keys, tag_key)
+                removed += len(keys)
+        except Exception as e:
+            logger.warning(f"⚠️ Invalidation du cache de réponses échouée (Redis): {e}")
+        return removed
+
+    def clear(self) -> None:
+        try:
+            keys = list(self.client.scan_iter(self.PREFIX + "*"))
+            if keys:
+                self.client.delete(*keys)
+        except Exception as e:
+            logger.warning(f"⚠️ Vidage du cache de réponses échoué (Redis): {e}")
+
+
+class ResponseCache:
+    def __init__(self):
+        self._backend = None
+        self._backend_lock = threading.Lock()
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            with self._backend_lock:
+                if self._backend is None:
+                    self._backend = self._create_backend()
+        return self._backend
+
+    @staticmethod
+    def _create_backend():
+        if settings.RESPONSE_CACHE_REDIS_URL:
+            try:
+                return RedisBackend(settings.RESPONSE_CACHE_REDIS_URL)
+            except Exception as e:
+                logger.warning(f"⚠️ Redis indisponible pour le cache de réponses, repli en mémoire: {e}")
+        return MemoryBackend(settings.RESPONSE_CACHE_MAX_ENTRIES)
+
+    def invalidate(self, *tags: str) -> int:
+        """Oublier les réponses étiquetées (et celles qui dépendent de toutes les valeurs du préfixe)"""
+        expanded = set()
+        for tag in tags:
+            expanded.add(tag)
+            prefix, _, value = tag.partition(":")
+            if value and value != "*":
+                expanded.add(f"{prefix}:*")
+        return self.backend.invalidate(expanded) if expanded else 0
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+
+response_cache = ResponseCache()
+
+
+def invalidate_tags(*tags: str) -> int:
+    return response_cache.invalidate(*tags)
+
+
+# ----------------------------------------------------------------------
+# Décorateur de route
+# ----------------------------------------------------------------------
+
+class _TagParams(dict):
+    """Paramètres des modèles d'étiquettes: absent ou None -> '*' (toutes les valeurs)"""
+
+    def __missing__(self, key):
+        return "*"
+
+
+def teacher_scope(params) -> str:
+    """Étiquette des tableaux de bord enseignant: un administrateur voit toutes les classes"""
+    return "teacher:*" if params["role"] == "admin" else f"teacher:{params['user']}"
+
+
+def _principal(kwargs: dict) -> Optional[int]:
+    user = kwargs.get("current_user")
+    return getattr(user, "id", None)
+
+
+def _cache_key(request: Request, principal: Optional[int]) -> str:
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    raw = f"{request.method} {request.url.path}?{query}|{principal if principal is not None else 'public'}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {value.strip().removeprefix("W/") for value in header.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+class _CachedCall:
+    def __init__(self, request: Request, kwargs: dict, tag_templates: Tuple[str, ...], ttl: Optional[float]):
+        self.request = request
+        principal = _principal(kwargs)
+        params = _TagParams({
+            name: value for name, value in kwargs.items()
+            if value is not None and isinstance(value, (int, str, float))
+        })
+        params["user"] = principal if principal is not None else "*"
+        role = getattr(kwargs.get("current_user"), "role", None)
+        params["role"] = getattr(role, "value", role) or "*"
+        self.tags = tuple(
+            template(params) if callable(template) else template.format_map(params)
+            for template in tag_templates
+        )
+        self.key = _cache_key(request, principal)
+        self.ttl = ttl if ttl is not None else settings.RESPONSE_CACHE_TTL_SECONDS
+
+    def cached(self) -> Optional[Response]:
+        entry = response_cache.backend.get(self.key)
+        if entry is None:
+            return None
+        etag, body = entry
+        return self._respond(etag, body, "HIT")
+
+    def store(self, result) -> Response:
+        if isinstance(result, Response):
+            return result
+        if _skip_store.get():
+            return JSONResponse(
+                content=jsonable_encoder(result), headers={"Cache-Control": "no-store", "X-Cache": "BYPASS"}
+            )
+        body = JSONResponse(content=jsonable_encoder(result)).body
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        response_cache.backend.set(self.key, etag, body, self.tags, self.ttl)
+        return self._respond(etag, body, "MISS")
+
+    def _respond(self, etag: str, body: bytes, status: str) -> Response:
+        headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL, "X-Cache": status}
+        if _etag_matches(self.request, etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+
+def skip_response_cache() -> None:
+    """Ne pas mettre en cache la réponse de la route en cours (valeurs de repli après une erreur)"""
+    _skip_store.set(True)
+
+
+def cached_response(tags: Iterable[str] = (), ttl: Optional[float] = None):
+    """Mettre en cache la réponse JSON d'une route GET.
+
+    `tags` sont des modèles formatés avec les paramètres de la route, `user` (id
+    de `current_user`) et `role`, par exemple "class:{class_id}" ou "student:{user}",
+    ou des fonctions de ces paramètres (teacher_scope).
+    La route doit retourner des données JSON (dict, liste), pas des objets ORM
+    filtrés par un response_model.
+    """
+    tag_templates = tuple(tags)
+
+    def decorator(func):
+        signature = inspect.signature(func)
+        adds_request = "request" not in signature.parameters
+        if adds_request:
+            parameters = list(signature.parameters.values())
+            position = next(
+                (i for i, p in enumerate(parameters) if p.kind == inspect.Parameter.VAR_KEYWORD), len(parameters)
+            )
+            parameters.insert(position, inspect.Parameter(
+                "request", inspect.Parameter.KEYWORD_ONLY, annotation=Request
+            ))
+            signature = signature.replace(parameters=parameters)
+
+        def prepare(kwargs) -> Tuple[Optional[_CachedCall], dict]:
+            request = kwargs.pop("request", None) if adds_request else kwargs.get("request")
+            # Appel direct depuis une autre route (sans requête): pas de cache
+            if request is None or not settings.RESPONSE_CACHE_ENABLED:
+                return None, kwargs
+            return _CachedCall(request, kwargs, tag_templates, ttl), kwargs
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                call, kwargs = prepare(kwargs)
+                if call is None:
+                    return await func(*args, **kwargs)
+                cached = call.cached()
+                if cached is not None:
+                    return cached
+                token = _skip_store.set(False)
+                try:
+                    return call.store(await func(*args, **kwargs))
+                finally:
+                    _skip_store.reset(token)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                call, kwargs = prepare(kwargs)
+                if call is None:
+                    return func(*args, **kwargs)
+                cached = call.cached()
+                if cached is not None:
+                    return cached
+                token = _skip_store.set(False)
+                try:
+                    return call.store(func(*args, **kwargs))
+                finally:
+                    _skip_store.reset(token)
+
+        wrapper.__signature__ = signature
+        return wrapper
+
+    return decorator
+
+
+# ----------------------------------------------------------------------
+# Invalidation sur écriture (après commit)
+# ----------------------------------------------------------------------
+
+STUDENT_SCOPE_SQL = text("""
+    SELECT cs.class_id, cg.teacher_id
+    FROM class_students cs
+    JOIN class_groups cg ON cg.id = cs.class_id
+    WHERE cs.student_id = :student_id
+""")
+
+
+def student_scope_tags(connection, student_id: Optional[int]) -> List[str]:
+    """Étiquettes touchées par une donnée d'un élève: l'élève, ses classes, leurs enseignants"""
+    if student_id is None:
+        return []
+    tags = [f"student:{student_id}"]
+    for class_id, teacher_id in connection.execute(STUDENT_SCOPE_SQL, {"student_id": student_id}):
+        tags += [f"class:{class_id}", f"teacher:{teacher_id}"]
+    return tags
+
+
+def _quiz_result_tags(connection, target) -> List[str]:
+    tags = student_scope_tags(connection, target.student_id)
+    creator = connection.execute(
+        text("SELECT created_by FROM quizzes WHERE id = :quiz_id"), {"quiz_id": target.quiz_id}
+    ).scalar()
+    if creator is not None:
+        tags.append(f"teacher:{creator}")
+    return tags
+
+
+def _quiz_assignment_tags(connection, target) -> List[str]:
+    tags = [f"teacher:{target.assigned_by}"]
+    if target.student_id is not None:
+        tags.append(f"student:{target.student_id}")
+    if target.class_id is not None:
+        tags.append(f"class:{target.class_id}")
+        tags += [f"student:{student_id}" for (student_id,) in connection.execute(
+            text("SELECT student_id FROM class_students WHERE class_id = :class_id"), {"class_id": target.class_id}
+        )]
+    return tags
+
+
+def _homework_tags(connection, target) -> List[str]:
+    tags = student_scope_tags(connection, target.assigned_to)
+    if target.class_id is not None:
+        tags.append(f"class:{target.class_id}")
+    if target.assigned_by is not None:
+        tags.append(f"teacher:{target.assigned_by}")
+    return tags
+
+
+def _previous_values(target, attribute: str) -> List:
+    """Valeur courante et anciennes valeurs d'un attribut (élève changé de classe, classe réattribuée)"""
+    history = sa_inspect(target).attrs[attribute].history
+    return [value for value in {getattr(target, attribute), *history.deleted} if value is not None]
+
+
+def _keep_previous_value(target, value, oldvalue, initiator):
+    """Sans effet: enregistré pour active_history (ancienne valeur gardée dans l'historique)"""
+
+
+def _class_tags(connection, class_id: int, with_students: bool = False) -> List[str]:
+    """La classe et son enseignant (et ses élèves)"""
+    tags = [f"class:{class_id}"]
+    teacher_id = connection.execute(
+        text("SELECT teacher_id FROM class_groups WHERE id = :class_id"), {"class_id": class_id}
+    ).scalar()
+    if teacher_id is not None:
+        tags.append(f"teacher:{teacher_id}")
+    if with_students:
+        tags += [f"student:{student_id}" for (student_id,) in connection.execute(
+            text("SELECT student_id FROM class_students WHERE class_id = :class_id"), {"class_id": class_id}
+        )]
+    return tags
+
+
+def _class_student_tags(connection, target) -> List[str]:
+    tags = [f"student:{student_id}" for student_id in _previous_values(target, "student_id")]
+    for class_id in _previous_values(target, "class_id"):
+        tags += _class_tags(connection, class_id)
+    return tags
+
+
+def _class_group_tags(connection, target) -> List[str]:
+    # Ancien enseignant d'une classe réattribuée (le nouveau est relu par _class_tags)
+    tags = [f"teacher:{teacher_id}" for teacher_id in _previous_values(target, "teacher_id")]
+    return tags + _class_tags(connection, target.id, with_students=True)
+
+
+def _owner_tags(attribute: str):
+    def tags(connection, target) -> List[str]:
+        return student_scope_tags(connection, getattr(target, attribute))
+    return tags
+
+
+def queue_invalidation(session: Optional[Session], tags: Iterable[str]) -> None:
+    """Invalider après le commit: avant, une requête concurrente remettrait en cache l'ancien état"""
+    if session is None:
+        response_cache.invalidate(*tags)
+    else:
+        session.info.setdefault("response_cache_tags", set()).update(tags)
+
+
+def _register(model, tags_of) -> None:
+    def invalidate(mapper, connection, target):
+        if settings.RESPONSE_CACHE_ENABLED:
+            queue_invalidation(object_session(target), tags_of(connection, target))
+
+    for name in ("after_insert", "after_update", "after_delete"):
+        event.listen(model, name, invalidate)
+
+
+def _register_write_events() -> None:
+    from models.badge import UserBadge
+    from models.class_group import ClassGroup, ClassStudent
+    from models.gamification import UserAchievement
+    from models.learning_history import LearningHistory
+    from models.organization import Homework, LearningGoal, StudySession
+    from models.quiz import QuizAssignment, QuizResult
+
+    _register(QuizResult, _quiz_result_tags)
+    _register(QuizAssignment, _quiz_assignment_tags)
+    _register(Homework, _homework_tags)
+    _register(ClassStudent, _class_student_tags)
+    _register(ClassGroup, _class_group_tags)
+    # Charger l'ancienne valeur à l'affectation (attribut expiré après un commit), pour que
+    # _previous_values retrouve l'ancienne classe / l'ancien enseignant dans l'historique
+    for attribute in (ClassStudent.class_id, ClassStudent.student_id, ClassGroup.teacher_id):
+        event.listen(attribute, "set", _keep_previous_value, active_history=True)
+
+    @event.listens_for(Session, "do_orm_execute")
+    def _queue_bulk_class_changes(orm_execute_state):
+        # query(ClassStudent).filter(...).delete() en masse ne passe pas par les listeners du mapper:
+        # relire les lignes visées avant l'exécution
+        if not settings.RESPONSE_CACHE_ENABLED or not (orm_execute_state.is_update or orm_execute_state.is_delete):
+            return
+        models = {mapper.class_ for mapper in orm_execute_state.all_mappers}
+        if ClassStudent in models:
+            columns, with_students = (ClassStudent.class_id, ClassStudent.student_id), False
+        elif ClassGroup in models:
+            columns, with_students = (ClassGroup.id,), True
+        else:
+            return
+        where = orm_execute_state.statement.whereclause
+        connection = orm_execute_state.session.connection()
+        tags = set()
+        for row in connection.execute(select(*columns) if where is None else select(*columns).where(where)):
+            tags.update(_class_tags(connection, row[0], with_students))
+            tags.update(f"student:{student_id}" for student_id in row[1:])
+        queue_invalidation(orm_execute_state.session, tags)
+    _register(UserBadge, _owner_tags("user_id"))
+    _register(UserAchievement, _owner_tags("user_id"))
+    _register(LearningHistory, _owner_tags("student_id"))
+    _register(StudySession, _owner_tags("user_id"))
+    _register(LearningGoal, _owner_tags("user_id"))
+
+
+_register_write_events()
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    tags = session.info.pop("response_cache_tags", None)
+    if tags:
+        response_cache.invalidate(*tags)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_rolled_back(session, previous_transaction):
+    session.info.pop("response_cache_tags", None)
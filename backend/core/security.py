@@ -1,38 +1,106 @@
 from passlib.context import CryptContext
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import event, inspect as sa_inspect
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+from typing import Dict, Optional, Tuple
 from .config import settings
 from .database import get_db
 from models.user import User
 import hashlib
+import hmac
+import logging
+import re
+import threading
+import time
 import jwt
 from jwt.exceptions import InvalidTokenError
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-security = HTTPBearer()
+logger = logging.getLogger(__name__)
+
+# Coût bcrypt borné par la configuration: les hachages d'un autre coût sont
+# signalés par needs_update() et réécrits à la connexion suivante
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
+security = HTTPBearer(auto_error=False)  # sans en-tête: 401 (get_current_user), pas 403
 
 # Hashage de mot de passe
 
-def verify_password(plain_password, hashed_password):
-    # Essayer d'abord bcrypt
+_LEGACY_SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+def is_legacy_hash(hashed_password: Optional[str]) -> bool:
+    """Ancien format: SHA256 hexadécimal non salé (scripts d'initialisation historiques)"""
+    return bool(hashed_password) and bool(_LEGACY_SHA256_RE.match(hashed_password))
+
+def verify_and_update(plain_password, hashed_password) -> Tuple[bool, Optional[str]]:
+    """Vérifier un mot de passe et retourner le nouveau hachage à enregistrer si nécessaire.
+
+    Retourne (valide, nouveau_hash); nouveau_hash vaut None quand le hachage stocké est à jour.
+    Les anciens hachages SHA256 et les hachages bcrypt d'un autre coût sont réécrits.
+    """
+    if not hashed_password:
+        return False, None
+
+    if is_legacy_hash(hashed_password):
+        sha256_hash = hashlib.sha256(plain_password.encode()).hexdigest()
+        if not hmac.compare_digest(sha256_hash, hashed_password):
+            return False, None
+        return True, get_password_hash(plain_password)
+
     try:
-        return pwd_context.verify(plain_password, hashed_password)
-    except Exception as e:
-        print(f"[SECURITY] Erreur bcrypt: {e}")
-        
-        # Fallback: essayer SHA256
-        try:
-            sha256_hash = hashlib.sha256(plain_password.encode()).hexdigest()
-            return sha256_hash == hashed_password
-        except Exception as e2:
-            print(f"[SECURITY] Erreur SHA256: {e2}")
-            return False
+        if not pwd_context.verify(plain_password, hashed_password):
+            return False, None
+    except (ValueError, TypeError) as e:
+        logger.warning(f"[SECURITY] Hachage de mot de passe illisible: {e}")
+        return False, None
+
+    if pwd_context.needs_update(hashed_password):
+        return True, get_password_hash(plain_password)
+    return True, None
+
+def verify_password(plain_password, hashed_password):
+    return verify_and_update(plain_password, hashed_password)[0]
 
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+# Vérification bcrypt dans un pool borné
+
+class PasswordPoolSaturated(Exception):
+    """Trop de vérifications de mot de passe en attente"""
+
+class PasswordVerificationPool:
+    """Exécute bcrypt sur au plus `max_workers` threads.
+
+    Au-delà de `max_workers + max_pending` vérifications en cours, les nouvelles
+    demandes attendent au plus `wait_seconds` puis échouent (PasswordPoolSaturated):
+    un pic de connexions dégrade en 503 au lieu de saturer tous les CPU.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int, wait_seconds: float):
+        self.max_workers = max_workers
+        self.wait_seconds = wait_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+
+    def verify_and_update(self, plain_password, hashed_password) -> Tuple[bool, Optional[str]]:
+        if not self._slots.acquire(timeout=self.wait_seconds):
+            raise PasswordPoolSaturated("Trop de vérifications de mot de passe en cours")
+        try:
+            future = self._executor.submit(verify_and_update, plain_password, hashed_password)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+password_pool = PasswordVerificationPool(
+    max_workers=settings.BCRYPT_MAX_WORKERS,
+    max_pending=settings.BCRYPT_MAX_PENDING,
+    wait_seconds=settings.BCRYPT_WAIT_SECONDS
+)
+
 # Création et validation de JWT
 
 def create_access_token(data: dict, expires_delta: int = None):
@@ -47,47 +115,102 @@ def decode_access_token(token: str):
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         return payload
     except InvalidTokenError as e:
-        print(f"JWT Error: {e}")
+        logger.debug(f"JWT Error: {e}")
         return None
 
+# Cache des utilisateurs authentifiés (clé: `sub` du token)
+
+_user_cache: Dict[str, Tuple[float, User]] = {}
+_user_cache_lock = threading.Lock()
+_user_cache_generation = 0
+
+def _snapshot_user(user: User) -> User:
+    """Copie détachée des colonnes d'un utilisateur, indépendante de toute session"""
+    snapshot = User(**{attr.key: getattr(user, attr.key) for attr in sa_inspect(User).column_attrs})
+    make_transient_to_detached(snapshot)
+    return snapshot
+
+def get_cached_user(db: Session, email: str) -> Optional[User]:
+    """Utilisateur par email, servi depuis le cache pendant USER_CACHE_TTL_SECONDS.
+
+    L'instance retournée est attachée à `db` sans requête (merge load=False) et
+    s'utilise comme un résultat de requête normal (relations, modifications).
+    """
+    now = time.monotonic()
+    with _user_cache_lock:
+        entry, generation = _user_cache.get(email), _user_cache_generation
+    if entry and entry[0] > now:
+        return db.merge(entry[1], load=False)
+
+    user = db.query(User).filter(User.email == email).first()
+    if user is not None and settings.USER_CACHE_TTL_SECONDS > 0:
+        with _user_cache_lock:
+            # Une invalidation pendant la lecture rend cette version périmée: ne pas la garder
+            if generation == _user_cache_generation:
+                _user_cache[email] = (now + settings.USER_CACHE_TTL_SECONDS, _snapshot_user(user))
+    return user
+
+def invalidate_user_cache(user_id: Optional[int] = None, email: Optional[str] = None) -> None:
+    """Retirer un utilisateur du cache (ou vider le cache sans argument)"""
+    global _user_cache_generation
+    with _user_cache_lock:
+        _user_cache_generation += 1
+        if user_id is None and email is None:
+            _user_cache.clear()
+            return
+        for key, (_, cached) in list(_user_cache.items()):
+            if key == email or cached.id == user_id:
+                del _user_cache[key]
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _flag_cached_user(mapper, connection, target):
+    """Rôle, mot de passe, email ou statut modifiés: oublier l'ancienne version au commit.
+
+    Invalider au flush laisserait une requête concurrente recharger la ligne d'avant
+    le commit et la remettre en cache pour tout le TTL.
+    """
+    session = object_session(target)
+    if session is None:
+        invalidate_user_cache(user_id=target.id)
+    else:
+        session.info.setdefault("changed_user_ids", set()).add(target.id)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    for user_id in session.info.pop("changed_user_ids", ()):
+        invalidate_user_cache(user_id=user_id)
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_rolled_back_users(session, previous_transaction):
+    session.info.pop("changed_user_ids", None)
+
 # Authentification et autorisation
 
 def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
     db: Session = Depends(get_db)
 ) -> User:
-    print(f"[DEBUG] get_current_user appelée")
-    print(f"[DEBUG] Token reçu: {credentials.credentials[:50]}...")
-    
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
-    try:
-        payload = decode_access_token(credentials.credentials)
-        print(f"[DEBUG] Payload décodé: {payload}")
-        if payload is None:
-            print(f"[DEBUG] Payload est None")
-            raise credentials_exception
-        user_email: str = payload.get("sub")
-        print(f"[DEBUG] Email extrait: {user_email}")
-        if user_email is None:
-            print(f"[DEBUG] Email est None")
-            raise credentials_exception
-    except InvalidTokenError as e:
-        print(f"[DEBUG] JWT Error: {e}")
+
+    if credentials is None:
+        raise credentials_exception
+    payload = decode_access_token(credentials.credentials)
+    if payload is None:
+        raise credentials_exception
+    user_email: str = payload.get("sub")
+    if user_email is None:
         raise credentials_exception
-    
-    print(f"[DEBUG] Recherche utilisateur avec email: {user_email}")
-    user = db.query(User).filter(User.email == user_email).first()
-    print(f"[DEBUG] Utilisateur trouvé: {user}")
+
+    user = get_cached_user(db, user_email)
     if user is None:
-        print(f"[DEBUG] Utilisateur non trouvé")
+        logger.debug(f"Utilisateur du token introuvable: {user_email}")
         raise credentials_exception
-    
-    print(f"[DEBUG] Utilisateur retourné: id={user.id}, role={user.role}")
+
     return user
 
 def require_role(allowed_roles):
@@ -102,4 +225,4 @@ def require_role(allowed_roles):
                 detail="Permissions insuffisantes"
             )
         return current_user
-    return role_checker 
\ No newline at end of file
+    return role_checker
\ No newline at end of file
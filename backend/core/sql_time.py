@@ -0,0 +1,22 @@
+"""Expressions SQL temporelles portables (SQLite / PostgreSQL) pour les requêtes text()"""
+
+
+def day_of_sql(dialect_name: str, column: str) -> str:
+    """Tronquer un horodatage au jour"""
+    if dialect_name == "postgresql":
+        return f"CAST({column} AS DATE)"
+    return f"date({column})"
+
+
+def hour_of_sql(dialect_name: str, column: str) -> str:
+    """Heure (0-23) d'un horodatage"""
+    if dialect_name == "postgresql":
+        return f"CAST(EXTRACT(HOUR FROM {column}) AS INTEGER)"
+    return f"CAST(strftime('%H', {column}) AS INTEGER)"
+
+
+def day_number_sql(dialect_name: str, column: str) -> str:
+    """Numéro de jour continu: jours consécutifs = entiers consécutifs"""
+    if dialect_name == "postgresql":
+        return f"({column} - DATE '1970-01-01')"
+    return f"CAST(julianday({column}) AS INTEGER)"
@@ -4,9 +4,12 @@ Banque d'exercices de remédiation diversifiée
 Évite la redondance et propose une variété d'activités d'apprentissage
 """
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+import logging
 import random
 
+logger = logging.getLogger(__name__)
+
 # ============================================================================
 # EXERCICES DE GRAMMAIRE FRANÇAISE
 # ============================================================================
@@ -290,10 +293,12 @@ INTERACTIVE_EXERCISES = {
 # FONCTIONS DE SÉLECTION INTELLIGENTE
 # ============================================================================
 
+DIFFICULTY_ORDER = ["facile", "intermédiaire", "avancé"]
+
 class RemediationExerciseBank:
     """Banque d'exercices de remédiation avec sélection intelligente"""
     
-    def __init__(self):
+    def __init__(self, history=None):
         self.all_exercises = {
             "grammar": GRAMMAR_EXERCISES,
             "conjugation": CONJUGATION_EXERCISES,
@@ -302,96 +307,106 @@ class RemediationExerciseBank:
             "interactive": INTERACTIVE_EXERCISES
         }
         
-        # Historique des exercices déjà proposés (pour éviter la redondance)
-        self.exercise_history = {}
+        # Index précalculés: par id, par catégorie et par (catégorie, difficulté)
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._by_category: Dict[str, List[Dict[str, Any]]] = {}
+        self._by_category_difficulty: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        for category, subcategories in self.all_exercises.items():
+            exercises = [ex for exercise_list in subcategories.values() for ex in exercise_list]
+            self._by_category[category] = exercises
+            for ex in exercises:
+                self._by_id[ex["id"]] = ex
+                self._by_category_difficulty.setdefault((category, ex["difficulty"]), []).append(ex)
+        
+        # Candidats par (catégories, difficulté), construits une seule fois
+        self._pools: Dict[Tuple[Tuple[str, ...], Optional[str]], List[Dict[str, Any]]] = {}
+        
+        # Historique des exercices déjà proposés (persistant, partagé entre workers)
+        if history is None:
+            from services.exercise_history import exercise_history as history
+        self.history = history
+    
+    def _categories_for(self, topic: Optional[str]) -> Tuple[str, ...]:
+        """Catégories correspondant au topic: nom exact, sinon correspondance partielle"""
+        if not topic or topic.lower() == "all":
+            return tuple(self.all_exercises)
+        topic = topic.lower()
+        if topic in self.all_exercises:
+            return (topic,)
+        return tuple(category for category in self.all_exercises if topic in category)
+    
+    def _pool(self, categories: Tuple[str, ...], difficulty: Optional[str]) -> List[Dict[str, Any]]:
+        key = (categories, difficulty)
+        pool = self._pools.get(key)
+        if pool is None:
+            if difficulty is None:
+                pool = [ex for category in categories for ex in self._by_category[category]]
+            else:
+                pool = [ex for category in categories
+                        for ex in self._by_category_difficulty.get((category, difficulty), [])]
+            self._pools[key] = pool
+        return pool
+    
+    @staticmethod
+    def _sample(pool: List[Dict[str, Any]], count: int, seen=()) -> List[Dict[str, Any]]:
+        """Tirage aléatoire sans remise de `count` exercices non vus.
+        
+        Tirage par indices (O(count) tant que peu d'exercices ont été vus); quand
+        plus de la moitié du pool a été tirée, on termine par un passage linéaire.
+        """
+        n = len(pool)
+        picked, tried = [], set()
+        while len(picked) < count and len(tried) < n:
+            if len(tried) * 2 > n:
+                rest = [ex for i, ex in enumerate(pool) if i not in tried and ex["id"] not in seen]
+                picked.extend(random.sample(rest, min(count - len(picked), len(rest))))
+                break
+            i = random.randrange(n)
+            if i in tried:
+                continue
+            tried.add(i)
+            if pool[i]["id"] not in seen:
+                picked.append(pool[i])
+        return picked
     
     def get_diverse_exercises(self, topic: str, difficulty: str, count: int = 3, 
                             student_id: int = None, avoid_repetition: bool = True) -> List[Dict[str, Any]]:
         """
         Sélectionne des exercices diversifiés en évitant la redondance
         """
-        # Récupérer tous les exercices du topic demandé
-        available_exercises = []
-        
-        # Correspondance directe par nom de catégorie
-        if topic.lower() in self.all_exercises:
-            category_exercises = self.all_exercises[topic.lower()]
-            for subcategory, exercise_list in category_exercises.items():
-                available_exercises.extend(exercise_list)
-        
-        # Si aucune correspondance directe, essayer une correspondance partielle
-        if not available_exercises:
-            for category, exercises in self.all_exercises.items():
-                if topic.lower() in category.lower():
-                    for subcategory, exercise_list in exercises.items():
-                        available_exercises.extend(exercise_list)
-        
-        # Log pour debug
-        print(f"🔍 [EXERCISE_BANK] Topic demandé: {topic}")
-        print(f"🔍 [EXERCISE_BANK] Catégories disponibles: {list(self.all_exercises.keys())}")
-        print(f"🔍 [EXERCISE_BANK] Exercices trouvés: {len(available_exercises)}")
+        categories = self._categories_for(topic)
+        if difficulty == "all":
+            difficulty = None
+        available_exercises = self._pool(categories, difficulty)
         
-        # Filtrer par difficulté si spécifiée
-        if difficulty:
-            before_filter = len(available_exercises)
-            available_exercises = [ex for ex in available_exercises if ex["difficulty"] == difficulty]
-            after_filter = len(available_exercises)
-            print(f"🔍 [EXERCISE_BANK] Filtrage par difficulté '{difficulty}': {before_filter} → {after_filter} exercices")
-            
-            # Si aucun exercice trouvé avec la difficulté demandée, essayer d'autres difficultés
-            if after_filter == 0:
-                print(f"⚠️ [EXERCISE_BANK] Aucun exercice trouvé avec difficulté '{difficulty}', recherche de difficultés alternatives...")
-                # Récupérer tous les exercices du topic sans filtrage de difficulté
-                all_topic_exercises = []
-                if topic.lower() in self.all_exercises:
-                    category_exercises = self.all_exercises[topic.lower()]
-                    for subcategory, exercise_list in category_exercises.items():
-                        all_topic_exercises.extend(exercise_list)
-                
-                if all_topic_exercises:
-                    # Prendre les exercices de la difficulté la plus proche
-                    difficulty_order = ["facile", "intermédiaire", "avancé"]
-                    target_index = difficulty_order.index(difficulty) if difficulty in difficulty_order else 1
-                    
-                    # Essayer d'abord la difficulté demandée, puis les plus proches
-                    for diff in [difficulty] + difficulty_order:
-                        if diff in difficulty_order:
-                            diff_exercises = [ex for ex in all_topic_exercises if ex["difficulty"] == diff]
-                            if diff_exercises:
-                                available_exercises = diff_exercises
-                                print(f"✅ [EXERCISE_BANK] Utilisation de difficulté alternative '{diff}': {len(available_exercises)} exercices")
-                                break
+        # Si aucun exercice avec la difficulté demandée (catégorie exacte), essayer les autres
+        if not available_exercises and difficulty and topic and topic.lower() in self.all_exercises:
+            for diff in DIFFICULTY_ORDER:
+                available_exercises = self._pool(categories, diff)
+                if available_exercises:
+                    logger.info(f"✅ [EXERCISE_BANK] Difficulté '{difficulty}' absente pour '{topic}', "
+                                f"utilisation de '{diff}' ({len(available_exercises)} exercices)")
+                    break
         
         # Éviter la redondance si demandé
-        if avoid_repetition and student_id:
-            if student_id not in self.exercise_history:
-                self.exercise_history[student_id] = set()
-            
-            # Filtrer les exercices déjà proposés
-            available_exercises = [ex for ex in available_exercises 
-                                 if ex["id"] not in self.exercise_history[student_id]]
+        seen = self.history.seen(student_id) if avoid_repetition and student_id else {}
+        selected_exercises = self._sample(available_exercises, count, seen)
         
-        # Mélanger pour plus de variété
-        random.shuffle(available_exercises)
-        
-        # Sélectionner le nombre demandé
-        selected_exercises = available_exercises[:count]
+        # Pool épuisé pour cet élève: reproposer les exercices vus il y a le plus longtemps
+        if len(selected_exercises) < count and seen:
+            oldest_first = sorted((ex for ex in available_exercises if ex["id"] in seen),
+                                  key=lambda ex: seen[ex["id"]])
+            selected_exercises.extend(oldest_first[:count - len(selected_exercises)])
         
         # Mettre à jour l'historique
         if student_id:
-            for exercise in selected_exercises:
-                self.exercise_history[student_id].add(exercise["id"])
+            self.history.record(student_id, [exercise["id"] for exercise in selected_exercises])
         
         return selected_exercises
     
     def get_exercise_by_id(self, exercise_id: str) -> Dict[str, Any]:
         """Récupère un exercice spécifique par son ID"""
-        for category in self.all_exercises.values():
-            for subcategory in category.values():
-                for exercise in subcategory:
-                    if exercise["id"] == exercise_id:
-                        return exercise
-        return None
+        return self._by_id.get(exercise_id)
     
     def get_random_exercise(self, topic: str = None, difficulty: str = None) -> Dict[str, Any]:
         """Récupère un exercice aléatoire"""
@@ -400,8 +415,6 @@ class RemediationExerciseBank:
     
     def get_progressive_exercises(self, topic: str, student_level: str, count: int = 3) -> List[Dict[str, Any]]:
         """Récupère des exercices progressifs selon le niveau de l'étudiant"""
-        difficulty_order = ["facile", "intermédiaire", "avancé"]
-        
         if student_level == "débutant":
             target_difficulties = ["facile"]
         elif student_level == "intermédiaire":
@@ -451,18 +464,13 @@ def get_exercise_statistics() -> Dict[str, Any]:
     by_category = {}
     by_difficulty = {}
     
-    for category_name, category in exercise_bank.all_exercises.items():
-        category_count = 0
-        for subcategory in category.values():
-            for exercise in subcategory:
-                total_exercises += 1
-                category_count += 1
-                
-                # Compter par difficulté
-                difficulty = exercise["difficulty"]
-                by_difficulty[difficulty] = by_difficulty.get(difficulty, 0) + 1
-        
-        by_category[category_name] = category_count
+    for category_name, exercises in exercise_bank._by_category.items():
+        total_exercises += len(exercises)
+        by_category[category_name] = len(exercises)
+    
+    # Compter par difficulté
+    for (_, difficulty), exercises in exercise_bank._by_category_difficulty.items():
+        by_difficulty[difficulty] = by_difficulty.get(difficulty, 0) + len(exercises)
     
     return {
         "total_exercises": total_exercises,
@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+Générateur de données synthétiques déterministe (graine fixe)
+Construit écoles, enseignants, classes, élèves, quiz, assignations et plusieurs
+années de quiz_results / learning_history par insertions groupées, puis
+reconstruit toutes les tables dérivées (cubes analytiques, activité quotidienne,
+compteurs de badges, journal des évaluations, calendrier, échéances, catalogue,
+statistiques d'items, recommandations) que les insertions groupées ne maintiennent pas.
+
+Il n'y a pas de table des écoles: une école est un groupe d'enseignants et
+d'élèves partageant un domaine d'email (ecoleN.synth.najah.ma).
+
+La taille est pilotée par le nombre de quiz_results visés (10k à 1M lignes);
+les autres volumes en découlent. Même graine + même date de fin = mêmes données.
+
+Usage:
+    python generate_synthetic_data.py --results 100000 --years 3 --seed 42
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+
+SUBJECTS = ["Mathématiques", "Français", "Arabe", "Sciences", "Histoire-Géographie", "Anglais", "Physique-Chimie"]
+LEVELS = ["primary", "middle", "high"]
+DIFFICULTIES = ["easy", "medium", "hard"]
+HISTORY_ACTIONS = ["start", "complete", "answer_qcm", "review"]
+
+SYNTHETIC_PASSWORD = "synthetique123"
+
+@dataclass
+class SyntheticScale:
+    """Volumes dérivés du nombre de quiz_results visés"""
+    results: int = 10_000
+    years: int = 2
+    results_per_student: int = 120
+    history_per_result: float = 2.0
+    students_per_class: int = 28
+    classes_per_teacher: int = 3
+    teachers_per_school: int = 12
+    quizzes_per_teacher: int = 15
+    questions_per_quiz: int = 5
+    # Derniers quiz de chaque enseignant: assignés mais pas encore passés
+    pending_quizzes_per_teacher: int = 3
+
+    @property
+    def students(self) -> int:
+        return max(self.students_per_class, self.results // self.results_per_student)
+
+    @property
+    def classes(self) -> int:
+        return max(1, -(-self.students // self.students_per_class))
+
+    @property
+    def teachers(self) -> int:
+        return max(1, -(-self.classes // self.classes_per_teacher))
+
+    @property
+    def schools(self) -> int:
+        return max(1, -(-self.teachers // self.teachers_per_school))
+
+@dataclass
+class GenerationReport:
+    counts: Dict[str, int] = field(default_factory=dict)
+    timings: Dict[str, float] = field(default_factory=dict)
+    password: str = SYNTHETIC_PASSWORD
+
+class SyntheticDataGenerator:
+    """Insertions groupées déterministes (ids attribués côté Python, par lots)"""
+
+    def __init__(self, db: Session, scale: SyntheticScale, seed: int = 42,
+                 end_date: Optional[datetime] = None, chunk_size: int = 5000):
+        self.db = db
+        self.scale = scale
+        self.rng = random.Random(seed)
+        self.seed = seed
+        self.end_date = (end_date or datetime.utcnow()).replace(hour=0, minute=0, second=0, microsecond=0)
+        self.start_date = self.end_date - timedelta(days=365 * scale.years)
+        self.chunk_size = chunk_size
+        self.report = GenerationReport()
+
+    # ------------------------------------------------------------------
+    # Outils
+    # ------------------------------------------------------------------
+
+    def _next_id(self, model) -> int:
+        return (self.db.query(func.max(model.id)).scalar() or 0) + 1
+
+    def _bulk_insert(self, model, rows: List[dict]) -> None:
+        for i in range(0, len(rows), self.chunk_size):
+            self.db.execute(insert(model), rows[i:i + self.chunk_size])
+
+    def _random_moment(self) -> datetime:
+        # Activité scolaire: jours de semaine, entre 8h et 20h
+        while True:
+            moment = self.start_date + timedelta(days=self.rng.randrange(365 * self.scale.years))
+            if moment.weekday() < 5:
+                break
+        return moment + timedelta(hours=self.rng.randint(8, 19), minutes=self.rng.randrange(60),
+                                  seconds=self.rng.randrange(60))
+
+    def _step(self, label: str, started: float, count: int) -> None:
+        self.report.counts[label] = count
+        self.report.timings[label] = time.perf_counter() - started
+        print(f"  ✅ {label}: {count} lignes en {self.report.timings[label]:.2f}s")
+
+    # ------------------------------------------------------------------
+    # Génération
+    # ------------------------------------------------------------------
+
+    def generate(self) -> GenerationReport:
+        from core.security import get_password_hash
+
+        scale = self.scale
+        print(f"🏫 {scale.schools} écoles, {scale.teachers} enseignants, {scale.classes} classes, "
+              f"{scale.students} élèves, ~{scale.results} résultats sur {scale.years} ans (graine {self.seed})")
+        # Un seul hachage bcrypt partagé: le coût du hachage n'est pas l'objet des données
+        hashed_password = get_password_hash(SYNTHETIC_PASSWORD)
+
+        teachers = self._generate_users("teacher", scale.teachers, hashed_password)
+        students = self._generate_users("student", scale.students, hashed_password)
+        classes = self._generate_classes(teachers, students)
+        quizzes = self._generate_quizzes(teachers)
+        self._generate_assignments(classes, quizzes)
+        self._generate_results(classes, quizzes)
+        self.db.commit()
+        self._rebuild_derived()
+        return self.report
+
+    def _generate_users(self, role: str, count: int, hashed_password: str) -> List[dict]:
+        from models.user import User, UserRole
+
+        started = time.perf_counter()
+        first_id = self._next_id(User)
+        per_school = -(-count // self.scale.schools)
+        rows = []
+        for i in range(count):
+            school = i // per_school + 1
+            user_id = first_id + i
+            rows.append({
+                "id": user_id,
+                "username": f"synth_{role}_{self.seed}_{i}",
+                "email": f"{role}{i}.s{self.seed}@ecole{school}.synth.najah.ma",
+                "hashed_password": hashed_password,
+                "role": UserRole(role),
+                "is_active": True,
+                "first_name": f"{role.capitalize()}{i}",
+                "last_name": f"Ecole{school}",
+                "created_at": self.start_date,
+            })
+        self._bulk_insert(User, rows)
+        self._step(f"users ({role})", started, len(rows))
+        return rows
+
+    def _generate_classes(self, teachers: List[dict], students: List[dict]) -> List[dict]:
+        from models.class_group import ClassGroup, ClassStudent
+
+        started = time.perf_counter()
+        first_class_id = self._next_id(ClassGroup)
+        first_member_id = self._next_id(ClassStudent)
+        classes, members = [], []
+        per_class = self.scale.students_per_class
+        for c in range(self.scale.classes):
+            teacher = teachers[c // self.scale.classes_per_teacher]
+            roster = [s["id"] for s in students[c * per_class:(c + 1) * per_class]]
+            classes.append({
+                "id": first_class_id + c,
+                "name": f"Classe synthétique {c + 1}",
+                "teacher_id": teacher["id"],
+                "level": self.rng.choice(LEVELS),
+                "subject": self.rng.choice(SUBJECTS),
+                "max_students": per_class,
+                "is_active": True,
+                "created_at": self.start_date,
+                "roster": roster,
+            })
+            members.extend({"class_id": first_class_id + c, "student_id": student_id} for student_id in roster)
+        for i, member in enumerate(members):
+            member["id"] = first_member_id + i
+
+        self._bulk_insert(ClassGroup, [{k: v for k, v in c.items() if k != "roster"} for c in classes])
+        self._bulk_insert(ClassStudent, members)
+        self._step("class_groups", started, len(classes))
+        self.report.counts["class_students"] = len(members)
+        return classes
+
+    def _generate_quizzes(self, teachers: List[dict]) -> Dict[int, List[dict]]:
+        from models.quiz import Question, Quiz
+
+        started = time.perf_counter()
+        quiz_id = self._next_id(Quiz)
+        question_id = self._next_id(Question)
+        quizzes_by_teacher: Dict[int, List[dict]] = {}
+        quizzes, questions = [], []
+        for teacher in teachers:
+            own = []
+            for q in range(self.scale.quizzes_per_teacher):
+                subject = self.rng.choice(SUBJECTS)
+                quiz = {
+                    "id": quiz_id,
+                    "title": f"{subject} - évaluation {q + 1}",
+                    "subject": subject,
+                    "level": self.rng.choice(LEVELS),
+                    "difficulty": self.rng.choice(DIFFICULTIES),
+                    "time_limit": self.rng.choice([10, 15, 20, 30]),
+                    "max_score": 100,
+                    "is_active": True,
+                    "created_by": teacher["id"],
+                    "created_at": self.start_date,
+                }
+                for n in range(self.scale.questions_per_quiz):
+                    options = [f"Réponse {k}" for k in "ABCD"]
+                    questions.append({
+                        "id": question_id,
+                        "quiz_id": quiz_id,
+                        "question_text": f"Question {n + 1} ({subject})",
+                        "question_type": "mcq",
+                        "options": options,
+                        "correct_answer": self.rng.choice(options),
+                        "points": 1,
+                        "order": n,
+                    })
+                    question_id += 1
+                quizzes.append(quiz)
+                own.append(quiz)
+                quiz_id += 1
+            quizzes_by_teacher[teacher["id"]] = own
+
+        self._bulk_insert(Quiz, quizzes)
+        self._bulk_insert(Question, questions)
+        self._step("quizzes", started, len(quizzes))
+        self.report.counts["questions"] = len(questions)
+        return quizzes_by_teacher
+
+    def _generate_assignments(self, classes: List[dict], quizzes: Dict[int, List[dict]]) -> None:
+        """Assignations par élève: les quiz passés (terminés) et les quiz en cours (à rendre)"""
+        from models.quiz import QuizAssignment
+
+        started = time.perf_counter()
+        assignment_id = self._next_id(QuizAssignment)
+        pending = self.scale.pending_quizzes_per_teacher
+        rows = []
+        for group in classes:
+            own = quizzes[group["teacher_id"]]
+            for index, quiz in enumerate(own):
+                is_pending = index >= len(own) - pending
+                for student_id in group["roster"]:
+                    due = self.end_date + timedelta(days=self.rng.randint(-3, 10)) if is_pending \
+                        else self._random_moment()
+                    rows.append({
+                        "id": assignment_id,
+                        "quiz_id": quiz["id"],
+                        "class_id": group["id"],
+                        "student_id": student_id,
+                        "assigned_by": group["teacher_id"],
+                        "due_date": due,
+                        "status": "assigned" if is_pending else "completed",
+                        "is_active": True,
+                        "created_at": min(due, self.end_date) - timedelta(days=7),
+                    })
+                    assignment_id += 1
+        self._bulk_insert(QuizAssignment, rows)
+        self._step("quiz_assignments", started, len(rows))
+
+    def _generate_results(self, classes: List[dict], quizzes: Dict[int, List[dict]]) -> None:
+        """quiz_results et learning_history, générés et insérés par lots (mémoire bornée)"""
+        from models.learning_history import LearningHistory
+        from models.quiz import QuizResult
+
+        started = time.perf_counter()
+        result_id = self._next_id(QuizResult)
+        history_id = self._next_id(LearningHistory)
+        pending = self.scale.pending_quizzes_per_teacher
+        per_student = max(1, self.scale.results // self.scale.students)
+        results, history = [], []
+        total_results = total_history = 0
+
+        def flush():
+            nonlocal results, history, total_results, total_history
+            self._bulk_insert(QuizResult, results)
+            self._bulk_insert(LearningHistory, history)
+            total_results += len(results)
+            total_history += len(history)
+            results, history = [], []
+
+        for group in classes:
+            own = quizzes[group["teacher_id"]]
+            past = own[:max(1, len(own) - pending)]
+            for student_id in group["roster"]:
+                # Niveau propre à l'élève, pour des distributions de scores réalistes
+                ability = self.rng.gauss(68, 14)
+                for _ in range(per_student):
+                    quiz = self.rng.choice(past)
+                    moment = self._random_moment()
+                    percentage = round(min(100.0, max(0.0, self.rng.gauss(ability, 12))), 1)
+                    results.append({
+                        "id": result_id,
+                        "user_id": student_id,
+                        "student_id": student_id,
+                        "quiz_id": quiz["id"],
+                        "score": percentage,
+                        "max_score": 100.0,
+                        "percentage": percentage,
+                        "is_completed": True,
+                        "completed_at": moment,
+                        "sujet": quiz["subject"],
+                        "answers": "{}",
+                        "time_spent": self.rng.randint(60, quiz["time_limit"] * 60),
+                        "created_at": moment,
+                    })
+                    events = int(self.scale.history_per_result) + \
+                        (1 if self.rng.random() < self.scale.history_per_result % 1 else 0)
+                    for e in range(events):
+                        action = HISTORY_ACTIONS[e] if e < len(HISTORY_ACTIONS) else "review"
+                        history.append({
+                            "id": history_id,
+                            "student_id": student_id,
+                            "action": action,
+                            "score": percentage if action == "complete" else None,
+                            "progression": 100.0 if action == "complete" else round(self.rng.uniform(0, 100), 1),
+                            "details": json.dumps({"quiz_id": quiz["id"], "result_id": result_id}),
+                            "timestamp": moment - timedelta(minutes=(events - e) * 3),
+                        })
+                        history_id += 1
+                    result_id += 1
+                if len(results) >= self.chunk_size * 4:
+                    flush()
+        flush()
+        self._step("quiz_results", started, total_results)
+        self.report.counts["learning_history"] = total_history
+
+    def _rebuild_derived(self) -> None:
+        """Les insertions groupées contournent les listeners: reconstruire toutes les tables dérivées.
+
+        Mêmes reconstructions que les scripts rebuild_*.py / backfill_*.py, y compris
+        pour les sources non générées (devoirs, contenus, tests adaptatifs): les lignes
+        dérivées de données déjà présentes dans la base restent cohérentes.
+        """
+        from services.activity_streaks import ActivityStreakService
+        from services.analytics_cubes import AnalyticsCubeService
+        from services.assessment_events import AssessmentEventLog
+        from services.badge_rule_engine import BadgeRuleEngine
+        from services.calendar_feed import CalendarFeed
+        from services.content_recommender import RecommenderJob
+        from services.deadline_scheduler import deadline_scheduler
+        from services.item_statistics import item_statistics
+        from services.library_catalogue import LibraryCatalogue
+
+        rebuilds = [
+            ("analytics_cubes", lambda: AnalyticsCubeService(self.db).rebuild()),
+            ("daily_activity_rollups", lambda: ActivityStreakService(self.db).rebuild()),
+            ("student_badge_counters", lambda: BadgeRuleEngine(self.db).backfill()["counters"]),
+            ("assessment_events", lambda: AssessmentEventLog(self.db).backfill()),
+            ("calendar_entries", lambda: sum(CalendarFeed(self.db).rebuild().values())),
+            ("deadline_events", lambda: deadline_scheduler.rebuild(self.db)),
+            ("library_catalogue", lambda: LibraryCatalogue(self.db).rebuild()),
+            ("adaptive_item_stats", lambda: item_statistics.rebuild(self.db)),
+            ("content_recommendations", lambda: RecommenderJob(self.db).run(full=True).students_updated),
+        ]
+        for label, rebuild in rebuilds:
+            started = time.perf_counter()
+            self._step(label, started, rebuild())
+
+def generate_synthetic_data(results=10_000, years=2, seed=42, end_date=None, chunk_size=5000):
+    from core.database import Base, SessionLocal, engine
+    from models.adaptive_evaluation import (AdaptiveQuestion, AdaptiveTest, QuestionResponse,
+                                            TestAssignment, TestAttempt)
+    import app  # noqa: F401  (enregistre tous les modèles, y compris ceux importés par les routeurs)
+
+    Base.metadata.create_all(bind=engine)
+    # Tables des tests adaptatifs lues par les reconstructions (metadata séparée, sans les
+    # tables liées à users qu'elle ne connaît pas)
+    adaptive_tables = [model.__table__ for model in (AdaptiveTest, AdaptiveQuestion, TestAssignment,
+                                                     TestAttempt, QuestionResponse)]
+    adaptive_tables[0].metadata.create_all(bind=engine, tables=adaptive_tables)
+    db = SessionLocal()
+    try:
+        scale = SyntheticScale(results=results, years=years)
+        started = time.perf_counter()
+        report = SyntheticDataGenerator(db, scale, seed=seed, end_date=end_date, chunk_size=chunk_size).generate()
+        print(f"🎉 Données synthétiques générées en {time.perf_counter() - started:.1f}s")
+        return report
+    except Exception as e:
+        print(f"❌ Erreur lors de la génération: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Générer des données synthétiques déterministes")
+    parser.add_argument("--results", type=int, default=10_000, help="Nombre de quiz_results visés (10k à 1M)")
+    parser.add_argument("--years", type=int, default=2, help="Profondeur de l'historique en années")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--end-date", type=lambda value: datetime.strptime(value, "%Y-%m-%d"),
+                        help="Date de fin de l'historique (AAAA-MM-JJ, aujourd'hui par défaut)")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Lignes par INSERT groupé")
+    args = parser.parse_args()
+
+    try:
+        generate_synthetic_data(args.results, args.years, args.seed, args.end_date, args.chunk_size)
+    except Exception:
+        sys.exit(1)
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Test de charge de l'API sur données synthétiques
+Génère un jeu de données déterministe (generate_synthetic_data.py) dans une base
+SQLite temporaire, puis rejoue un mélange de trafic réaliste contre l'application
+en processus: connexions, soumissions de quiz, tableaux de bord élève et
+enseignant, analytics. Affiche p50/p95/p99 par endpoint.
+
+Le mélange de requêtes est tiré avec la graine: deux exécutions sur la même
+machine sont comparables, une régression de latence devient mesurable. Avec
+--json, les chiffres sont écrits dans un fichier pour comparaison entre versions.
+
+Usage:
+    python load_test_api.py --results 50000 --requests 2000 --concurrency 16
+    python load_test_api.py --results 10000 --json load_test.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+# (endpoint, poids, rôle de l'appelant)
+TRAFFIC_MIX = [
+    ("login", 8, "student"),
+    ("quiz_submit", 12, "student"),
+    ("student_results", 14, "student"),
+    ("student_activity", 10, "student"),
+    ("teacher_dashboard", 12, "teacher"),
+    ("teacher_class_metrics", 8, "teacher"),
+    ("teacher_assignments", 6, "teacher"),
+    ("notifications_quiz", 6, "teacher"),
+    ("notifications_summary", 8, "teacher"),
+    ("analytics_class_overview", 10, "teacher"),
+    ("analytics_weekly_progress", 5, "teacher"),
+    ("analytics_score_distribution", 5, "teacher"),
+]
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def summarize(latencies, statuses):
+    return {
+        "count": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "max_ms": round(max(latencies, default=0) * 1000, 1),
+        "statuses": dict(statuses),
+    }
+
+def run_load_test(results, years, seed, requests, concurrency, bcrypt_rounds, json_path=None):
+    # Base temporaire et configuration avant l'import de l'application
+    db_file = os.path.join(tempfile.mkdtemp(), "load_test.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+    os.environ["BCRYPT_ROUNDS"] = str(bcrypt_rounds)
+    os.environ.setdefault("LOGIN_RATE_LIMIT", str(requests))
+    os.environ.setdefault("LOGIN_IP_RATE_LIMIT", str(requests))
+    os.environ.setdefault("DEADLINE_SCHEDULER_ENABLED", "false")
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import text
+    from app import app
+    from core.database import SessionLocal
+    from core.security import create_access_token
+    from generate_synthetic_data import generate_synthetic_data
+
+    generated = generate_synthetic_data(results=results, years=years, seed=seed)
+
+    db = SessionLocal()
+    try:
+        users = db.execute(text("SELECT id, email, role FROM users WHERE email LIKE '%.synth.najah.ma'")).fetchall()
+        classes = db.execute(text("SELECT id, teacher_id FROM class_groups")).fetchall()
+        pending = db.execute(text(
+            "SELECT student_id, quiz_id FROM quiz_assignments WHERE status = 'assigned' ORDER BY id"
+        )).fetchall()
+        questions = defaultdict(list)
+        for quiz_id, question_id, options in db.execute(text("SELECT quiz_id, id, options FROM questions")):
+            questions[quiz_id].append((question_id, json.loads(options) if isinstance(options, str) else options))
+    finally:
+        db.close()
+
+    rng = random.Random(seed)
+    students = [u for u in users if str(u.role).endswith("student")]
+    teachers = [u for u in users if str(u.role).endswith("teacher")]
+    classes_by_teacher = defaultdict(list)
+    for class_id, teacher_id in classes:
+        classes_by_teacher[teacher_id].append(class_id)
+
+    # Jetons émis directement: seule l'étape "login" mesure la vérification bcrypt
+    tokens = {u.id: create_access_token({"sub": u.email}) for u in users}
+
+    # Chaque (élève, quiz) en attente n'est soumis qu'une fois (un quiz terminé renvoie 400)
+    rng.shuffle(pending)
+
+    def build_request(endpoint, caller):
+        headers = {"Authorization": f"Bearer {tokens[caller.id]}"}
+        if endpoint == "login":
+            return "POST", "/api/v1/auth/login", {"email": caller.email, "password": generated.password}, {}
+        if endpoint == "quiz_submit":
+            if not pending:
+                return None
+            student_id, quiz_id = pending.pop()
+            answers = [{"question_id": qid, "answer": rng.choice(options or ["?"])} for qid, options in questions[quiz_id]]
+            return "POST", f"/api/v1/quizzes/{quiz_id}/submit", {"quiz_id": quiz_id, "answers": answers}, \
+                {"Authorization": f"Bearer {tokens[student_id]}"}
+        if endpoint == "student_results":
+            return "GET", f"/api/v1/quiz_results/student/{caller.id}", None, headers
+        if endpoint == "student_activity":
+            return "GET", f"/api/v1/activity/user/{caller.id}/recent", None, headers
+        if endpoint == "teacher_dashboard":
+            return "GET", "/api/v1/dashboard/dashboard-data", None, headers
+        if endpoint == "teacher_class_metrics":
+            return "GET", "/api/v1/dashboard/class-metrics", None, headers
+        if endpoint == "teacher_assignments":
+            return "GET", f"/api/v1/quiz_assignments/teacher/{caller.id}/assignments", None, headers
+        if endpoint == "notifications_quiz":
+            return "GET", f"/api/v1/notifications/quiz?teacher_id={caller.id}", None, headers
+        if endpoint == "notifications_summary":
+            return "GET", f"/api/v1/notifications/summary?teacher_id={caller.id}", None, headers
+        class_id = rng.choice(classes_by_teacher[caller.id] or [c.id for c in classes])
+        if endpoint == "analytics_class_overview":
+            return "GET", f"/api/v1/analytics/class-overview?class_id={class_id}", None, headers
+        if endpoint == "analytics_weekly_progress":
+            return "GET", f"/api/v1/analytics/weekly-progress?class_id={class_id}", None, headers
+        return "GET", "/api/v1/analytics/score-distribution", None, headers
+
+    # Programme de trafic tiré d'avance (même graine = mêmes requêtes, dans le même ordre)
+    names = [name for name, _, _ in TRAFFIC_MIX]
+    weights = [weight for _, weight, _ in TRAFFIC_MIX]
+    roles = {name: role for name, _, role in TRAFFIC_MIX}
+    schedule = []
+    for endpoint in rng.choices(names, weights=weights, k=requests):
+        caller = rng.choice(students if roles[endpoint] == "student" else teachers)
+        request = build_request(endpoint, caller)
+        if request is not None:
+            schedule.append((endpoint, request))
+
+    client = TestClient(app)
+    latencies = defaultdict(list)
+    statuses = defaultdict(Counter)
+    record_lock = threading.Lock()
+
+    def call(item):
+        endpoint, (method, path, body, headers) = item
+        start = time.perf_counter()
+        response = client.request(method, path, json=body, headers=headers)
+        elapsed = time.perf_counter() - start
+        with record_lock:
+            latencies[endpoint].append(elapsed)
+            statuses[endpoint][response.status_code] += 1
+
+    print()
+    print(f"🚦 {requests} requêtes, {concurrency} clients simultanés, "
+          f"{len(students)} élèves / {len(teachers)} enseignants")
+    print("=" * 96)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(call, schedule))
+    elapsed = time.perf_counter() - start
+
+    # Traitements après soumission (badges, cubes) planifiés pendant le test: hors mesure
+    from services.task_queue import task_queue
+    drained = task_queue.run_pending()
+
+    report = {name: summarize(latencies[name], statuses[name]) for name in names if latencies[name]}
+    print(f"  {'endpoint':<30}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}  statuts")
+    for name, stats in report.items():
+        print(f"  {name:<30}{stats['count']:>6}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}"
+              f"{stats['p99_ms']:>10.1f}{stats['max_ms']:>10.1f}  {stats['statuses']}")
+    total = sum(len(values) for values in latencies.values())
+    print()
+    print(f"  {total} requêtes en {elapsed:.2f}s ({total / elapsed if elapsed else 0:.1f} req/s)")
+    print(f"  {drained} tâches de fond exécutées après le test")
+
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "seed": seed, "results": results, "years": years,
+                "requests": requests, "concurrency": concurrency,
+                "elapsed_s": round(elapsed, 2), "data": generated.counts, "endpoints": report,
+            }, f, indent=2, ensure_ascii=False)
+        print(f"  📄 Résultats écrits dans {json_path}")
+
+    server_errors = sum(count for counter in statuses.values() for code, count in counter.items() if code >= 500)
+    if server_errors:
+        print(f"  ❌ {server_errors} réponses en erreur serveur (5xx)")
+    return server_errors == 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Test de charge de l'API sur données synthétiques")
+    parser.add_argument("--results", type=int, default=10_000, help="quiz_results générés (10k à 1M)")
+    parser.add_argument("--years", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--bcrypt-rounds", type=int, default=12)
+    parser.add_argument("--json", dest="json_path", help="Fichier de sortie des mesures (comparaison entre versions)")
+    args = parser.parse_args()
+
+    ok = run_load_test(args.results, args.years, args.seed, args.requests, args.concurrency,
+                       args.bcrypt_rounds, args.json_path)
+    sys.exit(0 if ok else 1)
@@ -3,6 +3,7 @@ from .adaptive_evaluation import (
     AdaptiveTest, AdaptiveQuestion, TestAssignment, 
     TestAttempt, QuestionResponse, CompetencyAnalysis, Class, AdaptiveClassStudent
 )
+from .adaptive_item_stats import AdaptiveItemStats
 
 # Modèles existants
 from .user import User, UserRole
@@ -10,15 +11,23 @@ from .quiz import Quiz, Question, QuizResult, QuizAnswer
 from .badge import Badge, UserBadge
 from .class_group import ClassGroup, ClassStudent
 from .content import Content, LearningPathContent
+from .library_catalogue import LibraryCatalogueEntry
+from .recommendation_index import ContentNeighbour, StudentRecommendationCandidate, RecommenderRun
 from .learning_path import LearningPath
 from .learning_path_step import LearningPathStep
+from .student_path_step_override import StudentPathStepOverride
 from .student_learning_path import StudentLearningPath
 from .learning_history import LearningHistory
+from .activity_rollup import DailyActivityRollup
+from .analytics_cube import AnalyticsCube, AnalyticsStudentDay
+from .deadline_event import DeadlineEvent
+from .background_task import BackgroundTask
 from .messages import Message
 from .thread import Thread
 from .assessment import Assessment, AssessmentQuestion, AssessmentResult
 from .homework import AdvancedHomework, AdvancedHomeworkSubmission
 from .calendar import CalendarEvent
+from .calendar_entry import CalendarEntry
 from .collaboration import StudyGroup, CollaborationProject
 from .ai_advanced import AIRecommendation, AITutoringSession
 from .reports import DetailedReport, SubjectProgressReport
@@ -27,16 +36,19 @@ from .real_time_activities import RealTimeActivities
 from .assignment import Assignment
 from .assignment_submission import AssignmentSubmission
 from .student_assignment import StudentAssignment
-from .content_sharing import ContentSharing, ContentAccess
+from .content_sharing import ContentSharing, ContentSharingTarget, ContentAccess
 from .notes import AdvancedNote, AdvancedSubject, AdvancedChapter
 
 # Modèles forum d'entraide
 from .forum import ForumCategory, ForumThread, ForumReply
 
-from .french_learning import FrenchLearningProfile, FrenchCompetency, FrenchCompetencyProgress, FrenchLearningPath, FrenchLearningModule, FrenchRecommendation
+from .french_learning import FrenchLearningProfile, FrenchCompetency, FrenchCompetencyProgress, FrenchAdaptiveTest, FrenchTestAnswer, FrenchLearningPath, FrenchLearningModule, FrenchRecommendation
 
 # Modèles de remédiation
-from .remediation import RemediationResult, RemediationBadge, RemediationProgress
+from .remediation import RemediationResult, RemediationBadge, RemediationProgress, RemediationExerciseHistory
+
+# Journal unifié des résultats d'évaluation (après les modèles sources)
+from .assessment_event import AssessmentEvent
 
 # from .analytics import (
 #     LearningAnalytics, PredictiveModel, StudentPrediction, LearningPattern,
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, Float, Date, DateTime, ForeignKey, Index
+from core.database import Base
+
+class DailyActivityRollup(Base):
+    """Agrégat journalier de l'activité (learning_history) par utilisateur.
+
+    Une ligne par (utilisateur, jour), maintenue à l'écriture par services/activity_streaks.py:
+    les séries et l'engagement se calculent sur O(jours) lignes au lieu de O(événements).
+    """
+    __tablename__ = "daily_activity_rollups"
+    __table_args__ = (
+        Index('ix_daily_activity_rollups_day', 'day'),
+    )
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    activity_count = Column(Integer, default=0, nullable=False)
+    scored_count = Column(Integer, default=0, nullable=False)
+    score_sum = Column(Float, default=0.0, nullable=False)
+    last_activity_at = Column(DateTime, nullable=True)
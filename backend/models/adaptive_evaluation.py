@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Float, ForeignKey, CheckConstraint
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Float, ForeignKey, CheckConstraint, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -11,6 +11,9 @@ Base = declarative_base()
 class AdaptiveTest(Base):
     """Modèle pour les tests adaptatifs"""
     __tablename__ = "adaptive_tests"
+    __table_args__ = (
+        Index('ix_adaptive_tests_created_by', 'created_by'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False)
@@ -69,6 +72,7 @@ class TestAssignment(Base):
     __table_args__ = (
         CheckConstraint(assignment_type.in_(['class', 'student']), name='valid_assignment_type'),
         CheckConstraint(status.in_(['active', 'inactive', 'completed']), name='valid_status'),
+        Index('ix_test_assignments_type_target', 'assignment_type', 'target_id', 'status'),
     )
     
     # Relations
@@ -163,4 +167,5 @@ class AdaptiveClassStudent(Base):
     # Contrainte d'unicité
     __table_args__ = (
         CheckConstraint('class_id != student_id', name='valid_adaptive_class_student'),
+        Index('ix_adaptive_class_students_student_id', 'student_id'),
     )
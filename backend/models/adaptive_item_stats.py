@@ -0,0 +1,45 @@
+from sqlalchemy import Column, Integer, Float, DateTime, text
+from core.database import Base
+
+class AdaptiveItemStats(Base):
+    """Compteurs cumulés d'une question de test adaptatif (statistiques d'items IRT).
+
+    Une ligne par question, incrémentée par lots (services/item_statistics.py) avec
+    des UPSERT `n = n + delta`: aucun incrément perdu avec plusieurs processus.
+    Taux de réussite, temps moyen, écart-type des temps et corrélation
+    point-bisériale (réussite de l'item / score total de la copie) se déduisent
+    des sommes, sans relire les réponses.
+    """
+    __tablename__ = "adaptive_item_stats"
+
+    # adaptive_questions.id (modèles adaptatifs sur une autre metadata: pas de ForeignKey)
+    question_id = Column(Integer, primary_key=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    correct = Column(Integer, default=0, nullable=False)
+    timed_attempts = Column(Integer, default=0, nullable=False)  # réponses avec un temps de réponse
+    response_time_sum = Column(Float, default=0.0, nullable=False)
+    response_time_sq_sum = Column(Float, default=0.0, nullable=False)
+    total_score_sum = Column(Float, default=0.0, nullable=False)  # score total de la copie (0-1)
+    total_score_sq_sum = Column(Float, default=0.0, nullable=False)
+    correct_total_score_sum = Column(Float, default=0.0, nullable=False)  # copies ayant réussi l'item
+    updated_at = Column(DateTime, nullable=True)
+
+# Upsert portable (SQLite >= 3.24 et PostgreSQL): les deltas s'ajoutent aux compteurs existants
+UPSERT_ITEM_STATS_SQL = text("""
+    INSERT INTO adaptive_item_stats (question_id, attempts, correct, timed_attempts, response_time_sum,
+                                     response_time_sq_sum, total_score_sum, total_score_sq_sum,
+                                     correct_total_score_sum, updated_at)
+    VALUES (:question_id, :attempts, :correct, :timed_attempts, :response_time_sum,
+            :response_time_sq_sum, :total_score_sum, :total_score_sq_sum,
+            :correct_total_score_sum, :updated_at)
+    ON CONFLICT (question_id) DO UPDATE SET
+        attempts = adaptive_item_stats.attempts + excluded.attempts,
+        correct = adaptive_item_stats.correct + excluded.correct,
+        timed_attempts = adaptive_item_stats.timed_attempts + excluded.timed_attempts,
+        response_time_sum = adaptive_item_stats.response_time_sum + excluded.response_time_sum,
+        response_time_sq_sum = adaptive_item_stats.response_time_sq_sum + excluded.response_time_sq_sum,
+        total_score_sum = adaptive_item_stats.total_score_sum + excluded.total_score_sum,
+        total_score_sq_sum = adaptive_item_stats.total_score_sq_sum + excluded.total_score_sq_sum,
+        correct_total_score_sum = adaptive_item_stats.correct_total_score_sum + excluded.correct_total_score_sum,
+        updated_at = excluded.updated_at
+""")
@@ -0,0 +1,58 @@
+from sqlalchemy import Column, Integer, Float, String, Date, ForeignKey, Index
+from core.database import Base
+
+# Bornes basses des tranches de score (mêmes tranches que /analytics/score-distribution)
+SCORE_BUCKETS = [90, 80, 70, 60, 50, 0]
+
+def score_bucket(score) -> int:
+    """Tranche de score (borne basse) d'un résultat"""
+    for bucket in SCORE_BUCKETS:
+        if (score or 0) >= bucket:
+            return bucket
+    return 0
+
+# Valeur de la dimension classe pour l'agrégat toutes classes confondues
+ALL_CLASSES = 0
+
+class AnalyticsCube(Base):
+    """Cube d'agrégats des résultats (quiz et tests adaptatifs) pour les tableaux de bord.
+
+    Une ligne par (source, jour, heure, classe, enseignant, matière, tranche de score),
+    maintenue après chaque résultat complété et reconstructible en bloc.
+    Chaque résultat compte une fois dans la classe ALL_CLASSES (totaux sans filtre)
+    et une fois dans chacune des classes de l'élève.
+    Les dimensions absentes valent 0 (enseignant) ou '' (matière).
+    """
+    __tablename__ = "analytics_cubes"
+    __table_args__ = (
+        Index('ix_analytics_cubes_source_day', 'source', 'day'),
+        Index('ix_analytics_cubes_teacher_subject', 'source', 'teacher_id', 'subject'),
+    )
+
+    source = Column(String(20), primary_key=True)  # quiz, adaptive
+    day = Column(Date, primary_key=True)
+    hour = Column(Integer, primary_key=True)
+    class_id = Column(Integer, primary_key=True, default=0)
+    teacher_id = Column(Integer, primary_key=True, default=0)
+    subject = Column(String(100), primary_key=True, default="")
+    score_bucket = Column(Integer, primary_key=True)
+    result_count = Column(Integer, default=0, nullable=False)
+    score_sum = Column(Float, default=0.0, nullable=False)
+    percentage_sum = Column(Float, default=0.0, nullable=False)
+    time_spent_sum = Column(Integer, default=0, nullable=False)
+    time_spent_count = Column(Integer, default=0, nullable=False)
+
+class AnalyticsStudentDay(Base):
+    """Activité quotidienne par élève et par source (comptage des élèves distincts).
+
+    Sans dimension classe: le filtre par classe joint class_students à la lecture.
+    """
+    __tablename__ = "analytics_student_days"
+    __table_args__ = (
+        Index('ix_analytics_student_days_source_day', 'source', 'day'),
+    )
+
+    source = Column(String(20), primary_key=True)
+    student_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    result_count = Column(Integer, default=0, nullable=False)
@@ -0,0 +1,35 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index, UniqueConstraint
+from core.database import Base
+
+SOURCE_QUIZ = "quiz"
+SOURCE_ADAPTIVE = "adaptive"
+SOURCE_REMEDIATION = "remediation"
+SOURCE_INITIAL_ASSESSMENT = "initial_assessment"
+
+class AssessmentEvent(Base):
+    """Journal unifié des résultats d'évaluation (quiz, test adaptatif, remédiation,
+    évaluation initiale).
+
+    Une ligne par résultat, écrite dans la transaction de la soumission: les séries
+    temporelles d'un élève se lisent en un seul parcours d'index (élève, date).
+    Une correction de note met à jour la ligne du résultat au lieu d'en ajouter une.
+    Écriture: services/assessment_events.py.
+    """
+    __tablename__ = "assessment_events"
+    __table_args__ = (
+        UniqueConstraint('source', 'source_id', name='uq_assessment_events_source'),
+        Index('ix_assessment_events_student_time', 'student_id', 'occurred_at'),
+        Index('ix_assessment_events_class_subject_time', 'class_id', 'subject', 'occurred_at'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    source = Column(String(30), nullable=False)
+    source_id = Column(Integer, nullable=False)
+    student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    class_id = Column(Integer, nullable=True)  # classe (class_groups) de l'assignation évaluée, sinon NULL
+    subject = Column(String(255), nullable=False)
+    title = Column(String(255), nullable=False)
+    score = Column(Float, nullable=False)
+    max_score = Column(Float, nullable=False)
+    normalized_score = Column(Float, nullable=False)  # pourcentage 0-100
+    occurred_at = Column(DateTime, nullable=False)
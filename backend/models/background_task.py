@@ -0,0 +1,42 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
+from datetime import datetime
+
+from core.database import Base
+
+# Cycle de vie d'une tâche: pending -> running -> succeeded | failed (pending à nouveau entre deux essais)
+TASK_PENDING = "pending"
+TASK_RUNNING = "running"
+TASK_SUCCEEDED = "succeeded"
+TASK_FAILED = "failed"
+
+class BackgroundTask(Base):
+    """Traitement différé après une soumission (badges, cubes, profils).
+
+    La tâche est insérée dans la transaction de la soumission: elle n'existe que
+    si la soumission est validée, et survit à un redémarrage. La clé d'idempotence
+    (type + sujet) empêche de planifier deux fois le même traitement.
+    """
+    __tablename__ = "background_tasks"
+    __table_args__ = (
+        Index('ix_background_tasks_ready', 'status', 'run_at', 'priority'),
+        Index('ix_background_tasks_subject', 'subject'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    idempotency_key = Column(String(160), unique=True, nullable=False)
+    kind = Column(String(60), nullable=False)       # 'quiz_result.badges', 'french_assessment.profile', ...
+    subject = Column(String(80), nullable=False)    # 'quiz_result:42': ce que le client interroge
+    payload = Column(Text, nullable=True)           # JSON des arguments du traitement
+    priority = Column(Integer, nullable=False, default=100)  # plus petit = plus urgent
+    status = Column(String(20), nullable=False, default=TASK_PENDING)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    run_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = Column(DateTime, nullable=True)
+    locked_by = Column(String(80), nullable=True)
+    last_error = Column(Text, nullable=True)
+    result = Column(Text, nullable=True)            # JSON retourné par le traitement
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # propriétaire (suivi par l'élève)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+    applied_at = Column(DateTime, nullable=True)    # effets validés avec la transaction du traitement (claim_effects)
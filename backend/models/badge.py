@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Boolean, Float
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Boolean, Float, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from core.database import Base
@@ -15,6 +15,9 @@ class Badge(Base):
 
 class UserBadge(Base):
     __tablename__ = "user_badge"
+    __table_args__ = (
+        Index('ix_user_badge_user_badge', 'user_id', 'badge_id'),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     badge_id = Column(Integer, ForeignKey("badges.id"), nullable=False)
@@ -0,0 +1,48 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Index, UniqueConstraint
+from datetime import datetime
+
+from core.database import Base
+
+# Fin d'une série récurrente sans date de fin (borne de l'index d'intervalles)
+OPEN_ENDED = datetime(9999, 12, 31)
+
+class CalendarEntry(Base):
+    """Événement de calendrier matérialisé (une ligne par élément source).
+
+    Échéances de quiz assignés et de devoirs, cours planifiés, objectifs et
+    événements personnels sont recopiés ici par les listeners des modèles sources
+    (services/calendar_entries.py).
+    Une ligne s'adresse à un élève (user_id), à une classe (class_id, membres
+    résolus à la lecture) et/ou à son auteur (owner_id). Un événement récurrent
+    reste une seule ligne (règle RRULE sans UNTIL, fin de série dans
+    recurrence_until) développée à la lecture; range_end borne l'intervalle couvert
+    par toute la série, pour une recherche par plage dans un seul index.
+    """
+    __tablename__ = "calendar_entries"
+    __table_args__ = (
+        UniqueConstraint('source', 'source_id', name='ux_calendar_entries_source'),
+        Index('ix_calendar_entries_user_range', 'user_id', 'range_end', 'starts_at'),
+        Index('ix_calendar_entries_class_range', 'class_id', 'range_end', 'starts_at'),
+        Index('ix_calendar_entries_owner_range', 'owner_id', 'range_end', 'starts_at'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    source = Column(String(20), nullable=False)   # 'quiz_assignment', 'homework', 'advanced_homework', 'schedule', 'goal', 'personal'
+    source_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    class_id = Column(Integer, ForeignKey("class_groups.id"), nullable=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    event_type = Column(String(50), nullable=False)
+    title = Column(String(255), nullable=False)
+    description = Column(Text, nullable=True)
+    subject = Column(String(100), nullable=True)
+    location = Column(String(255), nullable=True)
+    color = Column(String(7), nullable=True)
+    status = Column(String(50), nullable=True)
+    all_day = Column(Boolean, default=False, nullable=False)
+    starts_at = Column(DateTime, nullable=False)   # UTC naïf (première occurrence)
+    ends_at = Column(DateTime, nullable=False)
+    rrule = Column(String(255), nullable=True)     # ex. 'FREQ=WEEKLY;INTERVAL=1;BYDAY=MO,WE'
+    recurrence_until = Column(DateTime, nullable=True)
+    range_end = Column(DateTime, nullable=False)   # ends_at, fin de la dernière occurrence ou OPEN_ENDED
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
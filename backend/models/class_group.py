@@ -1,10 +1,13 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, DateTime, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from core.database import Base
 
 class ClassGroup(Base):
     __tablename__ = "class_groups"
+    __table_args__ = (
+        Index('ix_class_groups_teacher_id', 'teacher_id'),
+    )
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     description = Column(String, nullable=True)
@@ -21,6 +24,10 @@ class ClassGroup(Base):
 
 class ClassStudent(Base):
     __tablename__ = "class_students"
+    __table_args__ = (
+        Index('ix_class_students_class_student', 'class_id', 'student_id'),
+        Index('ix_class_students_student_id', 'student_id'),
+    )
     id = Column(Integer, primary_key=True, index=True)
     class_id = Column(Integer, ForeignKey("class_groups.id"), nullable=False)
     student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from core.database import Base
@@ -34,8 +34,28 @@ class ContentSharing(Base):
     download_count = Column(Integer, default=0)
     student_count = Column(Integer, default=0)  # Number of students who can access
 
+class ContentSharingTarget(Base):
+    """Destinataire d'un partage: une classe (membres résolus à la lecture) ou un élève.
+
+    Partager avec un niveau entier écrit une ligne par classe; la ligne d'accès
+    individuelle (ContentAccess) n'est créée qu'à la première consultation.
+    """
+    __tablename__ = "content_sharing_targets"
+    __table_args__ = (
+        Index('ix_content_sharing_targets_class', 'class_id', 'sharing_id'),
+        Index('ix_content_sharing_targets_student', 'student_id', 'sharing_id'),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    sharing_id = Column(Integer, ForeignKey("content_sharings.id", ondelete="CASCADE"), nullable=False, index=True)
+    class_id = Column(Integer, ForeignKey("class_groups.id", ondelete="CASCADE"), nullable=True)
+    student_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+
 class ContentAccess(Base):
     __tablename__ = "content_accesses"
+    __table_args__ = (
+        Index('ux_content_accesses_sharing_student', 'sharing_id', 'student_id', unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     content_id = Column(Integer, ForeignKey("contents.id"), nullable=False)
@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from datetime import datetime
+
+from core.database import Base
+
+class DeadlineEvent(Base):
+    """Échéance planifiée (devoir, objectif, rappel) à notifier une seule fois.
+
+    Une ligne par instant de déclenchement, identifiée par une clé d'idempotence
+    (source, élément, type, échéance de référence): une échéance déplacée produit
+    une nouvelle clé, une notification déjà envoyée ne l'est jamais une seconde fois.
+    Planification à l'écriture: services/deadline_events.py.
+    """
+    __tablename__ = "deadline_events"
+    __table_args__ = (
+        Index('ix_deadline_events_pending', 'fired_at', 'cancelled_at', 'fire_at'),
+        Index('ix_deadline_events_item', 'source', 'item_id'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    idempotency_key = Column(String(160), unique=True, nullable=False)
+    source = Column(String(20), nullable=False)   # 'homework', 'goal', 'reminder'
+    item_id = Column(Integer, nullable=False)
+    kind = Column(String(30), nullable=False)     # 'due_soon', 'overdue', 'due_in_week', 'due_in_2_days', 'reminder'
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    fire_at = Column(DateTime, nullable=False)
+    fired_at = Column(DateTime, nullable=True)
+    cancelled_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
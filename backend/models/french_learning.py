@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, Float, DateTime, Boolean, JSON
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Float, DateTime, Boolean, JSON, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from core.database import Base
@@ -78,10 +78,27 @@ class FrenchAdaptiveTest(Base):
     difficulty_progression = Column(Text, nullable=True)  # JSON de la progression de difficulté
     level_progression = Column(String, default="A1")     # Niveau de progression actuel
     current_level = Column(String, default="A1")         # Niveau actuel de l'étudiant
+    questions_sequence = Column(Text, nullable=True)     # JSON des IDs de questions, dans l'ordre
     
     # Relations
     student = relationship("User", foreign_keys=[student_id])
 
+class FrenchTestAnswer(Base):
+    """Réponses aux tests adaptatifs français (écrites par lots)"""
+    __tablename__ = "french_test_answers"
+    __table_args__ = (
+        Index('ix_french_test_answers_test_id', 'test_id'),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    test_id = Column(Integer, ForeignKey("french_adaptive_tests.id"), nullable=False)
+    student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    question_id = Column(Integer, nullable=False)
+    answer = Column(Text, nullable=False)
+    is_correct = Column(Boolean, nullable=False)
+    score = Column(Integer, nullable=False)
+    answered_at = Column(DateTime, default=datetime.utcnow)
+
 class FrenchLearningPath(Base):
     """Parcours d'apprentissage français personnalisé"""
     __tablename__ = "french_learning_paths"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, Text, DateTime, Date, Boolean, ForeignKey, Float, UniqueConstraint
 from sqlalchemy.sql import func
 from core.database import Base
 from datetime import datetime
@@ -84,4 +84,30 @@ class UserAchievement(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     achievement_id = Column(Integer, ForeignKey("achievements.id"), nullable=False)
-    unlocked_at = Column(DateTime(timezone=True), server_default=func.now()) 
\ No newline at end of file
+    unlocked_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class StudentBadgeCounter(Base):
+    """Compteurs incrémentaux par étudiant et par périmètre ('quiz', 'quiz:<sujet>', 'remediation:<sujet>').
+
+    Mis à jour à chaque événement par le moteur de règles de badges, ce qui évite
+    de rescanner tout l'historique des résultats pour évaluer les critères.
+    """
+    __tablename__ = "student_badge_counters"
+    __table_args__ = (
+        UniqueConstraint('student_id', 'scope', name='uq_student_badge_counters_student_scope'),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    student_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    scope = Column(String(255), nullable=False)
+    event_count = Column(Integer, default=0, nullable=False)
+    perfect_count = Column(Integer, default=0, nullable=False)
+    fast_count = Column(Integer, default=0, nullable=False)
+    early_count = Column(Integer, default=0, nullable=False)
+    percentage_sum = Column(Float, default=0.0, nullable=False)
+    first_percentages = Column(Text, nullable=True)  # JSON: 3 premiers pourcentages
+    recent_percentages = Column(Text, nullable=True)  # JSON: 3 derniers pourcentages
+    current_streak = Column(Integer, default=0, nullable=False)
+    best_streak = Column(Integer, default=0, nullable=False)
+    last_activity_date = Column(Date, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
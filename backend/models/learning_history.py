@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from core.database import Base
@@ -9,6 +9,9 @@ from .learning_path import LearningPath
 
 class LearningHistory(Base):
     __tablename__ = "learning_history"
+    __table_args__ = (
+        Index('ix_learning_history_student_timestamp', 'student_id', 'timestamp'),
+    )
     id = Column(Integer, primary_key=True, index=True)
     student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     content_id = Column(Integer, ForeignKey("contents.id"), nullable=True)
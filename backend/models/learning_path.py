@@ -14,6 +14,7 @@ class LearningPath(Base):
     difficulty = Column(String, nullable=True)
     estimated_duration = Column(Integer, default=30)  # en jours
     is_adaptive = Column(Boolean, default=False)
+    template_key = Column(String(120), unique=True, nullable=True, index=True)  # parcours partagé issu d'un modèle
     created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
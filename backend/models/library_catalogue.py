@@ -0,0 +1,44 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, DDL, ForeignKey, Index, event
+
+from core.database import Base
+
+class LibraryCatalogueEntry(Base):
+    """Index du catalogue de la bibliothèque (une ligne par contenu).
+
+    Colonnes dénormalisées prêtes à servir (tags décodés, auteur, type) et texte de
+    recherche normalisé (minuscules, sans accents) indexé en plein texte:
+    FTS5 sous SQLite (library_catalogue_fts), GIN/tsvector sous PostgreSQL.
+    Maintenu à l'écriture des contenus par services/library_catalogue.py.
+    """
+    __tablename__ = "library_catalogue"
+    __table_args__ = (
+        Index('ix_library_catalogue_facets', 'subject', 'level', 'type'),
+    )
+
+    content_id = Column(Integer, ForeignKey("contents.id", ondelete="CASCADE"), primary_key=True)
+    title = Column(String(255), nullable=False)
+    description = Column(Text, nullable=True)
+    type = Column(String(50), nullable=True)
+    subject = Column(String(100), nullable=True)
+    level = Column(String(50), nullable=True)
+    tags = Column(Text, nullable=True)  # JSON array décodé/normalisé
+    author = Column(String(255), nullable=True)
+    file_url = Column(String(500), nullable=True)
+    thumbnail_url = Column(String(500), nullable=True)
+    search_text = Column(Text, nullable=False, default="")
+    created_at = Column(DateTime(timezone=True), nullable=True)
+    is_active = Column(Boolean, default=True, nullable=False)
+
+# Plein texte hors alembic (Base.metadata.create_all): mêmes objets que la migration
+# add_library_catalogue, IF NOT EXISTS pour compléter une base créée sans eux
+event.listen(Base.metadata, "after_create", DDL(
+    "CREATE VIRTUAL TABLE IF NOT EXISTS library_catalogue_fts USING fts5("
+    "search_text, tokenize = 'unicode61 remove_diacritics 2')"
+).execute_if(dialect="sqlite"))
+event.listen(Base.metadata, "after_create", DDL(
+    "CREATE INDEX IF NOT EXISTS ix_library_catalogue_search ON library_catalogue "
+    "USING GIN (to_tsvector('simple', search_text))"
+).execute_if(dialect="postgresql"))
+event.listen(Base.metadata, "before_drop", DDL(
+    "DROP TABLE IF EXISTS library_catalogue_fts"
+).execute_if(dialect="sqlite"))
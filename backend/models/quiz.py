@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Float, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Float, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from core.database import Base
@@ -58,6 +58,11 @@ class Question(Base):
 
 class QuizResult(Base):
     __tablename__ = "quiz_results"
+    __table_args__ = (
+        Index('ix_quiz_results_student_quiz', 'student_id', 'quiz_id'),
+        Index('ix_quiz_results_student_completed', 'student_id', 'completed_at'),
+        Index('ix_quiz_results_quiz_completed', 'quiz_id', 'completed_at'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -83,6 +88,9 @@ class QuizResult(Base):
 
 class QuizAnswer(Base):
     __tablename__ = "quiz_answers"
+    __table_args__ = (
+        Index('ix_quiz_answers_result_question', 'result_id', 'question_id'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     result_id = Column(Integer, ForeignKey("quiz_results.id"), nullable=False)
@@ -100,6 +108,11 @@ class QuizAnswer(Base):
 
 class QuizAssignment(Base):
     __tablename__ = "quiz_assignments"
+    __table_args__ = (
+        Index('ix_quiz_assignments_student_id', 'student_id'),
+        Index('ix_quiz_assignments_class_id', 'class_id'),
+        Index('ix_quiz_assignments_assigned_by', 'assigned_by'),
+    )
     id = Column(Integer, primary_key=True, index=True)
     quiz_id = Column(Integer, ForeignKey("quizzes.id"), nullable=False)
     class_id = Column(Integer, ForeignKey("class_groups.id"), nullable=True)
@@ -0,0 +1,47 @@
+from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey, Index
+from datetime import datetime
+from core.database import Base
+
+class ContentNeighbour(Base):
+    """Voisins les plus proches d'une ressource (similarité cosinus des co-accès).
+
+    Top-K par ressource, recalculé par le job du recommandeur (run_recommender.py)
+    pour les seules ressources touchées depuis le dernier passage.
+    """
+    __tablename__ = "content_neighbours"
+    __table_args__ = (
+        Index('ix_content_neighbours_rank', 'content_id', 'rank'),
+    )
+
+    content_id = Column(Integer, ForeignKey("contents.id", ondelete="CASCADE"), primary_key=True)
+    neighbour_id = Column(Integer, ForeignKey("contents.id", ondelete="CASCADE"), primary_key=True)
+    score = Column(Float, nullable=False)
+    rank = Column(Integer, nullable=False)
+
+class StudentRecommendationCandidate(Base):
+    """Ressources candidates d'un élève (voisins de son historique, déjà vues exclues).
+
+    Servies telles quelles après un léger re-classement par matières faibles.
+    """
+    __tablename__ = "student_recommendation_candidates"
+    __table_args__ = (
+        Index('ix_student_recommendation_candidates_rank', 'student_id', 'rank'),
+    )
+
+    student_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    content_id = Column(Integer, ForeignKey("contents.id", ondelete="CASCADE"), primary_key=True)
+    score = Column(Float, nullable=False)
+    rank = Column(Integer, nullable=False)
+    subject = Column(String(100), nullable=True)
+
+class RecommenderRun(Base):
+    """Passages du job du recommandeur; le dernier filigrane borne le passage incrémental suivant"""
+    __tablename__ = "recommender_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    mode = Column(String(20), nullable=False)  # full, incremental
+    watermark = Column(DateTime, nullable=False)  # interactions prises en compte jusqu'à cette date
+    items_updated = Column(Integer, default=0, nullable=False)
+    students_updated = Column(Integer, default=0, nullable=False)
+    started_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, Float, Index
 from sqlalchemy.orm import relationship
 from core.database import Base
 from datetime import datetime
 
 class RemediationResult(Base):
     __tablename__ = "remediation_results"
+    __table_args__ = (
+        Index('ix_remediation_results_student_topic', 'student_id', 'topic', 'completed_at'),
+        Index('ix_remediation_results_student_completed', 'student_id', 'completed_at'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -22,6 +26,9 @@ class RemediationResult(Base):
 
 class RemediationBadge(Base):
     __tablename__ = "remediation_badges"
+    __table_args__ = (
+        Index('ix_remediation_badges_student_id', 'student_id'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -36,6 +43,9 @@ class RemediationBadge(Base):
 
 class RemediationProgress(Base):
     __tablename__ = "remediation_progress"
+    __table_args__ = (
+        Index('ix_remediation_progress_student_topic', 'student_id', 'topic'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -49,4 +59,19 @@ class RemediationProgress(Base):
     last_updated = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relations
-    student = relationship("User", back_populates="remediation_progress") 
\ No newline at end of file
+    student = relationship("User", back_populates="remediation_progress") 
+
+class RemediationExerciseHistory(Base):
+    """Exercices de la banque déjà proposés à un élève (partagé entre workers).
+
+    Borné par élève (les plus anciens sont évincés) et expiré après un délai,
+    voir services/exercise_history.py.
+    """
+    __tablename__ = "remediation_exercise_history"
+    __table_args__ = (
+        Index('ix_remediation_exercise_history_student_seen', 'student_id', 'seen_at'),
+    )
+
+    student_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    exercise_id = Column(String(50), primary_key=True)
+    seen_at = Column(DateTime, default=datetime.utcnow, nullable=False)
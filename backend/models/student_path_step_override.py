@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Boolean, DateTime, UniqueConstraint
+from sqlalchemy.sql import func
+from core.database import Base
+
+class StudentPathStepOverride(Base):
+    """Écart d'un élève par rapport aux étapes d'un parcours partagé.
+
+    Les étapes restent celles du modèle (learning_path_steps); seules les
+    colonnes renseignées ici remplacent celles de l'étape pour cet élève.
+    """
+    __tablename__ = "student_path_step_overrides"
+    __table_args__ = (
+        UniqueConstraint('student_learning_path_id', 'step_number', name='uq_student_path_step_override'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    student_learning_path_id = Column(Integer, ForeignKey("student_learning_paths.id"), nullable=False)
+    step_number = Column(Integer, nullable=False)
+    title = Column(String, nullable=True)
+    description = Column(Text, nullable=True)
+    content_type = Column(String, nullable=True)
+    content_id = Column(Integer, nullable=True)
+    estimated_duration = Column(Integer, nullable=True)
+    is_required = Column(Boolean, nullable=True)
+    is_active = Column(Boolean, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
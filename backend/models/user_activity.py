@@ -1,9 +1,12 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
 from sqlalchemy.sql import func
 from core.database import Base
 
 class UserActivity(Base):
     __tablename__ = "user_activity"
+    __table_args__ = (
+        Index('ix_user_activity_user_timestamp', 'user_id', 'timestamp'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, nullable=False)
@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""
+Script pour reconstruire l'agrégat journalier d'activité (daily_activity_rollups)
+depuis learning_history
+"""
+
+from core.database import SessionLocal
+import models  # noqa: F401  (enregistre tous les mappers)
+from services.activity_streaks import ActivityStreakService
+
+def rebuild_activity_rollups():
+    db = SessionLocal()
+    try:
+        print("🔁 Reconstruction de l'agrégat journalier d'activité...")
+        rows = ActivityStreakService(db).rebuild()
+        print(f"✅ {rows} lignes (utilisateur, jour) reconstruites")
+    except Exception as e:
+        print(f"❌ Erreur lors de la reconstruction: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    rebuild_activity_rollups()
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Script pour reconstruire les statistiques d'items des tests adaptatifs
+(adaptive_item_stats) depuis les réponses des tentatives terminées
+
+Usage:
+    python rebuild_adaptive_item_stats.py
+"""
+
+import sys
+
+from core.database import SessionLocal
+import models  # noqa: F401  (enregistre tous les mappers)
+from services.item_statistics import item_statistics
+
+def rebuild_adaptive_item_stats():
+    db = SessionLocal()
+    try:
+        print("🔁 Reconstruction des statistiques d'items...")
+        count = item_statistics.rebuild(db)
+        print(f"✅ Statistiques recalculées pour {count} questions")
+        return True
+    except Exception as e:
+        print(f"❌ Erreur lors de la reconstruction: {e}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    sys.exit(0 if rebuild_adaptive_item_stats() else 1)
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Script pour reconstruire les cubes analytiques (analytics_cubes, analytics_student_days)
+depuis quiz_results et test_attempts, ou vérifier leur cohérence
+
+Usage:
+    python rebuild_analytics_cubes.py           # reconstruction complète
+    python rebuild_analytics_cubes.py --check   # comparaison cube / tables brutes
+"""
+
+import argparse
+import sys
+
+from core.database import SessionLocal
+import models  # noqa: F401  (enregistre tous les mappers)
+from services.analytics_cubes import AnalyticsCubeService
+
+def rebuild_analytics_cubes():
+    db = SessionLocal()
+    try:
+        print("🔁 Reconstruction des cubes analytiques...")
+        rows = AnalyticsCubeService(db).rebuild()
+        print(f"✅ {rows} cellules de cube reconstruites")
+        return True
+    except Exception as e:
+        print(f"❌ Erreur lors de la reconstruction: {e}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+def check_analytics_cubes():
+    db = SessionLocal()
+    try:
+        print("🔍 Vérification de la cohérence des cubes analytiques...")
+        mismatches = AnalyticsCubeService(db).check_consistency()
+        for m in mismatches:
+            print(f"  ❌ {m['source']} {m['day']}: brut {m['raw_count']} résultats / {m['raw_score_sum']} pts, "
+                  f"cube {m['cube_count']} résultats / {m['cube_score_sum']} pts")
+        if mismatches:
+            print(f"❌ {len(mismatches)} jours incohérents - relancer sans --check pour reconstruire")
+            return False
+        print("✅ Cubes cohérents avec les tables brutes")
+        return True
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconstruction / vérification des cubes analytiques")
+    parser.add_argument("--check", action="store_true", help="Vérifier la cohérence sans reconstruire")
+    args = parser.parse_args()
+    sys.exit(0 if (check_analytics_cubes() if args.check else rebuild_analytics_cubes()) else 1)
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Script pour reconstruire les compteurs de badges en rejouant l'historique
+(quiz_results et remediation_results) par lots
+"""
+
+import argparse
+
+from core.database import SessionLocal
+import models  # noqa: F401  (enregistre tous les mappers)
+from services.badge_rule_engine import BadgeRuleEngine
+
+def rebuild_badge_counters(student_ids=None, batch_size=1000):
+    db = SessionLocal()
+    try:
+        print("🔁 Rejeu de l'historique des résultats...")
+        stats = BadgeRuleEngine(db).backfill(student_ids=student_ids, batch_size=batch_size)
+        print(f"✅ {stats['events']} événements rejoués")
+        print(f"✅ {stats['counters']} compteurs reconstruits")
+        print(f"🏆 {stats['badges_awarded']} badges attribués")
+    except Exception as e:
+        print(f"❌ Erreur lors du rejeu: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconstruire les compteurs de badges")
+    parser.add_argument("--student", type=int, action="append", help="Limiter à un étudiant (répétable)")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    rebuild_badge_counters(student_ids=args.student, batch_size=args.batch_size)
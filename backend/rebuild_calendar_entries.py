@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Script pour reconstruire les événements de calendrier matérialisés
+(calendar_entries) depuis les quiz assignés, devoirs, cours planifiés,
+objectifs et événements personnels
+
+Usage:
+    python rebuild_calendar_entries.py
+"""
+
+import sys
+
+from core.database import SessionLocal
+import models  # noqa: F401  (enregistre tous les mappers)
+from services.calendar_feed import CalendarFeed
+
+def rebuild_calendar_entries():
+    db = SessionLocal()
+    try:
+        print("🔁 Reconstruction des événements de calendrier...")
+        counts = CalendarFeed(db).rebuild()
+        for source, count in counts.items():
+            print(f"   {source}: {count}")
+        print(f"✅ {sum(counts.values())} événements matérialisés")
+        return True
+    except Exception as e:
+        print(f"❌ Erreur lors de la reconstruction: {e}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    sys.exit(0 if rebuild_calendar_entries() else 1)
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Script pour (re)planifier les échéances de notification (deadline_events)
+de tous les devoirs, objectifs et rappels ouverts
+
+Idempotent: les échéances déjà notifiées ne sont jamais replanifiées.
+
+Usage:
+    python rebuild_deadline_events.py
+"""
+
+import sys
+
+from core.database import SessionLocal
+import models  # noqa: F401  (enregistre tous les mappers)
+from services.deadline_scheduler import deadline_scheduler
+
+def rebuild_deadline_events():
+    db = SessionLocal()
+    try:
+        print("🔁 Planification des échéances de devoirs, objectifs et rappels...")
+        planned = deadline_scheduler.rebuild(db)
+        print(f"✅ {planned} échéances planifiées")
+        return True
+    except Exception as e:
+        print(f"❌ Erreur lors de la planification: {e}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    sys.exit(0 if rebuild_deadline_events() else 1)
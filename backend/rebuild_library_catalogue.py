@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Script pour reconstruire l'index du catalogue de la bibliothèque
+(library_catalogue et son index plein texte) depuis la table contents
+
+Usage:
+    python rebuild_library_catalogue.py
+"""
+
+import sys
+
+from core.database import SessionLocal
+import models  # noqa: F401  (enregistre tous les mappers)
+from models.category import Category  # noqa: F401  (référencée par contents)
+from services.library_catalogue import LibraryCatalogue
+
+def rebuild_library_catalogue():
+    db = SessionLocal()
+    try:
+        print("🔁 Reconstruction du catalogue de la bibliothèque...")
+        count = LibraryCatalogue(db).rebuild()
+        print(f"✅ {count} ressources indexées")
+        return True
+    except Exception as e:
+        print(f"❌ Erreur lors de la reconstruction: {e}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    sys.exit(0 if rebuild_library_catalogue() else 1)
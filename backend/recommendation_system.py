@@ -7,6 +7,9 @@ Section 2.2.3 : Système de recommandation et Section 3.2 : Technologie IA
 import sqlite3
 import json
 import random
+import threading
+import time
+from contextlib import closing
 from typing import Dict, List, Tuple, Optional
 from dataclasses import dataclass
 from datetime import datetime, timedelta
@@ -42,10 +45,14 @@ class LearningActivity:
 class RecommendationEngine:
     """Moteur de recommandation intelligent"""
     
+    # Durée de vie de l'analyse d'un étudiant (réutilisée par recommandations, prédictions et défis)
+    ANALYSIS_TTL_SECONDS = 300
+    
     def __init__(self, db_path: str = "./data/app.db"):
         self.db_path = db_path
         self.conn = None
-        self.cursor = None
+        self._analysis_cache: Dict[int, Tuple[float, Dict]] = {}
+        self._analysis_lock = threading.Lock()
         self.connect_db()
         
         # Paramètres de personnalisation
@@ -63,14 +70,18 @@ class RecommendationEngine:
         }
     
     def connect_db(self):
-        """Connexion à la base de données"""
+        """Vérifier l'accès à la base de données"""
         try:
-            self.conn = sqlite3.connect(self.db_path)
-            self.cursor = self.conn.cursor()
+            with closing(self._connection()):
+                pass
             print("✅ Connexion à la base de données établie")
         except Exception as e:
             print(f"❌ Erreur de connexion : {e}")
     
+    def _connection(self) -> sqlite3.Connection:
+        """Connexion courte, propre à un appel (un curseur partagé n'est pas sûr entre threads)"""
+        return sqlite3.connect(self.db_path)
+    
     def get_personalized_recommendations(self, student_id: int, 
                                        category: str = None, 
                                        limit: int = 5) -> List[LearningResource]:
@@ -118,10 +129,31 @@ class RecommendationEngine:
             return []
     
     def analyze_student_performance(self, student_id: int) -> Dict:
+        """Analyser les performances de l'étudiant (mise en cache par étudiant)"""
+        now = time.monotonic()
+        with self._analysis_lock:
+            cached = self._analysis_cache.get(student_id)
+        if cached and cached[0] > now:
+            return cached[1]
+        analysis = self._analyze_student_performance(student_id)
+        with self._analysis_lock:
+            self._analysis_cache[student_id] = (now + self.ANALYSIS_TTL_SECONDS, analysis)
+        return analysis
+    
+    def invalidate_student(self, student_id: Optional[int] = None):
+        """Oublier l'analyse en cache d'un étudiant (ou de tous), p. ex. après une nouvelle réponse"""
+        with self._analysis_lock:
+            if student_id is None:
+                self._analysis_cache.clear()
+            else:
+                self._analysis_cache.pop(student_id, None)
+    
+    def _analyze_student_performance(self, student_id: int) -> Dict:
         """Analyser les performances de l'étudiant pour personnaliser les recommandations"""
         try:
             # Récupérer l'historique des réponses
-            self.cursor.execute("""
+            with closing(self._connection()) as conn:
+                results = conn.execute("""
                 SELECT 
                     q.difficulty_level,
                     c.name as category,
@@ -135,9 +167,7 @@ class RecommendationEngine:
                 WHERE sa.student_id = ?
                 ORDER BY sa.answered_at DESC
                 LIMIT 100
-            """, (student_id,))
-            
-            results = self.cursor.fetchall()
+                """, (student_id,)).fetchall()
             
             if not results:
                 return self.get_default_analysis()
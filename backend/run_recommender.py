@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Script du recommandeur de ressources (à lancer chaque nuit par cron):
+recalcule les voisins des ressources touchées depuis le dernier passage
+et les listes de candidats des élèves concernés
+
+Usage:
+    python run_recommender.py          # incrémental
+    python run_recommender.py --full   # tout recalculer
+"""
+
+import sys
+
+from core.database import SessionLocal
+import models  # noqa: F401  (enregistre tous les mappers)
+from models.category import Category  # noqa: F401  (référencée par contents)
+from services.content_recommender import RecommenderJob
+
+def run_recommender(full: bool = False):
+    db = SessionLocal()
+    try:
+        print(f"🔁 Recalcul des recommandations ({'complet' if full else 'incrémental'})...")
+        run = RecommenderJob(db).run(full=full)
+        print(f"✅ {run.items_updated} ressources et {run.students_updated} élèves mis à jour ({run.mode})")
+        return True
+    except Exception as e:
+        print(f"❌ Erreur lors du recalcul: {e}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    sys.exit(0 if run_recommender(full="--full" in sys.argv[1:]) else 1)
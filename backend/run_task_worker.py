@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Worker de la file de tâches (traitements après soumission) en processus séparé
+
+Les tâches sont réservées en base: plusieurs processus (et les threads de
+l'application) peuvent tourner en même temps sans exécuter deux fois la même tâche.
+
+Usage:
+    python run_task_worker.py --workers 4
+    python run_task_worker.py --once      # exécuter les tâches dues puis quitter
+"""
+
+import argparse
+import signal
+import sys
+import threading
+
+import models  # noqa: F401  (enregistre tous les mappers)
+from models.category import Category  # noqa: F401  (référencée par contents)
+from services.task_queue import task_queue
+
+def run_task_worker(workers, once=False):
+    if once:
+        executed = task_queue.run_pending()
+        print(f"✅ {executed} tâches exécutées")
+        return True
+
+    stopping = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stopping.set())
+    signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+    task_queue.start(workers)
+    print(f"🧵 {workers} workers démarrés (Ctrl+C pour arrêter)")
+    stopping.wait()
+    task_queue.stop()
+    print("👋 Workers arrêtés")
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Worker de la file de tâches")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--once", action="store_true", help="Exécuter les tâches dues puis quitter")
+    args = parser.parse_args()
+    sys.exit(0 if run_task_worker(args.workers, args.once) else 1)
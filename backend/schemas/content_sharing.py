@@ -58,7 +58,7 @@ class ContentSharingRead(BaseModel):
         from_attributes = True
 
 class ContentAccessRead(BaseModel):
-    id: int
+    id: Optional[int]  # None tant que l'étudiant n'a pas consulté le contenu
     content_id: int
     student_id: int
     sharing_id: int
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Séries d'apprentissage et engagement à partir de l'agrégat journalier
+(daily_activity_rollups) - calcul des séries par "gaps-and-islands" en SQL.
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import Date, Integer, event, text
+from sqlalchemy.orm import Session
+
+from core.sql_time import day_of_sql, day_number_sql
+from models.activity_rollup import DailyActivityRollup
+from models.learning_history import LearningHistory
+
+
+class ActivityStreakService:
+    """Lecture des séries et de l'activité quotidienne en O(jours)"""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.dialect = db.get_bind().dialect.name
+
+    # ------------------------------------------------------------------
+    # Séries
+    # ------------------------------------------------------------------
+
+    def get_streaks(
+        self,
+        user_id: Optional[int] = None,
+        since: Optional[date] = None,
+        today: Optional[date] = None
+    ) -> Dict[str, int]:
+        """Série actuelle et meilleure série d'un utilisateur, ou de la plateforme si user_id est None.
+
+        Un jour compte pour la plateforme dès qu'au moins un utilisateur est actif.
+        La série actuelle est celle qui se termine aujourd'hui.
+        """
+        today = today or datetime.utcnow().date()
+        filters, params = self._filters(user_id, since)
+        params["today"] = today
+
+        sql = text(f"""
+            WITH active AS (
+                SELECT DISTINCT day FROM daily_activity_rollups
+                WHERE activity_count > 0 {filters}
+            ),
+            numbered AS (
+                SELECT day, {day_number_sql(self.dialect, 'day')}
+                       - ROW_NUMBER() OVER (ORDER BY day) AS grp
+                FROM active
+            ),
+            islands AS (
+                SELECT MAX(day) AS end_day, COUNT(*) AS length
+                FROM numbered GROUP BY grp
+            )
+            SELECT
+                COALESCE(MAX(length), 0) AS best,
+                COALESCE(MAX(CASE WHEN end_day = :today THEN length END), 0) AS current
+            FROM islands
+        """).columns(best=Integer, current=Integer)
+        row = self.db.execute(sql, params).first()
+        return {"current": row.current or 0, "best": row.best or 0}
+
+    def get_user_streaks(
+        self,
+        user_ids: Optional[Iterable[int]] = None,
+        since: Optional[date] = None,
+        today: Optional[date] = None
+    ) -> Dict[int, Dict[str, int]]:
+        """Séries de plusieurs utilisateurs en une requête (partition par utilisateur)"""
+        today = today or datetime.utcnow().date()
+        filters, params = self._filters(None, since)
+        params["today"] = today
+        if user_ids is not None:
+            user_ids = list(user_ids)
+            if not user_ids:
+                return {}
+            placeholders = ", ".join(f":uid_{i}" for i in range(len(user_ids)))
+            filters += f" AND user_id IN ({placeholders})"
+            params.update({f"uid_{i}": uid for i, uid in enumerate(user_ids)})
+
+        sql = text(f"""
+            WITH numbered AS (
+                SELECT user_id, day, {day_number_sql(self.dialect, 'day')}
+                       - ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY day) AS grp
+                FROM daily_activity_rollups
+                WHERE activity_count > 0 {filters}
+            ),
+            islands AS (
+                SELECT user_id, MAX(day) AS end_day, COUNT(*) AS length
+                FROM numbered GROUP BY user_id, grp
+            )
+            SELECT
+                user_id,
+                MAX(length) AS best,
+                COALESCE(MAX(CASE WHEN end_day = :today THEN length END), 0) AS current
+            FROM islands
+            GROUP BY user_id
+        """).columns(user_id=Integer, best=Integer, current=Integer)
+        return {
+            row.user_id: {"current": row.current or 0, "best": row.best or 0}
+            for row in self.db.execute(sql, params)
+        }
+
+    # ------------------------------------------------------------------
+    # Activité quotidienne
+    # ------------------------------------------------------------------
+
+    def get_daily_counts(
+        self,
+        user_id: Optional[int] = None,
+        since: Optional[date] = None
+    ) -> Dict[date, int]:
+        """Nombre d'activités par jour (un utilisateur ou toute la plateforme)"""
+        filters, params = self._filters(user_id, since)
+        sql = text(f"""
+            SELECT day, SUM(activity_count) AS activities
+            FROM daily_activity_rollups
+            WHERE 1 = 1 {filters}
+            GROUP BY day
+        """).columns(day=Date, activities=Integer)
+        return {row.day: row.activities or 0 for row in self.db.execute(sql, params)}
+
+    def get_history(self, days: int = 30, user_id: Optional[int] = None) -> List[int]:
+        """Historique 0/1 des `days` derniers jours (le dernier élément = aujourd'hui)"""
+        today = datetime.utcnow().date()
+        start = today - timedelta(days=days - 1)
+        counts = self.get_daily_counts(user_id=user_id, since=start)
+        return [1 if counts.get(start + timedelta(days=i), 0) > 0 else 0 for i in range(days)]
+
+    # ------------------------------------------------------------------
+    # Reconstruction
+    # ------------------------------------------------------------------
+
+    def rebuild(self, user_ids: Optional[Iterable[int]] = None) -> int:
+        """Recalculer l'agrégat depuis learning_history (INSERT ... SELECT groupé)"""
+        params = {}
+        where = ""
+        if user_ids is not None:
+            user_ids = list(user_ids)
+            if not user_ids:
+                return 0
+            placeholders = ", ".join(f":uid_{i}" for i in range(len(user_ids)))
+            where = f"WHERE student_id IN ({placeholders})"
+            params = {f"uid_{i}": uid for i, uid in enumerate(user_ids)}
+
+        delete_query = self.db.query(DailyActivityRollup)
+        if user_ids is not None:
+            delete_query = delete_query.filter(DailyActivityRollup.user_id.in_(user_ids))
+        delete_query.delete(synchronize_session=False)
+
+        day_expr = day_of_sql(self.dialect, "timestamp")
+        self.db.execute(text(f"""
+            INSERT INTO daily_activity_rollups
+                (user_id, day, activity_count, scored_count, score_sum, last_activity_at)
+            SELECT student_id, {day_expr}, COUNT(*), COUNT(score), COALESCE(SUM(score), 0), MAX(timestamp)
+            FROM learning_history
+            {where}
+            GROUP BY student_id, {day_expr}
+        """), params)
+        self.db.commit()
+        return self.db.query(DailyActivityRollup).count()
+
+    def _filters(self, user_id: Optional[int], since: Optional[date]):
+        filters = ""
+        params = {}
+        if user_id is not None:
+            filters += " AND user_id = :user_id"
+            params["user_id"] = user_id
+        if since is not None:
+            filters += " AND day >= :since"
+            params["since"] = since
+        return filters, params
+
+
+# Upsert portable (SQLite >= 3.24 et PostgreSQL)
+UPSERT_ROLLUP_SQL = text("""
+    INSERT INTO daily_activity_rollups (user_id, day, activity_count, scored_count, score_sum, last_activity_at)
+    VALUES (:user_id, :day, 1, :scored, :score, :at)
+    ON CONFLICT (user_id, day) DO UPDATE SET
+        activity_count = daily_activity_rollups.activity_count + 1,
+        scored_count = daily_activity_rollups.scored_count + excluded.scored_count,
+        score_sum = daily_activity_rollups.score_sum + excluded.score_sum,
+        last_activity_at = excluded.last_activity_at
+""")
+
+
+@event.listens_for(LearningHistory, "after_insert")
+def _update_daily_activity_rollup(mapper, connection, target):
+    """Maintenir l'agrégat dans la même transaction que l'insertion de l'historique"""
+    at = target.timestamp or datetime.utcnow()
+    connection.execute(UPSERT_ROLLUP_SQL, {
+        "user_id": target.student_id,
+        "day": at.date(),
+        "scored": 1 if target.score is not None else 0,
+        "score": target.score or 0.0,
+        "at": at,
+    })
@@ -14,6 +14,8 @@ from enum import Enum
 import sqlite3
 import os
 
+from services.item_statistics import ItemStatistics, item_statistics
+
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -206,20 +208,11 @@ class AdaptiveAIEngine:
         Sélection de question basée sur la théorie de réponse aux items (IRT)
         """
         try:
-            conn = self.get_db_connection()
-            cursor = conn.cursor()
-            
-            # Récupérer les questions disponibles
-            cursor.execute("""
-                SELECT 
-                    id, difficulty_level, subject, topic, success_rate, avg_response_time
-                FROM adaptive_questions 
-                WHERE test_id = ? AND id NOT IN ({})
-                ORDER BY ABS(difficulty_level - ?)
-            """.format(','.join('?' * len(answered_questions))), 
-            [test_id] + answered_questions + [student_profile.current_ability])
-            
-            available_questions = cursor.fetchall()
+            # Questions disponibles (instantané de la banque d'items), les plus proches du niveau d'abord
+            available_questions = sorted(
+                self._available_questions(test_id, answered_questions),
+                key=lambda question: abs(question.difficulty_level - student_profile.current_ability)
+            )
             
             if not available_questions:
                 raise ValueError("Aucune question disponible")
@@ -229,12 +222,13 @@ class AdaptiveAIEngine:
             best_information = -1
             
             for question in available_questions:
-                question_id, difficulty, subject, topic, success_rate, avg_time = question
+                difficulty, subject = question.difficulty_level, question.subject
                 
-                # Calculer l'information de Fisher pour cette question
+                # Calculer l'information de Fisher pour cette question (discrimination mesurée)
                 information = self._calculate_fisher_information(
                     difficulty, 
-                    student_profile.current_ability
+                    student_profile.current_ability,
+                    question.discrimination
                 )
                 
                 # Bonus pour les matières de faiblesse
@@ -252,7 +246,7 @@ class AdaptiveAIEngine:
             if not best_question:
                 raise ValueError("Impossible de sélectionner une question")
             
-            question_id, difficulty, subject, topic, success_rate, avg_time = best_question
+            question_id, difficulty, subject = best_question.question_id, best_question.difficulty_level, best_question.subject
             
             # Calculer l'ajustement de difficulté
             difficulty_adjustment = self._calculate_difficulty_adjustment(
@@ -268,17 +262,18 @@ class AdaptiveAIEngine:
                 metadata={
                     'fisher_information': best_information,
                     'difficulty_match': 1.0 - abs(difficulty - student_profile.current_ability) / 10.0,
-                    'subject_priority': subject in student_profile.weakness_subjects
+                    'subject_priority': subject in student_profile.weakness_subjects,
+                    'discrimination': best_question.discrimination,
+                    'item_attempts': best_question.attempts,
+                    'item_success_rate': best_question.success_rate
                 }
             )
             
-            conn.close()
             logger.info(f"🎯 Question IRT sélectionnée: {question_id} (difficulté: {difficulty})")
             return decision
             
         except Exception as e:
             logger.error(f"❌ Erreur lors de la sélection IRT: {e}")
-            conn.close()
             raise
     
     def _ml_gradient_selection(
@@ -297,26 +292,14 @@ class AdaptiveAIEngine:
             # Simuler un modèle ML qui prédit la difficulté optimale
             predicted_difficulty = self._predict_optimal_difficulty_ml(student_profile)
             
-            conn = self.get_db_connection()
-            cursor = conn.cursor()
-            
             # Trouver la question la plus proche de la difficulté prédite
-            cursor.execute("""
-                SELECT 
-                    id, difficulty_level, subject, topic, success_rate, avg_response_time
-                FROM adaptive_questions 
-                WHERE test_id = ? AND id NOT IN ({})
-                ORDER BY ABS(difficulty_level - ?)
-                LIMIT 1
-            """.format(','.join('?' * len(answered_questions))), 
-            [test_id] + answered_questions + [predicted_difficulty])
-            
-            question = cursor.fetchone()
+            available_questions = self._available_questions(test_id, answered_questions)
             
-            if not question:
+            if not available_questions:
                 raise ValueError("Aucune question disponible")
             
-            question_id, difficulty, subject, topic, success_rate, avg_time = question
+            question = min(available_questions, key=lambda item: abs(item.difficulty_level - predicted_difficulty))
+            question_id, difficulty = question.question_id, question.difficulty_level
             
             # Calculer l'ajustement basé sur la prédiction ML
             difficulty_adjustment = predicted_difficulty - difficulty
@@ -334,13 +317,11 @@ class AdaptiveAIEngine:
                 }
             )
             
-            conn.close()
             logger.info(f"🤖 Question ML sélectionnée: {question_id} (prédiction: {predicted_difficulty:.2f})")
             return decision
             
         except Exception as e:
             logger.error(f"❌ Erreur lors de la sélection ML: {e}")
-            conn.close()
             raise
     
     def _expert_rules_selection(
@@ -353,15 +334,12 @@ class AdaptiveAIEngine:
         Sélection de question basée sur des règles expertes éducatives
         """
         try:
-            conn = self.get_db_connection()
-            cursor = conn.cursor()
-            
             # Règles expertes pour la sélection de questions
             rules = self._get_expert_rules(student_profile)
             
             # Appliquer les règles pour filtrer les questions
             filtered_questions = self._apply_expert_rules(
-                cursor, test_id, answered_questions, rules
+                test_id, answered_questions, rules
             )
             
             if not filtered_questions:
@@ -370,7 +348,7 @@ class AdaptiveAIEngine:
             # Sélectionner la meilleure question selon les règles
             best_question = self._select_best_by_rules(filtered_questions, student_profile)
             
-            question_id, difficulty, subject, topic, success_rate, avg_time = best_question
+            question_id, difficulty, subject = best_question.question_id, best_question.difficulty_level, best_question.subject
             
             # Calculer l'ajustement selon les règles expertes
             difficulty_adjustment = self._calculate_expert_adjustment(
@@ -390,13 +368,11 @@ class AdaptiveAIEngine:
                 }
             )
             
-            conn.close()
             logger.info(f"🧠 Question expert sélectionnée: {question_id} (règle: {rules['primary_rule']})")
             return decision
             
         except Exception as e:
             logger.error(f"❌ Erreur lors de la sélection expert: {e}")
-            conn.close()
             raise
     
     def _hybrid_selection(
@@ -463,22 +439,12 @@ class AdaptiveAIEngine:
         Mettre à jour le profil de l'étudiant après une réponse
         """
         try:
-            # Récupérer les informations de la question
-            conn = self.get_db_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT difficulty_level, subject, topic
-                FROM adaptive_questions 
-                WHERE id = ?
-            """, (question_id,))
-            
-            question_info = cursor.fetchone()
+            # Récupérer les informations de la question (instantané de la banque d'items)
+            question_info = item_statistics.snapshot().items.get(question_id)
             if not question_info:
                 raise ValueError(f"Question {question_id} non trouvée")
             
-            difficulty, subject, topic = question_info
-            conn.close()
+            difficulty, subject = question_info.difficulty_level, question_info.subject
             
             # Mettre à jour la capacité selon IRT
             new_ability = self._update_irt_ability(
@@ -644,11 +610,15 @@ class AdaptiveAIEngine:
             else:
                 return avg_difficulty
     
-    def _calculate_fisher_information(self, difficulty: float, ability: float) -> float:
+    def _available_questions(self, test_id: int, answered_questions: List[int]) -> List[ItemStatistics]:
+        """Questions du test pas encore posées, avec leurs statistiques (sans lecture en base)"""
+        return item_statistics.snapshot().test_items(test_id, exclude=answered_questions)
+    
+    def _calculate_fisher_information(self, difficulty: float, ability: float, discrimination: float = 1.0) -> float:
         """Calculer l'information de Fisher pour une question"""
-        # Formule simplifiée de l'information de Fisher
-        p = 1.0 / (1.0 + np.exp(-(ability - difficulty)))
-        return p * (1.0 - p)
+        # Modèle logistique à deux paramètres: I = a² p (1 - p)
+        p = 1.0 / (1.0 + np.exp(-discrimination * (ability - difficulty)))
+        return discrimination ** 2 * p * (1.0 - p)
     
     def _calculate_difficulty_adjustment(
         self, 
@@ -716,42 +686,33 @@ class AdaptiveAIEngine:
     
     def _apply_expert_rules(
         self, 
-        cursor, 
         test_id: int, 
         answered_questions: List[int], 
         rules: Dict[str, Any]
-    ) -> List[Tuple]:
+    ) -> List[ItemStatistics]:
         """Appliquer les règles expertes pour filtrer les questions"""
         # Implémentation simplifiée
-        cursor.execute("""
-            SELECT 
-                id, difficulty_level, subject, topic, success_rate, avg_response_time
-            FROM adaptive_questions 
-            WHERE test_id = ? AND id NOT IN ({})
-        """.format(','.join('?' * len(answered_questions))), 
-        [test_id] + answered_questions)
-        
-        questions = cursor.fetchall()
+        questions = self._available_questions(test_id, answered_questions)
         
         # Filtrer selon les règles
         if 'max_difficulty' in rules['constraints']:
-            questions = [q for q in questions if q[1] <= rules['constraints']['max_difficulty']]
+            questions = [q for q in questions if q.difficulty_level <= rules['constraints']['max_difficulty']]
         elif 'min_difficulty' in rules['constraints']:
-            questions = [q for q in questions if q[1] >= rules['constraints']['min_difficulty']]
+            questions = [q for q in questions if q.difficulty_level >= rules['constraints']['min_difficulty']]
         elif 'target_difficulty' in rules['constraints']:
             target = rules['constraints']['target_difficulty']
-            questions = sorted(questions, key=lambda x: abs(x[1] - target))
+            questions = sorted(questions, key=lambda x: abs(x.difficulty_level - target))
         
         return questions
     
-    def _select_best_by_rules(self, questions: List[Tuple], student_profile: StudentProfile) -> Tuple:
+    def _select_best_by_rules(self, questions: List[ItemStatistics], student_profile: StudentProfile) -> ItemStatistics:
         """Sélectionner la meilleure question selon les règles"""
         if not questions:
             raise ValueError("Aucune question disponible")
         
         # Priorité aux matières de faiblesse
         for question in questions:
-            if question[2] in student_profile.weakness_subjects:  # subject
+            if question.subject in student_profile.weakness_subjects:
                 return question
         
         # Sinon, retourner la première question
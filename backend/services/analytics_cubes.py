@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Cubes analytiques (OLAP léger) pour les tableaux de bord enseignants.
+
+Les résultats complétés (quiz_results, test_attempts) sont agrégés par
+(source, jour, heure, classe, enseignant, matière, tranche de score) au fil de l'eau;
+les endpoints /analytics lisent ces agrégats au lieu de rebalayer les tables brutes.
+Un résultat est ventilé dans chacune des classes de l'élève, en plus de l'agrégat
+ALL_CLASSES qui sert les lectures sans filtre (chaque résultat n'y compte qu'une fois).
+"""
+
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+from core.response_cache import queue_invalidation
+from core.sql_time import day_of_sql, hour_of_sql
+from models.analytics_cube import ALL_CLASSES, AnalyticsCube, AnalyticsStudentDay, SCORE_BUCKETS, score_bucket
+from models.adaptive_evaluation import AdaptiveTest
+from models.class_group import ClassStudent
+from models.quiz import Quiz
+from models.user import User, UserRole
+
+SOURCE_QUIZ = "quiz"
+SOURCE_ADAPTIVE = "adaptive"
+
+# Upserts portables (SQLite >= 3.24 et PostgreSQL)
+UPSERT_CUBE_SQL = text("""
+    INSERT INTO analytics_cubes
+        (source, day, hour, class_id, teacher_id, subject, score_bucket,
+         result_count, score_sum, percentage_sum, time_spent_sum, time_spent_count)
+    VALUES (:source, :day, :hour, :class_id, :teacher_id, :subject, :score_bucket,
+            1, :score, :percentage, :time_spent, :timed)
+    ON CONFLICT (source, day, hour, class_id, teacher_id, subject, score_bucket) DO UPDATE SET
+        result_count = analytics_cubes.result_count + 1,
+        score_sum = analytics_cubes.score_sum + excluded.score_sum,
+        percentage_sum = analytics_cubes.percentage_sum + excluded.percentage_sum,
+        time_spent_sum = analytics_cubes.time_spent_sum + excluded.time_spent_sum,
+        time_spent_count = analytics_cubes.time_spent_count + excluded.time_spent_count
+""")
+
+UPSERT_STUDENT_DAY_SQL = text("""
+    INSERT INTO analytics_student_days (source, student_id, day, result_count)
+    VALUES (:source, :student_id, :day, 1)
+    ON CONFLICT (source, student_id, day) DO UPDATE SET
+        result_count = analytics_student_days.result_count + 1
+""")
+
+
+def _bucket_case_sql(column: str) -> str:
+    """Expression CASE équivalente à score_bucket()"""
+    branches = " ".join(f"WHEN {column} >= {bucket} THEN {bucket}" for bucket in SCORE_BUCKETS if bucket)
+    return f"CASE {branches} ELSE 0 END"
+
+
+class AnalyticsCubeService:
+    """Maintenance incrémentale, reconstruction et lecture des cubes analytiques"""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.dialect = db.get_bind().dialect.name
+
+    # ------------------------------------------------------------------
+    # Maintenance incrémentale
+    # ------------------------------------------------------------------
+
+    def record_quiz_result(self, result) -> bool:
+        """Ajouter un résultat de quiz complété (élèves uniquement) au cube"""
+        if not result.is_completed:
+            return False
+        role = self.db.query(User.role).filter(User.id == result.student_id).scalar()
+        if role != UserRole.student:
+            return False
+
+        teacher_id = self.db.query(Quiz.created_by).filter(Quiz.id == result.quiz_id).scalar()
+        self._record(
+            source=SOURCE_QUIZ,
+            student_id=result.student_id,
+            at=result.created_at or result.completed_at or datetime.utcnow(),
+            teacher_id=teacher_id,
+            subject=result.sujet,
+            score=result.score or 0.0,
+            percentage=result.percentage or 0.0,
+            time_spent=result.time_spent
+        )
+        return True
+
+    def record_test_attempt(self, attempt) -> bool:
+        """Ajouter une tentative de test adaptatif terminée au cube"""
+        if attempt.completed_at is None or not attempt.max_score:
+            return False
+
+        test = self.db.query(AdaptiveTest.created_by, AdaptiveTest.subject).filter(
+            AdaptiveTest.id == attempt.test_id
+        ).first()
+        percentage = (attempt.total_score or 0) * 100.0 / attempt.max_score
+        self._record(
+            source=SOURCE_ADAPTIVE,
+            student_id=attempt.student_id,
+            at=attempt.completed_at,
+            teacher_id=test.created_by if test else None,
+            subject=test.subject if test else None,
+            score=percentage,
+            percentage=percentage,
+            time_spent=None
+        )
+        return True
+
+    def _record(self, source, student_id, at, teacher_id, subject, score, percentage, time_spent):
+        class_ids = [
+            class_id for (class_id,) in self.db.query(ClassStudent.class_id).filter(
+                ClassStudent.student_id == student_id
+            ).distinct()
+        ]
+
+        # Une ligne pour l'agrégat toutes classes, puis une par classe de l'élève
+        self.db.execute(UPSERT_CUBE_SQL, [
+            {
+                "source": source,
+                "day": at.date(),
+                "hour": at.hour,
+                "class_id": class_id,
+                "teacher_id": teacher_id or 0,
+                "subject": subject or "",
+                "score_bucket": score_bucket(score),
+                "score": score,
+                "percentage": percentage,
+                "time_spent": time_spent or 0,
+                "timed": 1 if time_spent is not None else 0,
+            }
+            for class_id in [ALL_CLASSES] + class_ids
+        ])
+        self.db.execute(UPSERT_STUDENT_DAY_SQL, {
+            "source": source,
+            "student_id": student_id,
+            "day": at.date(),
+        })
+        # Les réponses en cache calculées depuis le cube (core/response_cache.py);
+        # class:* couvre les lectures sans filtre de classe
+        queue_invalidation(
+            self.db,
+            ["class:*"] + [f"class:{class_id}" for class_id in class_ids]
+            + [f"teacher:{teacher_id}", f"student:{student_id}"]
+        )
+        self.db.commit()
+
+    # ------------------------------------------------------------------
+    # Reconstruction en bloc
+    # ------------------------------------------------------------------
+
+    def _raw_results_sql(self, source: str) -> str:
+        """Résultats bruts normalisés (une ligne par résultat) d'une source"""
+        if source == SOURCE_QUIZ:
+            return f"""
+                SELECT r.student_id AS student_id,
+                       {day_of_sql(self.dialect, 'r.created_at')} AS day,
+                       {hour_of_sql(self.dialect, 'r.created_at')} AS hour,
+                       COALESCE(q.created_by, 0) AS teacher_id,
+                       COALESCE(r.sujet, '') AS subject,
+                       {_bucket_case_sql('r.score')} AS score_bucket,
+                       r.score AS score,
+                       r.percentage AS percentage,
+                       r.time_spent AS time_spent
+                FROM quiz_results r
+                JOIN users u ON u.id = r.student_id
+                LEFT JOIN quizzes q ON q.id = r.quiz_id
+                WHERE u.role = 'student' AND r.is_completed = :completed AND r.created_at IS NOT NULL
+            """
+        percentage = "(r.total_score * 100.0 / r.max_score)"
+        return f"""
+            SELECT r.student_id AS student_id,
+                   {day_of_sql(self.dialect, 'r.completed_at')} AS day,
+                   {hour_of_sql(self.dialect, 'r.completed_at')} AS hour,
+                   COALESCE(t.created_by, 0) AS teacher_id,
+                   COALESCE(t.subject, '') AS subject,
+                   {_bucket_case_sql(percentage)} AS score_bucket,
+                   {percentage} AS score,
+                   {percentage} AS percentage,
+                   NULL AS time_spent
+            FROM test_attempts r
+            LEFT JOIN adaptive_tests t ON t.id = r.test_id
+            WHERE r.completed_at IS NOT NULL AND r.max_score > 0
+        """
+
+    def rebuild(self, sources: Optional[Iterable[str]] = None) -> int:
+        """Recalculer les cubes depuis les tables brutes (INSERT ... SELECT groupé)"""
+        sources = list(sources or (SOURCE_QUIZ, SOURCE_ADAPTIVE))
+        self.db.query(AnalyticsCube).filter(AnalyticsCube.source.in_(sources)).delete(synchronize_session=False)
+        self.db.query(AnalyticsStudentDay).filter(AnalyticsStudentDay.source.in_(sources)).delete(synchronize_session=False)
+
+        for source in sources:
+            raw = self._raw_results_sql(source)
+            # Agrégat toutes classes (une fois par résultat) puis ventilation par appartenance
+            fanned_out = f"""
+                SELECT {ALL_CLASSES} AS class_id, raw.* FROM ({raw}) raw
+                UNION ALL
+                SELECT cs.class_id AS class_id, raw.* FROM ({raw}) raw
+                JOIN (SELECT DISTINCT class_id, student_id FROM class_students) cs
+                  ON cs.student_id = raw.student_id
+            """
+            self.db.execute(text(f"""
+                INSERT INTO analytics_cubes
+                    (source, day, hour, class_id, teacher_id, subject, score_bucket,
+                     result_count, score_sum, percentage_sum, time_spent_sum, time_spent_count)
+                SELECT :source, day, hour, class_id, teacher_id, subject, score_bucket,
+                       COUNT(*), COALESCE(SUM(score), 0), COALESCE(SUM(percentage), 0),
+                       COALESCE(SUM(time_spent), 0), COUNT(time_spent)
+                FROM ({fanned_out}) fanned
+                GROUP BY day, hour, class_id, teacher_id, subject, score_bucket
+            """), {"source": source, "completed": True})
+            self.db.execute(text(f"""
+                INSERT INTO analytics_student_days (source, student_id, day, result_count)
+                SELECT :source, student_id, day, COUNT(*)
+                FROM ({raw}) raw
+                GROUP BY student_id, day
+            """), {"source": source, "completed": True})
+
+        self.db.commit()
+        return self.db.query(AnalyticsCube).filter(AnalyticsCube.source.in_(sources)).count()
+
+    def check_consistency(self, since: Optional[date] = None, tolerance: float = 0.01) -> List[Dict]:
+        """Comparer les totaux journaliers du cube aux tables brutes; retourne les écarts"""
+        mismatches = []
+        for source in (SOURCE_QUIZ, SOURCE_ADAPTIVE):
+            raw_filter = "WHERE day >= :since" if since else ""
+            raw_rows = self.db.execute(text(f"""
+                SELECT day, COUNT(*) AS result_count, COALESCE(SUM(score), 0) AS score_sum
+                FROM ({self._raw_results_sql(source)}) raw
+                {raw_filter}
+                GROUP BY day
+            """), {"completed": True, "since": since}).fetchall()
+            raw = {str(row.day): (row.result_count, float(row.score_sum)) for row in raw_rows}
+
+            cube = {
+                str(row.day): (row.result_count, float(row.score_sum or 0))
+                for row in self._daily_query(source, since)
+            }
+
+            for day in sorted(set(raw) | set(cube)):
+                raw_count, raw_sum = raw.get(day, (0, 0.0))
+                cube_count, cube_sum = cube.get(day, (0, 0.0))
+                if raw_count != cube_count or abs(raw_sum - cube_sum) > tolerance:
+                    mismatches.append({
+                        "source": source,
+                        "day": day,
+                        "raw_count": raw_count,
+                        "cube_count": cube_count,
+                        "raw_score_sum": round(raw_sum, 2),
+                        "cube_score_sum": round(cube_sum, 2),
+                    })
+        return mismatches
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _class_key(class_id: Optional[int]) -> int:
+        """Valeur de la dimension classe à lire: la classe demandée ou l'agrégat toutes classes"""
+        return ALL_CLASSES if class_id is None else class_id
+
+    def _class_students(self, class_id: int):
+        """Sous-requête des élèves d'une classe (les journées élèves ne portent pas de classe)"""
+        return self.db.query(ClassStudent.student_id).filter(ClassStudent.class_id == class_id)
+
+    def _daily_query(self, source: str, since: Optional[date] = None, class_id: Optional[int] = None):
+        query = self.db.query(
+            AnalyticsCube.day,
+            func.sum(AnalyticsCube.result_count).label("result_count"),
+            func.sum(AnalyticsCube.score_sum).label("score_sum"),
+            func.sum(AnalyticsCube.percentage_sum).label("percentage_sum"),
+            func.sum(AnalyticsCube.time_spent_sum).label("time_spent_sum"),
+            func.sum(AnalyticsCube.time_spent_count).label("time_spent_count"),
+        ).filter(AnalyticsCube.source == source, AnalyticsCube.class_id == self._class_key(class_id))
+        if since is not None:
+            query = query.filter(AnalyticsCube.day >= since)
+        return query.group_by(AnalyticsCube.day)
+
+    def get_daily_totals(
+        self,
+        source: str = SOURCE_QUIZ,
+        since: Optional[date] = None,
+        class_id: Optional[int] = None
+    ) -> Dict[date, Dict[str, float]]:
+        """Mesures agrégées par jour: count, score_sum, percentage_sum, time_spent_sum, time_spent_count"""
+        return {
+            row.day: {
+                "count": row.result_count or 0,
+                "score_sum": row.score_sum or 0.0,
+                "percentage_sum": row.percentage_sum or 0.0,
+                "time_spent_sum": row.time_spent_sum or 0,
+                "time_spent_count": row.time_spent_count or 0,
+            }
+            for row in self._daily_query(source, since, class_id)
+        }
+
+    def get_bucket_counts(
+        self,
+        source: str = SOURCE_QUIZ,
+        since: Optional[date] = None,
+        class_id: Optional[int] = None
+    ) -> Dict[int, int]:
+        """Nombre de résultats par tranche de score"""
+        query = self.db.query(
+            AnalyticsCube.score_bucket, func.sum(AnalyticsCube.result_count)
+        ).filter(AnalyticsCube.source == source, AnalyticsCube.class_id == self._class_key(class_id))
+        if since is not None:
+            query = query.filter(AnalyticsCube.day >= since)
+        return {bucket: count or 0 for bucket, count in query.group_by(AnalyticsCube.score_bucket)}
+
+    def get_subject_averages(self, teacher_id: int, source: str = SOURCE_ADAPTIVE) -> Dict[str, float]:
+        """Pourcentage moyen par matière pour les évaluations d'un enseignant"""
+        rows = self.db.query(
+            AnalyticsCube.subject,
+            func.sum(AnalyticsCube.percentage_sum),
+            func.sum(AnalyticsCube.result_count)
+        ).filter(
+            AnalyticsCube.source == source,
+            AnalyticsCube.class_id == ALL_CLASSES,
+            AnalyticsCube.teacher_id == teacher_id
+        ).group_by(AnalyticsCube.subject)
+        return {subject: (total or 0.0) / count for subject, total, count in rows if count}
+
+    def count_active_students(
+        self,
+        source: str = SOURCE_QUIZ,
+        since: Optional[date] = None,
+        class_id: Optional[int] = None
+    ) -> int:
+        """Nombre d'élèves distincts ayant au moins un résultat depuis `since`"""
+        query = self.db.query(func.count(func.distinct(AnalyticsStudentDay.student_id))).filter(
+            AnalyticsStudentDay.source == source
+        )
+        if since is not None:
+            query = query.filter(AnalyticsStudentDay.day >= since)
+        if class_id is not None:
+            query = query.filter(AnalyticsStudentDay.student_id.in_(self._class_students(class_id)))
+        return query.scalar() or 0
+
+    def get_student_days(
+        self,
+        source: str = SOURCE_QUIZ,
+        since: Optional[date] = None,
+        class_id: Optional[int] = None
+    ) -> List[Tuple[int, date]]:
+        """Couples (élève, jour) actifs, pour les comptages d'élèves distincts par période"""
+        query = self.db.query(AnalyticsStudentDay.student_id, AnalyticsStudentDay.day).filter(
+            AnalyticsStudentDay.source == source
+        )
+        if since is not None:
+            query = query.filter(AnalyticsStudentDay.day >= since)
+        if class_id is not None:
+            query = query.filter(AnalyticsStudentDay.student_id.in_(self._class_students(class_id)))
+        return [(row.student_id, row.day) for row in query]
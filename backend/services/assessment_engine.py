@@ -8,9 +8,8 @@ from sqlalchemy.orm import Session
 from datetime import datetime
 import random
 
-from models.assessment import Assessment
-from models.assessment_question import AssessmentQuestion
-from models.assessment_result import AssessmentResult
+from models.assessment import Assessment, AssessmentQuestion, AssessmentResult
+from services.scoring_kernel import assessment_keys, grade
 
 class AssessmentEngine:
     """Moteur d'évaluation intelligent avec questions adaptatives"""
@@ -146,10 +145,25 @@ class AssessmentEngine:
                 }
             ]
     
+    def grade_answers(self, assessment_id: int, student_answers: List[Dict]) -> List[Dict]:
+        """Réponses avec leur correction: les réponses brutes ("answer") sont notées avec le
+        corrigé compilé de l'évaluation, sinon le "is_correct" fourni est conservé"""
+        report = grade(
+            assessment_keys(self.db, assessment_id),
+            [answer for answer in student_answers if "answer" in answer]
+        )
+        items = {str(item.question_id): item for item in report.items}
+        graded = []
+        for answer in student_answers:
+            item = items.get(str(answer.get("question_id")))
+            graded.append({**answer, "is_correct": item.is_correct if item else bool(answer.get("is_correct"))})
+        return graded
+    
     def generate_adaptive_questions(self, assessment_id: int, student_answers: List[Dict]) -> List[AssessmentQuestion]:
         """Générer des questions adaptatives basées sur les réponses"""
         
         # Analyser les réponses pour déterminer le niveau
+        student_answers = self.grade_answers(assessment_id, student_answers)
         correct_answers = sum(1 for answer in student_answers if answer["is_correct"])
         total_questions = len(student_answers)
         success_rate = correct_answers / total_questions if total_questions > 0 else 0
@@ -287,10 +301,16 @@ class AssessmentEngine:
         subject_scores = {}
         difficulty_scores = {}
         
+        # Questions chargées en une requête, réponses notées en une passe
+        student_answers = self.grade_answers(assessment_id, student_answers)
+        questions = {
+            question.id: question for question in self.db.query(AssessmentQuestion).filter(
+                AssessmentQuestion.id.in_([answer["question_id"] for answer in student_answers])
+            )
+        }
+        
         for answer in student_answers:
-            question = self.db.query(AssessmentQuestion).filter(
-                AssessmentQuestion.id == answer["question_id"]
-            ).first()
+            question = questions.get(answer["question_id"])
             
             if question:
                 max_score += question.points
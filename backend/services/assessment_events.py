@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Écriture, lecture et reconstruction du journal unifié des évaluations (assessment_events).
+
+Chaque soumission (quiz, test adaptatif, remédiation, évaluation initiale) écrit
+son événement dans la même transaction (listener after_flush ci-dessous); les endpoints
+d'analytics élève lisent ce journal au lieu de fusionner quatre tables en Python.
+La classe d'un événement est celle de l'assignation évaluée (quiz assigné, évaluation
+initiale assignée), pas une classe choisie parmi celles de l'élève.
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import event, func, inspect as sa_inspect, text
+from sqlalchemy.orm import Session
+
+from models.adaptive_evaluation import TestAttempt
+from models.assessment import AssessmentResult
+from models.assessment_event import (
+    AssessmentEvent, SOURCE_QUIZ, SOURCE_ADAPTIVE, SOURCE_REMEDIATION, SOURCE_INITIAL_ASSESSMENT
+)
+from models.quiz import QuizResult
+from models.remediation import RemediationResult
+
+
+SOURCE_TABLES = {
+    SOURCE_QUIZ: "quiz_results",
+    SOURCE_ADAPTIVE: "test_attempts",
+    SOURCE_REMEDIATION: "remediation_results",
+    SOURCE_INITIAL_ASSESSMENT: "assessment_results",
+}
+
+
+# Classe de l'assignation d'un résultat `r`: assignation directe à l'élève d'abord, puis
+# assignation à l'une de ses classes. Les tests adaptatifs (classes adaptatives, autre
+# table) et la remédiation (sans assignation) n'ont pas de classe.
+ASSIGNMENT_CLASS_SQL = {
+    SOURCE_QUIZ: """(
+        SELECT qa.class_id FROM quiz_assignments qa
+        WHERE qa.quiz_id = r.quiz_id AND qa.class_id IS NOT NULL
+          AND (qa.student_id = r.student_id
+               OR (qa.student_id IS NULL AND qa.class_id IN (
+                   SELECT cs.class_id FROM class_students cs WHERE cs.student_id = r.student_id)))
+        ORDER BY CASE WHEN qa.student_id IS NULL THEN 1 ELSE 0 END, qa.id DESC
+        LIMIT 1
+    )""",
+    SOURCE_INITIAL_ASSESSMENT: """(
+        SELECT aa.class_id FROM assessment_assignments aa
+        WHERE aa.assessment_id = r.assessment_id AND aa.student_id = r.student_id
+          AND aa.class_id IS NOT NULL
+        ORDER BY aa.id DESC
+        LIMIT 1
+    )""",
+}
+
+
+# Upsert portable (SQLite >= 3.24 et PostgreSQL)
+UPSERT_EVENT_SQL = text("""
+    INSERT INTO assessment_events
+        (source, source_id, student_id, class_id, subject, title, score, max_score, normalized_score, occurred_at)
+    VALUES (:source, :source_id, :student_id, :class_id,
+            :subject, :title, :score, :max_score, :normalized_score, :occurred_at)
+    ON CONFLICT (source, source_id) DO UPDATE SET
+        class_id = excluded.class_id,
+        subject = excluded.subject,
+        title = excluded.title,
+        score = excluded.score,
+        max_score = excluded.max_score,
+        normalized_score = excluded.normalized_score,
+        occurred_at = excluded.occurred_at
+""")
+
+
+ADAPTIVE_RESPONSES_SQL = text("""
+    SELECT COUNT(*), COALESCE(SUM(CASE WHEN is_correct THEN 1 ELSE 0 END), 0)
+    FROM question_responses WHERE attempt_id = :attempt_id
+""")
+
+
+def _normalized(score, max_score) -> float:
+    return (score / max_score * 100) if max_score and max_score > 0 else 0
+
+
+def _quiz_event(connection, result):
+    if not result.is_completed or result.created_at is None:
+        return None
+    return {
+        "subject": result.sujet or 'Général',
+        "title": f"Quiz {result.id}",
+        "score": result.score,
+        "max_score": result.max_score,
+        "normalized_score": _normalized(result.score, result.max_score),
+        "occurred_at": result.created_at,
+    }
+
+
+def _adaptive_event(connection, attempt):
+    if attempt.completed_at is None:
+        return None
+    # Score du test adaptatif = bonnes réponses / réponses
+    total, correct = connection.execute(ADAPTIVE_RESPONSES_SQL, {"attempt_id": attempt.id}).one()
+    if not total:
+        return None
+    score = correct / total * 100
+    return {
+        "subject": 'Test Adaptatif',
+        "title": f"Test {attempt.id}",
+        "score": score,
+        "max_score": 100,
+        "normalized_score": score,
+        "occurred_at": attempt.completed_at,
+    }
+
+
+def _remediation_event(connection, result):
+    if result.completed_at is None:
+        return None
+    return {
+        "subject": result.topic or 'Remédiation',
+        "title": f"Remédiation {result.exercise_type}",
+        "score": result.score,
+        "max_score": result.max_score,
+        "normalized_score": _normalized(result.score, result.max_score),
+        "occurred_at": result.completed_at,
+    }
+
+
+def _initial_assessment_event(connection, result):
+    if result.percentage is None or result.completed_at is None:
+        return None
+    return {
+        "subject": 'Évaluation Initiale',
+        "title": 'Évaluation Initiale',
+        "score": result.percentage,
+        "max_score": 100,
+        "normalized_score": result.percentage,
+        "occurred_at": result.completed_at,
+    }
+
+
+# modèle -> (source, construction de l'événement, colonnes suivies en mise à jour)
+EVENT_SOURCES = {
+    QuizResult: (SOURCE_QUIZ, _quiz_event, ("is_completed", "score", "max_score", "sujet", "created_at")),
+    TestAttempt: (SOURCE_ADAPTIVE, _adaptive_event, ("completed_at", "status")),
+    RemediationResult: (SOURCE_REMEDIATION, _remediation_event, ("score", "max_score", "topic", "completed_at")),
+    AssessmentResult: (SOURCE_INITIAL_ASSESSMENT, _initial_assessment_event, ("percentage", "completed_at")),
+}
+
+
+def assignment_class_id(connection, source: str, source_id: int) -> Optional[int]:
+    """Classe de l'assignation d'un résultat (NULL sans assignation de classe)"""
+    table, class_sql = SOURCE_TABLES[source], ASSIGNMENT_CLASS_SQL.get(source)
+    if class_sql is None:
+        return None
+    return connection.execute(
+        text(f"SELECT {class_sql} FROM {table} r WHERE r.id = :source_id"), {"source_id": source_id}
+    ).scalar()
+
+
+def record_assessment_event(connection, target) -> bool:
+    """Écrire (ou corriger) l'événement d'un résultat dans la transaction courante"""
+    source, build, _ = EVENT_SOURCES[type(target)]
+    values = build(connection, target)
+    if values is None:
+        return False
+    connection.execute(UPSERT_EVENT_SQL, {
+        "source": source,
+        "source_id": target.id,
+        "student_id": target.student_id,
+        "class_id": assignment_class_id(connection, source, target.id),
+        **values,
+    })
+    return True
+
+
+@event.listens_for(Session, "after_flush")
+def _record_flushed_results(session, flush_context):
+    """Après le flush (les réponses d'un test terminé sont alors écrites)"""
+    targets = [obj for obj in session.new if type(obj) in EVENT_SOURCES]
+    for obj in session.dirty:
+        tracked = EVENT_SOURCES.get(type(obj), (None, None, ()))[2]
+        state = sa_inspect(obj)
+        if tracked and any(state.attrs[name].history.has_changes() for name in tracked):
+            targets.append(obj)
+    removed = [obj for obj in session.deleted if type(obj) in EVENT_SOURCES]
+    if not targets and not removed:
+        return
+    connection = session.connection()
+    for obj in targets:
+        record_assessment_event(connection, obj)
+    table = AssessmentEvent.__table__
+    for obj in removed:
+        connection.execute(table.delete().where(
+            table.c.source == EVENT_SOURCES[type(obj)][0],
+            table.c.source_id == obj.id,
+        ))
+
+
+# Résultats historiques d'une source, au format du journal (mêmes règles que les listeners)
+BACKFILL_SELECTS = {
+    SOURCE_QUIZ: f"""
+        SELECT r.id AS source_id, r.student_id, {ASSIGNMENT_CLASS_SQL[SOURCE_QUIZ]} AS class_id,
+               COALESCE(r.sujet, 'Général') AS subject, 'Quiz ' || r.id AS title,
+               r.score AS score, r.max_score AS max_score,
+               CASE WHEN r.max_score > 0 THEN r.score * 100.0 / r.max_score ELSE 0 END AS normalized_score,
+               r.created_at AS occurred_at
+        FROM quiz_results r
+        WHERE r.is_completed = :completed AND r.created_at IS NOT NULL
+    """,
+    SOURCE_ADAPTIVE: f"""
+        SELECT r.id AS source_id, r.student_id, NULL AS class_id,
+               'Test Adaptatif' AS subject, 'Test ' || r.id AS title,
+               qr.correct * 100.0 / qr.total AS score, 100 AS max_score,
+               qr.correct * 100.0 / qr.total AS normalized_score,
+               r.completed_at AS occurred_at
+        FROM test_attempts r
+        JOIN (
+            SELECT attempt_id, COUNT(*) AS total,
+                   SUM(CASE WHEN is_correct THEN 1 ELSE 0 END) AS correct
+            FROM question_responses GROUP BY attempt_id
+        ) qr ON qr.attempt_id = r.id
+        WHERE r.completed_at IS NOT NULL
+    """,
+    SOURCE_REMEDIATION: f"""
+        SELECT r.id AS source_id, r.student_id, NULL AS class_id,
+               COALESCE(r.topic, 'Remédiation') AS subject, 'Remédiation ' || r.exercise_type AS title,
+               r.score AS score, r.max_score AS max_score,
+               CASE WHEN r.max_score > 0 THEN r.score * 100.0 / r.max_score ELSE 0 END AS normalized_score,
+               r.completed_at AS occurred_at
+        FROM remediation_results r
+        WHERE r.completed_at IS NOT NULL
+    """,
+    SOURCE_INITIAL_ASSESSMENT: f"""
+        SELECT r.id AS source_id, r.student_id, {ASSIGNMENT_CLASS_SQL[SOURCE_INITIAL_ASSESSMENT]} AS class_id,
+               'Évaluation Initiale' AS subject, 'Évaluation Initiale' AS title,
+               r.percentage AS score, 100 AS max_score, r.percentage AS normalized_score,
+               r.completed_at AS occurred_at
+        FROM assessment_results r
+        WHERE r.percentage IS NOT NULL AND r.completed_at IS NOT NULL
+    """,
+}
+
+
+class AssessmentEventLog:
+    """Séries temporelles d'évaluation d'un élève depuis le journal unifié"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def student_events(
+        self,
+        student_id: int,
+        since: Optional[datetime] = None,
+        limit: Optional[int] = None,
+        newest_first: bool = False
+    ) -> List[AssessmentEvent]:
+        """Événements d'un élève (parcours de l'index élève, date)"""
+        query = self.db.query(AssessmentEvent).filter(AssessmentEvent.student_id == student_id)
+        if since is not None:
+            query = query.filter(AssessmentEvent.occurred_at >= since)
+        order = AssessmentEvent.occurred_at.desc() if newest_first else AssessmentEvent.occurred_at
+        query = query.order_by(order, AssessmentEvent.id)
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
+
+    def subject_totals(self, student_id: int) -> List[Dict]:
+        """Totaux par matière d'un élève (score, score max, nombre)"""
+        rows = self.db.query(
+            AssessmentEvent.subject,
+            func.sum(AssessmentEvent.score),
+            func.sum(AssessmentEvent.max_score),
+            func.count(AssessmentEvent.id)
+        ).filter(
+            AssessmentEvent.student_id == student_id
+        ).group_by(AssessmentEvent.subject).all()
+        return [
+            {"subject": subject, "total_score": total or 0, "max_score": max_total or 0, "count": count}
+            for subject, total, max_total, count in rows
+        ]
+
+    def backfill(self) -> int:
+        """Ajouter au journal les résultats historiques absents (idempotent)"""
+        inserted = 0
+        for source, select_sql in BACKFILL_SELECTS.items():
+            result = self.db.execute(text(f"""
+                INSERT INTO assessment_events
+                    (source, source_id, student_id, class_id, subject, title,
+                     score, max_score, normalized_score, occurred_at)
+                SELECT :source, h.source_id, h.student_id, h.class_id, h.subject, h.title,
+                       h.score, h.max_score, h.normalized_score, h.occurred_at
+                FROM ({select_sql}) h
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM assessment_events e
+                    WHERE e.source = :source AND e.source_id = h.source_id
+                )
+            """), {"source": source, "completed": True})
+            inserted += result.rowcount or 0
+        self.db.commit()
+        return inserted
+
+    def reassign_classes(self) -> int:
+        """Recalculer la classe de tous les événements depuis leurs assignations"""
+        updated = 0
+        for source, table in SOURCE_TABLES.items():
+            class_sql = ASSIGNMENT_CLASS_SQL.get(source, "NULL")
+            result = self.db.execute(text(f"""
+                UPDATE assessment_events SET class_id = (
+                    SELECT {class_sql} FROM {table} r WHERE r.id = assessment_events.source_id
+                )
+                WHERE source = :source
+            """), {"source": source})
+            updated += result.rowcount or 0
+        self.db.commit()
+        return updated
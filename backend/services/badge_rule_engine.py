@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+"""
+Moteur de règles de badges et d'achievements
+Les critères sont déclarés une seule fois et évalués sur des compteurs
+incrémentaux par étudiant (StudentBadgeCounter) au lieu de rescanner
+l'historique complet des résultats à chaque soumission.
+"""
+
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import String, and_, cast, exists, literal
+from sqlalchemy.orm import Session
+
+from models.background_task import BackgroundTask, TASK_PENDING, TASK_RUNNING
+from models.gamification import StudentBadgeCounter
+from models.quiz import Quiz, QuizResult
+from models.remediation import RemediationResult, RemediationBadge
+
+logger = logging.getLogger(__name__)
+
+# Nombre de pourcentages conservés pour les règles "début vs fin"
+WINDOW_SIZE = 3
+# Seuils partagés avec les achievements historiques
+FAST_THRESHOLD_SECONDS = 1800
+EARLY_HOUR = 8
+
+
+@dataclass
+class BadgeRule:
+    """Règle déclarative: une métrique calculée sur un compteur et une cible"""
+    name: str
+    scope: str                      # 'quiz', 'quiz:*' ou 'remediation:*'
+    metric: Callable[[StudentBadgeCounter], float]
+    target: float
+    badge_type: str = "achievement"
+    description: str = ""
+    points: int = 0
+    awards: bool = False            # True = badge attribué automatiquement
+    condition: Optional[Callable[[StudentBadgeCounter], bool]] = None
+
+    def matches_scope(self, scope: str) -> bool:
+        if self.scope.endswith(":*"):
+            return scope.startswith(self.scope[:-1])
+        return scope == self.scope
+
+    def progress(self, counter: Optional[StudentBadgeCounter]) -> Dict[str, float]:
+        current = self.metric(counter) if counter else 0
+        return {"current": current, "target": self.target}
+
+    def is_met(self, counter: StudentBadgeCounter) -> bool:
+        if self.metric(counter) < self.target:
+            return False
+        return self.condition(counter) if self.condition else True
+
+
+def _average(counter: StudentBadgeCounter) -> float:
+    return counter.percentage_sum / counter.event_count if counter.event_count else 0.0
+
+
+def _window_average(raw: Optional[str]) -> float:
+    values = json.loads(raw) if raw else []
+    return sum(values) / len(values) if values else 0.0
+
+
+def _improvement(counter: StudentBadgeCounter) -> float:
+    return _window_average(counter.recent_percentages) - _window_average(counter.first_percentages)
+
+
+# ============================================================================
+# RÈGLES DÉCLARÉES
+# ============================================================================
+
+BADGE_RULES: List[BadgeRule] = [
+    # Badges de remédiation (attribués automatiquement, par sujet)
+    BadgeRule("Débutant", "remediation:*", lambda c: c.event_count, 1,
+              badge_type="achievement", points=10, awards=True,
+              description="Premier exercice de remédiation complété"),
+    BadgeRule("Persévérant", "remediation:*", lambda c: c.event_count, 5,
+              badge_type="achievement", points=25, awards=True,
+              description="5 exercices de remédiation complétés"),
+    BadgeRule("Expert", "remediation:*", lambda c: c.event_count, 10,
+              badge_type="expertise", points=50, awards=True,
+              condition=lambda c: _average(c) >= 80,
+              description="Expert en {topic} avec {average}% de réussite"),
+    BadgeRule("Amélioration", "remediation:*", lambda c: c.event_count, WINDOW_SIZE,
+              badge_type="improvement", points=30, awards=True,
+              condition=lambda c: _improvement(c) > 20,
+              description="Amélioration significative en {topic}"),
+    # Achievements de quiz (progression seulement, déblocage via l'endpoint)
+    BadgeRule("Quiz Master", "quiz", lambda c: c.event_count, 10),
+    BadgeRule("Perfect Score", "quiz", lambda c: c.perfect_count, 1),
+    BadgeRule("Streak Master", "quiz", lambda c: c.best_streak, 5),
+    BadgeRule("Rapide comme l'éclair", "quiz", lambda c: c.fast_count, 5),
+    BadgeRule("Lève-tôt", "quiz", lambda c: c.early_count, 1),
+    BadgeRule("Maître du Sujet", "quiz:*",
+              lambda c: 1 if c.event_count >= 10 and _average(c) >= 90 else 0, 1),
+]
+
+RULES_BY_NAME: Dict[str, BadgeRule] = {rule.name: rule for rule in BADGE_RULES}
+
+
+def new_counter(student_id: int, scope: str) -> StudentBadgeCounter:
+    """Créer un compteur vierge (les valeurs par défaut des colonnes ne s'appliquent qu'au flush)"""
+    return StudentBadgeCounter(
+        student_id=student_id,
+        scope=scope,
+        event_count=0,
+        perfect_count=0,
+        fast_count=0,
+        early_count=0,
+        percentage_sum=0.0,
+        first_percentages="[]",
+        recent_percentages="[]",
+        current_streak=0,
+        best_streak=0,
+        last_activity_date=None,
+        updated_at=datetime.utcnow()
+    )
+
+
+def apply_event(
+    counter: StudentBadgeCounter,
+    percentage: float,
+    occurred_at: datetime,
+    time_spent: Optional[int] = None
+) -> None:
+    """Appliquer un événement à un compteur: O(1), sans accès base"""
+    percentage = float(percentage or 0)
+    counter.event_count += 1
+    counter.percentage_sum += percentage
+    if percentage >= 100:
+        counter.perfect_count += 1
+    if time_spent is not None and 0 < time_spent <= FAST_THRESHOLD_SECONDS:
+        counter.fast_count += 1
+    if occurred_at.hour < EARLY_HOUR:
+        counter.early_count += 1
+
+    first = json.loads(counter.first_percentages or "[]")
+    if len(first) < WINDOW_SIZE:
+        first.append(percentage)
+        counter.first_percentages = json.dumps(first)
+    recent = json.loads(counter.recent_percentages or "[]")
+    recent = (recent + [percentage])[-WINDOW_SIZE:]
+    counter.recent_percentages = json.dumps(recent)
+
+    # Série de jours consécutifs
+    day = occurred_at.date()
+    last_day = counter.last_activity_date
+    if last_day is None or day > last_day:
+        if last_day is not None and day - last_day == timedelta(days=1):
+            counter.current_streak += 1
+        else:
+            counter.current_streak = 1
+        counter.last_activity_date = day
+        counter.best_streak = max(counter.best_streak, counter.current_streak)
+
+    counter.updated_at = datetime.utcnow()
+
+
+def _quiz_scopes(subject: Optional[str]) -> List[str]:
+    return ["quiz", f"quiz:{subject or 'Général'}"]
+
+
+def _remediation_scopes(topic: str) -> List[str]:
+    return [f"remediation:{topic}"]
+
+
+class BadgeRuleEngine:
+    """Évalue les règles de badges sur les compteurs et attribue en un seul commit"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # ------------------------------------------------------------------
+    # Événements
+    # ------------------------------------------------------------------
+
+    def record_quiz_result(self, result: QuizResult) -> List[Dict[str, object]]:
+        """Enregistrer un résultat de quiz déjà persisté"""
+        subject = result.sujet or (result.quiz.subject if result.quiz else None)
+        return self.record_event(
+            result.student_id,
+            _quiz_scopes(subject),
+            result.percentage,
+            result.completed_at or datetime.utcnow(),
+            time_spent=result.time_spent
+        )
+
+    def record_remediation_result(self, result: RemediationResult) -> List[Dict[str, object]]:
+        """Enregistrer un résultat de remédiation déjà persisté"""
+        return self.record_event(
+            result.student_id,
+            _remediation_scopes(result.topic),
+            result.percentage,
+            result.completed_at or datetime.utcnow(),
+            time_spent=result.time_spent
+        )
+
+    def record_event(
+        self,
+        student_id: int,
+        scopes: List[str],
+        percentage: float,
+        occurred_at: datetime,
+        time_spent: Optional[int] = None
+    ) -> List[Dict[str, object]]:
+        """Mettre à jour les compteurs concernés puis attribuer les badges en un seul commit.
+
+        L'événement doit déjà être enregistré: si l'étudiant n'a encore aucun
+        compteur, son historique (qui inclut l'événement) est rejoué à la place.
+        """
+        counters = self._load_counters(student_id)
+        if not counters:
+            self.backfill(student_ids=[student_id])
+            counters = self._load_counters(student_id)
+        else:
+            for scope in scopes:
+                counter = counters.get(scope)
+                if counter is None:
+                    counter = new_counter(student_id, scope)
+                    self.db.add(counter)
+                    counters[scope] = counter
+                apply_event(counter, percentage, occurred_at, time_spent)
+
+        awarded = self._award(student_id, [counters[s] for s in scopes if s in counters])
+        self.db.commit()
+        return awarded
+
+    # ------------------------------------------------------------------
+    # Progression
+    # ------------------------------------------------------------------
+
+    def get_progress(self, student_id: int, rule_name: str) -> Dict[str, float]:
+        """Progression d'une règle, à partir des compteurs (meilleur périmètre pour les jokers)"""
+        return self.get_progress_many(student_id, [rule_name])[rule_name]
+
+    def get_progress_many(self, student_id: int, rule_names: Iterable[str]) -> Dict[str, Dict[str, float]]:
+        """Progression de plusieurs règles, compteurs chargés une seule fois pour toutes.
+
+        Lecture seule: sans compteurs persistés (élève pas encore rejoué), l'historique
+        est rejoué une fois en mémoire sans rien écrire; la persistance se fait à la
+        prochaine soumission ou via rebuild_badge_counters.py.
+        """
+        rules = {name: RULES_BY_NAME.get(name) for name in rule_names}
+        counters: Dict[str, StudentBadgeCounter] = {}
+        if any(rules.values()):
+            counters = self._load_counters(student_id)
+            if not counters:
+                replayed, _ = self.replay(student_ids=[student_id])
+                counters = {scope: counter for (_, scope), counter in replayed.items()}
+
+        progress = {}
+        for name, rule in rules.items():
+            if rule is None:
+                progress[name] = {"current": 0, "target": 1}
+                continue
+            matching = [c for scope, c in counters.items() if rule.matches_scope(scope)]
+            progress[name] = max(
+                (rule.progress(c) for c in matching), key=lambda p: p["current"]
+            ) if matching else rule.progress(None)
+        return progress
+
+    # ------------------------------------------------------------------
+    # Rejeu de l'historique
+    # ------------------------------------------------------------------
+
+    def backfill(self, student_ids: Optional[Iterable[int]] = None, batch_size: int = 1000) -> Dict[str, int]:
+        """Reconstruire les compteurs en rejouant l'historique par lots.
+
+        Sans `student_ids`, tous les compteurs sont recalculés. Les badges
+        manquants sont attribués et le tout est écrit avec des insertions groupées.
+        """
+        student_ids = list(student_ids) if student_ids is not None else None
+        counters, events = self.replay(student_ids, batch_size)
+
+        delete_query = self.db.query(StudentBadgeCounter)
+        if student_ids is not None:
+            delete_query = delete_query.filter(StudentBadgeCounter.student_id.in_(student_ids))
+        delete_query.delete(synchronize_session=False)
+
+        by_student: Dict[int, List[StudentBadgeCounter]] = {}
+        for (student_id, _), counter in counters.items():
+            by_student.setdefault(student_id, []).append(counter)
+
+        awarded = 0
+        pending = list(counters.values())
+        for start in range(0, len(pending), batch_size):
+            self.db.bulk_save_objects(pending[start:start + batch_size])
+        for student_id, student_counters in by_student.items():
+            awarded += len(self._award(student_id, student_counters))
+        self.db.commit()
+
+        logger.info(f"🔁 Rejeu badges: {events} événements, {len(counters)} compteurs, {awarded} badges")
+        return {"events": events, "counters": len(counters), "badges_awarded": awarded}
+
+    def replay(
+        self, student_ids: Optional[Iterable[int]] = None, batch_size: int = 1000
+    ) -> Tuple[Dict[Tuple[int, str], StudentBadgeCounter], int]:
+        """Compteurs recalculés en mémoire depuis l'historique (hors session, rien n'est écrit)"""
+        student_ids = list(student_ids) if student_ids is not None else None
+        counters: Dict[Tuple[int, str], StudentBadgeCounter] = {}
+        events = 0
+        for student_id, scopes, percentage, occurred_at, time_spent in self._iter_history(student_ids, batch_size):
+            for scope in scopes:
+                key = (student_id, scope)
+                if key not in counters:
+                    counters[key] = new_counter(student_id, scope)
+                apply_event(counters[key], percentage, occurred_at, time_spent)
+            events += 1
+        return counters, events
+
+    @staticmethod
+    def _awaiting_badge_task(kind: str, subject_prefix: str, result_id):
+        """Tâche de badges du résultat pas encore appliquée: elle l'ajoutera elle-même aux compteurs"""
+        return exists().where(and_(
+            BackgroundTask.idempotency_key == literal(f"{kind}:{subject_prefix}:") + cast(result_id, String),
+            BackgroundTask.applied_at.is_(None),
+            BackgroundTask.status.in_([TASK_PENDING, TASK_RUNNING])
+        ))
+
+    def _iter_history(self, student_ids: Optional[List[int]], batch_size: int):
+        """Flux chronologique des résultats (quiz puis remédiation), lu par lots.
+
+        Les résultats dont la tâche de badges attend encore son exécution sont
+        exclus: rejoués ici puis appliqués par la tâche, ils compteraient deux fois.
+        La tâche en cours a déjà réservé ses effets (claim_effects): son résultat est inclus.
+        """
+        from services.post_submission_tasks import QUIZ_RESULT_BADGES, REMEDIATION_BADGES
+
+        quiz_query = self.db.query(
+            QuizResult.student_id, QuizResult.sujet, Quiz.subject,
+            QuizResult.percentage, QuizResult.completed_at, QuizResult.time_spent
+        ).outerjoin(Quiz, Quiz.id == QuizResult.quiz_id).filter(
+            QuizResult.is_completed == True,
+            ~self._awaiting_badge_task(QUIZ_RESULT_BADGES, "quiz_result", QuizResult.id)
+        )
+        if student_ids is not None:
+            quiz_query = quiz_query.filter(QuizResult.student_id.in_(student_ids))
+        quiz_rows = quiz_query.order_by(
+            QuizResult.student_id, QuizResult.completed_at, QuizResult.id
+        ).yield_per(batch_size)
+        for student_id, sujet, subject, percentage, completed_at, time_spent in quiz_rows:
+            if completed_at is None:
+                continue
+            yield student_id, _quiz_scopes(sujet or subject), percentage, completed_at, time_spent
+
+        remediation_query = self.db.query(
+            RemediationResult.student_id, RemediationResult.topic, RemediationResult.percentage,
+            RemediationResult.completed_at, RemediationResult.time_spent
+        ).filter(~self._awaiting_badge_task(REMEDIATION_BADGES, "remediation_result", RemediationResult.id))
+        if student_ids is not None:
+            remediation_query = remediation_query.filter(RemediationResult.student_id.in_(student_ids))
+        remediation_rows = remediation_query.order_by(
+            RemediationResult.student_id, RemediationResult.completed_at, RemediationResult.id
+        ).yield_per(batch_size)
+        for student_id, topic, percentage, completed_at, time_spent in remediation_rows:
+            if completed_at is None:
+                continue
+            yield student_id, _remediation_scopes(topic), percentage, completed_at, time_spent
+
+    # ------------------------------------------------------------------
+    # Attribution
+    # ------------------------------------------------------------------
+
+    def _load_counters(self, student_id: int) -> Dict[str, StudentBadgeCounter]:
+        rows = self.db.query(StudentBadgeCounter).filter(StudentBadgeCounter.student_id == student_id).all()
+        return {row.scope: row for row in rows}
+
+    def _award(self, student_id: int, counters: List[StudentBadgeCounter]) -> List[Dict[str, object]]:
+        """Ajouter à la session les badges nouvellement obtenus (sans commit)"""
+        candidates = []
+        for counter in counters:
+            for rule in BADGE_RULES:
+                if rule.awards and rule.matches_scope(counter.scope) and rule.is_met(counter):
+                    candidates.append((rule, counter))
+        if not candidates:
+            return []
+
+        # Une seule requête pour les badges déjà obtenus
+        existing = {
+            (badge_type, badge_name)
+            for badge_type, badge_name in self.db.query(
+                RemediationBadge.badge_type, RemediationBadge.badge_name
+            ).filter(RemediationBadge.student_id == student_id).all()
+        }
+
+        awarded = []
+        now = datetime.utcnow()
+        for rule, counter in candidates:
+            key = (rule.badge_type, rule.name)
+            if key in existing:
+                continue
+            existing.add(key)
+            description = rule.description.format(
+                topic=counter.scope.split(":", 1)[-1],
+                average=round(_average(counter), 1)
+            )
+            self.db.add(RemediationBadge(
+                student_id=student_id,
+                badge_type=rule.badge_type,
+                badge_name=rule.name,
+                description=description,
+                points=rule.points,
+                earned_at=now
+            ))
+            awarded.append({"badge_name": rule.name, "badge_type": rule.badge_type, "points": rule.points})
+            logger.info(f"🏆 Badge '{rule.name}' attribué à l'étudiant {student_id}")
+        return awarded
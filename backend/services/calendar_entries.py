@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Matérialisation des événements de calendrier (calendar_entries) à l'écriture.
+
+Chaque modèle source (quiz assignés, devoirs, cours planifiés, objectifs, événements
+personnels) a sa fonction de matérialisation; les listeners de mapper alignent sa
+ligne calendar_entries dans la transaction qui le modifie. Lecture: services/calendar_feed.py.
+"""
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import event, inspect as sa_inspect, text
+
+from models.calendar import CalendarEvent
+from models.calendar_entry import OPEN_ENDED
+from models.homework import AdvancedHomework
+from models.organization import Homework, LearningGoal
+from models.quiz import Quiz, QuizAssignment
+from models.schedule import ScheduleEvent
+from services.deadline_events import naive_utc
+
+WEEKDAYS = {
+    "monday": "MO", "tuesday": "TU", "wednesday": "WE", "thursday": "TH",
+    "friday": "FR", "saturday": "SA", "sunday": "SU",
+    "lundi": "MO", "mardi": "TU", "mercredi": "WE", "jeudi": "TH",
+    "vendredi": "FR", "samedi": "SA", "dimanche": "SU",
+}
+FREQUENCIES = {"daily": "DAILY", "weekly": "WEEKLY", "monthly": "MONTHLY", "yearly": "YEARLY"}
+
+def _parse_datetime(value) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return naive_utc(value)
+    if isinstance(value, str):
+        try:
+            return naive_utc(datetime.fromisoformat(value))
+        except ValueError:
+            return None
+    return None
+
+def build_rrule(frequency: Optional[str], interval=1, days=None) -> Optional[str]:
+    """Règle RRULE (sans UNTIL) depuis une fréquence 'daily'/'weekly'/... et des jours nommés"""
+    freq = FREQUENCIES.get((frequency or "").lower())
+    if freq is None:
+        return None
+    try:
+        interval = max(int(interval or 1), 1)
+    except (TypeError, ValueError):
+        interval = 1
+    rule = f"FREQ={freq};INTERVAL={interval}"
+    byday = [WEEKDAYS[day.lower()] for day in (days or []) if isinstance(day, str) and day.lower() in WEEKDAYS]
+    if byday and freq == "WEEKLY":
+        rule += ";BYDAY=" + ",".join(dict.fromkeys(byday))
+    return rule
+
+def _entry(source: str, item_id: int, starts_at: datetime, ends_at: Optional[datetime] = None, **values) -> dict:
+    ends_at = max(ends_at or starts_at, starts_at)
+    rule = values.get("rrule")
+    until = values.get("recurrence_until") if rule else None
+    if rule:
+        range_end = until + (ends_at - starts_at) if until else OPEN_ENDED
+    else:
+        range_end = ends_at
+    row = {
+        "source": source, "source_id": item_id,
+        "user_id": None, "class_id": None, "owner_id": None,
+        "event_type": source, "title": "", "description": None, "subject": None,
+        "location": None, "color": None, "status": None, "all_day": False,
+    }
+    row.update(values)
+    row.update(
+        starts_at=starts_at, ends_at=ends_at, rrule=rule, recurrence_until=until,
+        range_end=range_end, updated_at=datetime.utcnow()
+    )
+    return row
+
+def quiz_assignment_entry(connection, assignment: QuizAssignment) -> Optional[dict]:
+    due = naive_utc(assignment.due_date)
+    if due is None or assignment.is_active is False:
+        return None
+    quiz = connection.execute(
+        text("SELECT title, description, subject FROM quizzes WHERE id = :id"),
+        {"id": assignment.quiz_id}
+    ).first()
+    title = quiz.title if quiz else "Quiz"
+    return _entry(
+        "quiz_assignment", assignment.id, due,
+        # Un quiz assigné à un élève ne concerne pas le reste de sa classe
+        user_id=assignment.student_id,
+        class_id=assignment.class_id if assignment.student_id is None else None,
+        owner_id=assignment.assigned_by,
+        event_type="quiz_assignment",
+        title=f"Quiz: {title}",
+        description=(quiz.description if quiz else None) or "Quiz assigné",
+        subject=quiz.subject if quiz else None,
+        status=assignment.status,
+    )
+
+def homework_entry(connection, homework: Homework) -> Optional[dict]:
+    due = naive_utc(homework.due_date)
+    if due is None:
+        return None
+    return _entry(
+        "homework", homework.id, due,
+        user_id=homework.assigned_to,
+        class_id=homework.class_id if homework.assigned_to is None else None,
+        owner_id=homework.assigned_by,
+        event_type="homework",
+        title=homework.title,
+        description=homework.description,
+        subject=homework.subject,
+        status=homework.status,
+    )
+
+def advanced_homework_entry(connection, homework: AdvancedHomework) -> Optional[dict]:
+    due = naive_utc(homework.due_date)
+    if due is None or homework.is_active is False:
+        return None
+    return _entry(
+        "advanced_homework", homework.id, due,
+        class_id=homework.class_id,
+        owner_id=homework.created_by,
+        event_type="homework",
+        title=homework.title,
+        description=homework.description,
+        subject=homework.subject,
+        status="pending",
+    )
+
+def schedule_entry(connection, schedule: ScheduleEvent) -> Optional[dict]:
+    start = naive_utc(schedule.start_time)
+    if start is None or schedule.is_active is False:
+        return None
+    pattern = schedule.recurrence_pattern if isinstance(schedule.recurrence_pattern, dict) else {}
+    rule = build_rrule(pattern.get("type"), pattern.get("interval"), pattern.get("days")) if schedule.is_recurring else None
+    return _entry(
+        "schedule", schedule.id, start, naive_utc(schedule.end_time),
+        class_id=schedule.class_id,
+        owner_id=schedule.teacher_id,
+        event_type=schedule.event_type,
+        title=schedule.title,
+        description=schedule.description,
+        subject=schedule.subject,
+        location=schedule.location,
+        color=schedule.color,
+        status="scheduled",
+        rrule=rule,
+        recurrence_until=_parse_datetime(pattern.get("end_date") or pattern.get("until")),
+    )
+
+def goal_entry(connection, goal: LearningGoal) -> Optional[dict]:
+    target = naive_utc(goal.target_date)
+    if target is None or goal.user_id is None or goal.status == "abandoned":
+        return None
+    return _entry(
+        "goal", goal.id, target,
+        user_id=goal.user_id,
+        event_type="goal",
+        title=f"Objectif: {goal.title}",
+        description=goal.description,
+        subject=goal.subject,
+        status=goal.status,
+        all_day=True,
+    )
+
+def personal_entry(connection, calendar_event: CalendarEvent) -> Optional[dict]:
+    start = naive_utc(calendar_event.start_date)
+    if start is None or calendar_event.user_id is None:
+        return None
+    return _entry(
+        "personal", calendar_event.id, start, naive_utc(calendar_event.end_date),
+        user_id=calendar_event.user_id,
+        event_type=calendar_event.event_type,
+        title=calendar_event.title,
+        description=calendar_event.description,
+        location=calendar_event.location,
+        color=calendar_event.color,
+        status=calendar_event.priority,
+        all_day=bool(calendar_event.all_day),
+        rrule=build_rrule(calendar_event.recurrence),
+        recurrence_until=naive_utc(calendar_event.recurrence_end),
+    )
+
+# source -> (modèle, fonction de matérialisation)
+CALENDAR_SOURCES = {
+    "quiz_assignment": (QuizAssignment, quiz_assignment_entry),
+    "homework": (Homework, homework_entry),
+    "advanced_homework": (AdvancedHomework, advanced_homework_entry),
+    "schedule": (ScheduleEvent, schedule_entry),
+    "goal": (LearningGoal, goal_entry),
+    "personal": (CalendarEvent, personal_entry),
+}
+
+# Upsert portable (SQLite >= 3.24 et PostgreSQL)
+UPSERT_ENTRY_SQL = text("""
+    INSERT INTO calendar_entries
+        (source, source_id, user_id, class_id, owner_id, event_type, title, description, subject,
+         location, color, status, all_day, starts_at, ends_at, rrule, recurrence_until, range_end, updated_at)
+    VALUES (:source, :source_id, :user_id, :class_id, :owner_id, :event_type, :title, :description, :subject,
+            :location, :color, :status, :all_day, :starts_at, :ends_at, :rrule, :recurrence_until, :range_end, :updated_at)
+    ON CONFLICT (source, source_id) DO UPDATE SET
+        user_id = excluded.user_id,
+        class_id = excluded.class_id,
+        owner_id = excluded.owner_id,
+        event_type = excluded.event_type,
+        title = excluded.title,
+        description = excluded.description,
+        subject = excluded.subject,
+        location = excluded.location,
+        color = excluded.color,
+        status = excluded.status,
+        all_day = excluded.all_day,
+        starts_at = excluded.starts_at,
+        ends_at = excluded.ends_at,
+        rrule = excluded.rrule,
+        recurrence_until = excluded.recurrence_until,
+        range_end = excluded.range_end,
+        updated_at = excluded.updated_at
+""")
+
+DELETE_ENTRY_SQL = text("DELETE FROM calendar_entries WHERE source = :source AND source_id = :source_id")
+
+def materialize(connection, source: str, item) -> Optional[dict]:
+    """Aligner la ligne calendar_entries d'un élément (dans la transaction courante)"""
+    row = CALENDAR_SOURCES[source][1](connection, item)
+    if row is None:
+        connection.execute(DELETE_ENTRY_SQL, {"source": source, "source_id": item.id})
+    else:
+        connection.execute(UPSERT_ENTRY_SQL, row)
+    return row
+
+def _register_listeners(source: str, model) -> None:
+    @event.listens_for(model, "after_insert")
+    @event.listens_for(model, "after_update")
+    def _materialize(mapper, connection, target):
+        materialize(connection, source, target)
+
+    @event.listens_for(model, "after_delete")
+    def _unmaterialize(mapper, connection, target):
+        connection.execute(DELETE_ENTRY_SQL, {"source": source, "source_id": target.id})
+
+for _source, (_model, _) in CALENDAR_SOURCES.items():
+    _register_listeners(_source, _model)
+
+@event.listens_for(Quiz, "after_update")
+def _retitle_quiz_assignments(mapper, connection, target):
+    state = sa_inspect(target)
+    if not any(state.attrs[name].history.has_changes() for name in ("title", "subject")):
+        return
+    connection.execute(text("""
+        UPDATE calendar_entries SET title = :title, subject = :subject
+        WHERE source = 'quiz_assignment'
+          AND source_id IN (SELECT id FROM quiz_assignments WHERE quiz_id = :quiz_id)
+    """), {"title": f"Quiz: {target.title}", "subject": target.subject, "quiz_id": target.id})
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Calendrier d'un utilisateur lu dans calendar_entries.
+
+Une recherche par plage est une seule requête indexée: lignes adressées à
+l'utilisateur, dont il est l'auteur ou destinées à l'une de ses classes (résolues
+par l'annuaire en mémoire), dont l'intervalle [starts_at, range_end] recoupe la
+période. Les événements récurrents sont développés ici, occurrence par occurrence,
+et exportés tels quels (RRULE) dans le flux iCalendar.
+"""
+
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from dateutil.rrule import rrulestr
+from sqlalchemy import or_, text
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from models.calendar_entry import CalendarEntry
+from services.calendar_entries import CALENDAR_SOURCES, materialize
+from services.roster import student_class_ids
+
+ICAL_PRODID = "-//Najah AI//Calendrier//FR"
+
+
+def expand(entry: CalendarEntry, start: datetime, end: datetime,
+           limit: Optional[int] = None) -> List[Tuple[datetime, datetime]]:
+    """Occurrences (début, fin) d'une ligne qui recoupent [start, end]"""
+    duration = entry.ends_at - entry.starts_at
+    if not entry.rrule:
+        return [(entry.starts_at, entry.ends_at)]
+    try:
+        rule = rrulestr(entry.rrule, dtstart=entry.starts_at)
+    except (ValueError, TypeError):
+        return [(entry.starts_at, entry.ends_at)] if entry.starts_at <= end and entry.ends_at >= start else []
+    if entry.recurrence_until:
+        rule = rule.replace(until=entry.recurrence_until)
+    limit = limit or settings.CALENDAR_MAX_OCCURRENCES
+    occurrences = []
+    for occurrence in islice(rule.xafter(start - duration, inc=True), limit):
+        if occurrence > end:
+            break
+        occurrences.append((occurrence, occurrence + duration))
+    return occurrences
+
+
+def serialize(entry: CalendarEntry, starts_at: datetime, ends_at: datetime) -> Dict:
+    key = f"{entry.source}_{entry.source_id}"
+    return {
+        # Une occurrence d'une série est identifiée par sa date de début
+        "id": f"{key}_{starts_at:%Y%m%dT%H%M}" if entry.rrule else key,
+        "title": entry.title,
+        "type": entry.event_type,
+        "source": entry.source,
+        "source_id": entry.source_id,
+        "start_date": starts_at.isoformat(),
+        "end_date": ends_at.isoformat(),
+        "all_day": entry.all_day,
+        "description": entry.description,
+        "subject": entry.subject,
+        "location": entry.location,
+        "color": entry.color,
+        "status": entry.status,
+        "recurring": bool(entry.rrule),
+    }
+
+
+def _ical_text(value: Optional[str]) -> str:
+    return (value or "").replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\r\n", "\\n").replace("\n", "\\n")
+
+
+def _ical_line(line: str) -> str:
+    """Ligne iCalendar pliée à 75 octets (RFC 5545 §3.1)"""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts, current = [], b""
+    for char in line:
+        char_bytes = char.encode("utf-8")
+        if len(current) + len(char_bytes) > (75 if not parts else 74):
+            parts.append(current.decode("utf-8"))
+            current = b""
+        current += char_bytes
+    parts.append(current.decode("utf-8"))
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _ical_stamp(value: datetime, all_day: bool) -> str:
+    return f";VALUE=DATE:{value:%Y%m%d}" if all_day else f":{value:%Y%m%dT%H%M%SZ}"
+
+
+def ical_event(entry: CalendarEntry, stamp: datetime) -> str:
+    ends_at = entry.ends_at
+    if entry.all_day:
+        # DTEND exclusif: un événement sur la journée se termine le lendemain
+        ends_at = max(entry.ends_at, entry.starts_at) + timedelta(days=1)
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{entry.source}-{entry.source_id}@najah-ai",
+        f"DTSTAMP:{stamp:%Y%m%dT%H%M%SZ}",
+        "DTSTART" + _ical_stamp(entry.starts_at, entry.all_day),
+        "DTEND" + _ical_stamp(ends_at, entry.all_day),
+        f"SUMMARY:{_ical_text(entry.title)}",
+        f"CATEGORIES:{_ical_text(entry.event_type)}",
+    ]
+    if entry.description:
+        lines.append(f"DESCRIPTION:{_ical_text(entry.description)}")
+    if entry.location:
+        lines.append(f"LOCATION:{_ical_text(entry.location)}")
+    if entry.rrule:
+        rule = entry.rrule
+        if entry.recurrence_until:
+            rule += f";UNTIL={entry.recurrence_until:%Y%m%dT%H%M%SZ}"
+        lines.append(f"RRULE:{rule}")
+    lines.append("END:VEVENT")
+    return "".join(_ical_line(line) for line in lines)
+
+
+class CalendarFeed:
+    """Recherche par plage, développement des récurrences et export iCalendar"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _audience(self, user_id: int):
+        conditions = [CalendarEntry.user_id == user_id, CalendarEntry.owner_id == user_id]
+        class_ids = student_class_ids(self.db, user_id)
+        if class_ids:
+            conditions.append(CalendarEntry.class_id.in_(class_ids))
+        return or_(*conditions)
+
+    def entries(self, user_id: int, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                sources: Optional[Iterable[str]] = None):
+        """Lignes de l'utilisateur dont l'intervalle recoupe [start, end] (bornes facultatives)"""
+        query = self.db.query(CalendarEntry).filter(self._audience(user_id))
+        if start is not None:
+            query = query.filter(CalendarEntry.range_end >= start)
+        if end is not None:
+            query = query.filter(CalendarEntry.starts_at <= end)
+        if sources:
+            query = query.filter(CalendarEntry.source.in_(list(sources)))
+        return query.order_by(CalendarEntry.starts_at, CalendarEntry.id)
+
+    def rebuild(self, batch_size: int = 500) -> Dict[str, int]:
+        """Rematérialiser tous les éléments sources; retourne le nombre de lignes par source"""
+        connection = self.db.connection()
+        connection.execute(text("DELETE FROM calendar_entries"))
+        counts = {}
+        for source, (model, _) in CALENDAR_SOURCES.items():
+            counts[source] = sum(
+                1 for item in self.db.query(model).order_by(model.id).yield_per(batch_size)
+                if materialize(connection, source, item) is not None
+            )
+        self.db.commit()
+        return counts
+
+    def occurrences(self, user_id: int, start: datetime, end: datetime,
+                    sources: Optional[Iterable[str]] = None) -> List[Dict]:
+        """Événements de la période, récurrences développées, triés par date de début"""
+        events = []
+        for entry in self.entries(user_id, start, end, sources):
+            for starts_at, ends_at in expand(entry, start, end):
+                if ends_at >= start:
+                    events.append(serialize(entry, starts_at, ends_at))
+        events.sort(key=lambda event: (event["start_date"], event["id"]))
+        return events
+
+    def ical(self, user_id: int, start: Optional[datetime] = None, end: Optional[datetime] = None) -> Iterator[str]:
+        """Flux iCalendar, produit au fil de la lecture (par lots de 500 lignes)"""
+        stamp = datetime.utcnow()
+        yield _ical_line("BEGIN:VCALENDAR") + _ical_line("VERSION:2.0") + _ical_line(f"PRODID:{ICAL_PRODID}")
+        yield _ical_line("CALSCALE:GREGORIAN") + _ical_line(f"X-WR-CALNAME:{_ical_text(settings.PROJECT_NAME)}")
+        for entry in self.entries(user_id, start, end).yield_per(500):
+            yield ical_event(entry, stamp)
+        yield _ical_line("END:VCALENDAR")
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Destinataires des partages de contenu, résolus à la lecture.
+
+Un partage n'écrit plus une ligne content_accesses par élève: il enregistre ses
+cibles (une ligne par classe ou par élève, content_sharing_targets) et les
+membres des classes sont résolus par jointure sur class_students au moment de
+la lecture. La ligne d'accès individuelle (compteurs, permissions propres à
+l'élève) est créée à la première consultation, par un INSERT idempotent.
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, exists, or_, text
+from sqlalchemy.orm import Session
+
+from models.content_sharing import ContentAccess, ContentSharing
+
+# Élèves destinataires d'un partage (membres actuels des classes ciblées et élèves ciblés)
+RECIPIENTS_SQL = """
+    SELECT cs.student_id FROM content_sharing_targets t
+    JOIN class_students cs ON cs.class_id = t.class_id
+    WHERE t.sharing_id = :sharing_id
+    UNION
+    SELECT t.student_id FROM content_sharing_targets t
+    WHERE t.sharing_id = :sharing_id AND t.student_id IS NOT NULL
+"""
+
+# Partages dont un élève est destinataire
+STUDENT_SHARINGS_SQL = text("""
+    SELECT t.sharing_id FROM content_sharing_targets t WHERE t.student_id = :student_id
+    UNION
+    SELECT t.sharing_id FROM content_sharing_targets t
+    JOIN class_students cs ON cs.class_id = t.class_id
+    WHERE cs.student_id = :student_id
+""")
+
+MATERIALIZE_ACCESS_SQL = text("""
+    INSERT INTO content_accesses (content_id, student_id, sharing_id, access_count, can_view, can_download)
+    VALUES (:content_id, :student_id, :sharing_id, 0, :allowed, :allowed)
+    ON CONFLICT (sharing_id, student_id) DO NOTHING
+""")
+
+
+class SharingGrants:
+    """Cibles d'un partage, élèves destinataires et accès matérialisés à la demande"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def grant(self, sharing: ContentSharing, teacher_id: int) -> int:
+        """Enregistrer les cibles d'un partage (sans commit); retourne le nombre d'élèves atteints"""
+        target_ids = list(dict.fromkeys(sharing.target_ids or []))
+        if sharing.target_type == "class" and target_ids:
+            self.db.execute(text(
+                "INSERT INTO content_sharing_targets (sharing_id, class_id) VALUES (:sharing_id, :class_id)"
+            ), [{"sharing_id": sharing.id, "class_id": class_id} for class_id in target_ids])
+        elif sharing.target_type == "student" and target_ids:
+            self.db.execute(text(
+                "INSERT INTO content_sharing_targets (sharing_id, student_id) VALUES (:sharing_id, :student_id)"
+            ), [{"sharing_id": sharing.id, "student_id": student_id} for student_id in target_ids])
+        elif sharing.target_type == "all_students":
+            # Toutes les classes de l'enseignant au moment du partage
+            self.db.execute(text("""
+                INSERT INTO content_sharing_targets (sharing_id, class_id)
+                SELECT :sharing_id, g.id FROM class_groups g WHERE g.teacher_id = :teacher_id
+            """), {"sharing_id": sharing.id, "teacher_id": teacher_id})
+        return self.recipient_count(sharing.id)
+
+    def recipient_count(self, sharing_id: int) -> int:
+        return self.db.execute(
+            text(f"SELECT COUNT(*) FROM ({RECIPIENTS_SQL}) r"), {"sharing_id": sharing_id}
+        ).scalar() or 0
+
+    def recipients(self, sharing_id: int) -> List[int]:
+        rows = self.db.execute(text(f"{RECIPIENTS_SQL} ORDER BY 1"), {"sharing_id": sharing_id})
+        return [student_id for (student_id,) in rows]
+
+    def _visible(self, student_id: int):
+        """Partages actifs, non expirés, dont l'élève est destinataire et non révoqué"""
+        sharing_ids = [sharing_id for (sharing_id,) in self.db.execute(
+            STUDENT_SHARINGS_SQL, {"student_id": student_id}
+        )]
+        revoked = exists().where(and_(
+            ContentAccess.sharing_id == ContentSharing.id,
+            ContentAccess.student_id == student_id,
+            ContentAccess.can_view == False
+        ))
+        return self.db.query(ContentSharing).filter(
+            ContentSharing.id.in_(sharing_ids),
+            ContentSharing.is_active == True,
+            or_(ContentSharing.expiration_date.is_(None), ContentSharing.expiration_date > datetime.now()),
+            ~revoked
+        )
+
+    def shared_with(self, student_id: int) -> List[ContentSharing]:
+        return self._visible(student_id).order_by(ContentSharing.id).all()
+
+    def access_for(self, student_id: int, content_id: int) -> Tuple[Optional[ContentAccess], Optional[ContentSharing]]:
+        """Accès de l'élève à un contenu, créé à la première consultation (sans commit).
+
+        Avec plusieurs partages du même contenu, celui déjà consulté est préféré.
+        """
+        sharings = self._visible(student_id).filter(
+            ContentSharing.content_id == content_id
+        ).order_by(ContentSharing.id).all()
+        if not sharings:
+            return None, None
+        accesses: Dict[int, ContentAccess] = {
+            access.sharing_id: access for access in self.db.query(ContentAccess).filter(
+                ContentAccess.student_id == student_id,
+                ContentAccess.sharing_id.in_([sharing.id for sharing in sharings])
+            )
+        }
+        sharing = next((sharing for sharing in sharings if sharing.id in accesses), sharings[0])
+        access = accesses.get(sharing.id)
+        if access is None:
+            self.db.execute(MATERIALIZE_ACCESS_SQL, {
+                "content_id": content_id, "student_id": student_id, "sharing_id": sharing.id, "allowed": True
+            })
+            access = self.db.query(ContentAccess).filter(
+                ContentAccess.sharing_id == sharing.id,
+                ContentAccess.student_id == student_id
+            ).one()
+        return access, sharing
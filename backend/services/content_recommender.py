@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Recommandation de ressources (bibliothèque) par voisinage item-item.
+
+Le job (run_recommender.py, chaque nuit) construit la matrice creuse élève x ressource
+des interactions (accès partagés consultés, favoris, consultations de la
+bibliothèque, historique d'apprentissage),
+calcule la similarité cosinus des co-accès et stocke, pour les seules ressources
+touchées depuis le passage précédent, leurs K plus proches voisins, puis les listes
+de candidats des élèves concernés.
+
+Servir une recommandation = lire les candidats de l'élève (cache par élève) et les
+re-classer selon ses matières faibles (journal assessment_events); les élèves sans
+historique reçoivent les ressources les plus consultées.
+"""
+
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import DateTime, Float, Integer, func, insert, text
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from models.assessment_event import AssessmentEvent
+from models.content import Content
+from models.recommendation_index import ContentNeighbour, RecommenderRun, StudentRecommendationCandidate
+from services.library_catalogue import fold_text
+
+# Interactions pondérées (sommées quand un élève a plusieurs interactions avec une ressource)
+INTERACTIONS_SQL = text("""
+    SELECT a.student_id, a.content_id, 1.0 AS weight, COALESCE(a.last_accessed, a.first_accessed) AS at
+    FROM content_accesses a
+    WHERE a.access_count > 0 OR a.first_accessed IS NOT NULL
+    UNION ALL
+    SELECT f.user_id, f.content_id, 2.0, f.created_at
+    FROM user_favorites f
+    WHERE f.user_id IS NOT NULL AND f.content_id IS NOT NULL
+    UNION ALL
+    SELECT v.user_id, v.content_id, 1.0, MAX(v.viewed_at)
+    FROM content_history v
+    WHERE v.user_id IS NOT NULL AND v.content_id IS NOT NULL
+    GROUP BY v.user_id, v.content_id
+    UNION ALL
+    SELECT h.student_id, h.content_id, 1.0, MAX(h.timestamp)
+    FROM learning_history h
+    WHERE h.content_id IS NOT NULL
+    GROUP BY h.student_id, h.content_id
+""").columns(student_id=Integer, content_id=Integer, weight=Float, at=DateTime)
+
+REASON_NEIGHBOURS = "neighbours"
+REASON_WEAK_SUBJECT = "weak_subject"
+REASON_POPULAR = "popular"
+
+# Seuil (score normalisé moyen) sous lequel une matière est considérée faible
+WEAK_SUBJECT_THRESHOLD = 50
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _top_k(matrix: sparse.csr_matrix, k: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """(colonnes, valeurs) des k plus grandes valeurs positives de chaque ligne, triées"""
+    result = []
+    for row in range(matrix.shape[0]):
+        start, end = matrix.indptr[row], matrix.indptr[row + 1]
+        columns, values = matrix.indices[start:end], matrix.data[start:end]
+        keep = values > 0
+        columns, values = columns[keep], values[keep]
+        if len(values) > k:
+            best = np.argpartition(-values, k - 1)[:k]
+            columns, values = columns[best], values[best]
+        order = np.lexsort((columns, -values))
+        result.append((columns[order], values[order]))
+    return result
+
+
+class RecommenderJob:
+    """Recalcul (complet ou incrémental) des voisins et des candidats"""
+
+    def __init__(self, db: Session, neighbours: Optional[int] = None, candidates: Optional[int] = None):
+        self.db = db
+        self.neighbours = neighbours or settings.RECOMMENDER_NEIGHBOURS
+        self.candidates = candidates or settings.RECOMMENDER_CANDIDATES
+
+    def run(self, full: bool = False) -> RecommenderRun:
+        started_at = datetime.utcnow()
+        last_run = None if full else self.db.query(RecommenderRun).filter(
+            RecommenderRun.finished_at.isnot(None)
+        ).order_by(RecommenderRun.id.desc()).first()
+        since = last_run.watermark if last_run else None
+        run = RecommenderRun(mode="incremental" if since else "full", watermark=started_at, started_at=started_at)
+
+        interactions, students, items, changed_students = self._load_interactions(since)
+        if interactions.nnz:
+            if since is None:
+                affected_items = np.arange(len(items))
+            else:
+                # Ressources des élèves actifs depuis le dernier passage: leurs co-accès ont changé
+                affected_items = np.unique(interactions[sorted(changed_students)].indices)
+            if len(affected_items):
+                run.items_updated = self._update_neighbours(interactions, items, affected_items)
+                affected_students = np.unique(interactions[:, affected_items].tocoo().row)
+                run.students_updated = self._update_candidates(interactions, students, items, affected_students)
+
+        run.finished_at = datetime.utcnow()
+        self.db.add(run)
+        self.db.commit()
+        invalidate_recommendations()
+        return run
+
+    def _load_interactions(self, since: Optional[datetime]):
+        """Matrice creuse élève x ressource (CSR) et élèves actifs depuis `since`"""
+        content_ids = {content_id for (content_id,) in self.db.query(Content.id)}
+        student_index: Dict[int, int] = {}
+        item_index: Dict[int, int] = {}
+        rows, columns, weights = [], [], []
+        changed = set()
+        for student_id, content_id, weight, at in self.db.execute(INTERACTIONS_SQL):
+            if content_id not in content_ids:
+                continue
+            row = student_index.setdefault(student_id, len(student_index))
+            rows.append(row)
+            columns.append(item_index.setdefault(content_id, len(item_index)))
+            weights.append(weight)
+            at = _naive_utc(at)
+            if since is not None and at is not None and at > since:
+                changed.add(row)
+        matrix = sparse.csr_matrix(
+            (np.asarray(weights, dtype=np.float64), (rows, columns)),
+            shape=(len(student_index), len(item_index))
+        )
+        matrix.sum_duplicates()
+        students = np.array(sorted(student_index, key=student_index.get), dtype=np.int64)
+        items = np.array(sorted(item_index, key=item_index.get), dtype=np.int64)
+        return matrix, students, items, changed
+
+    def _update_neighbours(self, interactions: sparse.csr_matrix, items: np.ndarray, affected: np.ndarray) -> int:
+        """Similarité cosinus des lignes touchées (X[:, a]ᵀ X normalisé), top-K, remplacement en base"""
+        norms = np.sqrt(np.asarray(interactions.multiply(interactions).sum(axis=0)).ravel())
+        inverse = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+        co_access = (interactions[:, affected].T @ interactions).tocsr()
+        similarity = sparse.diags(inverse[affected]) @ co_access @ sparse.diags(inverse)
+        similarity = similarity.tocsr()
+        similarity[np.arange(len(affected)), affected] = 0  # pas de voisin à soi-même
+        similarity.eliminate_zeros()
+
+        affected_ids = [int(items[i]) for i in affected]
+        for start in range(0, len(affected_ids), 500):
+            chunk = affected_ids[start:start + 500]
+            self.db.query(ContentNeighbour).filter(ContentNeighbour.content_id.in_(chunk)).delete(synchronize_session=False)
+        rows = [
+            {"content_id": content_id, "neighbour_id": int(items[column]), "score": float(score), "rank": rank}
+            for content_id, (columns, scores) in zip(affected_ids, _top_k(similarity, self.neighbours))
+            for rank, (column, score) in enumerate(zip(columns, scores), start=1)
+        ]
+        if rows:
+            self.db.execute(insert(ContentNeighbour), rows)
+        return len(affected_ids)
+
+    def _neighbour_matrix(self, items: np.ndarray) -> sparse.csr_matrix:
+        """Voisins stockés (toutes ressources) sous forme ressource x ressource"""
+        index = {int(content_id): position for position, content_id in enumerate(items)}
+        rows, columns, scores = [], [], []
+        for content_id, neighbour_id, score in self.db.query(
+            ContentNeighbour.content_id, ContentNeighbour.neighbour_id, ContentNeighbour.score
+        ):
+            if content_id in index and neighbour_id in index:
+                rows.append(index[content_id])
+                columns.append(index[neighbour_id])
+                scores.append(score)
+        return sparse.csr_matrix((scores, (rows, columns)), shape=(len(items), len(items)))
+
+    def _update_candidates(
+        self,
+        interactions: sparse.csr_matrix,
+        students: np.ndarray,
+        items: np.ndarray,
+        affected: np.ndarray
+    ) -> int:
+        """Score des ressources non vues = historique pondéré x voisins; top-M par élève"""
+        history = interactions[affected]
+        scores = (history @ self._neighbour_matrix(items)).tocsr()
+        scores = (scores - scores.multiply(history.astype(bool))).tocsr()  # déjà vues exclues
+        scores.eliminate_zeros()
+
+        subjects = dict(self.db.query(Content.id, Content.subject).filter(Content.id.in_(items.tolist())))
+        affected_ids = [int(students[i]) for i in affected]
+        for start in range(0, len(affected_ids), 500):
+            chunk = affected_ids[start:start + 500]
+            self.db.query(StudentRecommendationCandidate).filter(
+                StudentRecommendationCandidate.student_id.in_(chunk)
+            ).delete(synchronize_session=False)
+        rows = [
+            {
+                "student_id": student_id,
+                "content_id": int(items[column]),
+                "score": float(score),
+                "rank": rank,
+                "subject": subjects.get(int(items[column])),
+            }
+            for student_id, (columns, values) in zip(affected_ids, _top_k(scores, self.candidates))
+            for rank, (column, score) in enumerate(zip(columns, values), start=1)
+        ]
+        if rows:
+            self.db.execute(insert(StudentRecommendationCandidate), rows)
+        return len(affected_ids)
+
+
+# Caches propres au processus (vidés après chaque passage du job, sinon expirés après le TTL)
+_cache: Dict[Tuple[str, int], Tuple[float, object]] = {}
+_cache_lock = threading.Lock()
+
+
+def _cached(key: Tuple[str, int], load):
+    now = time.monotonic()
+    with _cache_lock:
+        entry = _cache.get(key)
+    if entry and entry[0] > now:
+        return entry[1]
+    value = load()
+    if settings.RECOMMENDER_CACHE_TTL_SECONDS > 0:
+        with _cache_lock:
+            _cache[key] = (now + settings.RECOMMENDER_CACHE_TTL_SECONDS, value)
+    return value
+
+
+def invalidate_recommendations(student_id: Optional[int] = None) -> None:
+    """Oublier les candidats en cache d'un élève (ou de tous)"""
+    with _cache_lock:
+        if student_id is None:
+            _cache.clear()
+        else:
+            for kind in ("candidates", "weak_subjects"):
+                _cache.pop((kind, student_id), None)
+
+
+class ContentRecommender:
+    """Recommandations servies depuis les candidats précalculés"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def candidates(self, student_id: int) -> Tuple[Tuple[int, float, Optional[str]], ...]:
+        return _cached(("candidates", student_id), lambda: tuple(
+            self.db.query(
+                StudentRecommendationCandidate.content_id,
+                StudentRecommendationCandidate.score,
+                StudentRecommendationCandidate.subject
+            ).filter(
+                StudentRecommendationCandidate.student_id == student_id
+            ).order_by(StudentRecommendationCandidate.rank)
+        ))
+
+    def weak_subjects(self, student_id: int) -> frozenset:
+        """Matières (normalisées) où la moyenne de l'élève est sous le seuil"""
+        return _cached(("weak_subjects", student_id), lambda: frozenset(
+            fold_text(subject) for (subject,) in self.db.query(AssessmentEvent.subject).filter(
+                AssessmentEvent.student_id == student_id
+            ).group_by(AssessmentEvent.subject).having(
+                func.avg(AssessmentEvent.normalized_score) < WEAK_SUBJECT_THRESHOLD
+            )
+        ))
+
+    def popular(self) -> Tuple[int, ...]:
+        """Ressources les plus consultées (repli pour les élèves sans historique)"""
+        return _cached(("popular", 0), lambda: tuple(
+            content_id for (content_id,) in self.db.execute(text("""
+                SELECT a.content_id FROM content_accesses a
+                JOIN contents c ON c.id = a.content_id
+                GROUP BY a.content_id
+                ORDER BY SUM(a.access_count) DESC, a.content_id DESC
+                LIMIT :limit
+            """), {"limit": settings.RECOMMENDER_CANDIDATES})
+        ))
+
+    def recommend(self, student_id: int, limit: int = 10) -> List[Tuple[int, float, str]]:
+        """(ressource, score, raison) triés: candidats re-classés puis ressources populaires"""
+        weak = self.weak_subjects(student_id)
+        boost = 1 + settings.RECOMMENDER_WEAK_SUBJECT_BOOST
+        ranked = []
+        for content_id, score, subject in self.candidates(student_id):
+            if subject and fold_text(subject) in weak:
+                ranked.append((content_id, score * boost, REASON_WEAK_SUBJECT))
+            else:
+                ranked.append((content_id, score, REASON_NEIGHBOURS))
+        ranked.sort(key=lambda item: -item[1])
+        ranked = ranked[:limit]
+
+        if len(ranked) < limit:
+            excluded = {content_id for content_id, _, _ in ranked} | self._seen(student_id)
+            for content_id in self.popular():
+                if len(ranked) >= limit:
+                    break
+                if content_id not in excluded:
+                    ranked.append((content_id, 0.0, REASON_POPULAR))
+        return ranked
+
+    def _seen(self, student_id: int) -> Set[int]:
+        rows = self.db.execute(text("""
+            SELECT content_id FROM content_accesses
+            WHERE student_id = :student_id AND (access_count > 0 OR first_accessed IS NOT NULL)
+            UNION
+            SELECT content_id FROM content_history WHERE user_id = :student_id AND content_id IS NOT NULL
+            UNION
+            SELECT content_id FROM learning_history WHERE student_id = :student_id AND content_id IS NOT NULL
+        """), {"student_id": student_id})
+        return {content_id for (content_id,) in rows}
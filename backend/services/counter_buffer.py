@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Compteurs différés (vues, téléchargements, accès) agrégés en mémoire.
+
+Les endpoints très sollicités (30 élèves ouvrant le même document) ne font plus
+de lecture-modification-écriture sur des lignes chaudes: chaque incrément est
+cumulé en mémoire par (compteur, ligne), puis un thread de fond écrit les deltas
+par lots avec des UPDATE atomiques `n = n + :delta` (aucun incrément perdu, même
+avec plusieurs processus).
+
+Les lectures ajoutent les deltas encore en attente dans ce processus; ceux des
+autres processus apparaissent après leur prochain vidage (au plus
+COUNTER_FLUSH_SECONDS de retard).
+"""
+
+import atexit
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+CONTENT_ACCESS = "content_access"
+SHARING_VIEWS = "sharing_views"
+SHARING_DOWNLOADS = "sharing_downloads"
+FORUM_THREAD_VIEWS = "forum_thread_views"
+
+# Compteurs horodatés: dates de premier/dernier accès écrites avec le delta
+_STAMPED = {CONTENT_ACCESS}
+
+COUNTER_SQL = {
+    CONTENT_ACCESS: text("""
+        UPDATE content_accesses
+        SET access_count = COALESCE(access_count, 0) + :delta,
+            first_accessed = COALESCE(first_accessed, :first_at),
+            last_accessed = CASE WHEN last_accessed IS NULL OR last_accessed < :last_at
+                                 THEN :last_at ELSE last_accessed END
+        WHERE id = :id
+    """),
+    SHARING_VIEWS: text("UPDATE content_sharings SET view_count = COALESCE(view_count, 0) + :delta WHERE id = :id"),
+    SHARING_DOWNLOADS: text(
+        "UPDATE content_sharings SET download_count = COALESCE(download_count, 0) + :delta WHERE id = :id"
+    ),
+    FORUM_THREAD_VIEWS: text("UPDATE forum_threads SET view_count = COALESCE(view_count, 0) + :delta WHERE id = :id"),
+}
+
+Key = Tuple[str, int]
+
+
+class CounterBuffer:
+    """Deltas en attente par (compteur, ligne), vidés périodiquement en une transaction.
+
+    Un thread de fond vide les deltas toutes les `flush_interval` secondes (ou dès
+    `batch_size` lignes en attente); avec `flush_interval` à 0, chaque incrément est
+    écrit immédiatement. Un lot en échec est remis en attente et réessayé.
+    """
+
+    def __init__(self, session_factory=SessionLocal, flush_interval: float = 2.0, batch_size: int = 1000):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._pending: Dict[Key, Dict] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def increment(self, counter: str, row_id: int, delta: int = 1, at: Optional[datetime] = None) -> None:
+        if counter not in COUNTER_SQL:
+            raise ValueError(f"Compteur inconnu: {counter}")
+        with self._lock:
+            entry = self._pending.setdefault((counter, row_id), {"delta": 0, "first_at": None, "last_at": None})
+            entry["delta"] += delta
+            if counter in _STAMPED:
+                at = at or datetime.now()
+                entry["first_at"] = min(entry["first_at"] or at, at)
+                entry["last_at"] = max(entry["last_at"] or at, at)
+            pending = len(self._pending)
+        if self.flush_interval <= 0:
+            self.flush()
+            return
+        self._ensure_worker()
+        if pending >= self.batch_size:
+            self._wakeup.set()
+
+    def pending(self, counter: str, row_id: int) -> int:
+        """Delta pas encore écrit pour une ligne (à ajouter à la valeur lue en base)"""
+        with self._lock:
+            entry = self._pending.get((counter, row_id))
+            return entry["delta"] if entry else 0
+
+    def pending_total(self, counter: str, row_ids: Iterable[int]) -> int:
+        with self._lock:
+            return sum(self._pending[(counter, row_id)]["delta"]
+                       for row_id in row_ids if (counter, row_id) in self._pending)
+
+    def pending_stamps(self, counter: str, row_id: int) -> Tuple[Optional[datetime], Optional[datetime]]:
+        """Dates (premier, dernier) des accès pas encore écrits"""
+        with self._lock:
+            entry = self._pending.get((counter, row_id))
+            return (entry["first_at"], entry["last_at"]) if entry else (None, None)
+
+    def take(self) -> Dict[Key, Dict]:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    def restore(self, pending: Dict[Key, Dict]) -> None:
+        """Remettre en attente des deltas dont la transaction a échoué"""
+        with self._lock:
+            for key, old in pending.items():
+                entry = self._pending.setdefault(key, {"delta": 0, "first_at": None, "last_at": None})
+                entry["delta"] += old["delta"]
+                stamps = [stamp for stamp in (entry["first_at"], old["first_at"]) if stamp]
+                entry["first_at"] = min(stamps) if stamps else None
+                stamps = [stamp for stamp in (entry["last_at"], old["last_at"]) if stamp]
+                entry["last_at"] = max(stamps) if stamps else None
+
+    @staticmethod
+    def write(db: Session, pending: Dict[Key, Dict]) -> None:
+        """Écrire les deltas dans la transaction courante de `db` (sans commit), un lot par compteur"""
+        batches: Dict[str, list] = {}
+        for (counter, row_id), entry in sorted(pending.items()):
+            params = {"id": row_id, "delta": entry["delta"]}
+            if counter in _STAMPED:
+                params.update(first_at=entry["first_at"], last_at=entry["last_at"])
+            batches.setdefault(counter, []).append(params)
+        for counter, rows in batches.items():
+            db.execute(COUNTER_SQL[counter], rows)
+
+    def flush(self) -> int:
+        """Écrire tous les deltas en attente; retourne le nombre de lignes mises à jour"""
+        with self._flush_lock:
+            pending = self.take()
+            if not pending:
+                return 0
+            db = self.session_factory()
+            try:
+                self.write(db, pending)
+                db.commit()
+                return len(pending)
+            except Exception as e:
+                db.rollback()
+                self.restore(pending)
+                logger.error(f"❌ Écriture des compteurs échouée ({len(pending)} en attente): {e}")
+                return 0
+            finally:
+                db.close()
+
+    def _ensure_worker(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="counter-buffer-writer", daemon=True)
+                    self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+
+counter_buffer = CounterBuffer(
+    flush_interval=settings.COUNTER_FLUSH_SECONDS,
+    batch_size=settings.COUNTER_BATCH_SIZE
+)
+
+# Dernier filet de sécurité si l'arrêt de l'application n'a pas vidé les compteurs
+atexit.register(counter_buffer.flush)
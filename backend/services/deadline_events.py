@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Planification des échéances (deadline_events) à l'écriture des devoirs, objectifs et rappels.
+
+Les listeners de mapper alignent deadline_events sur l'état de chaque élément dans
+la transaction qui le modifie; le tas en mémoire consommé par services/deadline_scheduler.py
+n'est alimenté qu'après le commit.
+"""
+
+import heapq
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import event, inspect as sa_inspect, text
+from sqlalchemy.orm import Session, object_session
+
+from models.deadline_event import DeadlineEvent
+from models.organization import Homework, LearningGoal, Reminder
+
+# Statuts pour lesquels une échéance doit encore être notifiée
+OPEN_HOMEWORK_STATUSES = ("pending", "in_progress")
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Les échéances sont comparées en UTC naïf (comme datetime.utcnow())"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def homework_deadlines(homework: Homework) -> List[Tuple[str, datetime, datetime]]:
+    """(type, instant de déclenchement, échéance de référence) d'un devoir"""
+    due = naive_utc(homework.due_date)
+    if due is None or homework.assigned_to is None or homework.status not in OPEN_HOMEWORK_STATUSES:
+        return []
+    return [("due_soon", due - timedelta(days=1), due), ("overdue", due, due)]
+
+def goal_deadlines(goal: LearningGoal) -> List[Tuple[str, datetime, datetime]]:
+    target = naive_utc(goal.target_date)
+    if target is None or goal.user_id is None or goal.status != "active":
+        return []
+    return [("due_in_week", target - timedelta(days=7), target), ("due_in_2_days", target - timedelta(days=2), target)]
+
+def reminder_deadlines(reminder: Reminder) -> List[Tuple[str, datetime, datetime]]:
+    at = naive_utc(reminder.reminder_time)
+    if at is None or reminder.user_id is None or not reminder.is_active or reminder.notification_sent:
+        return []
+    return [("reminder", at, at)]
+
+# source -> (fonction d'échéances, attribut destinataire, colonnes qui déplacent les échéances)
+DEADLINE_SOURCES = {
+    "homework": (homework_deadlines, "assigned_to", ("due_date", "status", "assigned_to")),
+    "goal": (goal_deadlines, "user_id", ("target_date", "status", "user_id")),
+    "reminder": (reminder_deadlines, "user_id", ("reminder_time", "is_active", "notification_sent", "user_id")),
+}
+SOURCE_MODELS = {"homework": Homework, "goal": LearningGoal, "reminder": Reminder}
+
+# Rappel déjà passé de plus d'une heure lors de sa planification: trop tard pour notifier
+STALE_REMINDER_DELAY = timedelta(hours=1)
+
+def planned_deadlines(source: str, item, now: Optional[datetime] = None) -> List[dict]:
+    """Lignes deadline_events à planifier pour un élément.
+
+    Les étapes déjà dépassées (échéance passée, ou étape suivante déjà due) ne
+    sont pas planifiées: un devoir créé en retard ne reçoit que l'alerte de retard.
+    """
+    now = now or datetime.utcnow()
+    deadlines_of, recipient, _ = DEADLINE_SOURCES[source]
+    deadlines = deadlines_of(item)
+    if source == "reminder":
+        deadlines = [d for d in deadlines if d[1] > now - STALE_REMINDER_DELAY]
+
+    due_now = [d for d in deadlines if d[1] <= now]
+    if due_now:
+        latest = max(due_now, key=lambda d: d[1])
+        deadlines = [d for d in deadlines if d[1] > now or d is latest]
+    if source == "goal":
+        deadlines = [d for d in deadlines if d[2] > now]
+
+    return [
+        {
+            "idempotency_key": f"{source}:{item.id}:{kind}:{reference:%Y%m%dT%H%M%S}",
+            "source": source,
+            "item_id": item.id,
+            "kind": kind,
+            "user_id": getattr(item, recipient),
+            "fire_at": fire_at,
+            "created_at": now,
+        }
+        for kind, fire_at, reference in deadlines
+    ]
+
+class DeadlineHeap:
+    """Tas-min en mémoire des échéances en attente (fire_at, clé d'idempotence).
+
+    Reflet de deadline_events (fired_at et cancelled_at NULL): chargé au démarrage,
+    complété après chaque commit qui planifie une échéance. Une entrée périmée
+    (annulée, déjà envoyée par un autre worker) est simplement ignorée au déclenchement.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[datetime, str]] = []
+        self._changed = threading.Condition()
+
+    def push(self, fire_at: datetime, key: str) -> None:
+        with self._changed:
+            heapq.heappush(self._heap, (fire_at, key))
+            if self._heap[0] == (fire_at, key):
+                self._changed.notify_all()
+
+    def pop_due(self, now: datetime, limit: Optional[int] = None) -> List[Tuple[datetime, str]]:
+        """Retirer les échéances dues (au plus `limit`), sans doublons"""
+        due, seen = [], set()
+        with self._changed:
+            while self._heap and self._heap[0][0] <= now and (limit is None or len(due) < limit):
+                fire_at, key = heapq.heappop(self._heap)
+                if key not in seen:
+                    seen.add(key)
+                    due.append((fire_at, key))
+        return due
+
+    def next_fire_at(self) -> Optional[datetime]:
+        with self._changed:
+            return self._heap[0][0] if self._heap else None
+
+    def wait(self, timeout: float) -> None:
+        """Attendre au plus `timeout` secondes ou l'arrivée d'une échéance plus proche"""
+        with self._changed:
+            self._changed.wait(timeout)
+
+    def wake(self) -> None:
+        with self._changed:
+            self._changed.notify_all()
+
+    def clear(self) -> None:
+        with self._changed:
+            self._heap.clear()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+deadline_heap = DeadlineHeap()
+
+# Upsert portable (SQLite >= 3.24 et PostgreSQL): une échéance annulée puis
+# redevenue valide est réactivée, une échéance déjà envoyée reste envoyée
+UPSERT_DEADLINE_SQL = text("""
+    INSERT INTO deadline_events (idempotency_key, source, item_id, kind, user_id, fire_at, created_at)
+    VALUES (:idempotency_key, :source, :item_id, :kind, :user_id, :fire_at, :created_at)
+    ON CONFLICT (idempotency_key) DO UPDATE SET cancelled_at = NULL
+    WHERE deadline_events.fired_at IS NULL
+""")
+
+def schedule_deadlines(connection, source: str, item) -> List[dict]:
+    """Aligner deadline_events sur l'état d'un élément (dans la transaction courante)"""
+    rows = planned_deadlines(source, item)
+    table = DeadlineEvent.__table__
+    cancel = table.update().where(
+        table.c.source == source,
+        table.c.item_id == item.id,
+        table.c.fired_at.is_(None),
+        table.c.cancelled_at.is_(None),
+    )
+    if rows:
+        cancel = cancel.where(table.c.idempotency_key.notin_([row["idempotency_key"] for row in rows]))
+        connection.execute(UPSERT_DEADLINE_SQL, rows)
+    connection.execute(cancel.values(cancelled_at=datetime.utcnow()))
+    return rows
+
+def _queue_heap_push(target, rows: List[dict]) -> None:
+    """Alimenter le tas seulement après le commit (sinon un autre thread pourrait
+    déclencher une échéance dont la ligne n'est pas encore visible)"""
+    session = object_session(target)
+    if session is None:
+        for row in rows:
+            deadline_heap.push(row["fire_at"], row["idempotency_key"])
+    else:
+        session.info.setdefault("deadline_heap_pushes", []).extend(rows)
+
+def _register_listeners(source: str, model) -> None:
+    tracked = DEADLINE_SOURCES[source][2]
+
+    @event.listens_for(model, "after_insert")
+    def _schedule_on_insert(mapper, connection, target):
+        _queue_heap_push(target, schedule_deadlines(connection, source, target))
+
+    @event.listens_for(model, "after_update")
+    def _schedule_on_update(mapper, connection, target):
+        state = sa_inspect(target)
+        if any(state.attrs[name].history.has_changes() for name in tracked):
+            _queue_heap_push(target, schedule_deadlines(connection, source, target))
+
+    @event.listens_for(model, "after_delete")
+    def _cancel_on_delete(mapper, connection, target):
+        table = DeadlineEvent.__table__
+        connection.execute(table.update().where(
+            table.c.source == source,
+            table.c.item_id == target.id,
+            table.c.fired_at.is_(None),
+        ).values(cancelled_at=datetime.utcnow()))
+
+for _source, _model in SOURCE_MODELS.items():
+    _register_listeners(_source, _model)
+
+@event.listens_for(Session, "after_commit")
+def _push_committed_deadlines(session):
+    for row in session.info.pop("deadline_heap_pushes", []):
+        deadline_heap.push(row["fire_at"], row["idempotency_key"])
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_rolled_back_deadlines(session, previous_transaction):
+    session.info.pop("deadline_heap_pushes", None)
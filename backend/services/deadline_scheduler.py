@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Planificateur d'échéances: notifications de devoirs, d'objectifs et de rappels.
+
+Les instants de déclenchement sont persistés dans deadline_events (une ligne par
+échéance, clé d'idempotence unique) et maintenus à l'écriture par les listeners
+de services/deadline_events.py. Au démarrage, les échéances en attente sont chargées
+dans un tas-min; un thread dort jusqu'à la prochaine échéance et ne traite que les
+éléments dus: le coût d'un passage est proportionnel aux échéances dues, pas au
+nombre de devoirs ou d'objectifs.
+
+Avec plusieurs workers, chaque ligne est réservée (UPDATE ... WHERE fired_at IS NULL)
+avant l'insertion de sa notification dans la même transaction: une échéance n'est
+notifiée qu'une fois, même si plusieurs processus la voient due.
+"""
+
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import insert, or_
+from sqlalchemy.orm import Session
+
+from core.database import SessionLocal
+from models.deadline_event import DeadlineEvent
+from services.deadline_events import (
+    SOURCE_MODELS, OPEN_HOMEWORK_STATUSES, deadline_heap, naive_utc, schedule_deadlines
+)
+from models.notification import Notification, NotificationType
+from models.organization import Homework, LearningGoal, Reminder
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineScheduler:
+    """Déclenchement des échéances dues depuis le tas en mémoire"""
+
+    def __init__(self, session_factory=SessionLocal, batch_size: int = 500, max_sleep: float = 60.0):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.max_sleep = max_sleep
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    # ------------------------------------------------------------------
+    # Chargement et planification
+    # ------------------------------------------------------------------
+
+    def load(self, db: Session) -> int:
+        """(Re)charger le tas depuis les échéances en attente"""
+        pending = db.query(DeadlineEvent.fire_at, DeadlineEvent.idempotency_key).filter(
+            DeadlineEvent.fired_at.is_(None),
+            DeadlineEvent.cancelled_at.is_(None)
+        ).all()
+        deadline_heap.clear()
+        for fire_at, key in pending:
+            deadline_heap.push(fire_at, key)
+        return len(pending)
+
+    def rebuild(self, db: Session) -> int:
+        """Planifier les échéances de tous les éléments ouverts (remplissage initial).
+
+        Idempotent: les échéances déjà envoyées ne sont pas replanifiées.
+        """
+        connection = db.connection()
+        planned = 0
+        open_items = {
+            "homework": db.query(Homework).filter(Homework.status.in_(OPEN_HOMEWORK_STATUSES)),
+            "goal": db.query(LearningGoal).filter(LearningGoal.status == "active"),
+            "reminder": db.query(Reminder).filter(
+                Reminder.is_active == True,
+                or_(Reminder.notification_sent.is_(None), Reminder.notification_sent == False)
+            ),
+        }
+        for source, query in open_items.items():
+            for item in query.yield_per(self.batch_size):
+                planned += len(schedule_deadlines(connection, source, item))
+        db.commit()
+        self.load(db)
+        return planned
+
+    # ------------------------------------------------------------------
+    # Déclenchement
+    # ------------------------------------------------------------------
+
+    def fire_due(self, db: Session, now: Optional[datetime] = None) -> int:
+        """Notifier les échéances dues; retourne le nombre de notifications créées"""
+        now = now or datetime.utcnow()
+        created = 0
+        while True:
+            due = deadline_heap.pop_due(now, limit=self.batch_size)
+            if not due:
+                return created
+            try:
+                created += self._fire_batch(db, [key for _, key in due], now)
+            except Exception as e:
+                db.rollback()
+                for fire_at, key in due:
+                    deadline_heap.push(fire_at, key)
+                logger.error(f"❌ Déclenchement de {len(due)} échéances échoué: {e}")
+                return created
+
+    def _fire_batch(self, db: Session, keys: List[str], now: datetime) -> int:
+        events = db.query(DeadlineEvent).filter(
+            DeadlineEvent.idempotency_key.in_(keys),
+            DeadlineEvent.fired_at.is_(None),
+            DeadlineEvent.cancelled_at.is_(None)
+        ).all()
+        if not events:
+            return 0
+
+        items = self._load_items(db, events)
+        table = DeadlineEvent.__table__
+        notifications = []
+        fired_reminders = []
+        for deadline in events:
+            # Réservation: un autre worker a pu envoyer cette échéance entre-temps
+            claimed = db.execute(
+                table.update()
+                .where(table.c.id == deadline.id, table.c.fired_at.is_(None))
+                .values(fired_at=now)
+            ).rowcount
+            if not claimed:
+                continue
+            item = items[deadline.source].get(deadline.item_id)
+            notification = self._build_notification(deadline, item, now) if item is not None else None
+            if notification:
+                notifications.append(notification)
+                if deadline.source == "reminder":
+                    fired_reminders.append(deadline.item_id)
+
+        if notifications:
+            db.execute(insert(Notification), notifications)
+        if fired_reminders:
+            db.query(Reminder).filter(Reminder.id.in_(fired_reminders)).update(
+                {"notification_sent": True}, synchronize_session=False
+            )
+        db.commit()
+        return len(notifications)
+
+    @staticmethod
+    def _load_items(db: Session, events: Iterable[DeadlineEvent]) -> Dict[str, Dict[int, object]]:
+        """Éléments sources des échéances, une requête par source"""
+        ids: Dict[str, set] = {source: set() for source in SOURCE_MODELS}
+        for deadline in events:
+            ids[deadline.source].add(deadline.item_id)
+        return {
+            source: {item.id: item for item in db.query(model).filter(model.id.in_(ids[source]))} if ids[source] else {}
+            for source, model in SOURCE_MODELS.items()
+        }
+
+    @staticmethod
+    def _build_notification(deadline: DeadlineEvent, item, now: datetime) -> Optional[dict]:
+        """Ligne notifications d'une échéance, ou None si l'élément n'est plus concerné"""
+        if deadline.source == "homework":
+            if item.status not in OPEN_HOMEWORK_STATUSES:
+                return None
+            due = item.due_date.strftime('%d/%m/%Y')
+            if deadline.kind == "overdue":
+                title, message = "Devoir en retard !", f"Le devoir '{item.title}' était à rendre le {due}"
+            else:
+                title, message = "Devoir à rendre demain", f"Le devoir '{item.title}' est à rendre le {due}"
+            return {
+                "user_id": deadline.user_id, "title": title, "message": message,
+                "notification_type": NotificationType.ASSIGNMENT_DUE, "is_important": True,
+            }
+
+        if deadline.source == "goal":
+            if item.status != "active" or item.target_date is None:
+                return None
+            days_left = max(0, (naive_utc(item.target_date) - now).days)
+            return {
+                "user_id": deadline.user_id,
+                "title": f"Objectif à terminer dans {days_left} jours",
+                "message": f"L'objectif '{item.title}' doit être terminé le {item.target_date.strftime('%d/%m/%Y')}",
+                "notification_type": NotificationType.LEARNING_REMINDER,
+                "is_important": days_left <= 2,
+            }
+
+        if not item.is_active:
+            return None
+        return {
+            "user_id": deadline.user_id, "title": "Rappel", "message": item.title,
+            "notification_type": NotificationType.LEARNING_REMINDER, "is_important": False,
+        }
+
+    # ------------------------------------------------------------------
+    # Thread de fond
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """Charger les échéances en attente et démarrer le thread de déclenchement"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        db = self.session_factory()
+        try:
+            pending = self.load(db)
+        finally:
+            db.close()
+        logger.info(f"⏰ Planificateur d'échéances démarré ({pending} échéances en attente)")
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="deadline-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        deadline_heap.wake()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _seconds_until_next(self) -> float:
+        next_fire_at = deadline_heap.next_fire_at()
+        if next_fire_at is None:
+            return self.max_sleep
+        return min(self.max_sleep, max(0.0, (next_fire_at - datetime.utcnow()).total_seconds()))
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            delay = self._seconds_until_next()
+            if delay > 0:
+                deadline_heap.wait(delay)
+                continue
+            db = self.session_factory()
+            try:
+                created = self.fire_due(db)
+                if created:
+                    logger.info(f"🔔 {created} notifications d'échéance envoyées")
+            finally:
+                db.close()
+            # Échéances remises dans le tas après une erreur: ne pas boucler sans pause
+            if self._seconds_until_next() == 0:
+                self._stopping.wait(5)
+
+
+deadline_scheduler = DeadlineScheduler()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Historique persistant des exercices de remédiation proposés à chaque élève.
+
+Remplace l'ancien dictionnaire d'ensembles en mémoire (perdu au redémarrage,
+propre à chaque worker et sans limite). Chaque élève garde au plus
+`max_per_student` exercices (éviction des plus anciens, LRU) vus depuis moins
+de `ttl_days` jours: un exercice oublié peut être reproposé.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import DateTime, String, text
+
+from core.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+UPSERT_SEEN_SQL = text("""
+    INSERT INTO remediation_exercise_history (student_id, exercise_id, seen_at)
+    VALUES (:student_id, :exercise_id, :seen_at)
+    ON CONFLICT (student_id, exercise_id) DO UPDATE SET seen_at = excluded.seen_at
+""")
+
+# Au-delà de la limite, ne garder que les plus récents (et supprimer les expirés)
+EVICT_SQL = text("""
+    DELETE FROM remediation_exercise_history
+    WHERE student_id = :student_id
+      AND (seen_at < :expires_before OR exercise_id NOT IN (
+          SELECT exercise_id FROM remediation_exercise_history
+          WHERE student_id = :student_id
+          ORDER BY seen_at DESC
+          LIMIT :keep
+      ))
+""")
+
+
+class ExerciseHistoryStore:
+    """Ensemble des exercices vus par élève, borné (LRU) et expirant (TTL)"""
+
+    def __init__(self, session_factory=SessionLocal, max_per_student: int = 200, ttl_days: int = 30):
+        self.session_factory = session_factory
+        self.max_per_student = max_per_student
+        self.ttl = timedelta(days=ttl_days)
+
+    def seen(self, student_id: int) -> Dict[str, datetime]:
+        """{exercise_id: vu le} des exercices encore retenus pour l'élève"""
+        db = self.session_factory()
+        try:
+            rows = db.execute(text("""
+                SELECT exercise_id, seen_at FROM remediation_exercise_history
+                WHERE student_id = :student_id AND seen_at >= :since
+            """).columns(exercise_id=String, seen_at=DateTime), {
+                "student_id": student_id,
+                "since": datetime.utcnow() - self.ttl,
+            }).fetchall()
+            return {row.exercise_id: row.seen_at for row in rows}
+        except Exception as e:
+            logger.warning(f"⚠️ Historique des exercices indisponible (élève {student_id}): {e}")
+            return {}
+        finally:
+            db.close()
+
+    def record(self, student_id: int, exercise_ids: Iterable[str], now: Optional[datetime] = None) -> None:
+        """Marquer des exercices comme vus puis appliquer les limites de l'élève"""
+        exercise_ids = list(exercise_ids)
+        if not exercise_ids:
+            return
+        now = now or datetime.utcnow()
+        db = self.session_factory()
+        try:
+            db.execute(UPSERT_SEEN_SQL, [
+                {"student_id": student_id, "exercise_id": exercise_id, "seen_at": now}
+                for exercise_id in exercise_ids
+            ])
+            db.execute(EVICT_SQL, {
+                "student_id": student_id,
+                "expires_before": now - self.ttl,
+                "keep": self.max_per_student,
+            })
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"⚠️ Historique des exercices non enregistré (élève {student_id}): {e}")
+        finally:
+            db.close()
+
+    def forget(self, student_id: int) -> None:
+        db = self.session_factory()
+        try:
+            db.execute(text("DELETE FROM remediation_exercise_history WHERE student_id = :student_id"),
+                       {"student_id": student_id})
+            db.commit()
+        finally:
+            db.close()
+
+
+exercise_history = ExerciseHistoryStore()
@@ -12,6 +12,10 @@ from datetime import datetime
 import random
 
 from .french_question_selector import FrenchQuestionSelector
+from .scoring_kernel import french_key
+from .french_test_session_store import (
+    ActiveFrenchTest, TOTAL_QUESTIONS, french_answer_queue, french_test_store, get_question
+)
 
 class FrenchTestSessionManager:
     """Gestionnaire de sessions de test français"""
@@ -28,20 +32,17 @@ class FrenchTestSessionManager:
         print(f"🚀 Démarrage d'une nouvelle session de test français pour l'étudiant {student_id}")
         
         try:
-            # Vérifier si l'étudiant a déjà un test en cours
-            existing_test = self._get_existing_test(student_id)
+            # Vérifier si l'étudiant a déjà un test en cours (mémoire, puis base)
+            existing_test = french_test_store.find_active(student_id) or self._get_existing_test(student_id)
             if existing_test:
                 print(f"ℹ️ Test existant trouvé pour l'étudiant {student_id}")
                 return self._resume_existing_test(existing_test)
             
-            # Créer une nouvelle session de test
-            test_id = self._create_test_session(student_id)
-            
             # Sélectionner les 20 questions
             questions = self.question_selector.select_questions_for_assessment(student_id)
             
-            # Sauvegarder la séquence de questions
-            self._save_questions_sequence(test_id, questions)
+            # Créer la session avec sa séquence de questions
+            test_id = self._create_test_session(student_id, questions)
             
             # Retourner la première question
             first_question = self.question_selector.get_question_by_order(questions, 1)
@@ -49,19 +50,19 @@ class FrenchTestSessionManager:
             if not first_question:
                 raise Exception("Impossible de récupérer la première question")
             
+            french_test_store.put(ActiveFrenchTest(
+                test_id=test_id,
+                student_id=student_id,
+                sequence=tuple(q["id"] for q in questions)
+            ))
+            
             # Formater la réponse pour l'API
             response = {
                 "success": True,
                 "test_id": test_id,
                 "status": "in_progress",
                 "current_question": first_question,
-                "progress": {
-                    "current": 1,
-                    "total": 20,
-                    "difficulty": first_question["difficulty"],
-                    "level_progression": "A1",
-                    "current_level": "A1"
-                },
+                "progress": self._progress(1, first_question),
                 "questions_sequence": [q["id"] for q in questions],
                 "current_question_id": first_question["id"]
             }
@@ -77,134 +78,141 @@ class FrenchTestSessionManager:
         """
         Soumettre une réponse et passer à la question suivante
         Arrêt automatique après 20 questions
+        
+        Le test est servi depuis la mémoire: aucune lecture en base, la réponse
+        est confiée à la file d'écriture différée.
         """
-        print(f"📝 Soumission de réponse pour le test {test_id}, étudiant {student_id}")
+        test = french_test_store.get_or_load(test_id, lambda: self._load_test_state(test_id))
+        if not test or test.student_id != student_id:
+            raise Exception("Test non trouvé")
         
-        try:
-            # Récupérer les informations du test
-            test_info = self._get_test_info(test_id, student_id)
-            if not test_info:
-                raise Exception("Test non trouvé")
-            
+        with test.lock:
             # Vérifier que le test est en cours
-            if test_info["status"] != "in_progress":
+            if test.status != "in_progress":
                 raise Exception("Le test n'est pas en cours")
             
             # Récupérer la question actuelle
-            current_question_index = test_info["current_question_index"]
-            questions_sequence = json.loads(test_info["questions_sequence"])
-            
-            # Récupérer la question actuelle
-            current_question = self._get_question_by_id(questions_sequence[current_question_index - 1])
+            current_question_index = test.cursor
+            current_question = get_question(test.current_question_id)
             if not current_question:
                 raise Exception("Question actuelle non trouvée")
             
-            # Vérifier la réponse
-            is_correct = answer == current_question["correct"]
+            # Vérifier la réponse (corrigé compilé de la question)
+            is_correct = french_key(current_question).check(answer)
             score = 10 if is_correct else 0
+            test.scores.append(score)
             
-            # Sauvegarder la réponse
-            self._save_answer(test_id, student_id, current_question["id"], answer, is_correct, score)
-            
-            # Passer à la question suivante
-            next_question_index = current_question_index + 1
+            answer_row = {
+                "test_id": test_id,
+                "student_id": student_id,
+                "question_id": current_question["id"],
+                "answer": answer,
+                "is_correct": is_correct,
+                "score": score,
+                "answered_at": datetime.utcnow().isoformat()
+            }
             
             # Vérifier si c'est la dernière question (20ème)
-            if current_question_index >= 20:
+            if current_question_index >= TOTAL_QUESTIONS:
                 # Test terminé - c'est la 20ème question
                 print(f"🎯 Question 20 terminée, finalisation du test {test_id}")
-                return self._complete_test(test_id, student_id)
-            else:
-                # Question suivante
-                return self._get_next_question(test_id, student_id, next_question_index, questions_sequence)
-                
-        except Exception as e:
-            print(f"❌ Erreur lors de la soumission de la réponse: {e}")
-            raise
+                return self._complete_test(test, answer_row)
+            
+            # Passer à la question suivante
+            test.cursor = current_question_index + 1
+            french_answer_queue.enqueue(test_id, test.cursor, answer_row)
+            return self._next_question_response(test)
+    
+    def _progress(self, current: int, question: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "current": current,
+            "total": TOTAL_QUESTIONS,
+            "difficulty": question["difficulty"],
+            "level_progression": "A1",
+            "current_level": "A1"
+        }
     
-    def _get_existing_test(self, student_id: int) -> Optional[Dict[str, Any]]:
+    def _get_existing_test(self, student_id: int) -> Optional[ActiveFrenchTest]:
         """Récupérer un test existant pour l'étudiant"""
         try:
-            result = self.db.execute(text("""
-                SELECT id, status, current_question_index, questions_sequence, started_at
+            row = self.db.execute(text("""
+                SELECT id
                 FROM french_adaptive_tests
                 WHERE student_id = :student_id AND status IN ('in_progress', 'paused')
                 ORDER BY started_at DESC
                 LIMIT 1
-            """), {"student_id": student_id})
+            """), {"student_id": student_id}).fetchone()
             
-            row = result.fetchone()
             if row:
-                return {
-                    "id": row[0],
-                    "status": row[1],
-                    "current_question_index": row[2],
-                    "questions_sequence": row[3],
-                    "started_at": row[4]
-                }
+                return french_test_store.get_or_load(row[0], lambda: self._load_test_state(row[0]))
             return None
             
         except Exception as e:
             print(f"⚠️ Erreur lors de la récupération du test existant: {e}")
             return None
     
-    def _resume_existing_test(self, test_info: Dict[str, Any]) -> Dict[str, Any]:
+    def _load_test_state(self, test_id: int) -> Optional[ActiveFrenchTest]:
+        """Charger un test depuis la base (reprise après redémarrage ou expiration)"""
+        row = self.db.execute(text("""
+            SELECT id, student_id, status, current_question_index, questions_sequence
+            FROM french_adaptive_tests
+            WHERE id = :test_id
+        """), {"test_id": test_id}).fetchone()
+        if not row or not row[4]:
+            return None
+        
+        scores = [r[0] for r in self.db.execute(text("""
+            SELECT score FROM french_test_answers WHERE test_id = :test_id ORDER BY id
+        """), {"test_id": test_id})]
+        
+        return ActiveFrenchTest(
+            test_id=row[0],
+            student_id=row[1],
+            status="in_progress" if row[2] in ("in_progress", "paused") else row[2],
+            cursor=row[3] or 1,
+            sequence=tuple(json.loads(row[4])),
+            scores=scores
+        )
+    
+    def _resume_existing_test(self, test: ActiveFrenchTest) -> Dict[str, Any]:
         """Reprendre un test existant"""
-        print(f"🔄 Reprise du test existant {test_info['id']}")
+        print(f"🔄 Reprise du test existant {test.test_id}")
         
-        try:
-            questions_sequence = json.loads(test_info["questions_sequence"])
-            current_question_index = test_info["current_question_index"]
-            
-            # Récupérer la question actuelle
-            current_question_id = questions_sequence[current_question_index - 1]
-            current_question = self._get_question_by_id(current_question_id)
-            
-            if not current_question:
-                raise Exception("Question actuelle non trouvée")
-            
-            return {
-                "success": True,
-                "test_id": test_info["id"],
-                "status": "in_progress",
-                "current_question": current_question,
-                "progress": {
-                    "current": current_question_index,
-                    "total": 20,
-                    "difficulty": current_question["difficulty"],
-                    "level_progression": "A1",
-                    "current_level": "A1"
-                },
-                "questions_sequence": questions_sequence,
-                "current_question_id": current_question["id"]
-            }
-            
-        except Exception as e:
-            print(f"❌ Erreur lors de la reprise du test: {e}")
-            raise
+        current_question = get_question(test.current_question_id)
+        if not current_question:
+            raise Exception("Question actuelle non trouvée")
+        
+        return {
+            "success": True,
+            "test_id": test.test_id,
+            "status": "in_progress",
+            "current_question": current_question,
+            "progress": self._progress(test.cursor, current_question),
+            "questions_sequence": list(test.sequence),
+            "current_question_id": current_question["id"]
+        }
     
-    def _create_test_session(self, student_id: int) -> int:
-        """Créer une nouvelle session de test"""
+    def _create_test_session(self, student_id: int, questions: List[Dict[str, Any]]) -> int:
+        """Créer une nouvelle session de test avec sa séquence de questions"""
         try:
-            # Créer la table si elle n'existe pas
-            self._ensure_tables_exist()
-            
-            # Insérer la nouvelle session
             result = self.db.execute(text("""
                 INSERT INTO french_adaptive_tests 
                 (student_id, test_type, current_question_index, total_questions, 
-                 current_difficulty, status, started_at, level_progression, current_level)
-                VALUES (:student_id, 'initial', 1, 20, 'easy', 'in_progress', 
-                        :started_at, 'A1', 'A1')
+                 current_difficulty, status, started_at, level_progression, current_level,
+                 questions_sequence)
+                VALUES (:student_id, 'initial', 1, :total_questions, 'easy', 'in_progress', 
+                        :started_at, 'A1', 'A1', :questions_sequence)
             """), {
                 "student_id": student_id,
-                "started_at": datetime.utcnow().isoformat()
+                "total_questions": TOTAL_QUESTIONS,
+                "started_at": datetime.utcnow().isoformat(),
+                "questions_sequence": json.dumps([q["id"] for q in questions])
             })
             
             test_id = result.lastrowid
             self.db.commit()
             
-            print(f"✅ Session de test créée avec l'ID {test_id}")
+            print(f"✅ Session de test créée avec l'ID {test_id} ({len(questions)} questions)")
             return test_id
             
         except Exception as e:
@@ -212,196 +220,65 @@ class FrenchTestSessionManager:
             self.db.rollback()
             raise
     
-    def _save_questions_sequence(self, test_id: int, questions: List[Dict[str, Any]]):
-        """Sauvegarder la séquence de questions pour le test"""
-        try:
-            questions_sequence = [q["id"] for q in questions]
-            
-            result = self.db.execute(text("""
-                UPDATE french_adaptive_tests 
-                SET questions_sequence = :questions_sequence
-                WHERE id = :test_id
-            """), {
-                "questions_sequence": json.dumps(questions_sequence),
-                "test_id": test_id
-            })
-            
-            self.db.commit()
-            print(f"✅ Séquence de {len(questions_sequence)} questions sauvegardée")
-            
-        except Exception as e:
-            print(f"❌ Erreur lors de la sauvegarde de la séquence: {e}")
-            self.db.rollback()
-            raise
-    
-    def _get_test_info(self, test_id: int, student_id: int) -> Optional[Dict[str, Any]]:
-        """Récupérer les informations d'un test"""
-        try:
-            result = self.db.execute(text("""
-                SELECT id, status, current_question_index, questions_sequence
-                FROM french_adaptive_tests
-                WHERE id = :test_id AND student_id = :student_id
-            """), {
-                "test_id": test_id,
-                "student_id": student_id
-            })
-            
-            row = result.fetchone()
-            if row:
-                            return {
-                "id": row[0],
-                "status": row[1],
-                "current_question_index": row[2],
-                "questions_sequence": row[3]
-            }
-            return None
-            
-        except Exception as e:
-            print(f"⚠️ Erreur lors de la récupération des infos du test: {e}")
-            return None
-    
-    def _get_question_by_id(self, question_id: int) -> Optional[Dict[str, Any]]:
-        """Récupérer une question par son ID depuis la banque de questions"""
-        all_questions = []
-        for difficulty in self.question_selector.question_pool:
-            all_questions.extend(self.question_selector.question_pool[difficulty])
-        
-        for question in all_questions:
-            if question["id"] == question_id:
-                return question
+    def _next_question_response(self, test: ActiveFrenchTest) -> Dict[str, Any]:
+        """Réponse API pour la question suivante (servie depuis la mémoire)"""
+        next_question = get_question(test.current_question_id)
+        if not next_question:
+            raise Exception("Question suivante non trouvée")
         
-        return None
-    
-    def _save_answer(self, test_id: int, student_id: int, question_id: int, 
-                    answer: str, is_correct: bool, score: int):
-        """Sauvegarder la réponse de l'étudiant"""
-        try:
-            # Créer la table si elle n'existe pas
-            self._ensure_answer_table_exists()
-            
-            # Insérer la réponse
-            result = self.db.execute(text("""
-                INSERT INTO french_test_answers
-                (test_id, student_id, question_id, answer, is_correct, score, answered_at)
-                VALUES (:test_id, :student_id, :question_id, :answer, :is_correct, :score, :answered_at)
-            """), {
-                "test_id": test_id,
-                "student_id": student_id,
-                "question_id": question_id,
-                "answer": answer,
-                "is_correct": is_correct,
-                "score": score,
-                "answered_at": datetime.utcnow().isoformat()
-            })
-            
-            self.db.commit()
-            print(f"✅ Réponse sauvegardée pour la question {question_id}")
-            
-        except Exception as e:
-            print(f"❌ Erreur lors de la sauvegarde de la réponse: {e}")
-            self.db.rollback()
-            raise
+        return {
+            "success": True,
+            "test_id": test.test_id,
+            "status": "in_progress",
+            "next_question": next_question,
+            "progress": self._progress(test.cursor, next_question),
+            "questions_sequence": list(test.sequence),
+            "current_question_id": next_question["id"]
+        }
     
-    def _get_next_question(self, test_id: int, student_id: int, 
-                          next_question_index: int, questions_sequence: List[int]) -> Dict[str, Any]:
-        """Récupérer la question suivante"""
-        try:
-            # Mettre à jour l'index de la question actuelle
-            result = self.db.execute(text("""
-                UPDATE french_adaptive_tests 
-                SET current_question_index = :question_index
-                WHERE id = :test_id
-            """), {
-                "question_index": next_question_index,
-                "test_id": test_id
-            })
-            
-            self.db.commit()
-            
-            # Récupérer la question suivante
-            next_question_id = questions_sequence[next_question_index - 1]
-            next_question = self._get_question_by_id(next_question_id)
-            
-            if not next_question:
-                raise Exception("Question suivante non trouvée")
-            
-            return {
-                "success": True,
-                "test_id": test_id,
-                "status": "in_progress",
-                "next_question": next_question,
-                "progress": {
-                    "current": next_question_index,
-                    "total": 20,
-                    "difficulty": next_question["difficulty"],
-                    "level_progression": "A1",
-                    "current_level": "A1"
-                },
-                "questions_sequence": questions_sequence,
-                "current_question_id": next_question["id"]
-            }
-            
-        except Exception as e:
-            print(f"❌ Erreur lors de la récupération de la question suivante: {e}")
-            raise
-    
-    def _complete_test(self, test_id: int, student_id: int) -> Dict[str, Any]:
+    def _complete_test(self, test: ActiveFrenchTest, last_answer: Dict[str, Any]) -> Dict[str, Any]:
         """Finaliser le test et générer le profil"""
-        print(f"🎉 Finalisation du test {test_id} pour l'étudiant {student_id}")
+        print(f"🎉 Finalisation du test {test.test_id} pour l'étudiant {test.student_id}")
         
-        try:
-            # Calculer le score final
-            final_score = self._calculate_final_score(test_id)
-            
-            # Mettre à jour le statut du test
-            result = self.db.execute(text("""
-                UPDATE french_adaptive_tests 
-                SET status = 'completed', completed_at = :completed_at, final_score = :final_score
-                WHERE id = :test_id
-            """), {
-                "completed_at": datetime.utcnow().isoformat(),
-                "final_score": final_score,
-                "test_id": test_id
-            })
-            
-            self.db.commit()
-            
-            # Générer le profil d'apprentissage
-            profile = self._generate_learning_profile(student_id, final_score)
-            
-            return {
-                "success": True,
-                "test_id": test_id,
-                "status": "completed",
-                "final_score": final_score,
-                "profile": profile,
-                "message": "Test terminé avec succès ! Votre profil d'apprentissage a été généré."
-            }
-            
-        except Exception as e:
-            print(f"❌ Erreur lors de la finalisation du test: {e}")
-            raise
-    
-    def _calculate_final_score(self, test_id: int) -> float:
-        """Calculer le score final du test"""
-        try:
-            result = self.db.execute(text("""
-                SELECT SUM(score) as total_score, COUNT(*) as total_questions
-                FROM french_test_answers
-                WHERE test_id = :test_id
-            """), {"test_id": test_id})
-            
-            row = result.fetchone()
-            if row and row[0] is not None:
-                total_score = row[0]
-                total_questions = row[1]
-                return round((total_score / (total_questions * 10)) * 100, 2)
-            
-            return 0.0
-            
-        except Exception as e:
-            print(f"⚠️ Erreur lors du calcul du score final: {e}")
-            return 0.0
+        # Calculer le score final depuis les scores en mémoire
+        final_score = round(sum(test.scores) / (len(test.scores) * 10) * 100, 2) if test.scores else 0.0
+        
+        # Réponses en attente + statut final dans une seule transaction
+        with french_answer_queue.exclusive():
+            answers, cursors = french_answer_queue.take(test.test_id)
+            try:
+                french_answer_queue.write(self.db, answers + [last_answer], cursors)
+                self.db.execute(text("""
+                    UPDATE french_adaptive_tests 
+                    SET status = 'completed', completed_at = :completed_at, final_score = :final_score
+                    WHERE id = :test_id
+                """), {
+                    "completed_at": datetime.utcnow().isoformat(),
+                    "final_score": final_score,
+                    "test_id": test.test_id
+                })
+                self.db.commit()
+            except Exception as e:
+                print(f"❌ Erreur lors de la finalisation du test: {e}")
+                self.db.rollback()
+                french_answer_queue.restore(answers, cursors)
+                test.scores.pop()
+                raise
+        
+        test.status = "completed"
+        french_test_store.discard(test.test_id)
+        
+        # Générer le profil d'apprentissage
+        profile = self._generate_learning_profile(test.student_id, final_score)
+        
+        return {
+            "success": True,
+            "test_id": test.test_id,
+            "status": "completed",
+            "final_score": final_score,
+            "profile": profile,
+            "message": "Test terminé avec succès ! Votre profil d'apprentissage a été généré."
+        }
     
     def _generate_learning_profile(self, student_id: int, final_score: float) -> Dict[str, Any]:
         """Générer le profil d'apprentissage de l'étudiant"""
@@ -421,8 +298,6 @@ class FrenchTestSessionManager:
                 preferred_pace = "Lent"
             
             # Créer ou mettre à jour le profil
-            self._ensure_profile_table_exists()
-            
             result = self.db.execute(text("""
                 INSERT OR REPLACE INTO french_learning_profiles
                 (student_id, french_level, learning_style, preferred_pace, 
@@ -462,76 +337,3 @@ class FrenchTestSessionManager:
                 "strengths": [],
                 "weaknesses": []
             }
-    
-    def _ensure_tables_exist(self):
-        """S'assurer que les tables nécessaires existent"""
-        try:
-            # Table des tests français
-            self.db.execute(text("""
-                CREATE TABLE IF NOT EXISTS french_adaptive_tests (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    student_id INTEGER NOT NULL,
-                    test_type VARCHAR NOT NULL,
-                    current_question_index INTEGER DEFAULT 1,
-                    total_questions INTEGER,
-                    current_difficulty VARCHAR NOT NULL,
-                    status VARCHAR DEFAULT 'in_progress',
-                    started_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    completed_at DATETIME,
-                    final_score FLOAT,
-                    difficulty_progression TEXT,
-                    level_progression VARCHAR DEFAULT 'A1',
-                    current_level VARCHAR DEFAULT 'A1',
-                    questions_sequence TEXT
-                )
-            """))
-            
-            self.db.commit()
-            print("✅ Tables des tests français créées/vérifiées")
-            
-        except Exception as e:
-            print(f"⚠️ Erreur lors de la création des tables: {e}")
-    
-    def _ensure_answer_table_exists(self):
-        """S'assurer que la table des réponses existe"""
-        try:
-            self.db.execute(text("""
-                CREATE TABLE IF NOT EXISTS french_test_answers (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    test_id INTEGER NOT NULL,
-                    student_id INTEGER NOT NULL,
-                    question_id INTEGER NOT NULL,
-                    answer TEXT NOT NULL,
-                    is_correct BOOLEAN NOT NULL,
-                    score INTEGER NOT NULL,
-                    answered_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            """))
-            
-            self.db.commit()
-            
-        except Exception as e:
-            print(f"⚠️ Erreur lors de la création de la table des réponses: {e}")
-    
-    def _ensure_profile_table_exists(self):
-        """S'assurer que la table des profils existe"""
-        try:
-            self.db.execute(text("""
-                CREATE TABLE IF NOT EXISTS french_learning_profiles (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    student_id INTEGER NOT NULL UNIQUE,
-                    french_level VARCHAR,
-                    learning_style VARCHAR,
-                    preferred_pace VARCHAR,
-                    strengths TEXT,
-                    weaknesses TEXT,
-                    cognitive_profile TEXT,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            """))
-            
-            self.db.commit()
-            
-        except Exception as e:
-            print(f"⚠️ Erreur lors de la création de la table des profils: {e}")
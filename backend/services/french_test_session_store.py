@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Stockage en mémoire des sessions de test français actives et écriture différée
+des réponses (write-behind) vers french_test_answers / french_adaptive_tests.
+
+Chaque test actif est gardé sous forme compacte (séquence d'IDs, curseur, scores):
+la question suivante est servie sans aucune lecture en base. Les réponses et
+l'avancement du curseur sont persistés par lots dans une seule transaction,
+périodiquement, à la fin du test et à l'arrêt du processus.
+
+L'état est propre au processus: avec plusieurs workers, les requêtes d'un même
+test doivent être routées vers le même worker (sessions collantes), sinon un
+worker qui recharge le test depuis la base peut être en retard d'un lot.
+"""
+
+import atexit
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from core.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+TOTAL_QUESTIONS = 20
+
+_question_index: Optional[Dict[int, Dict[str, Any]]] = None
+_question_index_lock = threading.Lock()
+
+def get_question_index() -> Dict[int, Dict[str, Any]]:
+    """Index {id: question} de la banque de questions (construit une seule fois)"""
+    global _question_index
+    if _question_index is None:
+        with _question_index_lock:
+            if _question_index is None:
+                from .french_question_selector import FrenchQuestionSelector
+                pool = FrenchQuestionSelector(None).question_pool
+                _question_index = {q["id"]: q for questions in pool.values() for q in questions}
+    return _question_index
+
+def get_question(question_id: int) -> Optional[Dict[str, Any]]:
+    """Copie d'une question de la banque (les réponses API ne modifient pas l'index)"""
+    question = get_question_index().get(question_id)
+    return dict(question) if question else None
+
+
+@dataclass
+class ActiveFrenchTest:
+    """État compact d'un test en cours"""
+    test_id: int
+    student_id: int
+    sequence: Tuple[int, ...]
+    cursor: int = 1                     # index (1-based) de la question courante
+    status: str = "in_progress"
+    scores: List[int] = field(default_factory=list)  # score de chaque réponse donnée
+    last_access: float = field(default_factory=time.monotonic)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    @property
+    def current_question_id(self) -> int:
+        return self.sequence[self.cursor - 1]
+
+
+class FrenchTestSessionStore:
+    """Tests actifs par test_id, avec expiration des sessions inactives"""
+
+    def __init__(self, idle_seconds: float = 1800, max_sessions: int = 10000):
+        self.idle_seconds = idle_seconds
+        self.max_sessions = max_sessions
+        self._tests: Dict[int, ActiveFrenchTest] = {}
+        self._lock = threading.Lock()
+
+    def get(self, test_id: int) -> Optional[ActiveFrenchTest]:
+        with self._lock:
+            state = self._tests.get(test_id)
+        if state:
+            state.last_access = time.monotonic()
+        return state
+
+    def get_or_load(self, test_id: int, loader: Callable[[], Optional[ActiveFrenchTest]]) -> Optional[ActiveFrenchTest]:
+        """Servir le test depuis la mémoire, ou le charger une fois depuis la base"""
+        state = self.get(test_id)
+        if state is None:
+            state = loader()
+            if state is not None:
+                self.put(state)
+        return state
+
+    def find_active(self, student_id: int) -> Optional[ActiveFrenchTest]:
+        with self._lock:
+            for state in self._tests.values():
+                if state.student_id == student_id and state.status == "in_progress":
+                    return state
+        return None
+
+    def put(self, state: ActiveFrenchTest) -> None:
+        with self._lock:
+            if len(self._tests) >= self.max_sessions:
+                self._evict_idle()
+            self._tests[state.test_id] = state
+
+    def discard(self, test_id: int) -> None:
+        with self._lock:
+            self._tests.pop(test_id, None)
+
+    def _evict_idle(self) -> None:
+        """Oublier les sessions inactives (leurs réponses restent dans la file d'écriture)"""
+        limit = time.monotonic() - self.idle_seconds
+        idle = [test_id for test_id, state in self._tests.items() if state.last_access < limit]
+        if not idle and self._tests:
+            idle = [min(self._tests.values(), key=lambda s: s.last_access).test_id]
+        for test_id in idle:
+            del self._tests[test_id]
+
+
+INSERT_ANSWER_SQL = text("""
+    INSERT INTO french_test_answers
+    (test_id, student_id, question_id, answer, is_correct, score, answered_at)
+    VALUES (:test_id, :student_id, :question_id, :answer, :is_correct, :score, :answered_at)
+""")
+
+UPDATE_CURSOR_SQL = text("""
+    UPDATE french_adaptive_tests
+    SET current_question_index = :question_index
+    WHERE id = :test_id
+""")
+
+
+class FrenchAnswerWriteBehind:
+    """File d'écriture différée des réponses et des curseurs.
+
+    Un thread de fond vide la file toutes les `flush_interval` secondes (ou dès
+    `batch_size` réponses). Réponses et curseurs d'un lot sont écrits dans la même
+    transaction: après un arrêt brutal, la base reste cohérente (au pire en retard
+    d'un lot, que l'élève rejoue à la reprise).
+    """
+
+    def __init__(self, session_factory=SessionLocal, flush_interval: float = 1.0, batch_size: int = 200):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._answers: List[Dict[str, Any]] = []
+        self._cursors: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def enqueue(self, test_id: int, cursor: int, answer: Optional[Dict[str, Any]] = None) -> None:
+        with self._lock:
+            if answer is not None:
+                self._answers.append(answer)
+            self._cursors[test_id] = cursor
+            pending = len(self._answers)
+        self._ensure_worker()
+        if pending >= self.batch_size:
+            self._wakeup.set()
+
+    def take(self, test_id: Optional[int] = None):
+        """Retirer de la file les écritures en attente (toutes, ou celles d'un test)"""
+        with self._lock:
+            if test_id is None:
+                answers, cursors = self._answers, self._cursors
+                self._answers, self._cursors = [], {}
+            else:
+                answers = [a for a in self._answers if a["test_id"] == test_id]
+                self._answers = [a for a in self._answers if a["test_id"] != test_id]
+                cursors = {test_id: self._cursors.pop(test_id)} if test_id in self._cursors else {}
+        return answers, cursors
+
+    def restore(self, answers: List[Dict[str, Any]], cursors: Dict[int, int]) -> None:
+        """Remettre en file des écritures dont la transaction a échoué"""
+        with self._lock:
+            self._answers = answers + self._answers
+            for test_id, cursor in cursors.items():
+                self._cursors.setdefault(test_id, cursor)
+
+    @staticmethod
+    def write(db: Session, answers: List[Dict[str, Any]], cursors: Dict[int, int]) -> None:
+        """Écrire un lot dans la transaction courante de `db` (sans commit)"""
+        if answers:
+            db.execute(INSERT_ANSWER_SQL, answers)
+        if cursors:
+            db.execute(UPDATE_CURSOR_SQL, [
+                {"test_id": test_id, "question_index": cursor} for test_id, cursor in cursors.items()
+            ])
+
+    @contextmanager
+    def exclusive(self):
+        """Empêcher tout vidage concurrent (finalisation atomique d'un test)"""
+        with self._flush_lock:
+            yield
+
+    def flush(self) -> int:
+        """Persister toute la file dans une transaction; retourne le nombre de réponses écrites"""
+        with self._flush_lock:
+            answers, cursors = self.take()
+            if not answers and not cursors:
+                return 0
+            db = self.session_factory()
+            try:
+                self.write(db, answers, cursors)
+                db.commit()
+                return len(answers)
+            except Exception as e:
+                db.rollback()
+                self.restore(answers, cursors)
+                logger.error(f"❌ Écriture différée des réponses échouée ({len(answers)} en attente): {e}")
+                return 0
+            finally:
+                db.close()
+
+    def _ensure_worker(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="french-answers-writer", daemon=True)
+                    self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+
+french_test_store = FrenchTestSessionStore()
+french_answer_queue = FrenchAnswerWriteBehind()
+
+# Dernier filet de sécurité si l'arrêt de l'application n'a pas vidé la file
+atexit.register(french_answer_queue.flush)
@@ -66,6 +66,29 @@ class IntelligentProfileService:
             print(f"❌ Erreur génération profil intelligent: {e}")
             return self._generate_fallback_profile(student_id)
     
+    def save_profile(self, student_id: int, profile_data: Dict[str, Any]) -> FrenchLearningProfile:
+        """Enregistrer un profil généré dans french_learning_profiles (création ou mise à jour)"""
+        fields = {
+            "learning_style": profile_data.get('learning_style', 'visual'),
+            "french_level": profile_data.get('real_french_level', 'A1'),
+            "preferred_pace": profile_data.get('preferred_pace', 'moyen'),
+            "strengths": profile_data.get('strengths', '[]'),
+            "weaknesses": profile_data.get('weaknesses', '[]'),
+            "cognitive_profile": profile_data.get('cognitive_profile', '{}'),
+        }
+        profile = self.db.query(FrenchLearningProfile).filter(
+            FrenchLearningProfile.student_id == student_id
+        ).first()
+        if profile:
+            for name, value in fields.items():
+                setattr(profile, name, value)
+            profile.updated_at = datetime.utcnow()
+        else:
+            profile = FrenchLearningProfile(student_id=student_id, **fields)
+            self.db.add(profile)
+        self.db.commit()
+        return profile
+    
     def _analyze_performance(self, test: FrenchAdaptiveTest) -> Dict[str, Any]:
         """Analyse détaillée des performances du test"""
         try:
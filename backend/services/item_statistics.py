@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Statistiques d'items (IRT) des questions de tests adaptatifs, en mémoire.
+
+Chaque copie notée ajoute, pour chacune de ses questions, une observation
+(réussite, temps de réponse, score total de la copie) à des compteurs cumulés:
+tentatives, réussites, somme et somme des carrés des temps, sommes des scores
+totaux (toutes copies / copies ayant réussi) pour la corrélation point-bisériale.
+Comme pour les compteurs différés, les deltas sont cumulés en mémoire puis écrits
+par lots par un thread de fond, avec des UPSERT `n = n + delta` atomiques.
+
+Le moteur d'IA adaptative lit un instantané de la banque d'items (difficulté,
+matière, objectif et statistiques de chaque question, questions par test) chargé
+en une requête: aucune lecture en base par sélection de question. L'instantané
+intègre aussitôt les observations de ce processus; celles des autres processus
+apparaissent après leur vidage, au plus tard après ITEM_STATS_CACHE_TTL_SECONDS.
+Il est invalidé à chaque écriture ORM sur AdaptiveQuestion / AdaptiveTest.
+"""
+
+import atexit
+import logging
+import math
+import threading
+import time
+from dataclasses import asdict, dataclass, replace
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session, object_session
+
+from core.config import settings
+from core.database import SessionLocal
+from models.adaptive_evaluation import AdaptiveQuestion, AdaptiveTest, QuestionResponse, TestAttempt
+from models.adaptive_item_stats import AdaptiveItemStats, UPSERT_ITEM_STATS_SQL
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIFFICULTY = 5.0
+
+# Approximation de Lord: discrimination logistique a = 1.7 r / sqrt(1 - r²), bornée
+LOGISTIC_SCALE = 1.7
+MIN_DISCRIMINATION = 0.2
+MAX_DISCRIMINATION = 2.5
+
+
+def attempt_score(total_score: Optional[float], max_score: Optional[float]) -> float:
+    """Score total d'une copie ramené entre 0 et 1 (critère de la corrélation point-bisériale)"""
+    if not max_score or max_score <= 0:
+        return 0.0
+    return min(max((total_score or 0.0) / max_score, 0.0), 1.0)
+
+
+@dataclass
+class ItemCounts:
+    """Sommes cumulées d'une question (ou deltas en attente d'écriture)"""
+    attempts: int = 0
+    correct: int = 0
+    timed_attempts: int = 0
+    response_time_sum: float = 0.0
+    response_time_sq_sum: float = 0.0
+    total_score_sum: float = 0.0
+    total_score_sq_sum: float = 0.0
+    correct_total_score_sum: float = 0.0
+
+    def observe(self, is_correct: bool, response_time: Optional[float], total_score: float) -> None:
+        self.attempts += 1
+        self.total_score_sum += total_score
+        self.total_score_sq_sum += total_score * total_score
+        if is_correct:
+            self.correct += 1
+            self.correct_total_score_sum += total_score
+        # Un temps absent ou nul n'a pas été mesuré
+        if response_time and response_time > 0:
+            self.timed_attempts += 1
+            self.response_time_sum += response_time
+            self.response_time_sq_sum += response_time * response_time
+
+    def add(self, other: "ItemCounts") -> None:
+        for name, value in asdict(other).items():
+            setattr(self, name, getattr(self, name) + value)
+
+    def point_biserial(self) -> float:
+        """Corrélation réussite de l'item / score total (0 si indéfinie)"""
+        n, c = self.attempts, self.correct
+        if n < 2 or c == 0 or c == n:
+            return 0.0
+        mean = self.total_score_sum / n
+        variance = self.total_score_sq_sum / n - mean * mean
+        if variance <= 1e-12:
+            return 0.0
+        mean_correct = self.correct_total_score_sum / c
+        mean_wrong = (self.total_score_sum - self.correct_total_score_sum) / (n - c)
+        p = c / n
+        r = (mean_correct - mean_wrong) / math.sqrt(variance) * math.sqrt(p * (1.0 - p))
+        return min(max(r, -1.0), 1.0)
+
+
+@dataclass(frozen=True)
+class ItemStatistics:
+    """Question d'un test adaptatif et statistiques dérivées de ses compteurs"""
+    question_id: int
+    test_id: int
+    difficulty_level: float
+    subject: Optional[str]
+    topic: Optional[str]
+    attempts: int = 0
+    correct: int = 0
+    success_rate: float = 0.0  # 0 sans tentative
+    avg_response_time: float = 0.0  # secondes, 0 sans temps mesuré
+    response_time_std: float = 0.0
+    point_biserial: float = 0.0
+
+    def with_counts(self, counts: ItemCounts) -> "ItemStatistics":
+        timed = counts.timed_attempts
+        avg_time = counts.response_time_sum / timed if timed else 0.0
+        time_variance = counts.response_time_sq_sum / timed - avg_time * avg_time if timed else 0.0
+        return replace(
+            self,
+            attempts=counts.attempts,
+            correct=counts.correct,
+            success_rate=counts.correct / counts.attempts if counts.attempts else 0.0,
+            avg_response_time=avg_time,
+            response_time_std=math.sqrt(max(time_variance, 0.0)),
+            point_biserial=counts.point_biserial(),
+        )
+
+    @property
+    def discrimination(self) -> float:
+        """Paramètre a (1 tant que l'item a moins de ITEM_STATS_MIN_ATTEMPTS tentatives)"""
+        if self.attempts < settings.ITEM_STATS_MIN_ATTEMPTS:
+            return 1.0
+        if self.point_biserial <= 0:
+            return MIN_DISCRIMINATION
+        r = min(self.point_biserial, 0.99)
+        return min(max(LOGISTIC_SCALE * r / math.sqrt(1.0 - r * r), MIN_DISCRIMINATION), MAX_DISCRIMINATION)
+
+
+@dataclass(frozen=True)
+class ItemBank:
+    """Instantané immuable: statistiques par question et questions par test (triées par id)"""
+    items: Dict[int, ItemStatistics]
+    tests: Dict[int, Tuple[int, ...]]
+
+    def test_items(self, test_id: int, exclude: Iterable[int] = ()) -> List[ItemStatistics]:
+        excluded = set(exclude)
+        return [self.items[question_id] for question_id in self.tests.get(test_id, ())
+                if question_id not in excluded]
+
+
+def _difficulty(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return DEFAULT_DIFFICULTY
+
+
+class ItemStatisticsService:
+    """Compteurs d'items cumulés en mémoire, vidés par lots, et instantané de la banque d'items.
+
+    Un thread de fond écrit les deltas toutes les `flush_interval` secondes (ou dès
+    `batch_size` questions en attente); avec `flush_interval` à 0, chaque copie est
+    écrite immédiatement. Un lot en échec est remis en attente et réessayé.
+    """
+
+    def __init__(self, session_factory=SessionLocal, flush_interval: float = 5.0,
+                 batch_size: int = 1000, ttl: float = 300):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.ttl = ttl
+        self._pending: Dict[int, ItemCounts] = {}
+        # Compteurs de l'instantané courant: base lue en base + observations de ce processus
+        self._counts: Dict[int, ItemCounts] = {}
+        self._bank: Optional[ItemBank] = None
+        self._expires_at = 0.0
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------
+    # Écriture
+    # ------------------------------------------------------------------
+
+    def record_attempt(self, responses: Iterable[Tuple[int, bool, Optional[float]]], total_score: float) -> None:
+        """Ajouter les réponses (question, réussite, temps) d'une copie notée, score total entre 0 et 1"""
+        total_score = min(max(float(total_score or 0.0), 0.0), 1.0)
+        with self._lock:
+            touched = set()
+            for question_id, is_correct, response_time in responses:
+                self._pending.setdefault(question_id, ItemCounts()).observe(bool(is_correct), response_time, total_score)
+                self._counts.setdefault(question_id, ItemCounts()).observe(bool(is_correct), response_time, total_score)
+                touched.add(question_id)
+            if self._bank is not None and touched:
+                # Copie sur écriture: les lecteurs gardent un instantané cohérent
+                items = dict(self._bank.items)
+                for question_id in touched & items.keys():
+                    items[question_id] = items[question_id].with_counts(self._counts[question_id])
+                self._bank = ItemBank(items=items, tests=self._bank.tests)
+            pending = len(self._pending)
+        if self.flush_interval <= 0:
+            self.flush()
+            return
+        self._ensure_worker()
+        if pending >= self.batch_size:
+            self._wakeup.set()
+
+    def record(self, question_id: int, is_correct: bool, response_time: Optional[float], total_score: float) -> None:
+        self.record_attempt([(question_id, is_correct, response_time)], total_score)
+
+    def take(self) -> Dict[int, ItemCounts]:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    def restore(self, pending: Dict[int, ItemCounts]) -> None:
+        """Remettre en attente des deltas dont la transaction a échoué"""
+        with self._lock:
+            for question_id, counts in pending.items():
+                self._pending.setdefault(question_id, ItemCounts()).add(counts)
+
+    @staticmethod
+    def write(db: Session, pending: Dict[int, ItemCounts]) -> None:
+        """Écrire les deltas dans la transaction courante de `db` (sans commit)"""
+        now = datetime.utcnow()
+        db.execute(UPSERT_ITEM_STATS_SQL, [
+            dict(asdict(counts), question_id=question_id, updated_at=now)
+            for question_id, counts in sorted(pending.items())
+        ])
+
+    def flush(self) -> int:
+        """Écrire tous les deltas en attente; retourne le nombre de questions mises à jour"""
+        with self._flush_lock:
+            pending = self.take()
+            if not pending:
+                return 0
+            db = self.session_factory()
+            try:
+                self.write(db, pending)
+                db.commit()
+                return len(pending)
+            except Exception as e:
+                db.rollback()
+                self.restore(pending)
+                logger.error(f"❌ Écriture des statistiques d'items échouée ({len(pending)} en attente): {e}")
+                return 0
+            finally:
+                db.close()
+
+    def _ensure_worker(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="item-statistics-writer", daemon=True)
+                    self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+
+    def snapshot(self) -> ItemBank:
+        """Instantané courant (rechargé après une invalidation ou l'expiration du TTL)"""
+        now = time.monotonic()
+        with self._lock:
+            bank, expires_at, generation = self._bank, self._expires_at, self._generation
+        if bank is not None and expires_at > now:
+            return bank
+        return self._load(generation, now)
+
+    def _load(self, generation: int, now: float) -> ItemBank:
+        # Pas de vidage pendant la lecture: base + deltas en attente = état exact de ce processus
+        with self._flush_lock:
+            db = self.session_factory()
+            try:
+                questions = db.query(
+                    AdaptiveQuestion.id, AdaptiveQuestion.test_id, AdaptiveQuestion.difficulty_level,
+                    AdaptiveTest.subject, AdaptiveQuestion.learning_objective
+                ).join(AdaptiveTest, AdaptiveTest.id == AdaptiveQuestion.test_id).order_by(AdaptiveQuestion.id).all()
+                counts = {
+                    row.question_id: ItemCounts(**{name: getattr(row, name) or 0 for name in ItemCounts.__dataclass_fields__})
+                    for row in db.query(AdaptiveItemStats)
+                }
+            finally:
+                db.close()
+            with self._lock:
+                for question_id, delta in self._pending.items():
+                    counts.setdefault(question_id, ItemCounts()).add(delta)
+                items, tests = {}, {}
+                for question_id, test_id, difficulty, subject, topic in questions:
+                    item = ItemStatistics(question_id, test_id, _difficulty(difficulty), subject, topic)
+                    items[question_id] = item.with_counts(counts[question_id]) if question_id in counts else item
+                    tests.setdefault(test_id, []).append(question_id)
+                bank = ItemBank(items=items, tests={test_id: tuple(ids) for test_id, ids in tests.items()})
+                # Une invalidation pendant le chargement rend cet instantané périmé: ne pas le garder
+                if generation == self._generation and self.ttl > 0:
+                    self._bank, self._counts, self._expires_at = bank, counts, now + self.ttl
+        return bank
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._bank = None
+            self._generation += 1
+
+    # ------------------------------------------------------------------
+    # Reconstruction
+    # ------------------------------------------------------------------
+
+    def rebuild(self, db: Session, batch_size: int = 1000) -> int:
+        """Recalculer tous les compteurs depuis les réponses des tentatives terminées"""
+        with self._flush_lock:
+            # Les deltas en attente sont déjà dans question_responses: les écarter
+            self.take()
+            counts: Dict[int, ItemCounts] = {}
+            rows = db.query(
+                QuestionResponse.question_id, QuestionResponse.is_correct, QuestionResponse.response_time,
+                TestAttempt.total_score, TestAttempt.max_score
+            ).join(TestAttempt, TestAttempt.id == QuestionResponse.attempt_id).filter(
+                TestAttempt.status == "completed"
+            ).yield_per(batch_size)
+            for question_id, is_correct, response_time, total_score, max_score in rows:
+                counts.setdefault(question_id, ItemCounts()).observe(
+                    bool(is_correct), response_time, attempt_score(total_score, max_score)
+                )
+            db.execute(text("DELETE FROM adaptive_item_stats"))
+            if counts:
+                self.write(db, counts)
+            db.commit()
+        self.invalidate()
+        return len(counts)
+
+
+item_statistics = ItemStatisticsService(
+    flush_interval=settings.ITEM_STATS_FLUSH_SECONDS,
+    ttl=settings.ITEM_STATS_CACHE_TTL_SECONDS
+)
+
+# Dernier filet de sécurité si l'arrêt de l'application n'a pas vidé les compteurs
+atexit.register(item_statistics.flush)
+
+
+@event.listens_for(AdaptiveQuestion, "after_insert")
+@event.listens_for(AdaptiveQuestion, "after_update")
+@event.listens_for(AdaptiveQuestion, "after_delete")
+@event.listens_for(AdaptiveTest, "after_update")
+@event.listens_for(AdaptiveTest, "after_delete")
+def _invalidate_on_item_bank_change(mapper, connection, target):
+    item_statistics.invalidate()
+    # Une requête concurrente a pu recharger l'état d'avant le commit: invalider aussi à la fin
+    session = object_session(target)
+    if session is not None:
+        session.info["item_bank_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_soft_rollback")
+def _invalidate_after_transaction(session, *args):
+    if session.info.pop("item_bank_changed", False):
+        item_statistics.invalidate()
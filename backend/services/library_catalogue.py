@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Recherche dans le catalogue de la bibliothèque (library_catalogue).
+
+Plein texte sur titre, description et tags (FTS5 sous SQLite, tsvector sous
+PostgreSQL), facettes matière/niveau/type, pagination par clé (content_id
+décroissant) et appartenance favoris/collections résolue en une requête IN par page.
+"""
+
+import json
+import re
+import unicodedata
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import event, func, literal_column, select, text
+from sqlalchemy.orm import Session
+
+from models.content import Content
+from models.library import Collection, CollectionItem, UserFavorite
+from models.library_catalogue import LibraryCatalogueEntry
+
+FACETS = ("subject", "level", "type")
+
+
+def fold_text(value: str) -> str:
+    """Minuscules sans accents (recherche insensible à la casse et aux diacritiques)"""
+    decomposed = unicodedata.normalize("NFKD", value or "")
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def decode_tags(raw) -> List[str]:
+    """Tags stockés en JSON (ou, pour d'anciennes lignes, séparés par des virgules)"""
+    if not raw:
+        return []
+    try:
+        tags = json.loads(raw)
+    except (TypeError, ValueError):
+        tags = raw.split(",")
+    if not isinstance(tags, list):
+        tags = [tags]
+    return [str(tag).strip() for tag in tags if str(tag).strip()]
+
+
+UPSERT_ENTRY_SQL = text("""
+    INSERT INTO library_catalogue
+        (content_id, title, description, type, subject, level, tags, author,
+         file_url, thumbnail_url, search_text, created_at, is_active)
+    VALUES (:content_id, :title, :description, :type, :subject, :level, :tags,
+            (SELECT TRIM(COALESCE(u.first_name, '') || ' ' || COALESCE(u.last_name, ''))
+             FROM users u WHERE u.id = :created_by),
+            :file_url, :thumbnail_url, :search_text,
+            (SELECT c.created_at FROM contents c WHERE c.id = :content_id), :is_active)
+    ON CONFLICT (content_id) DO UPDATE SET
+        title = excluded.title,
+        description = excluded.description,
+        type = excluded.type,
+        subject = excluded.subject,
+        level = excluded.level,
+        tags = excluded.tags,
+        author = excluded.author,
+        file_url = excluded.file_url,
+        thumbnail_url = excluded.thumbnail_url,
+        search_text = excluded.search_text,
+        created_at = excluded.created_at,
+        is_active = excluded.is_active
+""")
+
+
+def catalogue_values(content) -> dict:
+    tags = decode_tags(content.tags)
+    return {
+        "content_id": content.id,
+        "title": content.title,
+        "description": content.description,
+        "type": content.content_type,
+        "subject": content.subject,
+        "level": content.level,
+        "tags": json.dumps(tags, ensure_ascii=False),
+        "created_by": content.created_by,
+        "file_url": content.file_url,
+        "thumbnail_url": content.thumbnail_url,
+        "search_text": fold_text(" ".join([content.title or "", content.description or "", " ".join(tags)])),
+        "is_active": content.is_active if content.is_active is not None else True,
+    }
+
+
+def index_content(connection, content) -> None:
+    """Mettre à jour l'entrée du catalogue (et le plein texte) dans la transaction courante"""
+    values = catalogue_values(content)
+    connection.execute(UPSERT_ENTRY_SQL, values)
+    if connection.dialect.name == "sqlite":
+        connection.execute(text("DELETE FROM library_catalogue_fts WHERE rowid = :id"), {"id": content.id})
+        connection.execute(
+            text("INSERT INTO library_catalogue_fts (rowid, search_text) VALUES (:id, :search_text)"),
+            {"id": content.id, "search_text": values["search_text"]}
+        )
+
+
+def unindex_content(connection, content_id: int) -> None:
+    if connection.dialect.name == "sqlite":
+        connection.execute(text("DELETE FROM library_catalogue_fts WHERE rowid = :id"), {"id": content_id})
+    connection.execute(text("DELETE FROM library_catalogue WHERE content_id = :id"), {"id": content_id})
+
+
+class LibraryCatalogue:
+    """Recherche, facettes et sérialisation des ressources du catalogue"""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.dialect = db.get_bind().dialect.name
+
+    def _match(self, search: str):
+        """Condition plein texte (tous les termes, en préfixe)"""
+        terms = re.findall(r"\w+", fold_text(search))
+        if not terms:
+            return None
+        if self.dialect == "sqlite":
+            fts_ids = select(literal_column("rowid")).select_from(text("library_catalogue_fts")).where(
+                text("library_catalogue_fts MATCH :fts_match").bindparams(
+                    fts_match=" ".join(f'"{term}"*' for term in terms)
+                )
+            )
+            return LibraryCatalogueEntry.content_id.in_(fts_ids)
+        if self.dialect == "postgresql":
+            return text(
+                "to_tsvector('simple', library_catalogue.search_text) @@ to_tsquery('simple', :fts_query)"
+            ).bindparams(fts_query=" & ".join(f"{term}:*" for term in terms))
+        return func.coalesce(LibraryCatalogueEntry.search_text, "").contains(" ".join(terms))
+
+    def _query(self, filters: Dict[str, Optional[str]], search: Optional[str], columns=None, exclude: Optional[str] = None):
+        query = self.db.query(*columns) if columns else self.db.query(LibraryCatalogueEntry)
+        for facet in FACETS:
+            if filters.get(facet) and facet != exclude:
+                query = query.filter(getattr(LibraryCatalogueEntry, facet) == filters[facet])
+        if search:
+            match = self._match(search)
+            if match is not None:
+                query = query.filter(match)
+        return query
+
+    def search(
+        self,
+        filters: Dict[str, Optional[str]],
+        search: Optional[str] = None,
+        limit: int = 50,
+        after: Optional[int] = None,
+        offset: int = 0
+    ) -> Tuple[List[LibraryCatalogueEntry], Optional[int]]:
+        """Une page de résultats et le curseur de la page suivante (None en fin de liste)"""
+        query = self._query(filters, search).order_by(LibraryCatalogueEntry.content_id.desc())
+        if after is not None:
+            query = query.filter(LibraryCatalogueEntry.content_id < after)
+        else:
+            query = query.offset(offset)
+        entries = query.limit(limit + 1).all()
+        next_cursor = entries[limit - 1].content_id if len(entries) > limit and limit > 0 else None
+        return entries[:limit], next_cursor
+
+    def facet_counts(self, facet: str, filters: Dict[str, Optional[str]], search: Optional[str] = None) -> List[Dict]:
+        """Nombre de ressources par valeur d'une facette (qui ignore son propre filtre)"""
+        column = getattr(LibraryCatalogueEntry, facet)
+        rows = self._query(
+            filters, search, columns=(column, func.count(LibraryCatalogueEntry.content_id)), exclude=facet
+        ).filter(column.isnot(None)).group_by(column).order_by(column).all()
+        return [{"value": value, "count": count} for value, count in rows if value]
+
+    def facets(self, filters: Dict[str, Optional[str]], search: Optional[str] = None) -> Dict[str, List[Dict]]:
+        return {facet: self.facet_counts(facet, filters, search) for facet in FACETS}
+
+    def memberships(self, user_id: int, content_ids: List[int]) -> Tuple[Set[int], Dict[int, List[str]]]:
+        """Favoris et collections de l'utilisateur pour une page (une requête IN chacun)"""
+        if not content_ids:
+            return set(), {}
+        favorites = {
+            content_id for (content_id,) in self.db.query(UserFavorite.content_id).filter(
+                UserFavorite.user_id == user_id,
+                UserFavorite.content_id.in_(content_ids)
+            )
+        }
+        collections: Dict[int, List[str]] = {}
+        for content_id, name in self.db.query(CollectionItem.content_id, Collection.name).join(
+            Collection, Collection.id == CollectionItem.collection_id
+        ).filter(
+            Collection.user_id == user_id,
+            CollectionItem.content_id.in_(content_ids)
+        ).order_by(Collection.id):
+            collections.setdefault(content_id, []).append(name)
+        return favorites, collections
+
+    def serialize_page(self, user_id: int, entries: List[LibraryCatalogueEntry]) -> List[Dict]:
+        favorites, collections = self.memberships(user_id, [entry.content_id for entry in entries])
+        return [serialize_entry(entry, entry.content_id in favorites, collections.get(entry.content_id, []))
+                for entry in entries]
+
+    def rebuild(self, batch_size: int = 500) -> int:
+        """Réindexer tous les contenus (catalogue et plein texte)"""
+        connection = self.db.connection()
+        if self.dialect == "sqlite":
+            connection.execute(text("DELETE FROM library_catalogue_fts"))
+        connection.execute(text("DELETE FROM library_catalogue"))
+        count = 0
+        for content in self.db.query(Content).order_by(Content.id).yield_per(batch_size):
+            index_content(connection, content)
+            count += 1
+        self.db.commit()
+        return count
+
+
+def serialize_entry(entry: LibraryCatalogueEntry, is_favorite: bool, collections: List[str]) -> Dict:
+    """Format attendu par le frontend (bibliothèque élève)"""
+    return {
+        "id": entry.content_id,
+        "title": entry.title,
+        "description": entry.description,
+        "type": entry.type,
+        "subject": entry.subject,
+        "level": entry.level,
+        "tags": json.loads(entry.tags) if entry.tags else [],
+        "author": entry.author or "",
+        "created_at": entry.created_at.isoformat() if entry.created_at else "",
+        "duration": None,
+        "file_size": None,
+        "views": 0,
+        "rating": 0.0,
+        "is_favorite": is_favorite,
+        "is_in_collection": bool(collections),
+        "collections": collections,
+        "url": entry.file_url or "",
+        "thumbnail": entry.thumbnail_url or ""
+    }
+
+
+@event.listens_for(Content, "after_insert")
+@event.listens_for(Content, "after_update")
+def _index_content(mapper, connection, target):
+    index_content(connection, target)
+
+
+@event.listens_for(Content, "after_delete")
+def _unindex_content(mapper, connection, target):
+    unindex_content(connection, target.id)
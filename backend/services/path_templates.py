@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+Modèles de parcours d'apprentissage compilés et matérialisation groupée.
+
+Un modèle (famille, matière, niveau, nombre d'étapes) est compilé une fois par
+processus en lignes prêtes à insérer. Le parcours correspondant est stocké une
+seule fois (learning_paths.template_key) et partagé: assigner un modèle à une
+classe n'insère qu'une ligne student_learning_paths par élève, en une requête
+groupée. Les écarts individuels (étape facultative, durée adaptée...) sont
+stockés dans student_path_step_overrides au lieu de dupliquer le parcours.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models.learning_path import LearningPath
+from models.learning_path_step import LearningPathStep
+from models.student_learning_path import StudentLearningPath
+from models.student_path_step_override import StudentPathStepOverride
+
+# (titre, description, type de contenu, durée en minutes)
+PERSONALIZED_STEPS = {
+    "Mathématiques": {
+        "Débutant": [
+            ("Nombres de 1 à 20", "Apprendre à compter et reconnaître les nombres", "video", 5),
+            ("Addition simple", "Additionner des nombres de 1 à 10", "exercise", 8),
+            ("Soustraction simple", "Soustraire des nombres de 1 à 10", "exercise", 8),
+            ("Formes géométriques", "Reconnaître les formes de base", "interactive", 6),
+            ("Évaluation", "Quiz de validation des acquis", "quiz", 3)
+        ],
+        "Intermédiaire": [
+            ("Tables de multiplication", "Maîtriser les tables de 2 à 5", "video", 10),
+            ("Multiplication à 2 chiffres", "Multiplier des nombres à 2 chiffres", "exercise", 12),
+            ("Division simple", "Diviser des nombres par 2, 3, 4, 5", "exercise", 12),
+            ("Fractions simples", "Comprendre les fractions 1/2, 1/3, 1/4", "interactive", 8),
+            ("Périmètre et aire", "Calculer le périmètre et l'aire des formes", "exercise", 15),
+            ("Problèmes", "Résoudre des problèmes simples", "exercise", 15),
+            ("Évaluation finale", "Quiz de validation complète", "quiz", 5)
+        ],
+        "Avancé": [
+            ("Tables complètes", "Maîtriser toutes les tables de multiplication", "video", 8),
+            ("Multiplication complexe", "Multiplier des nombres à 3 chiffres", "exercise", 15),
+            ("Division avec reste", "Diviser des nombres avec reste", "exercise", 15),
+            ("Fractions et décimaux", "Travailler avec fractions et décimaux", "interactive", 12),
+            ("Pourcentages", "Calculer des pourcentages", "exercise", 12),
+            ("Géométrie avancée", "Calculer volumes et surfaces", "exercise", 15),
+            ("Problèmes complexes", "Résoudre des problèmes multi-étapes", "exercise", 20),
+            ("Algèbre simple", "Introduction aux équations", "interactive", 15),
+            ("Statistiques", "Moyennes et graphiques", "exercise", 12),
+            ("Évaluation avancée", "Quiz de validation avancée", "quiz", 8)
+        ],
+    },
+    "Français": {
+        "Débutant": [
+            ("Alphabet et sons", "Apprendre l'alphabet et les sons", "video", 8),
+            ("Vocabulaire de base", "Mots du quotidien", "interactive", 10),
+            ("Articles définis", "Le, la, les", "exercise", 8),
+            ("Pluriel simple", "Formation du pluriel", "exercise", 8),
+            ("Évaluation", "Quiz de validation", "quiz", 6)
+        ],
+        "Intermédiaire": [
+            ("Conjugaison présent", "Être, avoir, aller au présent", "video", 12),
+            ("Adjectifs", "Accord des adjectifs", "exercise", 15),
+            ("Pronoms personnels", "Je, tu, il, elle, nous, vous, ils, elles", "exercise", 15),
+            ("Questions", "Formation des questions", "interactive", 10),
+            ("Négation", "Ne...pas, ne...plus", "exercise", 12),
+            ("Lecture simple", "Compréhension de textes courts", "exercise", 15),
+            ("Évaluation", "Quiz de validation", "quiz", 6)
+        ],
+        "Avancé": [
+            ("Temps composés", "Passé composé et imparfait", "video", 15),
+            ("Subjonctif", "Formation et emploi du subjonctif", "exercise", 20),
+            ("Conditionnel", "Formation et emploi du conditionnel", "exercise", 18),
+            ("Subordonnées", "Propositions subordonnées", "exercise", 15),
+            ("Vocabulaire avancé", "Expressions idiomatiques", "interactive", 12),
+            ("Grammaire avancée", "Accord du participe passé", "exercise", 20),
+            ("Compréhension", "Textes littéraires", "exercise", 25),
+            ("Expression écrite", "Rédaction de textes", "exercise", 30),
+            ("Culture", "Histoire de la littérature", "video", 15),
+            ("Évaluation", "Quiz de validation", "quiz", 10)
+        ],
+    },
+    "Sciences": {
+        "Débutant": [
+            ("Les 5 sens", "Découvrir nos sens", "video", 8),
+            ("Animaux et plantes", "Classification simple", "interactive", 10),
+            ("Matières", "Solide, liquide, gaz", "exercise", 8),
+            ("Énergie", "Sources d'énergie simples", "exercise", 8),
+            ("Évaluation", "Quiz de validation", "quiz", 6)
+        ],
+        "Intermédiaire": [
+            ("Système solaire", "Planètes et étoiles", "video", 15),
+            ("Chaînes alimentaires", "Relations entre êtres vivants", "exercise", 12),
+            ("Électricité", "Circuits simples", "interactive", 15),
+            ("Chimie de base", "Mélanges et solutions", "exercise", 15),
+            ("Écosystèmes", "Environnements naturels", "exercise", 12),
+            ("Météo", "Phénomènes météorologiques", "interactive", 10),
+            ("Évaluation", "Quiz de validation", "quiz", 8)
+        ],
+        "Avancé": [
+            ("Atomes et molécules", "Structure de la matière", "video", 20),
+            ("Forces et mouvement", "Lois de Newton", "exercise", 25),
+            ("Évolution", "Théorie de l'évolution", "exercise", 20),
+            ("Génétique", "Hérédité et ADN", "interactive", 18),
+            ("Écologie", "Impact humain sur l'environnement", "exercise", 20),
+            ("Technologies", "Innovations scientifiques", "video", 15),
+            ("Expérimentation", "Méthode scientifique", "exercise", 30),
+            ("Débats", "Questions éthiques", "interactive", 20),
+            ("Projets", "Projets scientifiques", "project", 40),
+            ("Évaluation", "Quiz de validation", "quiz", 12)
+        ],
+    },
+}
+
+GENERAL_STEPS = [
+    ("Découverte", "Exploration du sujet", "video", 10),
+    ("Pratique", "Exercices d'application", "exercise", 15),
+    ("Renforcement", "Consolidation des acquis", "interactive", 12),
+    ("Application", "Mise en situation", "exercise", 18),
+    ("Évaluation", "Validation des compétences", "quiz", 8)
+]
+
+CONSOLIDATION_STEPS = [
+    ("Bienvenue", "Présentation du parcours", "video", 5),
+    ("Méthodes d'apprentissage", "Techniques pour mieux apprendre", "interactive", 10),
+    ("Organisation", "Planifier son apprentissage", "exercise", 8),
+    ("Motivation", "Trouver sa motivation", "interactive", 8),
+    ("Premiers pas", "Premiers exercices simples", "exercise", 10),
+    ("Évaluation", "Validation des acquis", "quiz", 5)
+]
+
+BASE_STEPS = {
+    "Mathématiques": [
+        ("Découverte", "Introduction aux concepts de base", "video", 5),
+        ("Pratique", "Exercices simples", "exercise", 10),
+        ("Validation", "Quiz de validation", "quiz", 5)
+    ],
+    "Français": [
+        ("Découverte", "Introduction à la matière", "video", 5),
+        ("Pratique", "Exercices de base", "exercise", 10),
+        ("Validation", "Quiz de validation", "quiz", 5)
+    ],
+    "Sciences": [
+        ("Découverte", "Introduction aux sciences", "video", 5),
+        ("Pratique", "Expériences simples", "exercise", 10),
+        ("Validation", "Quiz de validation", "quiz", 5)
+    ],
+}
+
+ADVANCED_STEPS = {
+    "Mathématiques": [
+        ("Concepts avancés", "Introduction aux concepts complexes", "video", 15),
+        ("Problèmes complexes", "Résolution de problèmes avancés", "exercise", 25),
+        ("Applications", "Applications pratiques", "project", 30),
+        ("Défis", "Défis mathématiques", "challenge", 20),
+        ("Évaluation", "Validation des compétences avancées", "quiz", 10)
+    ],
+    None: [
+        ("Concepts avancés", "Introduction aux concepts complexes", "video", 15),
+        ("Pratique avancée", "Exercices complexes", "exercise", 25),
+        ("Projets", "Projets pratiques", "project", 30),
+        ("Défis", "Défis stimulants", "challenge", 20),
+        ("Évaluation", "Validation des compétences avancées", "quiz", 10)
+    ],
+}
+
+# (difficulté, durée estimée en minutes, nombre d'étapes) par niveau d'évaluation
+LEVEL_PARAMETERS = {
+    "Débutant": ("easy", 30, 5),
+    "Intermédiaire": ("intermediate", 45, 7),
+    "Avancé": ("advanced", 60, 10),
+}
+
+# Colonnes d'étape qu'un élève peut redéfinir
+OVERRIDABLE_STEP_FIELDS = (
+    "title", "description", "content_type", "content_id", "estimated_duration", "is_required", "is_active"
+)
+
+
+@dataclass(frozen=True)
+class CompiledPathTemplate:
+    """Parcours prêt à matérialiser: colonnes du parcours et lignes d'étapes"""
+    key: str
+    path: Tuple[Tuple[str, object], ...]
+    steps: Tuple[Tuple[Tuple[str, object], ...], ...]
+
+    @property
+    def step_count(self) -> int:
+        return len(self.steps)
+
+    def path_values(self) -> Dict[str, object]:
+        return dict(self.path)
+
+    def step_rows(self, learning_path_id: int, created_at: datetime) -> List[Dict[str, object]]:
+        return [dict(step, learning_path_id=learning_path_id, created_at=created_at) for step in self.steps]
+
+
+def _compile(key: str, path: Dict[str, object], step_data) -> CompiledPathTemplate:
+    steps = tuple(
+        tuple({
+            "step_number": i + 1,
+            "title": title,
+            "description": description,
+            "content_type": content_type,
+            "estimated_duration": duration,
+            "is_required": True,
+            "is_active": True,
+        }.items())
+        for i, (title, description, content_type, duration) in enumerate(step_data)
+    )
+    return CompiledPathTemplate(key=key, path=tuple(path.items()), steps=steps)
+
+
+def level_parameters(level: str) -> Tuple[str, int, int]:
+    """(difficulté, durée, nombre d'étapes) d'un niveau; niveau inconnu = Avancé"""
+    return LEVEL_PARAMETERS.get(level, LEVEL_PARAMETERS["Avancé"])
+
+
+@lru_cache(maxsize=256)
+def personalized_template(subject: str, level: str, step_count: int) -> CompiledPathTemplate:
+    """Parcours personnalisé d'une matière à un niveau (Débutant, Intermédiaire, Avancé)"""
+    difficulty, estimated_duration, _ = level_parameters(level)
+    by_level = PERSONALIZED_STEPS.get(subject)
+    if by_level is None:
+        step_data = GENERAL_STEPS
+    else:
+        step_data = by_level.get(level, by_level["Avancé"])
+    return _compile(f"personalized:{subject}:{level}:{step_count}", {
+        "title": f"Parcours {subject} - Niveau {level}",
+        "description": f"Parcours personnalisé en {subject} adapté à votre niveau {level.lower()}",
+        "objectives": f"Maîtriser les concepts de base en {subject} et progresser vers des notions plus avancées",
+        "subject": subject,
+        "level": level.lower(),
+        "difficulty": difficulty,
+        "estimated_duration": estimated_duration,
+        "is_adaptive": True,
+    }, step_data[:step_count])
+
+
+@lru_cache(maxsize=1)
+def consolidation_template() -> CompiledPathTemplate:
+    """Parcours de consolidation des fondamentaux (débutants)"""
+    return _compile("consolidation:Général:beginner:6", {
+        "title": "Parcours de Consolidation - Fondamentaux",
+        "description": "Parcours pour consolider les bases et gagner en confiance",
+        "objectives": "Renforcer les compétences de base et développer la confiance en soi",
+        "subject": "Général",
+        "level": "beginner",
+        "difficulty": "easy",
+        "estimated_duration": 40,
+        "is_adaptive": True,
+    }, CONSOLIDATION_STEPS)
+
+
+@lru_cache(maxsize=32)
+def base_template(subject: str) -> CompiledPathTemplate:
+    """Parcours de base d'une matière (début du parcours d'un élève)"""
+    step_data = BASE_STEPS.get(subject, BASE_STEPS["Sciences"])
+    return _compile(f"base:{subject}:beginner:{len(step_data)}", {
+        "title": f"Parcours de Base - {subject}",
+        "description": f"Parcours d'introduction à {subject}",
+        "objectives": f"Acquérir les fondamentaux en {subject}",
+        "subject": subject,
+        "level": "beginner",
+        "difficulty": "easy",
+        "estimated_duration": 30,
+        "is_adaptive": False,
+    }, step_data)
+
+
+@lru_cache(maxsize=32)
+def advanced_template(subject: str) -> CompiledPathTemplate:
+    """Parcours avancé proposé après un parcours réussi"""
+    step_data = ADVANCED_STEPS.get(subject, ADVANCED_STEPS[None])
+    return _compile(f"advanced:{subject}:advanced:{len(step_data)}", {
+        "title": f"Parcours Avancé - {subject}",
+        "description": f"Parcours avancé en {subject} pour étudiants performants",
+        "objectives": f"Explorer des concepts avancés en {subject}",
+        "subject": subject,
+        "level": "advanced",
+        "difficulty": "hard",
+        "estimated_duration": 60,
+        "is_adaptive": True,
+    }, step_data)
+
+
+def _chunks(values: List[int], size: int):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+class PathMaterializer:
+    """Création des parcours partagés et assignation groupée aux élèves"""
+
+    def __init__(self, db: Session, chunk_size: int = 500):
+        self.db = db
+        self.chunk_size = chunk_size
+
+    def shared_path(self, template: CompiledPathTemplate, created_by: int) -> LearningPath:
+        """Parcours partagé d'un modèle, créé avec ses étapes au premier usage"""
+        path = self.db.query(LearningPath).filter(LearningPath.template_key == template.key).first()
+        if path is not None:
+            return path
+        now = datetime.utcnow()
+        try:
+            # Point de sauvegarde: un autre processus a pu créer le même parcours entre-temps
+            with self.db.begin_nested():
+                path = LearningPath(template_key=template.key, created_by=created_by, created_at=now,
+                                    **template.path_values())
+                self.db.add(path)
+                self.db.flush()
+                self.db.execute(insert(LearningPathStep), template.step_rows(path.id, now))
+        except IntegrityError:
+            path = self.db.query(LearningPath).filter(LearningPath.template_key == template.key).one()
+        return path
+
+    def assign(
+        self,
+        template: CompiledPathTemplate,
+        student_ids: Iterable[int],
+        created_by: int,
+        overrides: Optional[Dict[int, Dict[int, Dict[str, object]]]] = None,
+    ) -> Tuple[LearningPath, int]:
+        """Assigner un modèle à des élèves (déjà assignés: ignorés); un seul commit.
+
+        `overrides`: {élève: {numéro d'étape: {colonne: valeur}}}.
+        Retourne le parcours partagé et le nombre de nouvelles assignations.
+        """
+        path = self.shared_path(template, created_by)
+        student_ids = list(dict.fromkeys(student_ids))
+        assigned = set()
+        for chunk in _chunks(student_ids, self.chunk_size):
+            assigned.update(student_id for (student_id,) in self.db.query(StudentLearningPath.student_id).filter(
+                StudentLearningPath.learning_path_id == path.id,
+                StudentLearningPath.student_id.in_(chunk)
+            ))
+
+        now = datetime.utcnow()
+        rows = [{
+            "student_id": student_id,
+            "learning_path_id": path.id,
+            "progress": 0.0,
+            "is_completed": False,
+            "started_at": now,
+            "current_step": 1,
+            "total_steps": template.step_count,
+        } for student_id in student_ids if student_id not in assigned]
+        if rows:
+            self.db.execute(insert(StudentLearningPath), rows)
+        if overrides:
+            self._store_overrides(path.id, overrides)
+        self.db.commit()
+        return path, len(rows)
+
+    def _store_overrides(self, learning_path_id: int, overrides: Dict[int, Dict[int, Dict[str, object]]]) -> None:
+        student_paths = {}
+        for chunk in _chunks(list(overrides), self.chunk_size):
+            student_paths.update(self.db.query(StudentLearningPath.student_id, StudentLearningPath.id).filter(
+                StudentLearningPath.learning_path_id == learning_path_id,
+                StudentLearningPath.student_id.in_(chunk)
+            ).all())
+
+        rows = []
+        for student_id, steps in overrides.items():
+            student_path_id = student_paths.get(student_id)
+            if student_path_id is None:
+                continue
+            for step_number, values in steps.items():
+                unknown = set(values) - set(OVERRIDABLE_STEP_FIELDS)
+                if unknown:
+                    raise ValueError(f"Colonnes d'étape non modifiables: {sorted(unknown)}")
+                row = dict.fromkeys(OVERRIDABLE_STEP_FIELDS)
+                row.update(values, student_learning_path_id=student_path_id, step_number=step_number)
+                rows.append(row)
+        if not rows:
+            return
+        # Remplacer les écarts existants des mêmes étapes (une suppression par numéro d'étape)
+        by_step: Dict[int, List[int]] = {}
+        for row in rows:
+            by_step.setdefault(row["step_number"], []).append(row["student_learning_path_id"])
+        for step_number, student_path_ids in by_step.items():
+            for chunk in _chunks(student_path_ids, self.chunk_size):
+                self.db.query(StudentPathStepOverride).filter(
+                    StudentPathStepOverride.step_number == step_number,
+                    StudentPathStepOverride.student_learning_path_id.in_(chunk)
+                ).delete(synchronize_session=False)
+        self.db.execute(insert(StudentPathStepOverride), rows)
+
+    def student_steps(self, student_path: StudentLearningPath) -> List[Dict[str, object]]:
+        """Étapes du parcours vues par l'élève (étapes du modèle + ses écarts)"""
+        steps = self.db.query(LearningPathStep).filter(
+            LearningPathStep.learning_path_id == student_path.learning_path_id
+        ).order_by(LearningPathStep.step_number).all()
+        overrides = {
+            override.step_number: override
+            for override in self.db.query(StudentPathStepOverride).filter(
+                StudentPathStepOverride.student_learning_path_id == student_path.id
+            )
+        }
+        resolved = []
+        for step in steps:
+            values = {"id": step.id, "step_number": step.step_number}
+            override = overrides.get(step.step_number)
+            for field in OVERRIDABLE_STEP_FIELDS:
+                value = getattr(override, field) if override is not None else None
+                values[field] = value if value is not None else getattr(step, field)
+            resolved.append(values)
+        return resolved
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Traitements dérivés d'une soumission, exécutés par la file de tâches.
+
+Un résultat de quiz alimente les compteurs de badges et les cubes analytiques,
+une tentative de test adaptatif les cubes, un résultat de remédiation les badges;
+une évaluation initiale de français terminée reçoit son profil intelligent.
+Le client suit l'avancement par sujet (quiz_result:<id>, test_attempt:<id>,
+remediation_result:<id>, french_assessment:<id>) via /api/v1/background-tasks.
+Les compteurs et cubes sont incrémentaux: leurs traitements réservent leurs effets
+(claim_effects) dans la transaction qui les écrit, une reprise ne les compte pas deux fois.
+Les compteurs de badges sont lus puis réécrits: leurs traitements sont per_user, deux
+workers ne mettent jamais à jour les compteurs d'un même élève en même temps.
+"""
+
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from models.adaptive_evaluation import TestAttempt
+from models.background_task import BackgroundTask
+from models.french_learning import FrenchAdaptiveTest
+from models.quiz import QuizResult
+from models.remediation import RemediationResult
+from services.task_queue import claim_effects, enqueue, task_handler
+
+QUIZ_RESULT_BADGES = "quiz_result.badges"
+QUIZ_RESULT_ANALYTICS = "quiz_result.analytics"
+TEST_ATTEMPT_ANALYTICS = "test_attempt.analytics"
+REMEDIATION_BADGES = "remediation_result.badges"
+FRENCH_ASSESSMENT_PROFILE = "french_assessment.profile"
+
+
+def quiz_result_subject(result_id: int) -> str:
+    return f"quiz_result:{result_id}"
+
+
+def test_attempt_subject(attempt_id: int) -> str:
+    return f"test_attempt:{attempt_id}"
+
+
+def remediation_subject(result_id: int) -> str:
+    return f"remediation_result:{result_id}"
+
+
+def french_assessment_subject(test_id: int) -> str:
+    return f"french_assessment:{test_id}"
+
+
+def enqueue_quiz_result_processing(db: Session, result: QuizResult) -> List[BackgroundTask]:
+    """Planifier badges et cubes d'un résultat complété (à valider avec la soumission)"""
+    subject = quiz_result_subject(result.id)
+    payload = {"result_id": result.id}
+    return [
+        enqueue(db, QUIZ_RESULT_BADGES, subject, payload, user_id=result.student_id),
+        enqueue(db, QUIZ_RESULT_ANALYTICS, subject, payload, user_id=result.student_id),
+    ]
+
+
+def enqueue_test_attempt_processing(db: Session, attempt: TestAttempt) -> BackgroundTask:
+    """Planifier la mise à jour des cubes pour une tentative de test adaptatif terminée"""
+    return enqueue(
+        db, TEST_ATTEMPT_ANALYTICS, test_attempt_subject(attempt.id),
+        {"attempt_id": attempt.id}, user_id=attempt.student_id
+    )
+
+
+def enqueue_remediation_badges(db: Session, result: RemediationResult) -> BackgroundTask:
+    """Planifier les compteurs de badges d'un résultat de remédiation"""
+    return enqueue(
+        db, REMEDIATION_BADGES, remediation_subject(result.id),
+        {"result_id": result.id}, user_id=result.student_id
+    )
+
+
+def enqueue_french_profile(db: Session, test: FrenchAdaptiveTest) -> BackgroundTask:
+    """Planifier le profil intelligent d'une évaluation initiale terminée"""
+    return enqueue(
+        db, FRENCH_ASSESSMENT_PROFILE, french_assessment_subject(test.id),
+        {"test_id": test.id, "student_id": test.student_id}, user_id=test.student_id
+    )
+
+
+def _completed_result(db: Session, result_id: int) -> Optional[QuizResult]:
+    result = db.query(QuizResult).filter(QuizResult.id == result_id).first()
+    return result if result is not None and result.is_completed else None
+
+
+@task_handler(QUIZ_RESULT_BADGES, priority=10, per_user=True)
+def record_badges(db: Session, result_id: int) -> dict:
+    from services.badge_rule_engine import BadgeRuleEngine
+    result = _completed_result(db, result_id)
+    if result is None or not claim_effects(db):
+        return {"skipped": True}
+    awarded = BadgeRuleEngine(db).record_quiz_result(result)
+    return {"awarded": awarded}
+
+
+@task_handler(QUIZ_RESULT_ANALYTICS, priority=50)
+def record_analytics(db: Session, result_id: int) -> dict:
+    from services.analytics_cubes import AnalyticsCubeService
+    result = _completed_result(db, result_id)
+    if result is None or not claim_effects(db):
+        return {"skipped": True}
+    return {"recorded": AnalyticsCubeService(db).record_quiz_result(result)}
+
+
+@task_handler(TEST_ATTEMPT_ANALYTICS, priority=50)
+def record_test_attempt_analytics(db: Session, attempt_id: int) -> dict:
+    from services.analytics_cubes import AnalyticsCubeService
+    attempt = db.query(TestAttempt).filter(TestAttempt.id == attempt_id).first()
+    if attempt is None or not claim_effects(db):
+        return {"skipped": True}
+    return {"recorded": AnalyticsCubeService(db).record_test_attempt(attempt)}
+
+
+@task_handler(REMEDIATION_BADGES, priority=10, per_user=True)
+def record_remediation_badges(db: Session, result_id: int) -> dict:
+    from services.badge_rule_engine import BadgeRuleEngine
+    result = db.query(RemediationResult).filter(RemediationResult.id == result_id).first()
+    if result is None or not claim_effects(db):
+        return {"skipped": True}
+    awarded = BadgeRuleEngine(db).record_remediation_result(result)
+    return {"awarded": awarded}
+
+
+@task_handler(FRENCH_ASSESSMENT_PROFILE, priority=100, max_attempts=3)
+def generate_french_profile(db: Session, test_id: int, student_id: int) -> dict:
+    from services.intelligent_profile_service import IntelligentProfileService
+    service = IntelligentProfileService(db)
+    profile_data = service.generate_intelligent_profile(test_id, student_id)
+    service.save_profile(student_id, profile_data)
+    return {
+        "french_level": profile_data.get("real_french_level"),
+        "confidence_score": profile_data.get("confidence_score"),
+        "learning_style": profile_data.get("learning_style"),
+    }
@@ -11,8 +11,8 @@ import json
 from models.student_learning_path import StudentLearningPath
 from models.learning_path import LearningPath
 from models.learning_path_step import LearningPathStep
-from models.assessment_result import AssessmentResult
-from models.quiz_result import QuizResult
+from models.assessment import AssessmentResult
+from models.quiz import QuizResult
 from models.user import User
 
 class ProgressTracker:
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Notifications de quiz calculées en base (retard, échéance proche, score faible, réussite).
+
+Chaque assignation active est classée par une seule requête (LEFT JOIN sur le
+dernier résultat de l'élève + CASE): plus de requêtes Quiz / User / QuizResult
+par assignation. Les listes sont paginées par curseur (id d'assignation
+décroissant) et les comptages du résumé sont mis en cache quelques secondes
+(LRU borné), vidé au commit de toute écriture sur les assignations ou résultats.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import DateTime, Float, Integer, String, event, text
+from sqlalchemy.orm import Session, object_session
+
+from models.quiz import QuizAssignment, QuizResult
+
+# Seuils de classification (identiques à l'ancienne version Python)
+DUE_SOON_DAYS = 3        # (due_date - maintenant).days <= 2
+LOW_SCORE_THRESHOLD = 60
+SUCCESS_SCORE_THRESHOLD = 80
+
+NOTIFICATION_KINDS = ("overdue", "due_soon", "low_score", "completed")
+
+SUMMARY_CACHE_SECONDS = 30
+SUMMARY_CACHE_MAX_ENTRIES = 1000  # couples (enseignant, classe) gardés, les moins récents évincés
+
+_summary_cache: "OrderedDict[Tuple[Optional[int], Optional[int]], Tuple[float, Dict[str, int]]]" = OrderedDict()
+_summary_cache_lock = threading.Lock()
+
+
+class QuizNotificationEngine:
+    """Classification ensembliste des assignations de quiz"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _classified_sql(self, teacher_id: Optional[int], class_id: Optional[int]) -> Tuple[str, Dict[str, Any]]:
+        """CTE `classified`: une ligne par assignation active avec échéance, et son type"""
+        now = datetime.utcnow()
+        params: Dict[str, Any] = {
+            "now": now,
+            "soon": now + timedelta(days=DUE_SOON_DAYS),
+            "low": LOW_SCORE_THRESHOLD,
+            "success": SUCCESS_SCORE_THRESHOLD,
+            "active": True,
+        }
+        filters = ""
+        if teacher_id is not None:
+            filters += " AND a.assigned_by = :teacher_id"
+            params["teacher_id"] = teacher_id
+        if class_id is not None:
+            filters += " AND a.class_id = :class_id"
+            params["class_id"] = class_id
+
+        sql = f"""
+            WITH classified AS (
+                SELECT
+                    a.id AS assignment_id,
+                    a.due_date,
+                    q.title AS quiz_title,
+                    u.username AS student_name,
+                    r.score,
+                    CASE
+                        WHEN r.id IS NULL AND a.due_date < :now THEN 'overdue'
+                        WHEN r.id IS NULL AND a.due_date < :soon THEN 'due_soon'
+                        WHEN r.score < :low THEN 'low_score'
+                        WHEN r.score >= :success THEN 'completed'
+                    END AS kind
+                FROM quiz_assignments a
+                JOIN quizzes q ON q.id = a.quiz_id
+                JOIN users u ON u.id = a.student_id
+                LEFT JOIN quiz_results r ON r.id = (
+                    SELECT MAX(r2.id) FROM quiz_results r2
+                    WHERE r2.quiz_id = a.quiz_id AND r2.student_id = a.student_id
+                )
+                WHERE a.is_active = :active AND a.due_date IS NOT NULL {filters}
+            )
+        """
+        return sql, params
+
+    def page(
+        self,
+        teacher_id: Optional[int] = None,
+        class_id: Optional[int] = None,
+        kind: Optional[str] = None,
+        before_id: Optional[int] = None,
+        limit: int = 50
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """Page de notifications (id d'assignation décroissant) et curseur de la page suivante"""
+        sql, params = self._classified_sql(teacher_id, class_id)
+        where = "kind IS NOT NULL"
+        if kind is not None:
+            where += " AND kind = :kind"
+            params["kind"] = kind
+        if before_id is not None:
+            where += " AND assignment_id < :before_id"
+            params["before_id"] = before_id
+        params["limit"] = limit + 1
+
+        rows = self.db.execute(text(f"""
+            {sql}
+            SELECT assignment_id, due_date, quiz_title, student_name, score, kind
+            FROM classified
+            WHERE {where}
+            ORDER BY assignment_id DESC
+            LIMIT :limit
+        """).columns(
+            assignment_id=Integer, due_date=DateTime, quiz_title=String,
+            student_name=String, score=Float, kind=String
+        ), params).mappings().all()
+
+        next_cursor = rows[limit - 1]["assignment_id"] if len(rows) > limit else None
+        return [self._to_notification(row, params["now"]) for row in rows[:limit]], next_cursor
+
+    def counts(self, teacher_id: Optional[int] = None, class_id: Optional[int] = None) -> Dict[str, int]:
+        """Nombre de notifications par type (une requête groupée)"""
+        sql, params = self._classified_sql(teacher_id, class_id)
+        counts = {k: 0 for k in NOTIFICATION_KINDS}
+        for row in self.db.execute(text(f"""
+            {sql}
+            SELECT kind, COUNT(*) AS total FROM classified
+            WHERE kind IS NOT NULL
+            GROUP BY kind
+        """), params):
+            counts[row.kind] = row.total
+        return counts
+
+    def cached_counts(self, teacher_id: Optional[int] = None, class_id: Optional[int] = None) -> Dict[str, int]:
+        """Comptages par type + résultats des 7 derniers jours, en cache SUMMARY_CACHE_SECONDS
+        par (enseignant, classe)"""
+        key = (teacher_id, class_id)
+        now = time.monotonic()
+        with _summary_cache_lock:
+            entry = _summary_cache.get(key)
+            if entry and entry[0] > now:
+                _summary_cache.move_to_end(key)
+                return dict(entry[1])
+
+        counts = self.counts(teacher_id, class_id)
+        counts["recent_completions"] = self._count_recent_results(teacher_id, class_id)
+        with _summary_cache_lock:
+            _summary_cache[key] = (now + SUMMARY_CACHE_SECONDS, counts)
+            _summary_cache.move_to_end(key)
+            while len(_summary_cache) > SUMMARY_CACHE_MAX_ENTRIES:
+                _summary_cache.popitem(last=False)
+        return dict(counts)
+
+    def summary(self, teacher_id: Optional[int] = None, class_id: Optional[int] = None) -> Dict[str, int]:
+        counts = self.cached_counts(teacher_id, class_id)
+        return {
+            "total_notifications": counts["overdue"] + counts["due_soon"] + counts["recent_completions"],
+            "unread_count": sum(counts[k] for k in NOTIFICATION_KINDS),
+            "high_priority": counts["overdue"] + counts["due_soon"],
+            "overdue_quizzes": counts["overdue"],
+            "due_soon_quizzes": counts["due_soon"],
+            "low_scores": counts["low_score"],
+            "recent_completions": counts["recent_completions"],
+        }
+
+    def _count_recent_results(self, teacher_id: Optional[int], class_id: Optional[int]) -> int:
+        params: Dict[str, Any] = {"since": datetime.utcnow() - timedelta(days=7)}
+        scope = ""
+        if teacher_id is not None or class_id is not None:
+            # Seulement les résultats des assignations filtrées
+            scope = "AND EXISTS (SELECT 1 FROM quiz_assignments a WHERE a.quiz_id = r.quiz_id AND a.student_id = r.student_id"
+            if teacher_id is not None:
+                scope += " AND a.assigned_by = :teacher_id"
+                params["teacher_id"] = teacher_id
+            if class_id is not None:
+                scope += " AND a.class_id = :class_id"
+                params["class_id"] = class_id
+            scope += ")"
+        return self.db.execute(text(f"""
+            SELECT COUNT(*) FROM quiz_results r
+            WHERE r.created_at >= :since {scope}
+        """), params).scalar() or 0
+
+    @staticmethod
+    def invalidate_summary_cache() -> None:
+        with _summary_cache_lock:
+            _summary_cache.clear()
+
+    @staticmethod
+    def _to_notification(row, now: datetime) -> Dict[str, Any]:
+        """Mise en forme d'une ligne classée (mêmes textes que l'ancienne version)"""
+        kind, quiz_title, student_name = row["kind"], row["quiz_title"], row["student_name"]
+        due_date = row["due_date"]
+        if due_date is not None and due_date.tzinfo is not None:
+            due_date = due_date.replace(tzinfo=None)
+        score = row["score"]
+
+        notification = {
+            "id": f"{kind}_{row['assignment_id']}",
+            "assignment_id": row["assignment_id"],
+            "type": kind,
+            "quiz_title": quiz_title,
+            "student_name": student_name,
+            "created_at": now.isoformat(),
+            "is_read": False,
+        }
+        if kind == "overdue":
+            notification.update(
+                title="Quiz en retard",
+                message=f"L'étudiant {student_name} n'a pas encore répondu au quiz '{quiz_title}' "
+                        f"({(now - due_date).days} jour(s) de retard)",
+                due_date=due_date.isoformat(),
+                days_overdue=(now - due_date).days,
+                priority="high"
+            )
+        elif kind == "due_soon":
+            notification.update(
+                title="Échéance proche",
+                message=f"L'étudiant {student_name} doit répondre au quiz '{quiz_title}' "
+                        f"dans {(due_date - now).days} jour(s)",
+                due_date=due_date.isoformat(),
+                priority="medium"
+            )
+        elif kind == "low_score":
+            notification.update(
+                title="Score faible",
+                message=f"L'étudiant {student_name} a obtenu un score faible ({score}/100) au quiz '{quiz_title}'",
+                score=score,
+                priority="medium"
+            )
+        else:
+            notification.update(
+                title="Quiz terminé avec succès",
+                message=f"L'étudiant {student_name} a brillamment réussi le quiz '{quiz_title}' "
+                        f"avec un score de {score}/100",
+                score=score,
+                priority="low"
+            )
+        return notification
+
+
+@event.listens_for(QuizAssignment, "after_insert")
+@event.listens_for(QuizAssignment, "after_update")
+@event.listens_for(QuizAssignment, "after_delete")
+@event.listens_for(QuizResult, "after_insert")
+@event.listens_for(QuizResult, "after_update")
+@event.listens_for(QuizResult, "after_delete")
+def _flag_notification_change(mapper, connection, target):
+    session = object_session(target)
+    if session is None:
+        QuizNotificationEngine.invalidate_summary_cache()
+    else:
+        session.info["quiz_notifications_changed"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _flag_bulk_notification_change(orm_execute_state):
+    # update() / delete() en masse ne passent pas par les listeners du mapper
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and any(
+        mapper.class_ in (QuizAssignment, QuizResult) for mapper in orm_execute_state.all_mappers
+    ):
+        orm_execute_state.session.info["quiz_notifications_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_notifications(session):
+    if session.info.pop("quiz_notifications_changed", False):
+        QuizNotificationEngine.invalidate_summary_cache()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_rolled_back_notifications(session, previous_transaction):
+    session.info.pop("quiz_notifications_changed", None)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Annuaire des classes: enseignant -> classes -> élèves, en mémoire.
+
+Les handlers qui résolvent « élèves de la classe X » ou « élèves de l'enseignant Y »
+lisent un instantané chargé en deux requêtes (class_groups, class_students) et
+partagé par tout le processus, au lieu de refaire la jointure à chaque requête.
+Les helpers retournent des ensembles d'IDs prêts pour un filtre `IN (...)`.
+
+L'instantané est invalidé à chaque écriture ORM sur ClassGroup / ClassStudent
+(affectation, retrait, CRUD des classes, suppressions en masse). Il est propre au
+processus: avec plusieurs workers, un changement fait ailleurs est visible au plus
+tard après ROSTER_CACHE_TTL_SECONDS.
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from core.config import settings
+from models.class_group import ClassGroup, ClassStudent
+
+EMPTY: FrozenSet[int] = frozenset()
+
+
+@dataclass(frozen=True)
+class Roster:
+    """Instantané immuable des appartenances (classes triées par id)"""
+    class_teacher: Dict[int, int]
+    class_students: Dict[int, FrozenSet[int]]
+    teacher_classes: Dict[int, Tuple[int, ...]]
+    teacher_students: Dict[int, FrozenSet[int]]
+    student_classes: Dict[int, Tuple[int, ...]]
+
+    @classmethod
+    def load(cls, db: Session) -> "Roster":
+        class_teacher = dict(db.query(ClassGroup.id, ClassGroup.teacher_id).order_by(ClassGroup.id))
+        members: Dict[int, set] = {}
+        student_classes: Dict[int, list] = {}
+        for class_id, student_id in db.query(ClassStudent.class_id, ClassStudent.student_id).order_by(
+            ClassStudent.class_id
+        ):
+            if class_id not in class_teacher:
+                continue
+            members.setdefault(class_id, set()).add(student_id)
+            if class_id not in student_classes.setdefault(student_id, []):
+                student_classes[student_id].append(class_id)
+
+        teacher_classes: Dict[int, list] = {}
+        teacher_students: Dict[int, set] = {}
+        for class_id, teacher_id in class_teacher.items():
+            teacher_classes.setdefault(teacher_id, []).append(class_id)
+            teacher_students.setdefault(teacher_id, set()).update(members.get(class_id, ()))
+
+        return cls(
+            class_teacher=class_teacher,
+            class_students={class_id: frozenset(ids) for class_id, ids in members.items()},
+            teacher_classes={teacher_id: tuple(ids) for teacher_id, ids in teacher_classes.items()},
+            teacher_students={teacher_id: frozenset(ids) for teacher_id, ids in teacher_students.items()},
+            student_classes={student_id: tuple(ids) for student_id, ids in student_classes.items()},
+        )
+
+
+_roster: Optional[Tuple[float, Roster]] = None
+_roster_lock = threading.Lock()
+_generation = 0
+
+
+def get_roster(db: Session) -> Roster:
+    """Instantané courant (rechargé après une invalidation ou l'expiration du TTL)"""
+    global _roster
+    now = time.monotonic()
+    with _roster_lock:
+        entry, generation = _roster, _generation
+    if entry and entry[0] > now:
+        return entry[1]
+    roster = Roster.load(db)
+    if settings.ROSTER_CACHE_TTL_SECONDS > 0:
+        with _roster_lock:
+            # Une invalidation pendant le chargement rend cet instantané périmé: ne pas le garder
+            if generation == _generation:
+                _roster = (now + settings.ROSTER_CACHE_TTL_SECONDS, roster)
+    return roster
+
+
+def invalidate_roster() -> None:
+    global _roster, _generation
+    with _roster_lock:
+        _roster = None
+        _generation += 1
+
+
+def class_student_ids(db: Session, class_id: int) -> FrozenSet[int]:
+    return get_roster(db).class_students.get(class_id, EMPTY)
+
+
+def teacher_class_ids(db: Session, teacher_id: int) -> Tuple[int, ...]:
+    return get_roster(db).teacher_classes.get(teacher_id, ())
+
+
+def teacher_student_ids(db: Session, teacher_id: int) -> FrozenSet[int]:
+    """Élèves de toutes les classes de l'enseignant"""
+    return get_roster(db).teacher_students.get(teacher_id, EMPTY)
+
+
+def student_class_ids(db: Session, student_id: int) -> Tuple[int, ...]:
+    return get_roster(db).student_classes.get(student_id, ())
+
+
+def teacher_has_student(db: Session, teacher_id: int, student_id: int) -> bool:
+    return student_id in teacher_student_ids(db, teacher_id)
+
+
+def class_teacher_id(db: Session, class_id: int) -> Optional[int]:
+    return get_roster(db).class_teacher.get(class_id)
+
+
+@event.listens_for(ClassGroup, "after_insert")
+@event.listens_for(ClassGroup, "after_update")
+@event.listens_for(ClassGroup, "after_delete")
+@event.listens_for(ClassStudent, "after_insert")
+@event.listens_for(ClassStudent, "after_update")
+@event.listens_for(ClassStudent, "after_delete")
+def _invalidate_on_roster_change(mapper, connection, target):
+    invalidate_roster()
+    # Une requête concurrente a pu recharger l'état d'avant le commit: invalider aussi à la fin
+    session = object_session(target)
+    if session is not None:
+        session.info["roster_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_soft_rollback")
+def _invalidate_after_transaction(session, *args):
+    if session.info.pop("roster_changed", False):
+        invalidate_roster()
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _invalidate_on_bulk_roster_change(orm_execute_state):
+    # query(ClassStudent).filter(...).delete() et update() en masse ne passent pas par les listeners du mapper
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and any(
+        mapper.class_ in (ClassGroup, ClassStudent) for mapper in orm_execute_state.all_mappers
+    ):
+        invalidate_roster()
+        orm_execute_state.session.info["roster_changed"] = True
@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+"""
+Noyau de notation partagé par tous les chemins de soumission.
+
+Le corrigé d'une question est compilé une seule fois (CompiledKey): réponses
+acceptées normalisées (casse, espaces, apostrophes et ponctuation finale; les
+accents comptent: « mange » n'est pas « mangé »), options indexées par leur
+texte, équivalences vrai/faux et comparaison numérique tolérante (« 3,5 » =
+« 3.50 »; un décimal est accepté à l'arrondi de sa dernière décimale).
+Une copie se note ensuite en une passe (`grade`): un accès dictionnaire et une
+normalisation par réponse, détail par question et totaux.
+
+Les corrigés des quiz, tests adaptatifs et évaluations sont chargés en une requête
+par quiz/test et gardés en cache dans le processus; toute écriture ORM sur une
+question invalide le corrigé de son quiz/test (au plus
+SCORING_KEY_CACHE_TTL_SECONDS de retard pour les écritures des autres processus).
+"""
+
+import json
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+from sqlalchemy import event, inspect as sa_inspect
+from sqlalchemy.orm import Session, object_session
+
+from core.config import settings
+from models.adaptive_evaluation import AdaptiveQuestion
+from models.assessment import AssessmentQuestion
+from models.quiz import Question
+
+BOOLEAN_TYPES = {"true_false", "vrai_faux", "boolean"}
+TRUE_WORDS = {"vrai", "true", "oui", "yes", "v", "t", "1"}
+FALSE_WORDS = {"faux", "false", "non", "no", "f", "0"}
+UNAVAILABLE = "Réponse correcte non disponible"
+
+_SPACES = re.compile(r"\s+")
+_APOSTROPHES = str.maketrans({"’": "'", "‘": "'", "`": "'", "´": "'"})
+_NUMBER = re.compile(r"^[+-]?(\d+([.,]\d*)?|[.,]\d+)$")
+
+
+def casefold_text(value: Any) -> str:
+    """Minuscules, espaces réduits, apostrophes typographiques unifiées (accents conservés)"""
+    if value is None:
+        return ""
+    return _SPACES.sub(" ", str(value).translate(_APOSTROPHES)).strip().casefold()
+
+
+def normalize_answer(value: Any) -> str:
+    """Forme de comparaison d'une réponse: casefold, sans ponctuation finale"""
+    return casefold_text(value).rstrip(" .!;")
+
+
+def parse_number(value: Any) -> Optional[Decimal]:
+    if isinstance(value, bool) or value is None:
+        return None
+    text = casefold_text(value).replace(" ", "")
+    if not _NUMBER.match(text):
+        return None
+    try:
+        return Decimal(text.replace(",", "."))
+    except InvalidOperation:
+        return None
+
+
+def parse_boolean(value: Any) -> Optional[bool]:
+    if isinstance(value, bool):
+        return value
+    word = normalize_answer(value)
+    if word in TRUE_WORDS:
+        return True
+    if word in FALSE_WORDS:
+        return False
+    return None
+
+
+def parse_options(options: Any) -> List[str]:
+    """Options d'une question: liste, ou JSON stocké en texte (tests adaptatifs, évaluations)"""
+    if isinstance(options, str):
+        try:
+            options = json.loads(options)
+        except ValueError:
+            return []
+    if isinstance(options, dict):
+        options = list(options.values())
+    if not isinstance(options, (list, tuple)):
+        return []
+    return [str(option) for option in options]
+
+
+def extract_correct_answer_from_text(question_text: str) -> str:
+    """Extrait la réponse correcte depuis le texte de la question."""
+    if not question_text:
+        return ""
+
+    # Chercher "Réponse correcte:"
+    correct_start = question_text.find("Réponse correcte:")
+    if correct_start != -1:
+        # Chercher la fin (explication ou fin du texte)
+        explanation_start = question_text.find("Explication:", correct_start)
+        if explanation_start != -1:
+            correct_answer = question_text[correct_start:explanation_start].strip()
+        else:
+            correct_answer = question_text[correct_start:].strip()
+
+        # Nettoyer
+        return correct_answer.replace("Réponse correcte:", "").strip()
+
+    return ""
+
+
+@dataclass(frozen=True)
+class CompiledKey:
+    """Corrigé compilé d'une question ('choice', 'boolean', 'numeric' ou 'text')"""
+    question_id: int
+    mode: str
+    points: float
+    display: str
+    accepted: frozenset = frozenset()
+    option_index: Optional[int] = None
+    options_exact: Mapping[str, int] = field(default_factory=dict)
+    options_folded: Mapping[str, int] = field(default_factory=dict)
+    option_count: int = 0
+    boolean: Optional[bool] = None
+    number: Optional[Decimal] = None
+    tolerance: Decimal = Decimal(0)
+
+    def _choice(self, answer: Any, by_index: bool = False) -> Optional[int]:
+        # Le texte de l'option d'abord (4 désigne l'option "4"); l'index seulement
+        # pour les copies déclarées en index d'options et sans option de ce texte
+        exact = casefold_text(answer)
+        if exact in self.options_exact:
+            return self.options_exact[exact]
+        index = self.options_folded.get(normalize_answer(answer))
+        if index is None and by_index and isinstance(answer, int) and not isinstance(answer, bool):
+            return answer if 0 <= answer < self.option_count else None
+        return index
+
+    def check(self, answer: Any, by_index: bool = False) -> bool:
+        """Réponse correcte? `by_index`: un entier désigne l'option par son index (0-based)"""
+        if answer is None:
+            return False
+        if self.mode == "choice":
+            if self.option_index is not None and self._choice(answer, by_index) == self.option_index:
+                return True
+            return normalize_answer(answer) in self.accepted
+        if self.mode == "boolean":
+            return parse_boolean(answer) is self.boolean
+        if self.mode == "numeric":
+            number = parse_number(answer)
+            if number is not None:
+                return abs(number - self.number) <= self.tolerance
+        return normalize_answer(answer) in self.accepted
+
+
+def compile_key(
+    question_id: int,
+    question_type: Optional[str],
+    correct_answer: Any,
+    options: Any = None,
+    points: Optional[float] = 1.0,
+    fallback: Optional[str] = None
+) -> CompiledKey:
+    """Compiler le corrigé d'une question.
+
+    `correct_answer` peut être le texte d'une option, son index (0-based) ou une
+    réponse libre; `fallback` sert de réponse attendue quand elle est absente.
+    """
+    points = float(points if points is not None else 1.0)
+    kind = (question_type or "").lower()
+    expected = correct_answer if correct_answer not in (None, "") else fallback
+    option_list = parse_options(options)
+
+    if kind in BOOLEAN_TYPES or (not option_list and isinstance(expected, bool)):
+        boolean = parse_boolean(expected)
+        if boolean is not None:
+            return CompiledKey(
+                question_id=question_id, mode="boolean", points=points,
+                display="Vrai" if boolean else "Faux", boolean=boolean
+            )
+
+    if option_list:
+        options_exact: Dict[str, int] = {}
+        folded: Dict[str, List[int]] = {}
+        for index, option in enumerate(option_list):
+            options_exact.setdefault(casefold_text(option), index)
+            folded.setdefault(normalize_answer(option), []).append(index)
+        # Une forme sans ponctuation finale n'est retenue que si elle ne confond pas deux options
+        options_folded = {form: indexes[0] for form, indexes in folded.items() if len(indexes) == 1}
+        option_index = None
+        if expected is not None:
+            option_index = options_exact.get(casefold_text(expected), options_folded.get(normalize_answer(expected)))
+            # Corrigé donné par index d'option (entier ou "2")
+            digits = str(expected).strip()
+            if option_index is None and not isinstance(expected, bool) and digits.isdigit() and int(digits) < len(option_list):
+                option_index = int(digits)
+        if option_index is not None or expected is not None:
+            display = option_list[option_index] if option_index is not None else str(expected)
+            return CompiledKey(
+                question_id=question_id, mode="choice", points=points, display=display,
+                accepted=frozenset({normalize_answer(display)}) if option_index is None else frozenset(),
+                option_index=option_index, options_exact=options_exact, options_folded=options_folded,
+                option_count=len(option_list)
+            )
+
+    if expected is None or expected == "":
+        return CompiledKey(question_id=question_id, mode="text", points=points, display=UNAVAILABLE)
+
+    display = str(expected)
+    number = parse_number(expected)
+    if number is not None:
+        # Décimal attendu: toute réponse qui s'arrondit à la même valeur est acceptée
+        exponent = number.as_tuple().exponent
+        tolerance = Decimal(5).scaleb(exponent - 1) if exponent < 0 else Decimal(0)
+        return CompiledKey(
+            question_id=question_id, mode="numeric", points=points, display=display,
+            accepted=frozenset({normalize_answer(expected)}), number=number, tolerance=tolerance
+        )
+    return CompiledKey(
+        question_id=question_id, mode="text", points=points, display=display,
+        accepted=frozenset({normalize_answer(expected)})
+    )
+
+
+@dataclass
+class ItemScore:
+    question_id: int
+    answer: Any
+    is_correct: bool
+    points_earned: float
+    points_possible: float
+    correct_answer: str
+
+
+@dataclass
+class GradeReport:
+    items: List[ItemScore]
+    score: float = 0.0
+    max_score: float = 0.0
+    correct_count: int = 0
+
+    @property
+    def percentage(self) -> float:
+        return (self.score / self.max_score * 100) if self.max_score > 0 else 0.0
+
+    def by_question(self) -> Dict[int, ItemScore]:
+        return {item.question_id: item for item in self.items}
+
+
+AnswerInput = Union[Mapping[Any, Any], Iterable[Tuple[Any, Any]], Iterable[Mapping[str, Any]]]
+
+
+def _answer_pairs(answers: AnswerInput) -> Iterable[Tuple[Any, Any]]:
+    """Réponses sous forme {question_id: réponse}, [(question_id, réponse)] ou
+    [{"question_id": ..., "answer": ...}]"""
+    if isinstance(answers, Mapping):
+        return answers.items()
+    return (
+        (answer.get("question_id"), answer.get("answer")) if isinstance(answer, Mapping) else answer
+        for answer in answers
+    )
+
+
+def grade(
+    keys: Mapping[int, CompiledKey],
+    answers: AnswerInput,
+    include_unanswered: bool = False,
+    by_index: bool = False
+) -> GradeReport:
+    """Noter une copie en une passe.
+
+    Les réponses à des questions absentes du corrigé sont ignorées; avec
+    `include_unanswered`, les questions sans réponse comptent comme fausses.
+    `by_index`: copie dont les réponses aux QCM sont des index d'options.
+    Une question répondue deux fois n'est notée qu'une fois (première réponse).
+    """
+    report = GradeReport(items=[])
+    seen = set()
+    for question_id, answer in _answer_pairs(answers):
+        try:
+            question_id = int(question_id)
+        except (TypeError, ValueError):
+            continue
+        key = keys.get(question_id)
+        if key is None or question_id in seen:
+            continue
+        seen.add(question_id)
+        is_correct = key.check(answer, by_index)
+        earned = key.points if is_correct else 0.0
+        report.items.append(ItemScore(question_id, answer, is_correct, earned, key.points, key.display))
+        report.score += earned
+        report.max_score += key.points
+        report.correct_count += is_correct
+    if include_unanswered:
+        for question_id, key in keys.items():
+            if question_id not in seen:
+                report.items.append(ItemScore(question_id, "", False, 0.0, key.points, key.display))
+                report.max_score += key.points
+    return report
+
+
+# Corrigés compilés par (source, quiz/test): source -> (modèle, colonne du conteneur)
+KEY_SOURCES = {
+    "quiz": (Question, "quiz_id"),
+    "adaptive_test": (AdaptiveQuestion, "test_id"),
+    "assessment": (AssessmentQuestion, "assessment_id"),
+}
+
+_keys: Dict[Tuple[str, int], Tuple[float, Dict[int, CompiledKey]]] = {}
+_keys_lock = threading.Lock()
+_generation = 0
+
+
+def _compile_rows(source: str, rows) -> Dict[int, CompiledKey]:
+    if source == "quiz":
+        return {
+            row.id: compile_key(
+                row.id, row.question_type, row.correct_answer, row.options, row.points,
+                fallback=extract_correct_answer_from_text(row.question_text) or None
+            )
+            for row in rows
+        }
+    if source == "adaptive_test":
+        # Tests adaptatifs: un point par question
+        return {row.id: compile_key(row.id, row.question_type, row.correct_answer, row.options, 1.0) for row in rows}
+    return {row.id: compile_key(row.id, row.question_type, row.correct_answer, row.options, row.points) for row in rows}
+
+
+def _load_keys(db: Session, source: str, container_id: int) -> Dict[int, CompiledKey]:
+    model, column = KEY_SOURCES[source]
+    columns = [model.id, model.question_type, model.correct_answer, model.options]
+    if source == "quiz":
+        columns += [model.points, model.question_text]
+    elif source == "assessment":
+        columns.append(model.points)
+    rows = db.query(*columns).filter(getattr(model, column) == container_id).all()
+    return _compile_rows(source, rows)
+
+
+def answer_keys(db: Session, source: str, container_id: int) -> Dict[int, CompiledKey]:
+    """Corrigés {question_id: CompiledKey} d'un quiz, test adaptatif ou évaluation"""
+    global _keys
+    cache_key = (source, container_id)
+    now = time.monotonic()
+    with _keys_lock:
+        entry, generation = _keys.get(cache_key), _generation
+    if entry and entry[0] > now:
+        return entry[1]
+    keys = _load_keys(db, source, container_id)
+    if settings.SCORING_KEY_CACHE_TTL_SECONDS > 0:
+        with _keys_lock:
+            # Une invalidation pendant le chargement rend ce corrigé périmé: ne pas le garder
+            if generation == _generation:
+                _keys[cache_key] = (now + settings.SCORING_KEY_CACHE_TTL_SECONDS, keys)
+    return keys
+
+
+def quiz_keys(db: Session, quiz_id: int) -> Dict[int, CompiledKey]:
+    return answer_keys(db, "quiz", quiz_id)
+
+
+def adaptive_test_keys(db: Session, test_id: int) -> Dict[int, CompiledKey]:
+    return answer_keys(db, "adaptive_test", test_id)
+
+
+def assessment_keys(db: Session, assessment_id: int) -> Dict[int, CompiledKey]:
+    return answer_keys(db, "assessment", assessment_id)
+
+
+def question_keys(db: Session, question_ids: Iterable[Any]) -> Dict[int, CompiledKey]:
+    """Corrigés de questions de quiz quelconques (via le corrigé en cache de leur quiz)"""
+    ids = set()
+    for question_id in question_ids:
+        try:
+            ids.add(int(question_id))
+        except (TypeError, ValueError):
+            continue
+    if not ids:
+        return {}
+    keys: Dict[int, CompiledKey] = {}
+    for (quiz_id,) in db.query(Question.quiz_id).filter(Question.id.in_(ids)).distinct():
+        keys.update((question_id, key) for question_id, key in quiz_keys(db, quiz_id).items() if question_id in ids)
+    return keys
+
+
+def invalidate_answer_keys(source: Optional[str] = None, container_id: Optional[int] = None) -> None:
+    global _generation
+    with _keys_lock:
+        _generation += 1
+        if source is None:
+            _keys.clear()
+        elif container_id is None:
+            for cache_key in [cache_key for cache_key in _keys if cache_key[0] == source]:
+                del _keys[cache_key]
+        else:
+            _keys.pop((source, container_id), None)
+
+
+_french_keys: Dict[int, CompiledKey] = {}
+_french_keys_lock = threading.Lock()
+
+
+def french_key(question: Mapping[str, Any]) -> CompiledKey:
+    """Corrigé d'une question de la banque du test de français (statique, compilé une fois)"""
+    key = _french_keys.get(question["id"])
+    if key is None:
+        key = compile_key(question["id"], "mcq", question.get("correct"), question.get("options"), 10)
+        with _french_keys_lock:
+            _french_keys[question["id"]] = key
+    return key
+
+
+def _register_listeners(source: str, model, column: str) -> None:
+    @event.listens_for(model, "after_insert")
+    @event.listens_for(model, "after_update")
+    @event.listens_for(model, "after_delete")
+    def _invalidate_on_question_change(mapper, connection, target):
+        history = sa_inspect(target).attrs[column].history
+        containers = {container_id for container_id in (getattr(target, column), *history.deleted) if container_id is not None}
+        for container_id in containers:
+            invalidate_answer_keys(source, container_id)
+        # Une requête concurrente a pu recompiler l'état d'avant le commit: invalider aussi à la fin
+        session = object_session(target)
+        if session is not None:
+            session.info.setdefault("answer_keys_changed", set()).update(
+                (source, container_id) for container_id in containers
+            )
+
+
+for _source, (_model, _column) in KEY_SOURCES.items():
+    _register_listeners(_source, _model, _column)
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_soft_rollback")
+def _invalidate_keys_after_transaction(session, *args):
+    for source, container_id in session.info.pop("answer_keys_changed", ()):
+        invalidate_answer_keys(source, container_id)
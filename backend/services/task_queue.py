@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+File de tâches durable pour les traitements après soumission.
+
+Les soumissions (quiz, évaluation initiale de français) ne font plus que
+l'enregistrement du résultat; les traitements dérivés (compteurs de badges,
+cubes analytiques, profil d'apprentissage) sont insérés dans background_tasks
+dans la même transaction, puis exécutés par un pool de threads de l'application
+ou par des processus séparés (run_task_worker.py).
+
+Chaque tâche est réservée par un UPDATE conditionnel avant son exécution: avec
+plusieurs threads ou processus, une tâche n'est exécutée que par un worker à la
+fois. Une tâche en échec est relancée avec un délai croissant jusqu'à
+max_attempts; une tâche dont le worker a disparu (bail expiré) est reprise.
+L'exécution est "au moins une fois": un traitement doit tolérer d'être rejoué.
+Un traitement non idempotent (incréments) appelle claim_effects() dans sa
+transaction: ses effets et la marque applied_at sont validés ensemble, et une
+reprise après un commit non conclu (worker interrompu) ne les applique pas deux fois.
+Les traitements déclarés per_user (lecture-modification-écriture des compteurs d'un
+élève) ne s'exécutent jamais en parallèle pour un même élève: la réservation attend
+la fin de la tâche per_user en cours du même utilisateur.
+"""
+
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import and_, event, exists, or_
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.database import SessionLocal
+from models.background_task import (
+    BackgroundTask, TASK_PENDING, TASK_RUNNING, TASK_SUCCEEDED, TASK_FAILED
+)
+from models.user import User
+
+logger = logging.getLogger(__name__)
+
+# Délai avant un nouvel essai: RETRY_BASE_SECONDS * 2^(essais - 1), plafonné
+RETRY_BASE_SECONDS = 5
+RETRY_MAX_SECONDS = 600
+
+
+@dataclass(frozen=True)
+class TaskHandler:
+    func: Callable[..., Optional[dict]]
+    priority: int
+    max_attempts: int
+    per_user: bool = False
+
+
+_handlers: Dict[str, TaskHandler] = {}
+
+
+def task_handler(kind: str, priority: int = 100, max_attempts: int = 5, per_user: bool = False):
+    """Déclarer le traitement d'un type de tâche: func(db, **payload) -> dict optionnel.
+
+    per_user: une seule tâche per_user à la fois par utilisateur (tous types confondus).
+    """
+    def decorator(func):
+        _handlers[kind] = TaskHandler(func, priority, max_attempts, per_user)
+        return func
+    return decorator
+
+
+def _per_user_kinds() -> List[str]:
+    return [kind for kind, handler in _handlers.items() if handler.per_user]
+
+
+def claim_effects(db: Session) -> bool:
+    """Marquer les effets de la tâche en cours comme appliqués (validé avec eux).
+
+    Retourne False si une exécution précédente les a déjà validés: le traitement
+    doit alors s'abstenir. Hors de la file (appel direct), retourne toujours True.
+    """
+    task_id = db.info.get("task_id")
+    if task_id is None:
+        return True
+    table = BackgroundTask.__table__
+    claimed = db.execute(
+        table.update().where(table.c.id == task_id, table.c.applied_at.is_(None)).values(applied_at=datetime.utcnow())
+    )
+    return claimed.rowcount == 1
+
+
+def _load_handlers() -> None:
+    # Les traitements s'enregistrent à l'import de leur module
+    from services import post_submission_tasks  # noqa: F401
+
+
+def enqueue(
+    db: Session,
+    kind: str,
+    subject: str,
+    payload: Optional[dict] = None,
+    user_id: Optional[int] = None,
+    key: Optional[str] = None,
+) -> BackgroundTask:
+    """Planifier une tâche dans la transaction courante (exécutée après le commit).
+
+    Idempotent: une tâche de même clé (par défaut type + sujet) est retournée
+    telle quelle au lieu d'être planifiée une seconde fois.
+    """
+    handler = _handlers.get(kind)
+    if handler is None:
+        raise ValueError(f"Type de tâche inconnu: {kind}")
+    key = key or f"{kind}:{subject}"
+    existing = db.query(BackgroundTask).filter(BackgroundTask.idempotency_key == key).first()
+    if existing is not None:
+        return existing
+    task = BackgroundTask(
+        idempotency_key=key,
+        kind=kind,
+        subject=subject,
+        payload=json.dumps(payload or {}),
+        priority=handler.priority,
+        max_attempts=handler.max_attempts,
+        status=TASK_PENDING,
+        run_at=datetime.utcnow(),
+        user_id=user_id,
+    )
+    db.add(task)
+    db.flush()
+    db.info["task_queue_wake"] = True
+    return task
+
+
+def retry_delay(attempts: int) -> float:
+    return min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** max(0, attempts - 1))
+
+
+class TaskWorkerPool:
+    """Pool de workers (threads) qui réservent et exécutent les tâches dues"""
+
+    def __init__(self, session_factory=SessionLocal, poll_interval: float = 5.0, lease_seconds: float = 300.0):
+        self.session_factory = session_factory
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self._threads: List[threading.Thread] = []
+        self._stopping = threading.Event()
+        self._wakeup = threading.Event()
+        # Notifié à chaque tâche terminée (attente du suivi côté API)
+        self.finished = threading.Condition()
+
+    # ------------------------------------------------------------------
+    # Réservation et exécution
+    # ------------------------------------------------------------------
+
+    def _ready_filter(self, now: datetime):
+        return or_(
+            and_(BackgroundTask.status == TASK_PENDING, BackgroundTask.run_at <= now),
+            and_(
+                BackgroundTask.status == TASK_RUNNING,
+                BackgroundTask.locked_at < now - timedelta(seconds=self.lease_seconds)
+            )
+        )
+
+    def claim(self, db: Session, worker_id: str) -> Optional[int]:
+        """Réserver la tâche due la plus prioritaire; retourne son id"""
+        now = datetime.utcnow()
+        candidates = db.query(BackgroundTask.id, BackgroundTask.kind, BackgroundTask.user_id).filter(
+            self._ready_filter(now)
+        ).order_by(
+            BackgroundTask.priority, BackgroundTask.run_at, BackgroundTask.id
+        ).limit(10).all()
+        table = BackgroundTask.__table__
+        lease_cutoff = now - timedelta(seconds=self.lease_seconds)
+        per_user_kinds = _per_user_kinds()
+        for task_id, kind, user_id in candidates:
+            # Réservation: un autre worker a pu prendre cette tâche entre-temps
+            claim = (
+                table.update()
+                .where(table.c.id == task_id)
+                .where(or_(
+                    and_(table.c.status == TASK_PENDING, table.c.run_at <= now),
+                    and_(table.c.status == TASK_RUNNING, table.c.locked_at < lease_cutoff)
+                ))
+            )
+            if kind in per_user_kinds and user_id is not None:
+                # Verrou de l'utilisateur (PostgreSQL; SQLite sérialise déjà les écritures):
+                # deux réservations concurrentes pour le même élève se voient
+                db.query(User.id).filter(User.id == user_id).with_for_update().first()
+                other = table.alias("other")
+                claim = claim.where(~exists().where(
+                    other.c.user_id == user_id,
+                    other.c.kind.in_(per_user_kinds),
+                    other.c.status == TASK_RUNNING,
+                    other.c.locked_at >= lease_cutoff,
+                    other.c.id != task_id
+                ))
+            claimed = db.execute(
+                claim.values(status=TASK_RUNNING, locked_at=now, locked_by=worker_id,
+                             attempts=table.c.attempts + 1)
+            ).rowcount
+            db.commit()
+            if claimed:
+                return task_id
+        return None
+
+    def execute(self, task_id: int, worker_id: str) -> str:
+        """Exécuter une tâche réservée; retourne son nouveau statut"""
+        db = self.session_factory()
+        try:
+            task = db.query(BackgroundTask).filter(BackgroundTask.id == task_id).first()
+            if task is None:
+                return TASK_FAILED
+            kind, attempts, max_attempts = task.kind, task.attempts, task.max_attempts
+            payload = json.loads(task.payload or "{}")
+            handler = _handlers.get(kind)
+            try:
+                if handler is None:
+                    raise LookupError(f"Aucun traitement pour le type {kind}")
+                db.info["task_id"] = task_id
+                result = handler.func(db, **payload)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                retry = handler is not None and attempts < max_attempts
+                status = TASK_PENDING if retry else TASK_FAILED
+                values = {"status": status, "last_error": f"{type(e).__name__}: {e}"[:2000],
+                          "locked_at": None, "locked_by": None}
+                if retry:
+                    values["run_at"] = datetime.utcnow() + timedelta(seconds=retry_delay(attempts))
+                else:
+                    values["finished_at"] = datetime.utcnow()
+                self._finish(db, task_id, worker_id, values)
+                log = logger.warning if retry else logger.error
+                log(f"❌ Tâche {kind} #{task_id} en échec (essai {attempts}/{max_attempts}): {e}")
+                return status
+
+            self._finish(db, task_id, worker_id, {
+                "status": TASK_SUCCEEDED, "result": json.dumps(result, default=str) if result is not None else None,
+                "last_error": None, "finished_at": datetime.utcnow(), "locked_at": None, "locked_by": None,
+            })
+            return TASK_SUCCEEDED
+        finally:
+            db.close()
+            with self.finished:
+                self.finished.notify_all()
+
+    @staticmethod
+    def _finish(db: Session, task_id: int, worker_id: str, values: dict) -> None:
+        # Seul le worker qui détient la réservation conclut (bail repris entre-temps sinon)
+        table = BackgroundTask.__table__
+        db.execute(
+            table.update().where(table.c.id == task_id, table.c.locked_by == worker_id).values(**values)
+        )
+        db.commit()
+
+    def run_pending(self, limit: Optional[int] = None, worker_id: Optional[str] = None) -> int:
+        """Exécuter les tâches dues dans le thread courant; retourne le nombre exécuté"""
+        _load_handlers()
+        worker_id = worker_id or self._worker_id("inline")
+        executed = 0
+        while limit is None or executed < limit:
+            db = self.session_factory()
+            try:
+                task_id = self.claim(db, worker_id)
+            finally:
+                db.close()
+            if task_id is None:
+                break
+            self.execute(task_id, worker_id)
+            executed += 1
+        return executed
+
+    # ------------------------------------------------------------------
+    # Threads de fond
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _worker_id(name: str) -> str:
+        return f"{socket.gethostname()}:{os.getpid()}:{name}"
+
+    @property
+    def running(self) -> bool:
+        return any(thread.is_alive() for thread in self._threads)
+
+    def start(self, workers: int) -> None:
+        """Démarrer `workers` threads d'exécution"""
+        if self.running or workers <= 0:
+            return
+        _load_handlers()
+        self._stopping.clear()
+        self._threads = [
+            threading.Thread(target=self._run, args=(self._worker_id(f"task-worker-{i}"),),
+                             name=f"task-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"🧵 File de tâches démarrée ({workers} workers)")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+    def wake(self) -> None:
+        self._wakeup.set()
+
+    def _run(self, worker_id: str) -> None:
+        while not self._stopping.is_set():
+            try:
+                db = self.session_factory()
+                try:
+                    task_id = self.claim(db, worker_id)
+                finally:
+                    db.close()
+            except Exception as e:
+                logger.error(f"❌ Réservation de tâche impossible: {e}")
+                task_id = None
+            if task_id is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            try:
+                self.execute(task_id, worker_id)
+            except Exception as e:
+                # Tâche laissée "running": reprise à l'expiration du bail
+                logger.error(f"❌ Tâche #{task_id} interrompue: {e}")
+
+    # ------------------------------------------------------------------
+    # Suivi
+    # ------------------------------------------------------------------
+
+    def wait_for(self, db: Session, subject: str, timeout: float) -> List[BackgroundTask]:
+        """Tâches d'un sujet, en attendant au plus `timeout` secondes qu'elles soient terminées"""
+        deadline = time.monotonic() + timeout
+        while True:
+            db.expire_all()
+            tasks = db.query(BackgroundTask).filter(BackgroundTask.subject == subject).order_by(BackgroundTask.id).all()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or all(task.status in (TASK_SUCCEEDED, TASK_FAILED) for task in tasks):
+                return tasks
+            with self.finished:
+                # Les workers d'autres processus ne notifient pas: relire au moins chaque seconde
+                self.finished.wait(min(remaining, 1.0))
+
+
+task_queue = TaskWorkerPool(poll_interval=settings.TASK_QUEUE_POLL_SECONDS,
+                            lease_seconds=settings.TASK_QUEUE_LEASE_SECONDS)
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_workers(session):
+    if session.info.pop("task_queue_wake", False):
+        task_queue.wake()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_wakeup(session, previous_transaction):
+    session.info.pop("task_queue_wake", None)
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Résolution des tests adaptatifs accessibles à un élève.
+
+Un élève accède à un test s'il lui est assigné directement, s'il est assigné
+à une de ses classes, ou s'il l'a créé lui-même (quiz générés depuis un parcours).
+Les trois cas sont résolus par une seule requête UNION ALL, mise en cache par
+élève et invalidée quand une assignation, une appartenance à une classe ou un
+test créé par l'élève change (au commit de la transaction).
+
+Le cache est propre au processus: avec plusieurs workers, un refus n'est jamais
+servi depuis le cache (la base est relue avant de refuser), et les accès retirés
+disparaissent au plus tard après TEST_ACCESS_CACHE_TTL_SECONDS.
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import DateTime, Integer, String, event, text
+from sqlalchemy.orm import Session, object_session
+
+from core.config import settings
+from models.adaptive_evaluation import AdaptiveTest, TestAssignment, AdaptiveClassStudent
+
+# Ordre de priorité quand un test est accessible de plusieurs façons
+GRANT_PRIORITY = {"student": 0, "class": 1, "creator": 2}
+
+ACCESSIBLE_TESTS_SQL = text("""
+    SELECT a.test_id, a.id AS assignment_id, 'student' AS via, a.due_date, a.assigned_at, a.status, a.assigned_by
+    FROM test_assignments a
+    WHERE a.assignment_type = 'student' AND a.target_id = :student_id AND a.status = 'active'
+    UNION ALL
+    SELECT a.test_id, a.id, 'class', a.due_date, a.assigned_at, a.status, a.assigned_by
+    FROM test_assignments a
+    JOIN adaptive_class_students cs ON cs.class_id = a.target_id
+    WHERE a.assignment_type = 'class' AND cs.student_id = :student_id AND a.status = 'active'
+    UNION ALL
+    SELECT t.id, NULL, 'creator', NULL, NULL, NULL, NULL
+    FROM adaptive_tests t
+    WHERE t.created_by = :student_id
+""").columns(
+    test_id=Integer, assignment_id=Integer, via=String, due_date=DateTime,
+    assigned_at=DateTime, status=String, assigned_by=Integer
+)
+
+
+@dataclass(frozen=True)
+class TestGrant:
+    """Une raison d'accès d'un élève à un test (assignation directe, de classe, ou création)"""
+    test_id: int
+    via: str
+    assignment_id: Optional[int] = None
+    due_date: Optional[datetime] = None
+    assigned_at: Optional[datetime] = None
+    status: Optional[str] = None
+    assigned_by: Optional[int] = None
+
+    @property
+    def is_assignment(self) -> bool:
+        return self.assignment_id is not None
+
+
+_grants_cache: Dict[int, Tuple[float, Tuple[TestGrant, ...]]] = {}
+_grants_cache_lock = threading.Lock()
+_grants_cache_generation = 0
+
+
+class TestAccessResolver:
+    """Tests accessibles à un élève (une requête, puis cache par élève)"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def grants(self, student_id: int, refresh: bool = False) -> Tuple[TestGrant, ...]:
+        """Toutes les raisons d'accès de l'élève, triées par priorité"""
+        now = time.monotonic()
+        with _grants_cache_lock:
+            entry, generation = _grants_cache.get(student_id), _grants_cache_generation
+        if entry and entry[0] > now and not refresh:
+            return entry[1]
+
+        rows = self.db.execute(ACCESSIBLE_TESTS_SQL, {"student_id": student_id}).mappings().all()
+        grants = tuple(sorted(
+            (TestGrant(**row) for row in rows),
+            key=lambda g: (GRANT_PRIORITY[g.via], g.assignment_id or 0)
+        ))
+        if settings.TEST_ACCESS_CACHE_TTL_SECONDS > 0:
+            with _grants_cache_lock:
+                # Une invalidation pendant la lecture rend ces accès périmés: ne pas les garder
+                if generation == _grants_cache_generation:
+                    _grants_cache[student_id] = (now + settings.TEST_ACCESS_CACHE_TTL_SECONDS, grants)
+        return grants
+
+    def resolve(self, student_id: int, test_id: int, assignment_only: bool = False) -> Optional[TestGrant]:
+        """Meilleure raison d'accès au test, ou None (vérifié en base avant de refuser).
+
+        Avec assignment_only, seul un test assigné (directement ou via une classe) est accepté.
+        """
+        grant = self._first_grant(self.grants(student_id), test_id, assignment_only)
+        if grant is None:
+            grant = self._first_grant(self.grants(student_id, refresh=True), test_id, assignment_only)
+        return grant
+
+    def assignments(self, student_id: int) -> List[TestGrant]:
+        """Assignations actives (directes puis de classe), hors tests créés par l'élève"""
+        return [grant for grant in self.grants(student_id) if grant.is_assignment]
+
+    @staticmethod
+    def _first_grant(grants, test_id: int, assignment_only: bool) -> Optional[TestGrant]:
+        return next((
+            grant for grant in grants
+            if grant.test_id == test_id and (grant.is_assignment or not assignment_only)
+        ), None)
+
+
+def invalidate_test_access(student_id: Optional[int] = None) -> None:
+    """Oublier les accès d'un élève (ou de tous les élèves sans argument)"""
+    global _grants_cache_generation
+    with _grants_cache_lock:
+        _grants_cache_generation += 1
+        if student_id is None:
+            _grants_cache.clear()
+        else:
+            _grants_cache.pop(student_id, None)
+
+
+def _flag_access_change(target, student_id: Optional[int]) -> None:
+    """Oublier les accès au commit (None: tous les élèves), pas au flush.
+
+    Invalider au flush laisserait une requête concurrente relire les accès d'avant
+    le commit et les remettre en cache pour tout le TTL.
+    """
+    session = object_session(target)
+    if session is None:
+        invalidate_test_access(student_id)
+    else:
+        session.info.setdefault("test_access_changed", set()).add(student_id)
+
+@event.listens_for(TestAssignment, "after_insert")
+@event.listens_for(TestAssignment, "after_update")
+@event.listens_for(TestAssignment, "after_delete")
+def _invalidate_on_assignment_change(mapper, connection, target):
+    # Assignation de classe: les élèves concernés ne sont pas connus ici, tout oublier
+    _flag_access_change(target, target.target_id if target.assignment_type == "student" else None)
+
+@event.listens_for(AdaptiveClassStudent, "after_insert")
+@event.listens_for(AdaptiveClassStudent, "after_update")
+@event.listens_for(AdaptiveClassStudent, "after_delete")
+def _invalidate_on_membership_change(mapper, connection, target):
+    _flag_access_change(target, target.student_id)
+
+@event.listens_for(AdaptiveTest, "after_insert")
+@event.listens_for(AdaptiveTest, "after_delete")
+def _invalidate_on_created_test(mapper, connection, target):
+    _flag_access_change(target, target.created_by)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_access(session):
+    changed = session.info.pop("test_access_changed", ())
+    if None in changed:
+        invalidate_test_access()
+        return
+    for student_id in changed:
+        invalidate_test_access(student_id)
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_rolled_back_access(session, previous_transaction):
+    session.info.pop("test_access_changed", None)
@@ -12,9 +12,10 @@ from services.assessment_engine import AssessmentEngine
 from services.learning_path_generator import LearningPathGenerator
 from services.progress_tracker import ProgressTracker
 from models.user import User
-from models.assessment import Assessment
+from models.assessment import Assessment, AssessmentResult
 from models.learning_path import LearningPath
-from models.assessment_result import AssessmentResult
+from models.student_learning_path import StudentLearningPath
+from services.path_templates import PathMaterializer, advanced_template, base_template
 
 class WorkflowManager:
     """Gestionnaire de workflow pour l'orchestration des processus d'apprentissage"""
@@ -24,6 +25,7 @@ class WorkflowManager:
         self.assessment_engine = AssessmentEngine(db)
         self.learning_path_generator = LearningPathGenerator(db)
         self.progress_tracker = ProgressTracker(db)
+        self.path_materializer = PathMaterializer(db)
     
     def initialize_student_learning_journey(self, student_id: int, subjects: List[str] = None) -> Dict[str, Any]:
         """Initialiser le parcours d'apprentissage complet d'un étudiant"""
@@ -225,96 +227,18 @@ class WorkflowManager:
         }
     
     def _create_base_learning_paths(self, student_id: int, subjects: List[str] = None) -> List[LearningPath]:
-        """Créer des parcours d'apprentissage de base"""
+        """Assigner les parcours d'apprentissage de base (partagés entre élèves)"""
         
         if not subjects:
             subjects = ["Mathématiques", "Français", "Sciences"]
         
         base_paths = []
         for subject in subjects[:3]:  # Limiter à 3 matières
-            # Créer un parcours de base pour chaque matière
-            base_path = LearningPath(
-                title=f"Parcours de Base - {subject}",
-                description=f"Parcours d'introduction à {subject}",
-                objectives=f"Acquérir les fondamentaux en {subject}",
-                subject=subject,
-                level="beginner",
-                difficulty="easy",
-                estimated_duration=30,
-                is_adaptive=False,
-                created_by=student_id,
-                created_at=datetime.utcnow()
-            )
-            
-            self.db.add(base_path)
-            self.db.commit()
-            self.db.refresh(base_path)
-            
-            # Créer les étapes de base
-            base_steps = self._create_base_path_steps(base_path.id, subject)
-            
-            # Assigner le parcours à l'étudiant
-            from models.student_learning_path import StudentLearningPath
-            student_path = StudentLearningPath(
-                student_id=student_id,
-                learning_path_id=base_path.id,
-                progress=0.0,
-                is_completed=False,
-                started_at=datetime.utcnow(),
-                current_step=1,
-                total_steps=len(base_steps)
-            )
-            
-            self.db.add(student_path)
-            self.db.commit()
-            
+            base_path, _ = self.path_materializer.assign(base_template(subject), [student_id], created_by=student_id)
             base_paths.append(base_path)
         
         return base_paths
     
-    def _create_base_path_steps(self, learning_path_id: int, subject: str) -> List:
-        """Créer les étapes de base pour un parcours"""
-        
-        from models.learning_path_step import LearningPathStep
-        
-        if subject == "Mathématiques":
-            step_data = [
-                ("Découverte", "Introduction aux concepts de base", "video", 5),
-                ("Pratique", "Exercices simples", "exercise", 10),
-                ("Validation", "Quiz de validation", "quiz", 5)
-            ]
-        elif subject == "Français":
-            step_data = [
-                ("Découverte", "Introduction à la matière", "video", 5),
-                ("Pratique", "Exercices de base", "exercise", 10),
-                ("Validation", "Quiz de validation", "quiz", 5)
-            ]
-        else:  # Sciences
-            step_data = [
-                ("Découverte", "Introduction aux sciences", "video", 5),
-                ("Pratique", "Expériences simples", "exercise", 10),
-                ("Validation", "Quiz de validation", "quiz", 5)
-            ]
-        
-        steps = []
-        for i, (title, description, content_type, duration) in enumerate(step_data):
-            step = LearningPathStep(
-                learning_path_id=learning_path_id,
-                step_number=i + 1,
-                title=title,
-                description=description,
-                content_type=content_type,
-                estimated_duration=duration,
-                is_required=True,
-                is_active=True,
-                created_at=datetime.utcnow()
-            )
-            self.db.add(step)
-            steps.append(step)
-        
-        self.db.commit()
-        return steps
-    
     def _generate_learning_recommendations(self, assessment_results: Dict, personalized_paths: List) -> List[str]:
         """Générer des recommandations d'apprentissage"""
         
@@ -404,85 +328,13 @@ class WorkflowManager:
         if not completed_path:
             return []
         
-        # Créer un parcours avancé dans la même matière
-        advanced_path = LearningPath(
-            title=f"Parcours Avancé - {completed_path.subject}",
-            description=f"Parcours avancé en {completed_path.subject} pour étudiants performants",
-            objectives=f"Explorer des concepts avancés en {completed_path.subject}",
-            subject=completed_path.subject,
-            level="advanced",
-            difficulty="hard",
-            estimated_duration=60,
-            is_adaptive=True,
-            created_by=student_id,
-            created_at=datetime.utcnow()
+        # Assigner le parcours avancé (partagé) dans la même matière
+        advanced_path, _ = self.path_materializer.assign(
+            advanced_template(completed_path.subject), [student_id], created_by=student_id
         )
         
-        self.db.add(advanced_path)
-        self.db.commit()
-        self.db.refresh(advanced_path)
-        
-        # Créer les étapes avancées
-        advanced_steps = self._create_advanced_path_steps(advanced_path.id, completed_path.subject)
-        
-        # Assigner le parcours à l'étudiant
-        from models.student_learning_path import StudentLearningPath
-        student_path = StudentLearningPath(
-            student_id=student_id,
-            learning_path_id=advanced_path.id,
-            progress=0.0,
-            is_completed=False,
-            started_at=datetime.utcnow(),
-            current_step=1,
-            total_steps=len(advanced_steps)
-        )
-        
-        self.db.add(student_path)
-        self.db.commit()
-        
         return [advanced_path]
     
-    def _create_advanced_path_steps(self, learning_path_id: int, subject: str) -> List:
-        """Créer les étapes avancées pour un parcours"""
-        
-        from models.learning_path_step import LearningPathStep
-        
-        if subject == "Mathématiques":
-            step_data = [
-                ("Concepts avancés", "Introduction aux concepts complexes", "video", 15),
-                ("Problèmes complexes", "Résolution de problèmes avancés", "exercise", 25),
-                ("Applications", "Applications pratiques", "project", 30),
-                ("Défis", "Défis mathématiques", "challenge", 20),
-                ("Évaluation", "Validation des compétences avancées", "quiz", 10)
-            ]
-        else:
-            step_data = [
-                ("Concepts avancés", "Introduction aux concepts complexes", "video", 15),
-                ("Pratique avancée", "Exercices complexes", "exercise", 25),
-                ("Projets", "Projets pratiques", "project", 30),
-                ("Défis", "Défis stimulants", "challenge", 20),
-                ("Évaluation", "Validation des compétences avancées", "quiz", 10)
-            ]
-        
-        steps = []
-        for i, (title, description, content_type, duration) in enumerate(step_data):
-            step = LearningPathStep(
-                learning_path_id=learning_path_id,
-                step_number=i + 1,
-                title=title,
-                description=description,
-                content_type=content_type,
-                estimated_duration=duration,
-                is_required=True,
-                is_active=True,
-                created_at=datetime.utcnow()
-            )
-            self.db.add(step)
-            steps.append(step)
-        
-        self.db.commit()
-        return steps
-    
     def _generate_path_completion_recommendations(self, performance_analysis: Dict, new_paths: List) -> List[str]:
         """Générer des recommandations après complétion d'un parcours"""
         
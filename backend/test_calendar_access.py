@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test des droits d'accès au calendrier (/api/v1/calendar/user/{user_id}/...):
+anonyme refusé (401), autre élève ou enseignant sans la classe refusés (403),
+élève lui-même, enseignant de sa classe et administrateur autorisés.
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from core.database import Base, get_db
+from core.security import create_access_token, invalidate_user_cache
+import models  # noqa: F401  (enregistre tous les mappers)
+from models.category import Category  # noqa: F401  (référencée par contents)
+from models.class_group import ClassGroup, ClassStudent
+from models.user import User, UserRole
+from services.roster import invalidate_roster
+from api.v1 import calendar
+
+ROUTES = ["events", "upcoming", "today", "export.ics"]
+
+
+def test_calendar_requires_owner_teacher_or_admin():
+    """Chaque route du calendrier vérifie l'appelant avant de lire les événements"""
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'calendar.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        db = Session()
+        try:
+            def user(name, role):
+                return User(email=f"{name}@najah.ma", username=name, hashed_password="x", role=role)
+
+            student, other_student = user("eleve", UserRole.student), user("autre_eleve", UserRole.student)
+            teacher, other_teacher = user("prof", UserRole.teacher), user("autre_prof", UserRole.teacher)
+            admin = user("admin", UserRole.admin)
+            db.add_all([student, other_student, teacher, other_teacher, admin])
+            db.commit()
+            class_group = ClassGroup(name="6e A", teacher_id=teacher.id)
+            db.add(class_group)
+            db.commit()
+            db.add(ClassStudent(class_id=class_group.id, student_id=student.id))
+            db.commit()
+            invalidate_user_cache()
+            invalidate_roster()
+
+            app = FastAPI()
+            app.include_router(calendar.router, prefix="/api/v1/calendar")
+
+            def override_get_db():
+                session = Session()
+                try:
+                    yield session
+                finally:
+                    session.close()
+
+            app.dependency_overrides[get_db] = override_get_db
+            client = TestClient(app)
+
+            def get(route, caller=None):
+                headers = {}
+                if caller is not None:
+                    headers["Authorization"] = f"Bearer {create_access_token({'sub': caller.email})}"
+                return client.get(f"/api/v1/calendar/user/{student.id}/{route}", headers=headers).status_code
+
+            for route in ROUTES:
+                assert get(route) == 401, route
+                assert get(route, other_student) == 403, route
+                assert get(route, other_teacher) == 403, route
+                for caller in (student, teacher, admin):
+                    assert get(route, caller) == 200, (route, caller.username)
+        finally:
+            db.close()
+            Base.metadata.drop_all(bind=engine)
+            engine.dispose()
+            invalidate_user_cache()
+            invalidate_roster()
+
+
+if __name__ == "__main__":
+    print("🧪 Droits d'accès au calendrier")
+    test_calendar_requires_owner_teacher_or_admin()
+    print("✅ Test réussi")
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Test de l'invalidation au commit des caches de processus: utilisateurs authentifiés
+(core/security.py) et accès aux tests adaptatifs (services/test_access.py).
+Une écriture flushée mais non commitée, ou annulée, ne doit rien oublier; un
+commit oublie l'ancienne version; une lecture concurrente à l'invalidation n'est
+pas remise en cache.
+"""
+
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from core.database import Base
+from core.security import _user_cache, get_cached_user, invalidate_user_cache
+import models  # noqa: F401  (enregistre tous les mappers)
+from models.category import Category  # noqa: F401  (référencée par contents)
+from models.adaptive_evaluation import AdaptiveTest, TestAssignment
+from models.user import User, UserRole
+from services.test_access import TestAccessResolver, _grants_cache, invalidate_test_access
+
+
+@contextmanager
+def database():
+    """Base temporaire: un enseignant et un élève"""
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'commit.db')}")
+        Base.metadata.create_all(bind=engine)
+        adaptive_tables = [AdaptiveTest.__table__, TestAssignment.__table__]
+        AdaptiveTest.metadata.create_all(bind=engine, tables=adaptive_tables)
+        with engine.begin() as connection:
+            # Base adaptative séparée: ses clés étrangères vers users ne se résolvent pas ici
+            connection.execute(text(
+                "CREATE TABLE adaptive_class_students (id INTEGER PRIMARY KEY, class_id INTEGER, student_id INTEGER)"
+            ))
+        Session = sessionmaker(bind=engine)
+        db = Session()
+        try:
+            db.add_all([
+                User(email="prof@najah.ma", username="prof", hashed_password="x", role=UserRole.teacher),
+                User(email="eleve@najah.ma", username="eleve", hashed_password="x", role=UserRole.student),
+            ])
+            db.commit()
+            invalidate_user_cache()
+            invalidate_test_access()
+            yield Session, db
+        finally:
+            db.close()
+            invalidate_user_cache()
+            invalidate_test_access()
+            Base.metadata.drop_all(bind=engine)
+            engine.dispose()
+
+
+def test_user_cache_forgets_on_commit_only():
+    """Changement de rôle: l'ancienne version reste servie jusqu'au commit, puis est relue"""
+    with database() as (Session, db):
+        assert get_cached_user(db, "eleve@najah.ma").role == UserRole.student
+        assert "eleve@najah.ma" in _user_cache
+
+        user = db.query(User).filter(User.email == "eleve@najah.ma").one()
+        user.role = UserRole.teacher
+        db.flush()
+        assert "eleve@najah.ma" in _user_cache, "invalidé avant le commit"
+        db.rollback()
+        assert "eleve@najah.ma" in _user_cache, "invalidé malgré le rollback"
+
+        user = db.query(User).filter(User.email == "eleve@najah.ma").one()
+        user.role = UserRole.teacher
+        db.commit()
+        assert "eleve@najah.ma" not in _user_cache
+        other = Session()
+        try:
+            assert get_cached_user(other, "eleve@najah.ma").role == UserRole.teacher
+        finally:
+            other.close()
+
+
+def test_concurrent_read_is_not_recached_after_invalidation():
+    """Une lecture commencée avant une invalidation ne remplit pas le cache"""
+    with database() as (Session, db):
+        reader = Session()
+        try:
+            original_query = reader.query
+
+            def query_then_invalidate(*args, **kwargs):
+                invalidate_user_cache()  # commit d'une autre requête pendant la lecture
+                return original_query(*args, **kwargs)
+
+            reader.query = query_then_invalidate
+            assert get_cached_user(reader, "eleve@najah.ma") is not None
+            assert "eleve@najah.ma" not in _user_cache
+        finally:
+            reader.close()
+
+
+def test_test_access_forgets_on_commit_only():
+    """Une assignation retirée reste visible jusqu'au commit; les autres élèves gardent leur cache"""
+    with database() as (Session, db):
+        teacher, student = db.query(User).order_by(User.id).all()
+        test = AdaptiveTest(title="Fractions", subject="Mathématiques", created_by=teacher.id)
+        db.add(test)
+        db.commit()
+        assignment = TestAssignment(test_id=test.id, assignment_type="student", target_id=student.id,
+                                    assigned_by=teacher.id)
+        db.add(assignment)
+        db.commit()
+
+        resolver = TestAccessResolver(db)
+        assert [grant.test_id for grant in resolver.assignments(student.id)] == [test.id]
+        resolver.grants(teacher.id)
+        assert set(_grants_cache) == {student.id, teacher.id}
+
+        assignment.status = "inactive"
+        db.flush()
+        assert student.id in _grants_cache, "invalidé avant le commit"
+        db.rollback()
+        assert student.id in _grants_cache, "invalidé malgré le rollback"
+
+        assignment.status = "inactive"
+        db.commit()
+        assert student.id not in _grants_cache and teacher.id in _grants_cache
+        assert resolver.assignments(student.id) == []
+
+        # Assignation de classe: élèves inconnus au flush, tout le cache est oublié au commit
+        db.add(TestAssignment(test_id=test.id, assignment_type="class", target_id=1, assigned_by=teacher.id))
+        db.flush()
+        assert teacher.id in _grants_cache
+        db.commit()
+        assert not _grants_cache
+
+
+if __name__ == "__main__":
+    print("🧪 Invalidation des caches au commit")
+    test_user_cache_forgets_on_commit_only()
+    print("✅ Cache des utilisateurs")
+    test_concurrent_read_is_not_recached_after_invalidation()
+    print("✅ Lecture concurrente non remise en cache")
+    test_test_access_forgets_on_commit_only()
+    print("✅ Cache des accès aux tests")
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Test des destinataires de partages (services/content_grants.py): membres des
+classes résolus à la lecture, partages expirés ou révoqués invisibles, accès
+individuel créé une seule fois à la première consultation.
+"""
+
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from core.database import Base
+import models  # noqa: F401  (enregistre tous les mappers)
+from models.category import Category  # noqa: F401  (référencée par contents)
+from models.class_group import ClassGroup, ClassStudent
+from models.content import Content
+from models.content_sharing import ContentAccess, ContentSharing
+from models.user import User, UserRole
+from services.content_grants import SharingGrants
+
+
+@contextmanager
+def sharing_database():
+    """Base temporaire: un enseignant, une classe de deux élèves, un élève hors classe, un contenu"""
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'grants.db')}")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        try:
+            users = {name: User(email=f"{name}@najah.ma", username=name, hashed_password="x", role=role)
+                     for name, role in (("prof", UserRole.teacher), ("a", UserRole.student),
+                                        ("b", UserRole.student), ("c", UserRole.student))}
+            db.add_all(users.values())
+            db.commit()
+            class_group = ClassGroup(name="6e A", teacher_id=users["prof"].id)
+            content = Content(title="Fractions", subject="Mathématiques", level="6e", content_type="document",
+                              created_by=users["prof"].id)
+            db.add_all([class_group, content])
+            db.commit()
+            db.add_all([ClassStudent(class_id=class_group.id, student_id=users[name].id) for name in ("a", "b")])
+            db.commit()
+            yield db, users, class_group, content
+        finally:
+            db.close()
+            Base.metadata.drop_all(bind=engine)
+            engine.dispose()
+
+
+def share(db, teacher, content, target_type, target_ids, expiration_date=None):
+    sharing = ContentSharing(content_id=content.id, shared_by=teacher.id, target_type=target_type,
+                             target_ids=target_ids, expiration_date=expiration_date)
+    db.add(sharing)
+    db.flush()
+    sharing.student_count = SharingGrants(db).grant(sharing, teacher.id)
+    db.commit()
+    return sharing
+
+
+def visible_ids(db, student):
+    return [sharing.id for sharing in SharingGrants(db).shared_with(student.id)]
+
+
+def test_class_members_resolved_at_read_time():
+    """Un élève ajouté à la classe après le partage le voit; un élève retiré ne le voit plus"""
+    with sharing_database() as (db, users, class_group, content):
+        sharing = share(db, users["prof"], content, "class", [class_group.id])
+        assert sharing.student_count == 2
+        assert visible_ids(db, users["c"]) == []
+
+        db.add(ClassStudent(class_id=class_group.id, student_id=users["c"].id))
+        db.query(ClassStudent).filter(ClassStudent.student_id == users["a"].id).delete()
+        db.commit()
+        grants = SharingGrants(db)
+        assert grants.recipients(sharing.id) == [users["b"].id, users["c"].id]
+        assert visible_ids(db, users["c"]) == [sharing.id]
+        assert visible_ids(db, users["a"]) == []
+
+
+def test_expired_and_revoked_sharings_are_hidden():
+    """Échéance passée ou accès révoqué: partage invisible et contenu inaccessible"""
+    with sharing_database() as (db, users, class_group, content):
+        expired = share(db, users["prof"], content, "student", [users["a"].id],
+                        expiration_date=datetime.now() - timedelta(minutes=1))
+        upcoming = share(db, users["prof"], content, "student", [users["b"].id],
+                         expiration_date=datetime.now() + timedelta(days=1))
+        grants = SharingGrants(db)
+        assert visible_ids(db, users["a"]) == []
+        assert grants.access_for(users["a"].id, content.id) == (None, None)
+        assert visible_ids(db, users["b"]) == [upcoming.id]
+
+        upcoming.expiration_date = datetime.now() - timedelta(seconds=1)
+        db.commit()
+        assert visible_ids(db, users["b"]) == []
+
+        expired.expiration_date = None
+        db.commit()
+        access, sharing = grants.access_for(users["a"].id, content.id)
+        assert sharing.id == expired.id and access.can_view
+        access.can_view = False
+        db.commit()
+        assert visible_ids(db, users["a"]) == []
+
+
+def test_access_is_materialized_once():
+    """Consultations répétées: une seule ligne content_accesses par élève et partage"""
+    with sharing_database() as (db, users, class_group, content):
+        sharing = share(db, users["prof"], content, "all_students", None)
+        grants = SharingGrants(db)
+        first, _ = grants.access_for(users["a"].id, content.id)
+        db.commit()
+        second, second_sharing = grants.access_for(users["a"].id, content.id)
+        db.commit()
+        assert first.id == second.id and second_sharing.id == sharing.id
+        assert db.query(ContentAccess).filter(ContentAccess.student_id == users["a"].id).count() == 1
+        assert grants.access_for(users["c"].id, content.id) == (None, None)
+
+
+if __name__ == "__main__":
+    print("🧪 Destinataires des partages de contenu")
+    test_class_members_resolved_at_read_time()
+    print("✅ Membres des classes résolus à la lecture")
+    test_expired_and_revoked_sharings_are_hidden()
+    print("✅ Partages expirés ou révoqués invisibles")
+    test_access_is_materialized_once()
+    print("✅ Accès créé une seule fois")
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test des compteurs différés (services/counter_buffer.py): les vues restent en
+mémoire (lues avec le delta en attente) jusqu'au vidage, l'arrêt de l'application
+écrit tout ce qui reste, et un lot en échec est conservé puis réécrit.
+"""
+
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from core.database import Base
+import models  # noqa: F401  (enregistre tous les mappers)
+from models.category import Category  # noqa: F401  (référencée par contents)
+from models.forum import ForumCategory, ForumThread
+from models.user import User, UserRole
+from services.counter_buffer import FORUM_THREAD_VIEWS, CounterBuffer, counter_buffer
+
+
+@contextmanager
+def forum_database():
+    """Base temporaire avec un fil de discussion; retourne (Session, id du fil)"""
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'counters.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        db = Session()
+        try:
+            author = User(email="prof@najah.ma", username="prof", hashed_password="x", role=UserRole.teacher)
+            category = ForumCategory(name="Mathématiques")
+            db.add_all([author, category])
+            db.commit()
+            thread = ForumThread(title="Fractions", content="Question", category_id=category.id,
+                                 author_id=author.id, view_count=0)
+            db.add(thread)
+            db.commit()
+            yield Session, thread.id
+        finally:
+            db.close()
+            Base.metadata.drop_all(bind=engine)
+            engine.dispose()
+
+
+def stored_views(Session, thread_id):
+    db = Session()
+    try:
+        return db.query(ForumThread.view_count).filter(ForumThread.id == thread_id).scalar()
+    finally:
+        db.close()
+
+
+def test_shutdown_flushes_pending_views():
+    """30 vues cumulées en mémoire: rien en base avant l'arrêt, tout après"""
+    from app import flush_write_behind_queues
+
+    with forum_database() as (Session, thread_id):
+        saved = counter_buffer.session_factory, counter_buffer.flush_interval
+        counter_buffer.session_factory, counter_buffer.flush_interval = Session, 3600
+        try:
+            for _ in range(30):
+                counter_buffer.increment(FORUM_THREAD_VIEWS, thread_id)
+            assert stored_views(Session, thread_id) == 0
+            assert counter_buffer.pending(FORUM_THREAD_VIEWS, thread_id) == 30
+
+            flush_write_behind_queues()
+            assert stored_views(Session, thread_id) == 30
+            assert counter_buffer.pending(FORUM_THREAD_VIEWS, thread_id) == 0
+        finally:
+            counter_buffer.take()
+            counter_buffer.session_factory, counter_buffer.flush_interval = saved
+
+
+def test_failed_flush_keeps_pending_deltas():
+    """Écriture impossible: les deltas restent en attente et s'ajoutent aux suivants"""
+    with forum_database() as (Session, thread_id), tempfile.TemporaryDirectory() as directory:
+        empty = create_engine(f"sqlite:///{os.path.join(directory, 'empty.db')}")
+        buffer = CounterBuffer(session_factory=sessionmaker(bind=empty), flush_interval=3600)
+        try:
+            buffer.increment(FORUM_THREAD_VIEWS, thread_id, delta=2)
+            assert buffer.flush() == 0
+            assert buffer.pending(FORUM_THREAD_VIEWS, thread_id) == 2
+
+            buffer.increment(FORUM_THREAD_VIEWS, thread_id)
+            buffer.session_factory = Session
+            assert buffer.flush() == 1
+            assert stored_views(Session, thread_id) == 3
+            assert buffer.pending(FORUM_THREAD_VIEWS, thread_id) == 0
+        finally:
+            empty.dispose()
+
+
+if __name__ == "__main__":
+    print("🧪 Compteurs différés")
+    test_shutdown_flushes_pending_views()
+    print("✅ Vues écrites à l'arrêt de l'application")
+    test_failed_flush_keeps_pending_deltas()
+    print("✅ Lot en échec conservé puis réécrit")
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Test de l'assignation d'un parcours partagé à une classe
+(POST /api/v1/learning_paths/class/{class_id}/assign): enseignant de la classe,
+autre enseignant, écarts par élève et réassignation idempotente.
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from core.database import Base, get_db
+from core.security import get_current_user
+import models  # noqa: F401  (enregistre tous les mappers)
+from models.category import Category  # noqa: F401  (référencée par contents)
+from models.class_group import ClassGroup, ClassStudent
+from models.student_learning_path import StudentLearningPath
+from models.student_path_step_override import StudentPathStepOverride
+from models.user import User, UserRole
+from api.v1 import learning_paths
+
+
+def test_assign_learning_path_to_class():
+    """Seul l'enseignant de la classe assigne; chaque élève reçoit le parcours une fois"""
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'paths.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        db = Session()
+        try:
+            teacher = User(email="prof@najah.ma", username="prof", hashed_password="x", role=UserRole.teacher)
+            other = User(email="autre@najah.ma", username="autre", hashed_password="x", role=UserRole.teacher)
+            students = [User(email=f"eleve{i}@najah.ma", username=f"eleve{i}", hashed_password="x",
+                             role=UserRole.student) for i in range(3)]
+            db.add_all([teacher, other, *students])
+            db.commit()
+            class_group = ClassGroup(name="6e A", teacher_id=teacher.id)
+            db.add(class_group)
+            db.commit()
+            db.add_all([ClassStudent(class_id=class_group.id, student_id=s.id) for s in students[:2]])
+            db.commit()
+
+            app = FastAPI()
+            app.include_router(learning_paths.router, prefix="/api/v1/learning_paths")
+            current = {"user": teacher}
+
+            def override_get_db():
+                session = Session()
+                try:
+                    yield session
+                finally:
+                    session.close()
+
+            app.dependency_overrides[get_db] = override_get_db
+            app.dependency_overrides[get_current_user] = lambda: current["user"]
+            client = TestClient(app)
+            url = f"/api/v1/learning_paths/class/{class_group.id}/assign"
+            body = {"subject": "Mathématiques", "level": "Débutant",
+                    "overrides": {str(students[0].id): {"2": {"is_required": False}}}}
+
+            response = client.post(url, json=body)
+            assert response.status_code == 200, response.text
+            assert response.json()["students"] == 2
+            assert response.json()["newly_assigned"] == 2
+            path_id = response.json()["learning_path_id"]
+            assigned = {sid for (sid,) in db.query(StudentLearningPath.student_id).filter(
+                StudentLearningPath.learning_path_id == path_id)}
+            assert assigned == {students[0].id, students[1].id}
+            assert db.query(StudentPathStepOverride).count() == 1
+
+            # Réassignation: aucun doublon
+            response = client.post(url, json={"subject": "Mathématiques", "level": "Débutant"})
+            assert response.status_code == 200
+            assert response.json()["newly_assigned"] == 0
+
+            # Élève hors de la classe dans les écarts
+            outsider = {"subject": "Mathématiques", "overrides": {str(students[2].id): {"1": {"is_required": False}}}}
+            assert client.post(url, json=outsider).status_code == 400
+
+            # Autre enseignant, classe inconnue
+            current["user"] = other
+            assert client.post(url, json=body).status_code == 403
+            assert client.post("/api/v1/learning_paths/class/9999/assign", json=body).status_code == 404
+        finally:
+            db.close()
+            Base.metadata.drop_all(bind=engine)
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    print("🧪 Assignation d'un parcours à une classe")
+    test_assign_learning_path_to_class()
+    print("✅ Test réussi")
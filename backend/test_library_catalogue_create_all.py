@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Test du catalogue de la bibliothèque sur une base créée par Base.metadata.create_all
+(sans alembic): la table plein texte library_catalogue_fts doit exister et être
+alimentée à l'écriture d'un contenu.
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from core.database import Base
+import models  # noqa: F401  (enregistre tous les mappers)
+from models.category import Category  # noqa: F401  (référencée par contents)
+from models.content import Content
+from models.library_catalogue import LibraryCatalogueEntry
+from models.user import User, UserRole
+
+
+def test_create_all_then_insert_content():
+    """create_all puis insertion d'un contenu: catalogue et plein texte à jour"""
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'catalogue.db')}")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        try:
+            author = User(email="auteur@najah.ma", username="auteur", hashed_password="x",
+                          role=UserRole.teacher, first_name="Amal", last_name="Idrissi")
+            db.add(author)
+            db.commit()
+
+            content = Content(title="Équations du second degré", description="Cours illustré",
+                              content_type="document", subject="Mathématiques", level="intermediate",
+                              tags='["algèbre"]', created_by=author.id)
+            db.add(content)
+            db.commit()
+
+            entry = db.get(LibraryCatalogueEntry, content.id)
+            assert entry is not None
+            assert entry.author == "Amal Idrissi"
+            matches = db.execute(
+                text("SELECT rowid FROM library_catalogue_fts WHERE library_catalogue_fts MATCH :q"),
+                {"q": "equations"}
+            ).scalars().all()
+            assert matches == [content.id]
+
+            db.delete(content)
+            db.commit()
+            remaining = db.execute(text("SELECT COUNT(*) FROM library_catalogue_fts")).scalar()
+            assert remaining == 0
+        finally:
+            db.close()
+            Base.metadata.drop_all(bind=engine)
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    print("🧪 Catalogue de la bibliothèque sur une base create_all")
+    test_create_all_then_insert_content()
+    print("✅ Test réussi")
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Test de l'invalidation du cache de réponses (core/response_cache.py):
+étiquettes oubliées au commit d'une écriture (pas au flush, pas après un rollback),
+changements d'effectifs des classes (ClassStudent, ClassGroup, suppressions en masse)
+et réponses de route MISS / HIT / 304.
+"""
+
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from core.database import Base
+from core.response_cache import cached_response, response_cache
+import models  # noqa: F401  (enregistre tous les mappers)
+from models.category import Category  # noqa: F401  (référencée par contents)
+from models.class_group import ClassGroup, ClassStudent
+from models.quiz import Quiz, QuizResult
+from models.user import User, UserRole
+
+TAGS = ["class:{class_id}", "teacher:{teacher_id}", "student:{student_id}", "class:*"]
+
+
+@contextmanager
+def school():
+    """Base temporaire: deux enseignants, une classe de deux élèves, un élève hors classe"""
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'cache.db')}")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        try:
+            users = {name: User(email=f"{name}@najah.ma", username=name, hashed_password="x", role=role)
+                     for name, role in (("prof", UserRole.teacher), ("autre", UserRole.teacher),
+                                        ("a", UserRole.student), ("b", UserRole.student), ("c", UserRole.student))}
+            db.add_all(users.values())
+            db.commit()
+            class_group = ClassGroup(name="6e A", teacher_id=users["prof"].id)
+            db.add(class_group)
+            db.commit()
+            db.add_all([ClassStudent(class_id=class_group.id, student_id=users[name].id) for name in ("a", "b")])
+            db.commit()
+            response_cache.clear()
+            yield db, users, class_group
+        finally:
+            db.close()
+            response_cache.clear()
+            Base.metadata.drop_all(bind=engine)
+            engine.dispose()
+
+
+def cache(*tags):
+    """Mettre en cache une réponse étiquetée; retourne sa clé"""
+    key = "|".join(tags)
+    response_cache.backend.set(key, '"etag"', b"{}", tuple(tags), 60)
+    return key
+
+
+def cached(key):
+    return response_cache.backend.get(key) is not None
+
+
+def test_write_invalidates_after_commit_only():
+    """Un résultat de quiz oublie l'élève, sa classe et son enseignant au commit"""
+    with school() as (db, users, class_group):
+        quiz = Quiz(title="Fractions", subject="Mathématiques", created_by=users["autre"].id)
+        db.add(quiz)
+        db.commit()
+        keys = {
+            "student": cache(f"student:{users['a'].id}"),
+            "class": cache(f"class:{class_group.id}"),
+            "all_classes": cache("class:*"),
+            "teacher": cache(f"teacher:{users['prof'].id}"),
+            "creator": cache(f"teacher:{users['autre'].id}"),
+            "other_student": cache(f"student:{users['c'].id}"),
+        }
+
+        def submit():
+            db.add(QuizResult(user_id=users["a"].id, student_id=users["a"].id, quiz_id=quiz.id, score=1,
+                              max_score=2, percentage=50.0, is_completed=True))
+            db.flush()
+
+        submit()
+        assert all(cached(key) for key in keys.values()), "invalidé avant le commit"
+        db.rollback()
+        assert all(cached(key) for key in keys.values()), "invalidé malgré le rollback"
+
+        submit()
+        db.commit()
+        assert not any(cached(keys[name]) for name in ("student", "class", "all_classes", "teacher", "creator"))
+        assert cached(keys["other_student"])
+
+
+def test_class_membership_changes_invalidate_class_and_teacher():
+    """Ajout, retrait (un à un ou en masse) d'élèves et changement d'enseignant"""
+    with school() as (db, users, class_group):
+        class_key, teacher_key = cache(f"class:{class_group.id}"), cache(f"teacher:{users['prof'].id}")
+        student_key = cache(f"student:{users['c'].id}")
+        db.add(ClassStudent(class_id=class_group.id, student_id=users["c"].id))
+        db.commit()
+        assert not cached(class_key) and not cached(teacher_key) and not cached(student_key)
+
+        class_key, teacher_key = cache(f"class:{class_group.id}"), cache(f"teacher:{users['prof'].id}")
+        membership = db.query(ClassStudent).filter(ClassStudent.student_id == users["c"].id).one()
+        db.delete(membership)
+        db.commit()
+        assert not cached(class_key) and not cached(teacher_key)
+
+        # Suppression en masse (suppression d'une classe): les élèves visés sont relus avant l'exécution
+        class_key, student_key = cache(f"class:{class_group.id}"), cache(f"student:{users['a'].id}")
+        db.query(ClassStudent).filter(ClassStudent.class_id == class_group.id).delete()
+        assert cached(class_key)
+        db.commit()
+        assert not cached(class_key) and not cached(student_key)
+
+        # Classe réattribuée: ancien et nouvel enseignant
+        old_key, new_key = cache(f"teacher:{users['prof'].id}"), cache(f"teacher:{users['autre'].id}")
+        class_group.teacher_id = users["autre"].id
+        db.commit()
+        assert not cached(old_key) and not cached(new_key)
+
+
+def test_cached_route_hit_and_conditional_get():
+    """Deuxième appel servi par le cache, If-None-Match -> 304, invalidation -> MISS"""
+    response_cache.clear()
+    calls = []
+    app = FastAPI()
+
+    @app.get("/classes/{class_id}/stats")
+    @cached_response(tags=["class:{class_id}"])
+    def stats(class_id: int, request: Request):
+        calls.append(class_id)
+        return {"class_id": class_id, "calls": len(calls)}
+
+    client = TestClient(app)
+    first = client.get("/classes/3/stats")
+    assert first.headers["X-Cache"] == "MISS"
+    second = client.get("/classes/3/stats")
+    assert second.headers["X-Cache"] == "HIT" and second.json() == first.json()
+    assert client.get("/classes/3/stats", headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+    response_cache.invalidate("class:3")
+    assert client.get("/classes/3/stats").headers["X-Cache"] == "MISS"
+    assert calls == [3, 3]
+    response_cache.clear()
+
+
+if __name__ == "__main__":
+    print("🧪 Cache de réponses")
+    test_write_invalidates_after_commit_only()
+    print("✅ Invalidation au commit seulement")
+    test_class_membership_changes_invalidate_class_and_teacher()
+    print("✅ Changements d'effectifs des classes")
+    test_cached_route_hit_and_conditional_get()
+    print("✅ MISS / HIT / 304")
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Test de l'annuaire des classes (services/roster.py): instantané partagé tant
+que rien ne change, invalidé par l'ajout ou le retrait d'un élève (un à un ou
+en masse) et par la réattribution d'une classe, jamais gardé après un rollback.
+"""
+
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from core.database import Base
+import models  # noqa: F401  (enregistre tous les mappers)
+from models.category import Category  # noqa: F401  (référencée par contents)
+from models.class_group import ClassGroup, ClassStudent
+from models.user import User, UserRole
+from services.roster import (
+    Roster, class_student_ids, get_roster, invalidate_roster, student_class_ids, teacher_has_student
+)
+
+
+@contextmanager
+def roster_database():
+    """Base temporaire: deux enseignants, une classe d'un élève, un élève hors classe"""
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'roster.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        db = Session()
+        try:
+            users = {name: User(email=f"{name}@najah.ma", username=name, hashed_password="x", role=role)
+                     for name, role in (("prof", UserRole.teacher), ("autre", UserRole.teacher),
+                                        ("a", UserRole.student), ("b", UserRole.student))}
+            db.add_all(users.values())
+            db.commit()
+            class_group = ClassGroup(name="6e A", teacher_id=users["prof"].id)
+            db.add(class_group)
+            db.commit()
+            db.add(ClassStudent(class_id=class_group.id, student_id=users["a"].id))
+            db.commit()
+            invalidate_roster()
+            yield Session, db, users, class_group
+        finally:
+            db.close()
+            invalidate_roster()
+            Base.metadata.drop_all(bind=engine)
+            engine.dispose()
+
+
+def test_membership_insert_and_delete_invalidate_snapshot():
+    """Ajout puis retrait d'un élève visibles dès le commit, y compris dans une autre session"""
+    with roster_database() as (Session, db, users, class_group):
+        snapshot = get_roster(db)
+        assert get_roster(db) is snapshot
+        assert not teacher_has_student(db, users["prof"].id, users["b"].id)
+
+        db.add(ClassStudent(class_id=class_group.id, student_id=users["b"].id))
+        db.commit()
+        other = Session()
+        try:
+            assert get_roster(other) is not snapshot
+            assert teacher_has_student(other, users["prof"].id, users["b"].id)
+            assert student_class_ids(other, users["b"].id) == (class_group.id,)
+
+            membership = db.query(ClassStudent).filter(ClassStudent.student_id == users["b"].id).one()
+            db.delete(membership)
+            db.commit()
+            assert not teacher_has_student(other, users["prof"].id, users["b"].id)
+
+            db.query(ClassStudent).filter(ClassStudent.class_id == class_group.id).delete()
+            db.commit()
+            assert class_student_ids(other, class_group.id) == frozenset()
+
+            class_group.teacher_id = users["autre"].id
+            db.commit()
+            assert get_roster(other).class_teacher[class_group.id] == users["autre"].id
+        finally:
+            other.close()
+
+
+def test_rolled_back_membership_is_not_kept():
+    """Un instantané lu avant le rollback (élève ajouté non commité) n'est pas resservi"""
+    with roster_database() as (Session, db, users, class_group):
+        db.add(ClassStudent(class_id=class_group.id, student_id=users["b"].id))
+        db.flush()
+        assert teacher_has_student(db, users["prof"].id, users["b"].id)
+        db.rollback()
+
+        other = Session()
+        try:
+            assert not teacher_has_student(other, users["prof"].id, users["b"].id)
+        finally:
+            other.close()
+
+
+def test_invalidation_during_load_discards_snapshot():
+    """Une invalidation pendant le chargement: l'instantané lu n'est pas mis en cache"""
+    with roster_database() as (Session, db, users, class_group):
+        original_load = Roster.load
+
+        def load_then_invalidate(db):
+            roster = original_load(db)
+            invalidate_roster()  # commit d'une autre requête pendant la lecture
+            return roster
+
+        Roster.load = load_then_invalidate
+        try:
+            first = get_roster(db)
+        finally:
+            Roster.load = original_load
+        assert get_roster(db) is not first
+
+
+if __name__ == "__main__":
+    print("🧪 Annuaire des classes")
+    test_membership_insert_and_delete_invalidate_snapshot()
+    print("✅ Ajout et retrait d'élèves")
+    test_rolled_back_membership_is_not_kept()
+    print("✅ Rien de gardé après un rollback")
+    test_invalidation_during_load_discards_snapshot()
+    print("✅ Instantané périmé non mis en cache")
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Test du noyau de notation (services/scoring_kernel.py) contre la comparaison
+historique de submit_quiz: QCM à options numériques, accents, index d'options,
+vrai/faux et réponses numériques.
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.scoring_kernel import compile_key, grade
+
+
+def baseline_mcq(options, correct_answer, answer):
+    """Comparaison de l'ancien submit_quiz pour un QCM"""
+    if isinstance(correct_answer, int) and 0 <= correct_answer < len(options):
+        correct_text = options[correct_answer]
+    else:
+        correct_text = correct_answer if isinstance(correct_answer, str) else ""
+    return str(answer).strip().lower() == correct_text.strip().lower()
+
+
+def test_numeric_options_match_by_text():
+    """Options "2".."5": la réponse 4 (entier JSON ou texte) désigne l'option "4", pas l'index 4"""
+    options = ["2", "3", "4", "5"]
+    key = compile_key(1, "mcq", "4", options)
+    for answer in (4, "4", " 4 ", 2, "2", 0, 3, "5"):
+        assert key.check(answer) == baseline_mcq(options, "4", answer), answer
+    # Index accepté seulement pour une copie déclarée en index et sans option de ce texte
+    assert key.check(2, by_index=True) is False
+    letters = compile_key(2, "mcq", "Paris", ["Rabat", "Paris", "Fès"])
+    assert letters.check(1) is False
+    assert letters.check(1, by_index=True) is True
+    assert letters.check(True, by_index=True) is False
+
+
+def test_accents_are_significant():
+    """Casse et espaces ignorés comme avant; un accent manquant rend la réponse fausse"""
+    text = compile_key(1, "text", "mangé")
+    assert text.check("  MANGÉ ") is True
+    assert text.check("mange") is False
+    choice = compile_key(2, "mcq", "à", ["a", "à", "as"])
+    assert choice.check("à") is True
+    assert choice.check("a") is False
+    for answer in ("à", "a", "À "):
+        assert choice.check(answer) == baseline_mcq(["a", "à", "as"], "à", answer), answer
+
+
+def test_numeric_and_boolean_keys():
+    """Tout ce qu'acceptait l'ancienne comparaison reste accepté"""
+    number = compile_key(1, "text", "3.5")
+    assert number.check("3.5") and number.check("3,50") and number.check(3.5)
+    assert not number.check("3.6")
+    boolean = compile_key(2, "true_false", True)
+    assert boolean.check("true") and boolean.check("Vrai") and boolean.check(True)
+    assert not boolean.check("faux")
+
+    keys = {1: number, 2: boolean, 3: compile_key(3, "mcq", 2, ["x", "y", "z"], points=2)}
+    report = grade(keys, {"1": "3,5", "2": "vrai", "3": "z", "99": "ignorée"})
+    assert (report.score, report.max_score, report.correct_count) == (4.0, 4.0, 3)
+    assert report.by_question()[3].correct_answer == "z"
+
+
+if __name__ == "__main__":
+    print("🧪 Noyau de notation")
+    test_numeric_options_match_by_text()
+    print("✅ Options numériques comparées par texte")
+    test_accents_are_significant()
+    print("✅ Accents pris en compte")
+    test_numeric_and_boolean_keys()
+    print("✅ Réponses numériques et vrai/faux")
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Test de la file de tâches après soumission (services/task_queue.py):
+compteurs de badges d'un élève sans compteurs avec plusieurs tâches en attente,
+clés d'idempotence, nouveaux essais et reprise d'une tâche interrompue sans
+appliquer ses effets deux fois, réservation exclusive des tâches per_user d'un
+même élève, lecture du suivi
+(/api/v1/background-tasks) limitée aux enseignants de l'élève, et progression
+de toutes les règles calculée sur un seul rejeu de l'historique.
+"""
+
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from core.database import Base, get_db
+from core.security import get_current_user
+import models  # noqa: F401  (enregistre tous les mappers)
+from models.background_task import BackgroundTask, TASK_FAILED, TASK_PENDING, TASK_RUNNING, TASK_SUCCEEDED
+from models.category import Category  # noqa: F401  (référencée par contents)
+from models.class_group import ClassGroup, ClassStudent
+from models.gamification import StudentBadgeCounter
+from models.learning_history import LearningHistory
+from models.quiz import Quiz, QuizResult
+from models.user import User, UserRole
+from services.badge_rule_engine import BADGE_RULES, BadgeRuleEngine
+from services.post_submission_tasks import QUIZ_RESULT_BADGES, enqueue_quiz_result_processing
+from services.roster import invalidate_roster
+from services.task_queue import TaskWorkerPool, _handlers, claim_effects, enqueue, retry_delay, task_handler
+from api.v1 import background_tasks
+
+
+@contextmanager
+def queue_database():
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'tasks.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        try:
+            yield Session
+        finally:
+            Base.metadata.drop_all(bind=engine)
+            engine.dispose()
+
+
+def _submit_results(db, count):
+    """Élève et `count` résultats complétés, chacun avec ses tâches planifiées"""
+    teacher = User(email="prof@najah.ma", username="prof", hashed_password="x", role=UserRole.teacher)
+    student = User(email="eleve@najah.ma", username="eleve", hashed_password="x", role=UserRole.student)
+    db.add_all([teacher, student])
+    db.commit()
+    quiz = Quiz(title="Fractions", subject="Mathématiques", created_by=teacher.id)
+    db.add(quiz)
+    db.commit()
+    start = datetime(2026, 10, 5, 10, 0)
+    for day in range(count):
+        result = QuizResult(user_id=student.id, student_id=student.id, quiz_id=quiz.id, score=8, max_score=10,
+                            percentage=80.0, is_completed=True, sujet="Mathématiques",
+                            completed_at=start + timedelta(days=day), time_spent=600)
+        db.add(result)
+        db.flush()
+        enqueue_quiz_result_processing(db, result)
+    db.commit()
+    return student.id
+
+
+def test_pending_badge_tasks_are_not_replayed_twice():
+    """Le premier traitement rejoue l'historique sans les résultats dont la tâche attend encore"""
+    with queue_database() as Session:
+        db = Session()
+        try:
+            student_id = _submit_results(db, 3)
+            pool = TaskWorkerPool(session_factory=Session)
+            assert pool.run_pending() == 6
+            counter = db.query(StudentBadgeCounter).filter(
+                StudentBadgeCounter.student_id == student_id, StudentBadgeCounter.scope == "quiz"
+            ).one()
+            assert counter.event_count == 3
+            assert counter.current_streak == 3
+            assert db.query(BackgroundTask).filter(BackgroundTask.status != TASK_SUCCEEDED).count() == 0
+        finally:
+            db.close()
+
+
+def test_enqueue_is_idempotent_and_failures_are_retried():
+    """Même clé: une seule tâche; un échec est replanifié avec délai puis abandonné après max_attempts"""
+    calls = []
+
+    @task_handler("test_flaky", max_attempts=2)
+    def flaky(db):
+        calls.append(len(calls))
+        raise RuntimeError("service indisponible")
+
+    with queue_database() as Session:
+        db = Session()
+        try:
+            first = enqueue(db, "test_flaky", "demo:1")
+            assert enqueue(db, "test_flaky", "demo:1").id == first.id
+            db.commit()
+            assert db.query(BackgroundTask).count() == 1
+
+            pool = TaskWorkerPool(session_factory=Session)
+            before = datetime.utcnow()
+            assert pool.run_pending() == 1
+            db.refresh(first)
+            assert (first.status, first.attempts) == (TASK_PENDING, 1)
+            assert first.last_error == "RuntimeError: service indisponible"
+            assert first.run_at >= before + timedelta(seconds=retry_delay(1))
+            assert pool.run_pending() == 0, "nouvel essai avant son délai"
+
+            first.run_at = datetime.utcnow()
+            db.commit()
+            assert pool.run_pending() == 1
+            db.refresh(first)
+            assert (first.status, first.attempts) == (TASK_FAILED, 2)
+            assert first.finished_at is not None and calls == [0, 1]
+        finally:
+            db.close()
+            _handlers.pop("test_flaky", None)
+
+
+def test_interrupted_task_effects_are_applied_once():
+    """Worker disparu après le commit des effets: la reprise (bail expiré) ne les rejoue pas"""
+    @task_handler("test_effects")
+    def record(db, student_id):
+        if claim_effects(db):
+            db.add(LearningHistory(student_id=student_id, action="test_effects"))
+        return {"student_id": student_id}
+
+    with queue_database() as Session:
+        db = Session()
+        try:
+            student_id = _submit_results(db, 0)
+            task = enqueue(db, "test_effects", f"student:{student_id}", {"student_id": student_id})
+            db.commit()
+
+            crashing = TaskWorkerPool(session_factory=Session)
+
+            def crash(*args, **kwargs):
+                raise RuntimeError("worker interrompu")
+
+            crashing._finish = crash
+            try:
+                crashing.run_pending()
+                raise AssertionError("le worker aurait dû s'interrompre")
+            except RuntimeError as e:
+                assert str(e) == "worker interrompu"
+            db.refresh(task)
+            assert task.status == TASK_RUNNING and task.applied_at is not None
+
+            TaskWorkerPool(session_factory=Session, lease_seconds=0).run_pending()
+            db.refresh(task)
+            assert (task.status, task.attempts) == (TASK_SUCCEEDED, 2)
+            assert db.query(LearningHistory).filter(LearningHistory.action == "test_effects").count() == 1
+        finally:
+            db.close()
+            _handlers.pop("test_effects", None)
+
+
+def test_per_user_tasks_are_claimed_one_at_a_time():
+    """Une tâche de badges de l'élève en cours bloque la réservation des autres (pas des cubes)"""
+    with queue_database() as Session:
+        db = Session()
+        try:
+            student_id = _submit_results(db, 2)
+            pool = TaskWorkerPool(session_factory=Session)
+            first = pool.claim(db, "worker-a")
+            assert db.get(BackgroundTask, first).kind == QUIZ_RESULT_BADGES
+
+            # L'autre tâche de badges de l'élève attend; les cubes restent réservables
+            claimed = [pool.claim(db, "worker-b") for _ in range(3)]
+            kinds = [db.get(BackgroundTask, task_id).kind for task_id in claimed if task_id is not None]
+            assert QUIZ_RESULT_BADGES not in kinds
+            assert len(kinds) == 2
+
+            # Première tâche terminée: la suivante de l'élève devient réservable
+            db.query(BackgroundTask).filter(BackgroundTask.id == first).update(
+                {"status": TASK_SUCCEEDED, "locked_at": None, "locked_by": None}
+            )
+            db.commit()
+            second = pool.claim(db, "worker-b")
+            assert second is not None and second != first
+            task = db.get(BackgroundTask, second)
+            assert task.kind == QUIZ_RESULT_BADGES and task.user_id == student_id
+        finally:
+            db.close()
+
+
+def test_task_status_visible_to_class_teachers_only():
+    """Élève propriétaire, enseignant de sa classe et administrateur; pas un autre enseignant"""
+    with queue_database() as Session:
+        db = Session()
+        try:
+            student_id = _submit_results(db, 1)
+            teacher = db.query(User).filter(User.username == "prof").one()
+            other = User(email="autre@najah.ma", username="autre", hashed_password="x", role=UserRole.teacher)
+            admin = User(email="admin@najah.ma", username="admin", hashed_password="x", role=UserRole.admin)
+            db.add_all([other, admin])
+            db.commit()
+            class_group = ClassGroup(name="6e A", teacher_id=teacher.id)
+            db.add(class_group)
+            db.commit()
+            db.add(ClassStudent(class_id=class_group.id, student_id=student_id))
+            db.commit()
+            invalidate_roster()
+            task_id, subject = db.query(BackgroundTask.id, BackgroundTask.subject).filter(
+                BackgroundTask.user_id == student_id
+            ).first()
+
+            app = FastAPI()
+            app.include_router(background_tasks.router, prefix="/api/v1/background-tasks")
+            current = {}
+
+            def override_get_db():
+                session = Session()
+                try:
+                    yield session
+                finally:
+                    session.close()
+
+            app.dependency_overrides[get_db] = override_get_db
+            app.dependency_overrides[get_current_user] = lambda: current["user"]
+            client = TestClient(app)
+            for user, visible in ((db.get(User, student_id), True), (teacher, True), (admin, True), (other, False)):
+                current["user"] = user
+                expected = 200 if visible else 404
+                assert client.get(f"/api/v1/background-tasks/{task_id}").status_code == expected, user.username
+                assert client.get("/api/v1/background-tasks/", params={"subject": subject}).status_code == expected
+        finally:
+            db.close()
+            invalidate_roster()
+
+
+
+def test_progress_of_all_rules_replays_history_once():
+    """Sans compteurs persistés, toutes les règles sont évaluées sur un seul rejeu, sans écriture"""
+    with queue_database() as Session:
+        db = Session()
+        try:
+            student_id = _submit_results(db, 3)
+            TaskWorkerPool(session_factory=Session).run_pending()
+            db.query(StudentBadgeCounter).delete()
+            db.commit()
+
+            statements = []
+
+            @event.listens_for(db.get_bind(), "before_cursor_execute")
+            def count(conn, cursor, statement, parameters, context, executemany):
+                statements.append(statement)
+
+            names = [rule.name for rule in BADGE_RULES] + ["Inconnu"]
+            progress = BadgeRuleEngine(db).get_progress_many(student_id, names)
+            event.remove(db.get_bind(), "before_cursor_execute", count)
+
+            assert sum("FROM quiz_results" in statement for statement in statements) == 1
+            assert not any(statement.lstrip().upper().startswith(("INSERT", "UPDATE")) for statement in statements)
+            assert progress["Quiz Master"] == {"current": 3, "target": 10}
+            assert progress["Streak Master"] == {"current": 3, "target": 5}
+            assert progress["Perfect Score"]["current"] == 0
+            assert progress["Inconnu"] == {"current": 0, "target": 1}
+            assert BadgeRuleEngine(db).get_progress(student_id, "Rapide comme l'éclair")["current"] == 3
+        finally:
+            db.close()
+
+if __name__ == "__main__":
+    print("🧪 File de tâches après soumission")
+    test_enqueue_is_idempotent_and_failures_are_retried()
+    print("✅ Clé d'idempotence et nouveaux essais")
+    test_interrupted_task_effects_are_applied_once()
+    print("✅ Effets d'une tâche reprise appliqués une seule fois")
+    test_pending_badge_tasks_are_not_replayed_twice()
+    print("✅ Tâches de badges en attente non rejouées deux fois")
+    test_per_user_tasks_are_claimed_one_at_a_time()
+    print("✅ Tâches per_user réservées une à une")
+    test_task_status_visible_to_class_teachers_only()
+    print("✅ Suivi des tâches limité aux enseignants de l'élève")
+    test_progress_of_all_rules_replays_history_once()
+    print("✅ Progression de toutes les règles en un seul rejeu")